@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+"""
+异步多源策略搜集 - 并发抓取GitHub、arXiv、社区JSON等来源并写入StrategyCollector
+支持全局并发上限、按主机限速、指数退避重试、连接复用和ETag/Last-Modified条件请求（需要安装aiohttp）
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+import xml.etree.ElementTree as ET
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote_plus, urlsplit
+
+# 需要重试的HTTP状态码
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# 策略库的市场分类（StrategyCollector只保存这些分类）
+CATEGORIES = ('stocks', 'futures', 'crypto', 'options')
+
+# 按关键词推断策略分类（按顺序匹配，未命中时归为股票）
+CATEGORY_KEYWORDS = (
+    ('crypto', ('crypto', 'bitcoin', 'btc', 'ethereum', 'defi', '加密', '比特币', '以太坊')),
+    ('options', ('option', 'volatility', 'implied vol', 'greeks', '期权', '波动率')),
+    ('futures', ('future', 'commodit', 'cta', '期货', '商品')),
+)
+
+_ATOM = '{http://www.w3.org/2005/Atom}'
+
+# JSON来源缺少的策略字段按此补齐（扩展器依赖这些字段生成变体和混合策略）
+STRATEGY_DEFAULTS = {
+    'type': '其他',
+    'complexity': '中级',
+    'logic': '',
+    'indicators': '',
+    'language': 'Python',
+    'data_requirements': '',
+    'references': '',
+}
+
+
+def guess_category(text: str) -> str:
+    """根据标题和描述推断策略所属市场"""
+    text = (text or '').lower()
+    for category, keywords in CATEGORY_KEYWORDS:
+        if any(keyword in text for keyword in keywords):
+            return category
+    return 'stocks'
+
+
+def _import_aiohttp():
+    """导入可选依赖aiohttp"""
+    try:
+        import aiohttp
+    except ImportError as e:
+        raise ImportError("异步搜集需要安装aiohttp: pip install aiohttp") from e
+    return aiohttp
+
+
+class AsyncSource(ABC):
+    """异步搜集来源基类
+
+    urls() 给出需要抓取的地址，parse() 将响应正文解析为策略记录。
+    """
+
+    name = ''
+
+    def __init__(self, category: Optional[str] = None):
+        # 为None时按内容推断分类
+        if category is not None and category not in CATEGORIES:
+            raise ValueError(f"未知的策略分类: {category}（可选: {', '.join(CATEGORIES)}）")
+        self.category = category
+
+    @abstractmethod
+    def urls(self) -> List[str]:
+        """需要抓取的地址列表"""
+
+    def headers(self) -> Dict[str, str]:
+        """额外的请求头（如认证信息）"""
+        return {}
+
+    @abstractmethod
+    def parse(self, url: str, body: str) -> Iterable[Dict]:
+        """将响应正文解析为策略记录"""
+
+    def _category(self, *texts: str) -> str:
+        return self.category or guess_category(' '.join(t or '' for t in texts))
+
+
+class JsonFeedSource(AsyncSource):
+    """JSON策略列表（社区导出、内部镜像等）
+
+    响应为策略记录数组，或包含items/strategies数组的对象；
+    field_map 可将来源字段名映射为策略字段名。记录中的分类不属于CATEGORIES时按内容推断。
+    """
+
+    name = 'json'
+
+    def __init__(self, url: str, category: Optional[str] = None,
+                 field_map: Optional[Dict[str, str]] = None, source: str = ''):
+        super().__init__(category)
+        self.url = url
+        self.field_map = field_map or {}
+        self.source = source or urlsplit(url).netloc
+
+    def urls(self) -> List[str]:
+        return [self.url]
+
+    def parse(self, url, body):
+        data = json.loads(body)
+        if isinstance(data, dict):
+            data = data.get('items') or data.get('strategies') or []
+        for item in data:
+            record = {self.field_map.get(k, k): v for k, v in item.items()}
+            if not record.get('name'):
+                continue
+            if record.get('category') not in CATEGORIES:
+                record['category'] = self._category(record['name'], record.get('logic', ''))
+            for field, value in STRATEGY_DEFAULTS.items():
+                record.setdefault(field, value)
+            record.setdefault('source', self.source)
+            yield record
+
+
+class GitHubSearchSource(AsyncSource):
+    """GitHub仓库搜索（REST API /search/repositories）"""
+
+    name = 'github'
+
+    def __init__(self, query: str, category: Optional[str] = None, pages: int = 1,
+                 per_page: int = 50, api_url: str = 'https://api.github.com',
+                 token: Optional[str] = None):
+        super().__init__(category)
+        self.query = query
+        self.pages = pages
+        self.per_page = per_page
+        self.api_url = api_url.rstrip('/')
+        self.token = token or os.environ.get('GITHUB_TOKEN')
+
+    def urls(self):
+        return [
+            f'{self.api_url}/search/repositories?q={quote_plus(self.query)}'
+            f'&sort=stars&per_page={self.per_page}&page={page}'
+            for page in range(1, self.pages + 1)
+        ]
+
+    def headers(self):
+        headers = {'Accept': 'application/vnd.github+json'}
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        return headers
+
+    def parse(self, url, body):
+        for item in json.loads(body).get('items', []):
+            description = item.get('description') or ''
+            yield {
+                'name': item.get('full_name') or item.get('name'),
+                'category': self._category(item.get('name', ''), description,
+                                           ' '.join(item.get('topics') or [])),
+                'type': '开源实现',
+                'complexity': '中级',
+                'logic': description,
+                'indicators': ', '.join(item.get('topics') or []),
+                'language': item.get('language') or 'Python',
+                'data_requirements': '',
+                'source': 'GitHub',
+                'references': item.get('html_url', ''),
+            }
+
+
+class ArxivSource(AsyncSource):
+    """arXiv论文检索（Atom API）"""
+
+    name = 'arxiv'
+
+    def __init__(self, query: str, category: Optional[str] = None, max_results: int = 50,
+                 api_url: str = 'http://export.arxiv.org/api/query'):
+        super().__init__(category)
+        self.query = query
+        self.max_results = max_results
+        self.api_url = api_url
+
+    def urls(self):
+        return [
+            f'{self.api_url}?search_query={quote_plus(self.query)}'
+            f'&sortBy=submittedDate&sortOrder=descending&max_results={self.max_results}'
+        ]
+
+    def parse(self, url, body):
+        root = ET.fromstring(body)
+        for entry in root.iter(f'{_ATOM}entry'):
+            title = ' '.join((entry.findtext(f'{_ATOM}title') or '').split())
+            summary = ' '.join((entry.findtext(f'{_ATOM}summary') or '').split())
+            if not title:
+                continue
+            yield {
+                'name': title,
+                'category': self._category(title, summary),
+                'type': '学术研究',
+                'complexity': '高级',
+                'logic': summary[:300],
+                'indicators': '',
+                'language': 'Python',
+                'data_requirements': '',
+                'source': 'arXiv',
+                'references': entry.findtext(f'{_ATOM}id') or '',
+            }
+
+
+ASYNC_SOURCES = {
+    'json': JsonFeedSource,
+    'github': GitHubSearchSource,
+    'arxiv': ArxivSource,
+}
+
+
+def get_async_source(name: str, **kwargs) -> AsyncSource:
+    """按名称创建搜集来源"""
+    if name not in ASYNC_SOURCES:
+        raise ValueError(f"未知的搜集来源: {name}（可选: {', '.join(ASYNC_SOURCES)}）")
+    return ASYNC_SOURCES[name](**kwargs)
+
+
+def load_sources(path: str) -> List[AsyncSource]:
+    """读取来源配置文件：{"sources": [{"type": "github", "query": "..."}, ...]}"""
+    with open(path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    sources = []
+    for entry in config.get('sources', []):
+        entry = dict(entry)
+        sources.append(get_async_source(entry.pop('type'), **entry))
+    return sources
+
+
+class HttpCache:
+    """条件请求缓存：按URL保存ETag、Last-Modified和响应正文
+
+    条目保存为 cache_dir/<前两位>/<URL哈希>.json，收到304时直接使用缓存正文。
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, url: str) -> str:
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, key[:2], f'{key}.json')
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(url), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, url: str, etag: Optional[str], last_modified: Optional[str], body: str):
+        path = self._path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'url': url, 'etag': etag, 'last_modified': last_modified, 'body': body},
+                      f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def conditional_headers(entry: Optional[Dict[str, Any]]) -> Dict[str, str]:
+        """由缓存条目生成条件请求头"""
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+
+class HostRateLimiter:
+    """按主机限速：同一主机的相邻请求至少间隔 1/rate 秒"""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate if rate > 0 else 0.0
+        self.next_allowed: Dict[str, float] = {}
+
+    async def acquire(self, host: str):
+        if not self.interval:
+            return
+        # 事件循环是单线程的，预约时间槽无需加锁
+        now = time.monotonic()
+        slot = max(now, self.next_allowed.get(host, now))
+        self.next_allowed[host] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class AsyncStrategyCollector:
+    """异步多源搜集器
+
+    所有请求共用一个连接池（aiohttp.ClientSession），全局并发由concurrency限制，
+    同一主机的请求按per_host_rate限速；429/5xx和网络错误按指数退避重试
+    （优先遵循Retry-After）。解析出的策略按来源和URL的固定顺序交给
+    collector.add_strategy，因此结果与抓取完成的先后无关。
+    """
+
+    def __init__(self, collector, sources: List[AsyncSource], concurrency: int = 32,
+                 per_host_rate: float = 2.0, per_host_connections: int = 4,
+                 retries: int = 3, backoff: float = 0.5, timeout: float = 30.0,
+                 cache_dir: Optional[str] = None,
+                 user_agent: str = 'quant-strategy-collector/1.0'):
+        self.collector = collector
+        self.sources = sources
+        self.concurrency = concurrency
+        self.per_host_connections = per_host_connections
+        self.rate_limiter = HostRateLimiter(per_host_rate)
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.cache = HttpCache(cache_dir) if cache_dir else None
+        self.user_agent = user_agent
+        self.stats = {'requests': 0, 'not_modified': 0, 'retries': 0, 'failed': 0,
+                      'parsed': 0, 'added': 0, 'duplicates': 0}
+
+    async def fetch(self, session, semaphore: asyncio.Semaphore, url: str,
+                    headers: Dict[str, str]) -> Optional[str]:
+        """抓取单个URL，返回正文；重试耗尽后返回None
+
+        只有请求本身占用并发名额，按主机限速的等待和退避等待都在名额之外，
+        同一主机的大量URL或很长的Retry-After不会占满并发、拖慢其他主机。
+        """
+        aiohttp = _import_aiohttp()
+        cached = self.cache.get(url) if self.cache else None
+        headers = {**headers, **HttpCache.conditional_headers(cached)}
+        host = urlsplit(url).netloc
+
+        for attempt in range(self.retries + 1):
+            await self.rate_limiter.acquire(host)
+            self.stats['requests'] += 1
+            delay = self.backoff * (2 ** attempt) * (1 + random.random() / 2)
+            try:
+                async with semaphore, session.get(url, headers=headers) as response:
+                    if response.status == 304 and cached is not None:
+                        self.stats['not_modified'] += 1
+                        return cached['body']
+                    if response.status < 400:
+                        body = await response.text()
+                        etag = response.headers.get('ETag')
+                        last_modified = response.headers.get('Last-Modified')
+                        if self.cache and (etag or last_modified):
+                            self.cache.put(url, etag, last_modified, body)
+                        return body
+                    if response.status not in RETRY_STATUSES:
+                        print(f"抓取失败 {url}: HTTP {response.status}")
+                        break
+                    retry_after = response.headers.get('Retry-After', '')
+                    if retry_after.isdigit():
+                        delay = float(retry_after)
+                    reason = f"HTTP {response.status}"
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                reason = type(e).__name__
+            if attempt < self.retries:
+                self.stats['retries'] += 1
+                await asyncio.sleep(delay)
+            else:
+                print(f"抓取失败 {url}: {reason}（已重试 {self.retries} 次）")
+        self.stats['failed'] += 1
+        return None
+
+    async def _collect_url(self, session, semaphore: asyncio.Semaphore,
+                           source: AsyncSource, url: str) -> List[Dict]:
+        body = await self.fetch(session, semaphore, url, source.headers())
+        if body is None:
+            return []
+        try:
+            return list(source.parse(url, body))
+        except Exception as e:
+            # 来源返回的内容不可信：任何解析错误只丢弃这个URL，不影响其他来源
+            print(f"解析失败 {url}: {type(e).__name__}: {e}")
+            self.stats['failed'] += 1
+            return []
+
+    async def run(self) -> Dict[str, int]:
+        """并发抓取全部来源，并按固定顺序写入搜集器"""
+        aiohttp = _import_aiohttp()
+        tasks: List[Tuple[AsyncSource, str]] = [
+            (source, url) for source in self.sources for url in source.urls()
+        ]
+        semaphore = asyncio.Semaphore(self.concurrency)
+        connector = aiohttp.TCPConnector(limit=self.concurrency,
+                                         limit_per_host=self.per_host_connections)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                         headers={'User-Agent': self.user_agent}) as session:
+            results = await asyncio.gather(*(
+                self._collect_url(session, semaphore, source, url) for source, url in tasks
+            ), return_exceptions=True)
+
+        for (source, url), strategies in zip(tasks, results):
+            if isinstance(strategies, Exception):
+                print(f"抓取失败 {url}: {type(strategies).__name__}: {strategies}")
+                self.stats['failed'] += 1
+                continue
+            for strategy in strategies:
+                self.stats['parsed'] += 1
+                if self.collector.add_strategy(strategy):
+                    self.stats['added'] += 1
+                else:
+                    self.stats['duplicates'] += 1
+        return self.stats
+
+    def collect(self) -> Dict[str, int]:
+        """同步入口"""
+        return asyncio.run(self.run())
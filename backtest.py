@@ -0,0 +1,655 @@
+#!/usr/bin/env python3
+"""
+向量化回测引擎 - 为策略目录中的基础策略计算信号和绩效指标
+行情以 (bar数, 标的数) 的二维数组表示，指标和仓位都按整列计算，没有逐bar的Python循环
+"""
+
+import argparse
+import functools
+import inspect
+import math
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+# 年化使用的每年bar数（日线）
+PERIODS_PER_YEAR = 252
+
+# EWM类指标（EMA、Wilder平滑）有无限记忆：按周期的这个倍数截断时，更早数据的权重已低于浮点舍入误差
+EWM_MEMORY = 40
+
+# 回测结果中汇总到策略目录的指标
+SUMMARY_METRICS = ('total_return', 'annual_return', 'annual_volatility', 'sharpe',
+                   'max_drawdown', 'trades', 'exposure')
+
+
+class IndicatorMemo:
+    """滚动指标的记忆化缓存
+
+    只缓存输入全部为已注册行情数组的指标调用（按数组id识别，注册时保留数组引用，id不会被复用），
+    参数扫描中不同参数组合共用的均线、RSI、ATR等只计算一次。缓存的结果设为只读，
+    总大小超过max_bytes时按最近最少使用淘汰。
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._arrays: Dict[int, np.ndarray] = {}
+        self._results: 'OrderedDict[tuple, np.ndarray]' = OrderedDict()
+
+    def register(self, panel: Mapping[str, np.ndarray]):
+        """登记一组行情数组，以它们为输入的指标调用才会被缓存"""
+        for values in panel.values():
+            self._arrays[id(values)] = values
+
+    def key(self, name: str, args: tuple) -> Optional[tuple]:
+        """调用的缓存键，参数中有未登记的数组时返回None"""
+        parts = [name]
+        for arg in args:
+            if isinstance(arg, np.ndarray):
+                if self._arrays.get(id(arg)) is not arg:
+                    return None
+                parts.append(('array', id(arg)))
+            else:
+                parts.append(arg)
+        return tuple(parts)
+
+    def get(self, key: tuple) -> Optional[np.ndarray]:
+        result = self._results.get(key)
+        if result is not None:
+            self._results.move_to_end(key)
+            self.hits += 1
+        return result
+
+    def put(self, key: tuple, result: np.ndarray):
+        self.misses += 1
+        result.flags.writeable = False
+        self._results[key] = result
+        self.nbytes += result.nbytes
+        while self.nbytes > self.max_bytes and len(self._results) > 1:
+            _, evicted = self._results.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+
+
+# 当前生效的指标缓存（由 memoize_indicators 设置）
+_active_memo: Optional[IndicatorMemo] = None
+
+
+@contextmanager
+def memoize_indicators(memo: Optional[IndicatorMemo]) -> Iterator[Optional[IndicatorMemo]]:
+    """在代码块内启用指标缓存（memo为None时不缓存）"""
+    global _active_memo
+    previous, _active_memo = _active_memo, memo
+    try:
+        yield memo
+    finally:
+        _active_memo = previous
+
+
+def _memoized(func: Callable[..., np.ndarray]) -> Callable[..., np.ndarray]:
+    """指标函数装饰器：启用指标缓存且输入为已登记数组时复用结果
+
+    缓存键由补齐默认值后的参数生成，rsi(x)、rsi(x, 14) 和 rsi(x, period=14) 共用同一结果。
+    """
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        memo = _active_memo
+        if memo is None:
+            return func(*args, **kwargs)
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = memo.key(func.__name__, bound.args)
+        if key is None:
+            return func(*bound.args)
+        result = memo.get(key)
+        if result is None:
+            result = func(*bound.args)
+            memo.put(key, result)
+        return result
+    return wrapper
+
+
+def as_panel(values: Any) -> np.ndarray:
+    """将行情序列转换为 (bar数, 标的数) 的float64数组"""
+    array = np.asarray(values, dtype=np.float64)
+    if array.ndim == 1:
+        array = array.reshape(-1, 1)
+    if array.ndim != 2:
+        raise ValueError(f"行情数组必须是一维或二维，实际为{array.ndim}维")
+    return array
+
+
+def shift(values: np.ndarray, periods: int = 1) -> np.ndarray:
+    """沿时间轴平移，空出的位置填NaN"""
+    result = np.full_like(values, np.nan)
+    if periods > 0:
+        result[periods:] = values[:-periods]
+    elif periods < 0:
+        result[:periods] = values[-periods:]
+    else:
+        result[:] = values
+    return result
+
+
+def ffill(values: np.ndarray) -> np.ndarray:
+    """沿时间轴向前填充NaN（开头的NaN保持不变）"""
+    rows = np.arange(len(values)).reshape(-1, 1)
+    last = np.where(np.isnan(values), 0, rows)
+    np.maximum.accumulate(last, axis=0, out=last)
+    return np.take_along_axis(values, last, axis=0)
+
+
+def _rolling(values: np.ndarray, window: int):
+    return pd.DataFrame(values).rolling(window, min_periods=window)
+
+
+@_memoized
+def sma(values: np.ndarray, window: int) -> np.ndarray:
+    """简单移动平均"""
+    return _rolling(values, window).mean().to_numpy()
+
+
+@_memoized
+def ema(values: np.ndarray, span: int) -> np.ndarray:
+    """指数移动平均"""
+    return pd.DataFrame(values).ewm(span=span, adjust=False, min_periods=span).mean().to_numpy()
+
+
+@_memoized
+def rolling_max(values: np.ndarray, window: int) -> np.ndarray:
+    return _rolling(values, window).max().to_numpy()
+
+
+@_memoized
+def rolling_min(values: np.ndarray, window: int) -> np.ndarray:
+    return _rolling(values, window).min().to_numpy()
+
+
+def wilder(values: np.ndarray, period: int) -> np.ndarray:
+    """Wilder平滑（RSI、ATR使用）"""
+    return pd.DataFrame(values).ewm(alpha=1 / period, adjust=False, min_periods=period).mean().to_numpy()
+
+
+@_memoized
+def rsi(close: np.ndarray, period: int = 14) -> np.ndarray:
+    """相对强弱指标RSI"""
+    delta = np.diff(close, axis=0, prepend=np.nan)
+    gain = wilder(np.clip(delta, 0, None), period)
+    loss = wilder(np.clip(-delta, 0, None), period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        value = 100 - 100 / (1 + gain / loss)
+    return np.where(loss == 0, np.where(gain > 0, 100.0, 50.0), value)
+
+
+@_memoized
+def atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int = 20) -> np.ndarray:
+    """平均真实波幅ATR"""
+    previous = shift(close)
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - previous), np.abs(low - previous)))
+    return wilder(true_range, period)
+
+
+@_memoized
+def rolling_beta(close: np.ndarray, pair_close: np.ndarray, window: int) -> np.ndarray:
+    """滚动OLS对冲比率 cov(logA, logB) / var(logB)"""
+    log_a = pd.DataFrame(np.log(close))
+    log_b = pd.DataFrame(np.log(pair_close))
+    cov = log_a.rolling(window, min_periods=window).cov(log_b)
+    var = log_b.rolling(window, min_periods=window).var()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (cov / var).to_numpy()
+
+
+@_memoized
+def zscore(values: np.ndarray, window: int) -> np.ndarray:
+    """滚动Z-score"""
+    rolling = _rolling(values, window)
+    mean = rolling.mean().to_numpy()
+    std = rolling.std().to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (values - mean) / std
+
+
+def simple_returns(close: np.ndarray) -> np.ndarray:
+    """逐bar简单收益率（首个bar为0）"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = close / shift(close) - 1
+    return np.nan_to_num(returns, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+def positions_from_signals(entries_long: np.ndarray, entries_short: Optional[np.ndarray],
+                           exits: np.ndarray) -> np.ndarray:
+    """由入场/出场条件生成持仓（1多头，-1空头，0空仓）
+
+    入场和出场之间的bar沿用上一个状态，通过向前填充实现，不需要逐bar循环。
+    同一bar同时满足时入场优先。
+    """
+    signal = np.where(exits, 0.0, np.nan)
+    if entries_short is not None:
+        signal = np.where(entries_short, -1.0, signal)
+    signal = np.where(entries_long, 1.0, signal)
+    return np.nan_to_num(ffill(signal), nan=0.0)
+
+
+class BacktestStrategy(ABC):
+    """可回测策略基类
+
+    positions() 返回每个bar收盘时的目标仓位，引擎在下一个bar按该仓位持有。
+    """
+
+    # 对应策略目录中的策略名称
+    name = ''
+    # 需要的行情字段
+    required = ('close',)
+    # 最新仓位依赖的最近bar数（最长指标窗口），增量评估据此确定需要重算的预热区间
+    required_bars = 0
+
+    @abstractmethod
+    def positions(self, data: Mapping[str, np.ndarray]) -> np.ndarray:
+        """每个bar收盘时的目标仓位"""
+
+    def asset_returns(self, data: Mapping[str, np.ndarray]) -> np.ndarray:
+        """仓位所对应资产的逐bar收益率"""
+        return simple_returns(data['close'])
+
+
+class MovingAverageCross(BacktestStrategy):
+    """双均线策略：短期均线在长期均线之上时持有多头"""
+
+    name = '双均线策略'
+
+    def __init__(self, fast: int = 10, slow: int = 30, kind: str = 'sma'):
+        if fast >= slow:
+            raise ValueError("短期均线周期必须小于长期均线周期")
+        if kind not in ('sma', 'ema'):
+            raise ValueError(f"未知的均线类型: {kind}")
+        self.fast = fast
+        self.slow = slow
+        self.kind = kind
+
+    @property
+    def required_bars(self):
+        return self.slow * (EWM_MEMORY if self.kind == 'ema' else 1)
+
+    def positions(self, data):
+        average = sma if self.kind == 'sma' else ema
+        fast = average(data['close'], self.fast)
+        slow = average(data['close'], self.slow)
+        return (fast > slow).astype(np.float64)
+
+
+class RSIReversal(BacktestStrategy):
+    """RSI超买超卖策略：RSI低于lower买入，高于upper卖出"""
+
+    name = 'RSI超买超卖策略'
+
+    def __init__(self, period: int = 14, lower: float = 30, upper: float = 70):
+        self.period = period
+        self.lower = lower
+        self.upper = upper
+
+    @property
+    def required_bars(self):
+        return self.period * EWM_MEMORY
+
+    def positions(self, data):
+        value = rsi(data['close'], self.period)
+        return positions_from_signals(value < self.lower, None, value > self.upper)
+
+
+class TurtleBreakout(BacktestStrategy):
+    """海龟交易法则：突破entry日高低点入场，跌破exit日反向高低点或ATR止损离场
+
+    ATR止损采用吊灯止损（近entry日最高收盘价 - stop_atr×ATR，空头对称），
+    止损位不依赖具体入场价，因此可以整列计算。
+    """
+
+    name = '海龟交易法则'
+    required = ('high', 'low', 'close')
+
+    def __init__(self, entry: int = 20, exit: int = 10, atr_period: int = 20,
+                 stop_atr: float = 2.0):
+        self.entry = entry
+        self.exit = exit
+        self.atr_period = atr_period
+        self.stop_atr = stop_atr
+
+    @property
+    def required_bars(self):
+        return max(self.entry + 1, self.atr_period * EWM_MEMORY)
+
+    def positions(self, data):
+        high, low, close = data['high'], data['low'], data['close']
+        stop = self.stop_atr * atr(high, low, close, self.atr_period)
+
+        upper = shift(rolling_max(high, self.entry))
+        lower = shift(rolling_min(low, self.entry))
+        exit_long = (close < shift(rolling_min(low, self.exit))) | \
+            (close < rolling_max(close, self.entry) - stop)
+        exit_short = (close > shift(rolling_max(high, self.exit))) | \
+            (close > rolling_min(close, self.entry) + stop)
+
+        # 多空两条腿分别建仓，再合成净仓位
+        long_leg = positions_from_signals(close > upper, None, exit_long)
+        short_leg = positions_from_signals(close < lower, None, exit_short)
+        return long_leg - short_leg
+
+
+class DualThrust(BacktestStrategy):
+    """Dual Thrust策略：以开盘价加减前N日波动区间为上下轨，突破上轨做多，突破下轨做空"""
+
+    name = 'Dual Thrust策略'
+    required = ('open', 'high', 'low', 'close')
+
+    def __init__(self, lookback: int = 4, k1: float = 0.5, k2: float = 0.5):
+        self.lookback = lookback
+        self.k1 = k1
+        self.k2 = k2
+
+    @property
+    def required_bars(self):
+        return self.lookback + 1
+
+    def positions(self, data):
+        open_, close = data['open'], data['close']
+        highest_high = shift(rolling_max(data['high'], self.lookback))
+        lowest_low = shift(rolling_min(data['low'], self.lookback))
+        highest_close = shift(rolling_max(close, self.lookback))
+        lowest_close = shift(rolling_min(close, self.lookback))
+        band = np.fmax(highest_high - lowest_close, highest_close - lowest_low)
+
+        upper = open_ + self.k1 * band
+        lower = open_ - self.k2 * band
+        # 反转系统：始终在市，只在突破反向轨道时换向
+        return positions_from_signals(close > upper, close < lower, np.zeros_like(close, dtype=bool))
+
+
+class Momentum(BacktestStrategy):
+    """动量策略：lookback日收益为正且价格位于均线之上时持有多头"""
+
+    name = '比特币动量策略'
+
+    def __init__(self, lookback: int = 20, trend: int = 50):
+        self.lookback = lookback
+        self.trend = trend
+
+    @property
+    def required_bars(self):
+        return max(self.lookback + 1, self.trend)
+
+    def positions(self, data):
+        close = data['close']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            momentum = close / shift(close, self.lookback) - 1
+        return ((momentum > 0) & (close > sma(close, self.trend))).astype(np.float64)
+
+
+class PairsZScore(BacktestStrategy):
+    """配对交易策略：对数价差的Z-score超过entry时反向建仓，回到exit以内平仓
+
+    对冲比率为滚动OLS估计的beta，仓位作用于价差 A - beta×B。
+    行情需同时提供close（A腿）和pair_close（B腿）。
+    """
+
+    name = '配对交易策略'
+    required = ('close', 'pair_close')
+
+    def __init__(self, window: int = 60, entry: float = 2.0, exit: float = 0.5):
+        self.window = window
+        self.entry = entry
+        self.exit = exit
+
+    @property
+    def required_bars(self):
+        # 对冲比率和价差Z-score两层滚动窗口
+        return 2 * self.window
+
+    def hedge_ratio(self, data) -> np.ndarray:
+        """滚动OLS对冲比率 cov(logA, logB) / var(logB)"""
+        return rolling_beta(data['close'], data['pair_close'], self.window)
+
+    def positions(self, data):
+        beta = self.hedge_ratio(data)
+        spread = np.log(data['close']) - beta * np.log(data['pair_close'])
+        z = zscore(spread, self.window)
+        return positions_from_signals(z < -self.entry, z > self.entry, np.abs(z) < self.exit)
+
+    def asset_returns(self, data):
+        # 按上一bar的对冲比率持有价差组合
+        beta = np.nan_to_num(shift(self.hedge_ratio(data)), nan=0.0)
+        return simple_returns(data['close']) - beta * simple_returns(data['pair_close'])
+
+
+BACKTEST_STRATEGIES = {
+    cls.name: cls
+    for cls in (MovingAverageCross, RSIReversal, PairsZScore, TurtleBreakout, DualThrust, Momentum)
+}
+
+
+def get_backtest_strategy(name: str, **params) -> BacktestStrategy:
+    """按策略目录名称创建可回测策略"""
+    if name not in BACKTEST_STRATEGIES:
+        raise ValueError(f"策略 {name} 暂无回测实现（可选: {', '.join(BACKTEST_STRATEGIES)}）")
+    return BACKTEST_STRATEGIES[name](**params)
+
+
+class BacktestResult:
+    """回测结果：逐bar仓位、净收益、净值曲线，以及按标的计算的绩效指标"""
+
+    def __init__(self, positions: np.ndarray, returns: np.ndarray,
+                 periods_per_year: int = PERIODS_PER_YEAR):
+        self.positions = positions
+        self.returns = returns
+        self.equity = np.cumprod(1 + returns, axis=0)
+        self.metrics = self._compute_metrics(periods_per_year)
+
+    def _compute_metrics(self, periods_per_year: int) -> Dict[str, np.ndarray]:
+        returns, equity = self.returns, self.equity
+        bars = len(returns)
+        final = equity[-1] if bars else np.ones(returns.shape[1])
+        mean = returns.mean(axis=0)
+        std = returns.std(axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sharpe = np.where(std > 0, mean / std * math.sqrt(periods_per_year), 0.0)
+            annual_return = np.where(
+                final > 0, final ** (periods_per_year / max(bars, 1)) - 1, -1.0
+            )
+        drawdown = equity / np.maximum.accumulate(equity, axis=0) - 1
+        changes = np.diff(self.positions, axis=0, prepend=0)
+        return {
+            'total_return': final - 1,
+            'annual_return': annual_return,
+            'annual_volatility': std * math.sqrt(periods_per_year),
+            'sharpe': sharpe,
+            'max_drawdown': drawdown.min(axis=0) if bars else np.zeros(returns.shape[1]),
+            'trades': np.count_nonzero(changes, axis=0),
+            'exposure': np.count_nonzero(self.positions, axis=0) / max(bars, 1),
+        }
+
+    def summary(self, digits: int = 4) -> Dict[str, float]:
+        """各指标在所有标的上的平均值（用于写入策略目录）"""
+        return _summarize(self.metrics, self.returns.shape[1], self.returns.shape[0], digits)
+
+
+def _summarize(metrics: Mapping[str, np.ndarray], symbols: int, bars: int, digits: int) -> Dict[str, float]:
+    summary = {name: round(float(np.mean(metrics[name])), digits) for name in SUMMARY_METRICS}
+    summary['symbols'] = int(symbols)
+    summary['bars'] = int(bars)
+    return summary
+
+
+class IncrementalMetrics:
+    """可追加的绩效累计量
+
+    每个标的保存最终净值、净值高点、最大回撤、收益率的均值和离差平方和、换仓次数、
+    持仓bar数和最后仓位。追加新bar的仓位和净收益后，summary()与对完整序列回测的
+    BacktestResult.summary()在浮点舍入误差内一致，新数据到来时无需重算历史。
+    """
+
+    def __init__(self, symbols: int, periods_per_year: float = PERIODS_PER_YEAR):
+        self.periods_per_year = periods_per_year
+        self.bars = 0
+        self.equity = np.ones(symbols)
+        self.peak = np.full(symbols, -np.inf)
+        self.drawdown = np.full(symbols, np.inf)
+        self.mean = np.zeros(symbols)
+        self.m2 = np.zeros(symbols)
+        self.trades = np.zeros(symbols, dtype=np.int64)
+        self.exposure = np.zeros(symbols, dtype=np.int64)
+        self.position = np.zeros(symbols)
+
+    def update(self, positions: np.ndarray, returns: np.ndarray):
+        """追加若干bar的仓位和净收益（形状为 (bar数, 标的数)）"""
+        count = len(returns)
+        if not count:
+            return
+        equity = np.cumprod(np.vstack([self.equity, 1 + returns]), axis=0)[1:]
+        peak = np.maximum.accumulate(np.vstack([self.peak, equity]), axis=0)[1:]
+        self.drawdown = np.minimum(self.drawdown, (equity / peak - 1).min(axis=0))
+        self.equity, self.peak = equity[-1], peak[-1]
+
+        # 分块合并均值和离差平方和（Chan等人的并行算法）
+        mean = returns.mean(axis=0)
+        m2 = ((returns - mean) ** 2).sum(axis=0)
+        total = self.bars + count
+        delta = mean - self.mean
+        self.mean = self.mean + delta * count / total
+        self.m2 = self.m2 + m2 + delta ** 2 * self.bars * count / total
+        self.bars = total
+
+        self.trades += np.count_nonzero(np.diff(np.vstack([self.position, positions]), axis=0), axis=0)
+        self.exposure += np.count_nonzero(positions, axis=0)
+        self.position = positions[-1].copy()
+
+    @classmethod
+    def from_result(cls, result: BacktestResult, periods_per_year: float = PERIODS_PER_YEAR) -> 'IncrementalMetrics':
+        """由完整回测结果创建"""
+        metrics = cls(result.returns.shape[1], periods_per_year)
+        metrics.update(result.positions, result.returns)
+        return metrics
+
+    def metrics(self) -> Dict[str, np.ndarray]:
+        """与 BacktestResult.metrics 相同口径的各标的指标"""
+        bars, ppy = self.bars, self.periods_per_year
+        std = np.sqrt(self.m2 / bars) if bars else np.zeros_like(self.mean)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sharpe = np.where(std > 0, self.mean / std * math.sqrt(ppy), 0.0)
+            annual_return = np.where(self.equity > 0, self.equity ** (ppy / max(bars, 1)) - 1, -1.0)
+        return {
+            'total_return': self.equity - 1,
+            'annual_return': annual_return,
+            'annual_volatility': std * math.sqrt(ppy),
+            'sharpe': sharpe,
+            'max_drawdown': self.drawdown if bars else np.zeros_like(self.mean),
+            'trades': self.trades,
+            'exposure': self.exposure / max(bars, 1),
+        }
+
+    def summary(self, digits: int = 4) -> Dict[str, float]:
+        """与 BacktestResult.summary 相同格式的汇总"""
+        return _summarize(self.metrics(), len(self.mean), self.bars, digits)
+
+
+class BacktestEngine:
+    """向量化回测引擎
+
+    data为行情字段到数组的映射（open/high/low/close/volume，配对交易另需pair_close），
+    每个数组形状为 (bar数,) 或 (bar数, 标的数)，多个标的在同一次运行中整列计算。
+    信号在bar收盘时产生，下一个bar开始持有；换仓按成交额扣除cost比例的费用。
+    """
+
+    def __init__(self, cost: float = 0.0005, periods_per_year: int = PERIODS_PER_YEAR):
+        self.cost = cost
+        self.periods_per_year = periods_per_year
+
+    @staticmethod
+    def prepare(data: Mapping[str, Any]) -> Dict[str, np.ndarray]:
+        """将行情转换为二维float64数组"""
+        return {field: as_panel(values) for field, values in data.items()}
+
+    def run(self, strategy: BacktestStrategy, data: Mapping[str, Any]) -> BacktestResult:
+        """回测单个策略"""
+        panel = self.prepare(data)
+        missing = [field for field in strategy.required if field not in panel]
+        if missing:
+            raise ValueError(f"回测{strategy.name}缺少行情字段: {', '.join(missing)}")
+
+        positions = np.nan_to_num(strategy.positions(panel), nan=0.0)
+        held = shift(positions)
+        held[0] = 0.0
+        turnover = np.abs(np.diff(positions, axis=0, prepend=0))
+        returns = held * strategy.asset_returns(panel) - self.cost * shift(turnover)
+        returns[0] = 0.0
+        return BacktestResult(positions, returns, self.periods_per_year)
+
+    def evaluate(self, strategies: Iterable[Dict], data: Mapping[str, Any],
+                 params: Optional[Dict[str, Dict]] = None) -> Iterator[Dict]:
+        """为策略目录中有回测实现的策略附加绩效指标
+
+        变体按其基础策略（variant_of）的实现回测；缺少所需行情字段的策略跳过。
+        返回带有backtest字段的策略副本。
+        """
+        panel = self.prepare(data)
+        params = params or {}
+        results: Dict[str, Optional[Dict]] = {}
+        for strategy in strategies:
+            name = strategy.get('name')
+            if name not in BACKTEST_STRATEGIES:
+                name = strategy.get('variant_of')
+            if name not in BACKTEST_STRATEGIES:
+                continue
+            if name not in results:
+                implementation = get_backtest_strategy(name, **params.get(name, {}))
+                if all(field in panel for field in implementation.required):
+                    results[name] = self.run(implementation, panel).summary()
+                else:
+                    results[name] = None
+            if results[name] is not None:
+                yield {**strategy, 'backtest': results[name]}
+
+
+def load_ohlcv_csv(path: str) -> Dict[str, np.ndarray]:
+    """读取单个标的的OHLCV CSV（列名不区分大小写）"""
+    frame = pd.read_csv(path)
+    frame.columns = [str(c).strip().lower() for c in frame.columns]
+    return {
+        field: frame[field].to_numpy(dtype=np.float64)
+        for field in ('open', 'high', 'low', 'close', 'volume') if field in frame
+    }
+
+
+def parse_args(argv: List[str] = None) -> argparse.Namespace:
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='向量化策略回测')
+    parser.add_argument('csv', help='OHLCV行情CSV文件')
+    parser.add_argument('--strategy', choices=list(BACKTEST_STRATEGIES), default='双均线策略',
+                        help='回测的策略')
+    parser.add_argument('--pair-csv', default=None, help='配对交易中B腿的行情CSV文件')
+    parser.add_argument('--cost', type=float, default=0.0005, help='单边交易费率')
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str] = None):
+    """主函数"""
+    args = parse_args(argv)
+    data = load_ohlcv_csv(args.csv)
+    if args.pair_csv:
+        data['pair_close'] = load_ohlcv_csv(args.pair_csv)['close']
+
+    engine = BacktestEngine(cost=args.cost)
+    result = engine.run(get_backtest_strategy(args.strategy), data)
+    print(f"=== {args.strategy} 回测结果 ===")
+    for name, value in result.summary().items():
+        print(f"{name}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+性能基准 - 用合成基础策略测量搜集、扩展和写出各阶段的耗时、吞吐量和峰值内存
+结果输出为JSON，可与保存的基线比较，耗时或内存超出容差时以非零状态退出，
+便于在夜间任务之前发现扩展流水线的性能回退；仓库附带默认规模的基线 benchmark_baseline.json，
+基线缺失时同样以非零状态退出，不会静默通过
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional
+
+from strategy_collector import StrategyCollector
+from strategy_expander import StrategyExpander
+
+DEFAULT_BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+
+DEFAULT_SIZES = [100, 1000, 10000]
+
+CATEGORIES = ['stocks', 'futures', 'crypto', 'options']
+
+STAGES = [
+    'collect',
+    'save_to_json',
+    'save_to_csv',
+    'collector_update_catalog',
+    'expand_strategies',
+    'save_expanded_strategies',
+    'expander_update_catalog',
+]
+
+# 合成策略的词汇表：核心逻辑由随机抽取的短语拼成，避免被近似去重当作重复
+_TYPES = ['趋势跟踪', '均值回归', '统计套利', '动量策略', '波动率交易', '收入策略', '机器学习']
+_COMPLEXITIES = ['基础', '中级', '高级']
+_INDICATORS = ['SMA', 'EMA', 'RSI', 'MACD', 'ATR', 'KDJ', '布林带', '成交量', '隐含波动率',
+               'Delta', 'Vega', '价差Z-score', '资金费率', '持仓量', '订单簿深度', '链上活跃地址']
+_PHRASES = [
+    '短期均线上穿长期均线', '价格突破N日高点', '成交量放大确认', 'RSI低于阈值', '波动率收缩后扩张',
+    '跌破ATR止损线', '价差偏离均值两倍标准差', '资金费率转正', '隐含波动率高于历史波动率',
+    '开盘区间突破', '收盘价站上布林带中轨', 'MACD柱线翻红', '持仓量连续增加', '期限结构贴水',
+    '跨品种价差回归', '动量排名前十', '盘口买卖失衡', '链上大额转账增加', '季节性效应显著',
+    '分钟级反转信号', '夜盘跳空缺口', '基差收敛', '行业轮动信号', '情绪指标极值',
+]
+_ACTIONS = ['时买入', '时卖出', '时做多', '时做空', '时平仓', '时加仓', '时减仓']
+
+
+def synthetic_strategies(count: int, seed: int = 0) -> Iterator[Dict]:
+    """生成count个互不重复的合成基础策略（固定种子，结果可复现）"""
+    rng = random.Random(seed)
+    for i in range(count):
+        category = CATEGORIES[i % len(CATEGORIES)]
+        logic = '，'.join(
+            phrase + rng.choice(_ACTIONS) for phrase in rng.sample(_PHRASES, 6)
+        ) + f'，参数{rng.randint(2, 250)}/{rng.randint(2, 250)}'
+        yield {
+            'name': f'合成策略{i:07d}',
+            'category': category,
+            'type': rng.choice(_TYPES),
+            'complexity': rng.choice(_COMPLEXITIES),
+            'logic': logic,
+            'indicators': ', '.join(rng.sample(_INDICATORS, 3)),
+            'language': 'Python',
+            'data_requirements': '日级行情数据',
+            'source': '基准测试合成',
+            'references': f'https://example.com/strategies/{i}',
+        }
+
+
+class StageTimer:
+    """逐阶段测量耗时和峰值内存（tracemalloc会使被测代码明显变慢，可关闭）"""
+
+    def __init__(self, trace_memory: bool = True):
+        self.trace_memory = trace_memory
+        self.results: List[Dict] = []
+
+    def measure(self, size: int, stage: str, func: Callable[[], int]):
+        """执行一个阶段，func返回该阶段处理的记录数"""
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        # 被测方法会打印进度，基准运行时丢弃
+        with contextlib.redirect_stdout(io.StringIO()):
+            records = func()
+        seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] if self.trace_memory else None
+        self.results.append({
+            'size': size,
+            'stage': stage,
+            'seconds': round(seconds, 6),
+            'records': records,
+            'throughput': round(records / seconds, 1) if seconds > 0 else None,
+            'peak_bytes': peak,
+        })
+
+
+def run_pipeline(size: int, timer: StageTimer, workers: int = 1, seed: int = 0):
+    """在临时目录中对size个合成基础策略跑一遍搜集 → 导出 → 扩展 → 写出 → 更新目录"""
+    work_dir = tempfile.mkdtemp(prefix='strategy_bench_')
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            collector = StrategyCollector(work_dir)
+            expander = StrategyExpander(work_dir)
+
+        def collect() -> int:
+            for strategy in synthetic_strategies(size, seed):
+                collector.add_strategy(strategy)
+            return len(collector.strategies)
+
+        def save(method: Callable[[str], None]) -> Callable[[], int]:
+            def run() -> int:
+                for category in CATEGORIES:
+                    method(category)
+                return len(collector.strategies)
+            return run
+
+        def collector_update_catalog() -> int:
+            collector.update_catalog()
+            return len(collector.strategies)
+
+        def expand() -> int:
+            expander.expand_strategies(workers=workers)
+            return len(expander.expanded_strategies)
+
+        def save_expanded() -> int:
+            expander.save_expanded_strategies()
+            return len(expander.expanded_strategies)
+
+        def expander_update_catalog() -> int:
+            expander.update_catalog()
+            return len(expander.strategies) + len(expander.expanded_strategies)
+
+        stages = {
+            'collect': collect,
+            'save_to_json': save(collector.save_to_json),
+            'save_to_csv': save(collector.save_to_csv),
+            'collector_update_catalog': collector_update_catalog,
+            'expand_strategies': expand,
+            'save_expanded_strategies': save_expanded,
+            'expander_update_catalog': expander_update_catalog,
+        }
+        for stage in STAGES:
+            timer.measure(size, stage, stages[stage])
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def run_benchmarks(sizes: List[int], repeat: int = 1, workers: int = 1,
+                   trace_memory: bool = True, seed: int = 0) -> Dict:
+    """对每个规模重复repeat次，每个阶段取最短耗时和最大峰值内存"""
+    if trace_memory:
+        tracemalloc.start()
+    try:
+        runs = []
+        for size in sizes:
+            for _ in range(repeat):
+                timer = StageTimer(trace_memory)
+                run_pipeline(size, timer, workers, seed)
+                runs.extend(timer.results)
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+
+    best: Dict[tuple, Dict] = {}
+    for result in runs:
+        key = (result['size'], result['stage'])
+        current = best.get(key)
+        if current is None:
+            best[key] = dict(result)
+            continue
+        if result['seconds'] < current['seconds']:
+            current.update(seconds=result['seconds'], throughput=result['throughput'])
+        if result['peak_bytes'] is not None:
+            current['peak_bytes'] = max(current['peak_bytes'], result['peak_bytes'])
+
+    return {
+        'version': 1,
+        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'workers': workers,
+        'repeat': repeat,
+        'trace_memory': trace_memory,
+        'results': list(best.values()),
+    }
+
+
+def compare_with_baseline(report: Dict, baseline: Dict, tolerance: float = 0.25,
+                          min_seconds: float = 0.05) -> List[Dict]:
+    """与基线逐项比较，返回回退项列表
+
+    耗时超过基线 (1 + tolerance) 倍且超过min_seconds（过短的阶段受噪声影响大）、
+    或峰值内存超过基线 (1 + tolerance) 倍时视为回退。
+    """
+    baseline_results = {(r['size'], r['stage']): r for r in baseline.get('results', [])}
+    regressions = []
+    for result in report['results']:
+        base = baseline_results.get((result['size'], result['stage']))
+        if base is None:
+            continue
+        result['baseline_seconds'] = base['seconds']
+        time_ratio = result['seconds'] / base['seconds'] if base['seconds'] > 0 else 1.0
+        result['time_ratio'] = round(time_ratio, 3)
+        if time_ratio > 1 + tolerance and result['seconds'] >= min_seconds:
+            regressions.append({**result, 'metric': 'seconds'})
+
+        if result['peak_bytes'] and base.get('peak_bytes'):
+            memory_ratio = result['peak_bytes'] / base['peak_bytes']
+            result['memory_ratio'] = round(memory_ratio, 3)
+            if memory_ratio > 1 + tolerance:
+                regressions.append({**result, 'metric': 'peak_bytes'})
+    return regressions
+
+
+def format_report(report: Dict) -> str:
+    """格式化为文本表格"""
+    lines = [f"{'规模':>9} {'阶段':<26} {'耗时(s)':>10} {'记录数':>10} {'吞吐(条/s)':>12} "
+             f"{'峰值内存(MB)':>12} {'基线比':>7}"]
+    for r in report['results']:
+        peak = f"{r['peak_bytes'] / 1e6:.1f}" if r['peak_bytes'] is not None else '-'
+        ratio = f"{r['time_ratio']:.2f}" if 'time_ratio' in r else '-'
+        throughput = f"{r['throughput']:.0f}" if r['throughput'] else '-'
+        lines.append(f"{r['size']:>9} {r['stage']:<26} {r['seconds']:>10.3f} {r['records']:>10} "
+                     f"{throughput:>12} {peak:>12} {ratio:>7}")
+    return '\n'.join(lines)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='策略库流水线性能基准')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='合成基础策略数量（可多个，如 100 10000 1000000）')
+    parser.add_argument('--repeat', type=int, default=1, help='每个规模重复次数（取最短耗时）')
+    parser.add_argument('--workers', type=int, default=1, help='扩展阶段的并行进程数')
+    parser.add_argument('--seed', type=int, default=0, help='合成数据随机种子')
+    parser.add_argument('--no-memory', action='store_true',
+                        help='不使用tracemalloc测量峰值内存（耗时更接近真实运行）')
+    parser.add_argument('--output', default=None, help='将结果写入JSON文件')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE_FILE, help='基线结果文件')
+    parser.add_argument('--save-baseline', action='store_true', help='将本次结果保存为基线')
+    parser.add_argument('--no-baseline', action='store_true', help='只测量，不与基线比较（基线缺失时也不报错）')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='允许超出基线的比例（默认0.25，即慢25%%以内不算回退）')
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    report = run_benchmarks(args.sizes, repeat=max(1, args.repeat), workers=args.workers,
+                            trace_memory=not args.no_memory, seed=args.seed)
+
+    regressions = []
+    missing_baseline = not args.save_baseline and not args.no_baseline and not os.path.exists(args.baseline)
+    if not args.save_baseline and not args.no_baseline and not missing_baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('trace_memory') != report['trace_memory']:
+            print("注意: 基线与本次运行的内存测量设置不同，耗时不可直接比较")
+        regressions = compare_with_baseline(report, baseline, args.tolerance)
+        unmatched = [r for r in report['results'] if 'baseline_seconds' not in r]
+        if unmatched:
+            sizes = sorted({r['size'] for r in unmatched})
+            print(f"注意: 基线中没有规模 {', '.join(map(str, sizes))} 的 {len(unmatched)} 项结果，这些项未做比较")
+    report['regressions'] = regressions
+
+    print(format_report(report))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已保存到 {args.output}")
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n基线已保存到 {args.baseline}")
+
+    if missing_baseline:
+        print(f"\n基线文件 {args.baseline} 不存在，无法检查性能回退"
+              f"（用 --save-baseline 生成基线，或用 --no-baseline 只测量不比较）")
+        return 2
+    if regressions:
+        print(f"\n发现 {len(regressions)} 项性能回退:")
+        for r in regressions:
+            if r['metric'] == 'seconds':
+                print(f"  {r['size']} {r['stage']}: 耗时 {r['seconds']:.3f}s，基线 {r['baseline_seconds']:.3f}s")
+            else:
+                print(f"  {r['size']} {r['stage']}: 峰值内存为基线的 {r['memory_ratio']:.2f} 倍")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+策略总目录更新 - 统计数据保存在旁路状态文件中，按章节增量更新 strategies_catalog.md
+目录中由程序维护的章节以HTML注释标记包围，只重写内容发生变化的章节；
+读改写全程持有文件锁，并以临时文件 + 重命名的方式原子替换
+"""
+
+import hashlib
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+CATALOG_FILE = 'strategies_catalog.md'
+STATE_FILE = 'strategies_catalog.state.json'
+CATALOG_TITLE = '# 量化交易策略总目录'
+
+CATEGORY_TITLES = {
+    'stocks': '股票策略',
+    'futures': '期货策略',
+    'crypto': '加密货币策略',
+    'options': '期权策略',
+}
+
+LISTING_HEADER = (
+    '| 策略名称 | 类型 | 复杂度 | 核心逻辑 | 技术指标 | 代码链接 | 状态 |\n'
+    '|---------|------|--------|----------|----------|----------|------|'
+)
+
+
+def _start_marker(name: str) -> str:
+    return f'<!-- catalog:{name} -->'
+
+
+def _end_marker(name: str) -> str:
+    return f'<!-- /catalog:{name} -->'
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+
+def _atomic_write(path: str, text: str):
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def _cell(value: Any) -> str:
+    """表格单元格内容（竖线和换行会破坏表格）"""
+    return str(value or '').replace('|', '\\|').replace('\n', ' ')
+
+
+def render_listing(category: str, strategies: List[Dict]) -> str:
+    """渲染分类策略清单章节"""
+    rows = []
+    for s in strategies:
+        reference = s.get('references') or ''
+        link = f'[参考链接]({reference})' if reference.startswith('http') else _cell(reference)
+        rows.append(
+            f"| {_cell(s.get('name'))} | {_cell(s.get('type'))} | {_cell(s.get('complexity'))} | "
+            f"{_cell(s.get('logic'))} | {_cell(s.get('indicators'))} | {link} | ✅ 已收录 |"
+        )
+    title = CATEGORY_TITLES.get(category, category)
+    return '\n'.join([f'### {title}', LISTING_HEADER] + rows)
+
+
+def render_stats(stats: Dict[str, Any], update_time: str) -> str:
+    """渲染统计信息章节"""
+    base = stats.get('base', {})
+    expanded = stats.get('expanded', {})
+    base_total = sum(base.values())
+    expanded_total = sum(expanded.values())
+    counts = {c: base.get(c, 0) + expanded.get(c, 0) for c in CATEGORY_TITLES}
+    return f"""## 统计信息
+- **总策略数:** {base_total + expanded_total} (持续更新中)
+- **最后更新:** {update_time}
+- **覆盖市场:** 股票、期货、加密货币、期权
+
+### 各市场策略数量
+- **股票策略:** {counts['stocks']} 个
+- **期货策略:** {counts['futures']} 个
+- **加密货币策略:** {counts['crypto']} 个
+- **期权策略:** {counts['options']} 个
+
+### 策略来源
+- **基础策略:** {base_total} 个
+- **扩展变体:** {expanded_total} 个
+- **机器学习增强:** {stats.get('ml_enhanced', 0)} 个
+- **混合策略:** {stats.get('hybrid', 0)} 个"""
+
+
+def _find_heading(content: str, heading: str, start: int = 0) -> int:
+    """查找位于行首的标题，返回起始位置（找不到返回-1）"""
+    position = start
+    while True:
+        position = content.find(heading, position)
+        if position == -1:
+            return -1
+        line_end = content.find('\n', position)
+        line = content[position:line_end if line_end != -1 else len(content)]
+        if (position == 0 or content[position - 1] == '\n') and line.strip() == heading:
+            return position
+        position += len(heading)
+
+
+def _section_end(content: str, start: int, levels: tuple, skip: Optional[str] = None) -> int:
+    """从start处的标题行之后查找下一个同级或更高级标题的位置"""
+    position = content.find('\n', start)
+    while position != -1:
+        line_start = position + 1
+        line_end = content.find('\n', line_start)
+        line = content[line_start:line_end if line_end != -1 else len(content)].strip()
+        if line.startswith(levels) and line != skip:
+            return line_start
+        position = line_end
+    return len(content)
+
+
+class CatalogUpdater:
+    """策略总目录增量更新器
+
+    状态文件保存统计数据和各章节内容的哈希；更新时先按键覆盖统计，
+    再渲染章节并与哈希比较，只有内容变化的章节才写回目录文件。
+    统计按绝对数覆盖而不是累加增量：搜集器和扩展器每次运行都持有完整的策略表，
+    覆盖是幂等的，同一天重复运行或中途失败重跑都不会重复计数。
+    目录中缺少标记的旧章节（如最初手写的"## 统计信息"）在首次更新时迁移为标记章节。
+    """
+
+    def __init__(self, base_dir: str = ".", lock_timeout: float = 30.0):
+        self.catalog_file = os.path.join(base_dir, CATALOG_FILE)
+        self.state_file = os.path.join(base_dir, STATE_FILE)
+        self.lock_file = f'{self.catalog_file}.lock'
+        self.lock_timeout = lock_timeout
+
+    @contextmanager
+    def lock(self) -> Iterator[None]:
+        """独占文件锁（搜集器和扩展器同时运行时串行化更新）"""
+        deadline = time.monotonic() + self.lock_timeout
+        with open(self.lock_file, 'a+') as f:
+            while True:
+                try:
+                    if fcntl is not None:
+                        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    else:
+                        f.seek(0)
+                        msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                    break
+                except OSError:
+                    if time.monotonic() > deadline:
+                        raise TimeoutError(f"等待目录文件锁超时: {self.lock_file}")
+                    time.sleep(0.05)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def load_state(self) -> Dict[str, Any]:
+        """读取状态文件，不存在或损坏时返回空状态"""
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+        state.setdefault('stats', {})
+        state.setdefault('sections', {})
+        return state
+
+    def _splice(self, content: str, name: str, text: str) -> str:
+        """用新内容替换标记章节；旧版无标记章节就地迁移，找不到时插入到合适位置"""
+        block = f'{_start_marker(name)}\n{text}\n{_end_marker(name)}'
+        start = content.find(_start_marker(name))
+        if start != -1:
+            end = content.find(_end_marker(name), start)
+            if end != -1:
+                return content[:start] + block + content[end + len(_end_marker(name)):]
+
+        if name == 'stats':
+            heading = _find_heading(content, '## 统计信息')
+            if heading != -1:
+                # 旧版更新逻辑可能留下重复的"## 统计信息"标题，一并替换
+                end = _section_end(content, heading, ('## ', '# '), skip='## 统计信息')
+                return content[:heading] + block + '\n\n' + content[end:]
+            title = _find_heading(content, CATALOG_TITLE)
+            if title != -1:
+                insert = content.find('\n', title) + 1 if content.find('\n', title) != -1 else len(content)
+                return content[:insert] + '\n' + block + '\n' + content[insert:]
+            return f'{CATALOG_TITLE}\n\n{block}\n' + content
+
+        heading_text = text.split('\n', 1)[0]
+        heading = _find_heading(content, heading_text)
+        if heading != -1:
+            end = _section_end(content, heading, ('## ', '### ', '# '))
+            return content[:heading] + block + '\n\n' + content[end:]
+        index = _find_heading(content, '## 策略分类索引')
+        if index != -1:
+            end = _section_end(content, index, ('## ', '# '))
+            return content[:end] + block + '\n\n' + content[end:]
+        return content.rstrip('\n') + '\n\n' + block + '\n'
+
+    def update(self, stats: Optional[Dict[str, Any]] = None,
+               listings: Optional[Dict[str, List[Dict]]] = None,
+               sections: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """更新目录
+
+        stats    按键覆盖统计数据（base/expanded为 {分类: 数量}，ml_enhanced/hybrid为数量）
+        listings {分类: 策略列表}，重新生成对应分类的策略清单章节
+        sections {章节名: Markdown文本}，其他由程序维护的章节
+        返回合并后的统计数据。
+        """
+        with self.lock():
+            state = self.load_state()
+            if stats:
+                state['stats'].update(stats)
+
+            # 统计章节的哈希不含更新时间，统计不变时不改动目录
+            rendered = {'stats': render_stats(state['stats'], '')}
+            for category, strategies in (listings or {}).items():
+                rendered[f'listing:{category}'] = render_listing(category, strategies)
+            rendered.update(sections or {})
+
+            if os.path.exists(self.catalog_file):
+                with open(self.catalog_file, 'r', encoding='utf-8') as f:
+                    content = f.read()
+            else:
+                content = f'{CATALOG_TITLE}\n\n'
+
+            changed = [
+                name for name, text in rendered.items()
+                if state['sections'].get(name) != _digest(text)
+                or _start_marker(name) not in content
+            ]
+            if changed:
+                update_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                for name in changed:
+                    text = rendered[name]
+                    if name == 'stats':
+                        text = render_stats(state['stats'], update_time)
+                    content = self._splice(content, name, text)
+                    state['sections'][name] = _digest(rendered[name])
+                _atomic_write(self.catalog_file, content)
+            _atomic_write(self.state_file, json.dumps(state, ensure_ascii=False, indent=2))
+            state['changed'] = changed
+        return state
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+扩展结果缓存 - 按基础策略内容哈希持久化已生成的变体
+重复运行时只为新增或修改过的基础策略重新生成变体
+"""
+
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional, Set
+
+# 计算内容哈希时忽略的字段（每次搜集都会刷新，不影响生成结果）
+VOLATILE_FIELDS = ('added_date', 'last_updated')
+
+
+class ExpansionCache:
+    """扩展结果缓存
+
+    每个条目以"生成器版本 + 基础策略内容"的SHA-256为键，保存为
+    cache_dir/<前两位>/<哈希>.json。本次运行中未被读取或写入的条目
+    视为已删除策略或旧版本生成器的结果，由evict_unused()清理。
+    """
+
+    def __init__(self, cache_dir: str, version: str):
+        self.cache_dir = cache_dir
+        self.version = version
+        self.used: Set[str] = set()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, *strategies: Dict) -> str:
+        """计算一个或多个基础策略（混合策略为策略对）的缓存键"""
+        digest = hashlib.sha256(self.version.encode('utf-8'))
+        for strategy in strategies:
+            content = {k: v for k, v in strategy.items() if k not in VOLATILE_FIELDS}
+            digest.update(b'\0')
+            digest.update(json.dumps(content, ensure_ascii=False, sort_keys=True).encode('utf-8'))
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f'{key}.json')
+
+    def contains(self, key: str) -> bool:
+        """判断缓存中是否存在该键"""
+        return os.path.exists(self._path(key))
+
+    def get(self, key: str) -> Optional[List[Dict]]:
+        """读取缓存的变体列表，未命中时返回None"""
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                variants = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if key not in self.used:
+            # 本次运行刚写入的条目不计为命中
+            self.hits += 1
+            self.used.add(key)
+        return variants
+
+    def put(self, key: str, variants: List[Dict]):
+        """写入新生成的变体（先写临时文件再重命名，避免中断留下损坏条目）"""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(variants, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        self.used.add(key)
+        self.misses += 1
+
+    def evict_unused(self) -> int:
+        """删除本次运行未使用的条目，返回删除数量"""
+        evicted = 0
+        for shard in os.listdir(self.cache_dir):
+            shard_dir = os.path.join(self.cache_dir, shard)
+            if not os.path.isdir(shard_dir):
+                continue
+            for filename in os.listdir(shard_dir):
+                key = filename.split('.', 1)[0]
+                if key not in self.used:
+                    os.remove(os.path.join(shard_dir, filename))
+                    evicted += 1
+        return evicted
+
+    def stats(self) -> Dict[str, int]:
+        """缓存命中统计"""
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self.used)}
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+混合策略配对 - 可插拔的基础策略组合方式
+先按分类分组，再按策略惰性枚举组合（以基础策略表的行号表示），
+并可在生成前估算输出规模
+"""
+
+import random
+import re
+from abc import ABC, abstractmethod
+from collections import Counter, defaultdict
+from itertools import combinations
+from math import comb
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from strategy_table import StrategyTable
+
+# 拆分技术指标文本的分隔符
+_INDICATOR_SEPARATORS = re.compile(r'[,，、+/\s]+')
+
+
+def group_by_category(table: StrategyTable) -> Dict[int, np.ndarray]:
+    """按分类分组，返回 {分类编码: 行号数组}（按首次出现顺序）"""
+    codes = table.codes('category')
+    groups = {}
+    for code in dict.fromkeys(codes.tolist()):
+        groups[code] = np.flatnonzero(codes == code)
+    return groups
+
+
+class PairingPolicy(ABC):
+    """配对策略基类"""
+
+    @abstractmethod
+    def combinations(self, table: StrategyTable) -> Iterator[Tuple[int, ...]]:
+        """惰性枚举参与混合的行号组合"""
+
+    @abstractmethod
+    def estimate(self, table: StrategyTable) -> int:
+        """估算组合数量（上界）"""
+
+
+class NeighborPairing(PairingPolicy):
+    """相邻配对：每个策略与列表中其后window个同类策略配对（原有行为）"""
+
+    def __init__(self, window: int = 2):
+        self.window = window
+
+    def combinations(self, table: StrategyTable) -> Iterator[Tuple[int, ...]]:
+        codes = table.codes('category').tolist()
+        for i in range(len(codes)):
+            for j in range(i+1, min(i+1+self.window, len(codes))):
+                if codes[i] == codes[j]:
+                    yield i, j
+
+    def estimate(self, table: StrategyTable) -> int:
+        codes = table.codes('category')
+        return int(sum(
+            np.count_nonzero(codes[:-offset] == codes[offset:])
+            for offset in range(1, self.window + 1) if offset < len(codes)
+        ))
+
+
+class AllPairsPairing(PairingPolicy):
+    """同类全配对：每个分类内的所有策略对"""
+
+    def combinations(self, table: StrategyTable) -> Iterator[Tuple[int, ...]]:
+        for rows in group_by_category(table).values():
+            for i, j in combinations(rows.tolist(), 2):
+                yield i, j
+
+    def estimate(self, table: StrategyTable) -> int:
+        return sum(comb(len(rows), 2) for rows in group_by_category(table).values())
+
+
+class KWayPairing(PairingPolicy):
+    """同类k路组合：每个分类内任意k个策略的组合"""
+
+    def __init__(self, k: int = 3):
+        if k < 2:
+            raise ValueError("k路组合要求k >= 2")
+        self.k = k
+
+    def combinations(self, table: StrategyTable) -> Iterator[Tuple[int, ...]]:
+        for rows in group_by_category(table).values():
+            yield from combinations(rows.tolist(), self.k)
+
+    def estimate(self, table: StrategyTable) -> int:
+        return sum(comb(len(rows), self.k) for rows in group_by_category(table).values())
+
+
+class RandomPairing(PairingPolicy):
+    """随机抽样：每个分类内按固定种子无放回抽取sample_size个策略对
+
+    直接在策略对编号区间上抽样，不需要先生成全部策略对。
+    """
+
+    def __init__(self, sample_size: int = 100, seed: int = 0):
+        self.sample_size = sample_size
+        self.seed = seed
+
+    @staticmethod
+    def _decode(index: int, n: int) -> Tuple[int, int]:
+        """将编号解码为 (i, j)：按i升序、j升序排列的第index个策略对"""
+        # 第i行之前共有 i*n - i*(i+1)/2 个策略对，二分查找index所在的行
+        low, high = 0, n - 2
+        while low < high:
+            mid = (low + high + 1) // 2
+            if mid * n - mid * (mid + 1) // 2 <= index:
+                low = mid
+            else:
+                high = mid - 1
+        i = low
+        j = index - (i * n - i * (i + 1) // 2) + i + 1
+        return i, j
+
+    def combinations(self, table: StrategyTable) -> Iterator[Tuple[int, ...]]:
+        rng = random.Random(self.seed)
+        for rows in group_by_category(table).values():
+            total = comb(len(rows), 2)
+            for index in sorted(rng.sample(range(total), min(self.sample_size, total))):
+                i, j = self._decode(index, len(rows))
+                yield int(rows[i]), int(rows[j])
+
+    def estimate(self, table: StrategyTable) -> int:
+        return sum(
+            min(self.sample_size, comb(len(rows), 2))
+            for rows in group_by_category(table).values()
+        )
+
+
+class TopKOverlapPairing(PairingPolicy):
+    """指标重叠Top-k：每个策略与同类中技术指标Jaccard相似度最高的k个策略配对
+
+    通过指标倒排索引只比较至少共享一个指标的策略；出现次数超过
+    max_posting的指标视为通用指标，不参与候选生成，避免退化为全配对。
+    """
+
+    def __init__(self, k: int = 3, max_posting: int = 1000):
+        self.k = k
+        self.max_posting = max_posting
+
+    @staticmethod
+    def _tokens(indicators) -> frozenset:
+        return frozenset(
+            token.lower() for token in _INDICATOR_SEPARATORS.split(str(indicators or '')) if token
+        )
+
+    def combinations(self, table: StrategyTable) -> Iterator[Tuple[int, ...]]:
+        indicators = table.column('indicators')
+        for rows in group_by_category(table).values():
+            rows = rows.tolist()
+            tokens = {row: self._tokens(indicators[row]) for row in rows}
+
+            postings: Dict[str, List[int]] = defaultdict(list)
+            for row in rows:
+                for token in tokens[row]:
+                    postings[token].append(row)
+
+            emitted = set()
+            for row in rows:
+                overlap = Counter()
+                for token in tokens[row]:
+                    posting = postings[token]
+                    if len(posting) <= self.max_posting:
+                        overlap.update(posting)
+                overlap.pop(row, None)
+
+                scored = sorted(
+                    ((count / len(tokens[row] | tokens[other]), other)
+                     for other, count in overlap.items()),
+                    key=lambda item: (-item[0], item[1]),
+                )
+                for _, other in scored[:self.k]:
+                    pair = (min(row, other), max(row, other))
+                    if pair not in emitted:
+                        emitted.add(pair)
+                        yield pair
+
+    def estimate(self, table: StrategyTable) -> int:
+        return sum(
+            min(len(rows) * self.k, comb(len(rows), 2))
+            for rows in group_by_category(table).values()
+        )
+
+
+PAIRING_POLICIES = {
+    'neighbors': NeighborPairing,
+    'all-pairs': AllPairsPairing,
+    'top-k': TopKOverlapPairing,
+    'random': RandomPairing,
+    'k-way': KWayPairing,
+}
+
+
+def get_pairing_policy(name: str, **kwargs) -> PairingPolicy:
+    """按名称创建配对策略"""
+    if name not in PAIRING_POLICIES:
+        raise ValueError(f"未知的配对策略: {name}（可选: {', '.join(PAIRING_POLICIES)}）")
+    return PAIRING_POLICIES[name](**kwargs)
@@ -0,0 +1,469 @@
+#!/usr/bin/env python3
+"""
+本地行情库 - 将CSV/Parquet行情转换为内存映射的列式数组
+K线按 (时间, 标的) 对齐存储，期权链按 (日期, 标的) 排序存储；
+读取时返回内存映射上的切片视图，多个进程共享操作系统页缓存中的同一份数据
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import shutil
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+# 数据集元信息文件
+META_FILE = 'meta.json'
+
+# 识别时间列的候选列名（按优先级）
+TIME_COLUMNS = ('datetime', 'timestamp', 'date', 'time')
+
+# K线字段
+OHLCV_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+# 期权链中按字典编码存储的文本列
+OPTION_TEXT_COLUMNS = ('underlying', 'option_type')
+
+# 期权类型列的候选列名
+OPTION_TYPE_COLUMNS = ('option_type', 'type', 'cp', 'call_put')
+
+TimeLike = Union[str, np.datetime64, pd.Timestamp, None]
+
+
+def _expand_paths(paths: Iterable[str]) -> List[str]:
+    """展开目录为其中的CSV/Parquet文件（按文件名排序）"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(
+                glob.glob(os.path.join(path, '*.csv')) + glob.glob(os.path.join(path, '*.parquet'))
+            ))
+        else:
+            files.append(path)
+    return files
+
+
+def _normalize_column(column: Any) -> str:
+    return str(column).strip().lower()
+
+
+def _import_pyarrow_parquet():
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("读取Parquet行情需要安装pyarrow: pip install pyarrow") from e
+    return pq
+
+
+def _read_columns(path: str) -> List[str]:
+    """只读取文件头（CSV首行或Parquet schema），返回小写列名"""
+    if path.endswith('.parquet'):
+        names = _import_pyarrow_parquet().read_schema(path).names
+    else:
+        names = pd.read_csv(path, nrows=0).columns
+    return [_normalize_column(c) for c in names]
+
+
+def _read_table(path: str, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """读取CSV或Parquet文件，列名统一为小写；指定columns时只解析这些列（不存在的列忽略）"""
+    wanted = None if columns is None else {_normalize_column(c) for c in columns}
+    if path.endswith('.parquet'):
+        names = _import_pyarrow_parquet().read_schema(path).names
+        selected = None if wanted is None else [c for c in names if _normalize_column(c) in wanted]
+        frame = pd.read_parquet(path, columns=selected)
+    else:
+        usecols = None if wanted is None else (lambda c: _normalize_column(c) in wanted)
+        frame = pd.read_csv(path, usecols=usecols)
+    frame.columns = [_normalize_column(c) for c in frame.columns]
+    if columns is not None:
+        frame = frame[[c for c in columns if c in frame.columns]]
+    return frame
+
+
+def _time_column(columns: Sequence[str], path: str) -> str:
+    for column in TIME_COLUMNS:
+        if column in columns:
+            return column
+    raise ValueError(f"{path} 缺少时间列（可选列名: {', '.join(TIME_COLUMNS)}）")
+
+
+def _to_datetime(values) -> np.ndarray:
+    return pd.to_datetime(values).to_numpy(dtype='datetime64[ns]')
+
+
+def _symbol_frames(path: str, frame: pd.DataFrame) -> Iterator[Tuple[str, pd.DataFrame]]:
+    """按标的拆分：含symbol列的长表按列拆分，否则以文件名作为标的代码"""
+    if 'symbol' in frame.columns:
+        for symbol, group in frame.groupby('symbol', sort=False):
+            yield str(symbol), group
+    else:
+        yield os.path.splitext(os.path.basename(path))[0], frame
+
+
+def _write_meta(directory: str, meta: Dict):
+    with open(os.path.join(directory, META_FILE), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+
+
+def _build_id(files: List[str]) -> str:
+    """由源文件路径、大小和修改时间生成构建标识（用于结果缓存键）"""
+    digest = hashlib.sha256()
+    for path in files:
+        stat = os.stat(path)
+        digest.update(f'{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}\0'.encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+class OhlcvDataset:
+    """K线数据集：每个字段一个 (时间数, 标的数) 的float64内存映射数组，缺失为NaN"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, META_FILE), 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.name = self.meta['name']
+        self.symbols: List[str] = self.meta['symbols']
+        self.fields: List[str] = self.meta['fields']
+        self.symbol_index = {symbol: column for column, symbol in enumerate(self.symbols)}
+        self.timestamps = np.load(os.path.join(directory, 'timestamps.npy'), mmap_mode='r')
+        self._arrays: Dict[str, np.ndarray] = {}
+
+    def field(self, name: str) -> np.ndarray:
+        """整个字段的内存映射数组"""
+        if name not in self._arrays:
+            if name not in self.fields:
+                raise KeyError(f"数据集 {self.name} 没有字段 {name}")
+            self._arrays[name] = np.load(os.path.join(self.directory, f'{name}.npy'), mmap_mode='r')
+        return self._arrays[name]
+
+    def rows(self, start: TimeLike = None, end: TimeLike = None) -> slice:
+        """时间区间 [start, end] 对应的行切片"""
+        lo = 0 if start is None else int(np.searchsorted(self.timestamps, np.datetime64(start, 'ns'), 'left'))
+        hi = len(self.timestamps) if end is None else \
+            int(np.searchsorted(self.timestamps, np.datetime64(end, 'ns'), 'right'))
+        return slice(lo, hi)
+
+    def columns(self, symbols: Optional[Sequence[str]] = None) -> Union[slice, List[int]]:
+        """标的对应的列：连续递增的列返回切片（零拷贝），否则返回列号列表"""
+        if symbols is None:
+            return slice(0, len(self.symbols))
+        try:
+            indexes = [self.symbol_index[s] for s in symbols]
+        except KeyError as e:
+            raise KeyError(f"数据集 {self.name} 没有标的 {e.args[0]}") from None
+        if indexes and indexes == list(range(indexes[0], indexes[0] + len(indexes))):
+            return slice(indexes[0], indexes[0] + len(indexes))
+        return indexes
+
+    def panel(self, start: TimeLike = None, end: TimeLike = None,
+              symbols: Optional[Sequence[str]] = None,
+              fields: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+        """返回 {字段: (时间数, 标的数)数组}，可直接传给BacktestEngine
+
+        时间区间和连续标的的切片是内存映射上的视图，不复制数据；
+        不连续的标的列表会按列号取出副本。
+        """
+        return self.slice(start, end, symbols, fields).load()
+
+    def slice(self, start: TimeLike = None, end: TimeLike = None,
+              symbols: Optional[Sequence[str]] = None,
+              fields: Optional[Sequence[str]] = None) -> 'PanelSlice':
+        """返回可跨进程传递的切片描述（只包含路径和行列号）"""
+        return PanelSlice(self.directory, self.rows(start, end), self.columns(symbols),
+                          list(fields) if fields is not None else list(self.fields),
+                          self.meta.get('build_id', ''))
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+
+class PanelSlice:
+    """K线数据集切片的描述
+
+    只保存数据集路径和行列号，可以廉价地传给子进程，
+    子进程调用load()各自打开内存映射，共享同一份页缓存。
+    """
+
+    def __init__(self, directory: str, rows: slice, columns: Union[slice, List[int]],
+                 fields: List[str], build_id: str = ''):
+        self.directory = directory
+        self.rows = rows
+        self.columns = columns
+        self.fields = fields
+        self.build_id = build_id
+
+    def load(self) -> Dict[str, np.ndarray]:
+        dataset = OhlcvDataset(self.directory)
+        return {field: dataset.field(field)[self.rows, self.columns] for field in self.fields}
+
+    def fingerprint(self) -> str:
+        """切片内容标识：数据集构建标识 + 行列范围"""
+        columns = self.columns
+        if isinstance(columns, slice):
+            columns = (columns.start, columns.stop)
+        content = json.dumps([self.build_id, self.rows.start, self.rows.stop, columns, self.fields])
+        return hashlib.blake2b(content.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class OptionChainDataset:
+    """期权链数据集：按 (日期, 标的, 到期日, 行权价, 类型) 排序的列式数组
+
+    文本列（标的、期权类型）以字典编码存储，编码顺序与文本排序一致，
+    因此同一日期、同一标的的合约是连续的一段，可以零拷贝切片。
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, META_FILE), 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.name = self.meta['name']
+        self.columns: List[str] = self.meta['columns']
+        self.dictionaries: Dict[str, List[str]] = self.meta['dictionaries']
+        self.dates = np.load(os.path.join(directory, 'dates.npy'), mmap_mode='r')
+        self.offsets = np.load(os.path.join(directory, 'date_offsets.npy'), mmap_mode='r')
+        self._arrays: Dict[str, np.ndarray] = {}
+
+    def column(self, name: str) -> np.ndarray:
+        """整列的内存映射数组"""
+        if name not in self._arrays:
+            if name not in self.columns:
+                raise KeyError(f"数据集 {self.name} 没有列 {name}")
+            self._arrays[name] = np.load(os.path.join(self.directory, f'{name}.npy'), mmap_mode='r')
+        return self._arrays[name]
+
+    def _date_rows(self, date: TimeLike) -> slice:
+        position = int(np.searchsorted(self.dates, np.datetime64(date, 'ns')))
+        if position == len(self.dates) or self.dates[position] != np.datetime64(date, 'ns'):
+            return slice(0, 0)
+        return slice(int(self.offsets[position]), int(self.offsets[position + 1]))
+
+    def chain(self, date: TimeLike, underlying: Optional[str] = None,
+              columns: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+        """某个交易日（可选某个标的）的期权链，返回 {列名: 数组视图}"""
+        rows = self._date_rows(date)
+        if underlying is not None and rows.stop > rows.start:
+            values = self.dictionaries['underlying']
+            code = values.index(underlying) if underlying in values else -1
+            codes = self.column('underlying')[rows]
+            lo = int(np.searchsorted(codes, code, 'left'))
+            hi = int(np.searchsorted(codes, code, 'right'))
+            rows = slice(rows.start + lo, rows.start + hi)
+        return {name: self.column(name)[rows] for name in (columns or self.columns)}
+
+    def decode(self, column: str, codes: np.ndarray) -> np.ndarray:
+        """将字典编码还原为文本"""
+        return np.asarray(self.dictionaries[column], dtype=object)[codes]
+
+    def __len__(self) -> int:
+        return int(self.offsets[-1]) if len(self.offsets) else 0
+
+
+class MarketDataStore:
+    """本地行情库
+
+    目录结构：{root}/{数据集名称}/meta.json 及每列一个 .npy 文件。
+    构建时先写入临时目录再整体替换，构建过程中断不会破坏已有数据集。
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def datasets(self) -> List[str]:
+        """已构建的数据集名称"""
+        return sorted(
+            name for name in os.listdir(self.root)
+            if os.path.exists(os.path.join(self.root, name, META_FILE))
+        )
+
+    def open(self, name: str) -> Union[OhlcvDataset, OptionChainDataset]:
+        """打开数据集（按元信息中的类型）"""
+        directory = os.path.join(self.root, name)
+        if not os.path.exists(os.path.join(directory, META_FILE)):
+            raise FileNotFoundError(f"行情库中没有数据集 {name}")
+        with open(os.path.join(directory, META_FILE), 'r', encoding='utf-8') as f:
+            kind = json.load(f)['kind']
+        return OhlcvDataset(directory) if kind == 'ohlcv' else OptionChainDataset(directory)
+
+    def _staging(self, name: str) -> str:
+        staging = os.path.join(self.root, f'.{name}.tmp-{os.getpid()}')
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        return staging
+
+    def _publish(self, staging: str, name: str) -> str:
+        directory = os.path.join(self.root, name)
+        if os.path.exists(directory):
+            shutil.rmtree(directory)
+        os.replace(staging, directory)
+        return directory
+
+    def build_ohlcv(self, name: str, paths: Iterable[str], frequency: str = '') -> OhlcvDataset:
+        """由K线文件构建数据集
+
+        每个文件可以是单个标的（以文件名作为代码）或含symbol列的长表。
+        第一遍只读取时间和代码列确定对齐后的形状，第二遍逐文件写入内存映射，
+        内存占用与单个文件大小相当。
+        """
+        files = _expand_paths(paths)
+        if not files:
+            raise ValueError("没有找到K线文件")
+
+        symbols, timestamps, fields = {}, [], []
+        for path in files:
+            columns = _read_columns(path)
+            time_column = _time_column(columns, path)
+            frame = _read_table(path, [time_column, 'symbol'])
+            timestamps.append(_to_datetime(frame[time_column]))
+            for symbol, _ in _symbol_frames(path, frame):
+                symbols.setdefault(symbol, len(symbols))
+            fields.extend(f for f in OHLCV_FIELDS if f in columns and f not in fields)
+        index = np.unique(np.concatenate(timestamps))
+        fields = [f for f in OHLCV_FIELDS if f in fields]
+
+        staging = self._staging(name)
+        shape = (len(index), len(symbols))
+        arrays = {
+            field: np.lib.format.open_memmap(os.path.join(staging, f'{field}.npy'), mode='w+',
+                                             dtype=np.float64, shape=shape)
+            for field in fields
+        }
+        for array in arrays.values():
+            array[:] = np.nan
+        for path in files:
+            frame = _read_table(path, list(TIME_COLUMNS) + ['symbol'] + fields)
+            time_column = _time_column(frame.columns, path)
+            for symbol, group in _symbol_frames(path, frame):
+                rows = np.searchsorted(index, _to_datetime(group[time_column]))
+                column = symbols[symbol]
+                for field in fields:
+                    if field in group.columns:
+                        arrays[field][rows, column] = group[field].to_numpy(dtype=np.float64)
+        for array in arrays.values():
+            array.flush()
+        del arrays
+
+        np.save(os.path.join(staging, 'timestamps.npy'), index)
+        _write_meta(staging, {
+            'kind': 'ohlcv',
+            'name': name,
+            'frequency': frequency,
+            'symbols': list(symbols),
+            'fields': fields,
+            'shape': list(shape),
+            'start': str(index[0]) if len(index) else None,
+            'end': str(index[-1]) if len(index) else None,
+            'build_id': _build_id(files),
+        })
+        return OhlcvDataset(self._publish(staging, name))
+
+    def build_option_chain(self, name: str, paths: Iterable[str]) -> OptionChainDataset:
+        """由期权链文件构建数据集
+
+        必需列：date、underlying、expiry、strike、option_type（或type/cp/call_put），
+        其余数值列（如bid、ask、iv、open_interest）原样保留。
+        """
+        files = _expand_paths(paths)
+        if not files:
+            raise ValueError("没有找到期权链文件")
+
+        frames = []
+        for path in files:
+            frame = _read_table(path)
+            for alias in OPTION_TYPE_COLUMNS:
+                if alias in frame.columns:
+                    frame = frame.rename(columns={alias: 'option_type'})
+                    break
+            time_column = _time_column(frame.columns, path)
+            frame = frame.rename(columns={time_column: 'date'})
+            missing = [c for c in ('date', 'underlying', 'expiry', 'strike', 'option_type')
+                       if c not in frame.columns]
+            if missing:
+                raise ValueError(f"{path} 缺少期权链字段: {', '.join(missing)}")
+            frames.append(frame)
+        chain = pd.concat(frames, ignore_index=True)
+
+        chain['date'] = _to_datetime(chain['date'])
+        chain['expiry'] = _to_datetime(chain['expiry'])
+        chain['option_type'] = chain['option_type'].astype(str).str.upper().str[0]
+        dictionaries = {}
+        for column in OPTION_TEXT_COLUMNS:
+            values = sorted(chain[column].astype(str).unique())
+            dictionaries[column] = values
+            chain[column] = pd.Categorical(chain[column].astype(str), categories=values).codes.astype(np.int32)
+        chain = chain.sort_values(['date', 'underlying', 'expiry', 'strike', 'option_type'], kind='stable')
+
+        staging = self._staging(name)
+        columns = []
+        for column in chain.columns:
+            values = chain[column]
+            if column in ('date', 'expiry'):
+                array = values.to_numpy(dtype='datetime64[ns]')
+            elif column in OPTION_TEXT_COLUMNS:
+                array = values.to_numpy(dtype=np.int32)
+            elif pd.api.types.is_numeric_dtype(values):
+                array = values.to_numpy(dtype=np.float64)
+            else:
+                # 其余文本列不进入列式存储
+                continue
+            np.save(os.path.join(staging, f'{column}.npy'), array)
+            columns.append(column)
+
+        dates = chain['date'].to_numpy(dtype='datetime64[ns]')
+        unique_dates, starts = np.unique(dates, return_index=True)
+        np.save(os.path.join(staging, 'dates.npy'), unique_dates)
+        np.save(os.path.join(staging, 'date_offsets.npy'),
+                np.append(starts, len(dates)).astype(np.int64))
+        _write_meta(staging, {
+            'kind': 'option_chain',
+            'name': name,
+            'columns': columns,
+            'dictionaries': dictionaries,
+            'rows': len(chain),
+            'build_id': _build_id(files),
+        })
+        return OptionChainDataset(self._publish(staging, name))
+
+
+def parse_args(argv: List[str] = None) -> argparse.Namespace:
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='本地行情库')
+    parser.add_argument('--root', default='market_data', help='行情库根目录')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    ohlcv = commands.add_parser('build-ohlcv', help='由CSV/Parquet K线文件构建数据集')
+    ohlcv.add_argument('name', help='数据集名称，如 stocks_daily')
+    ohlcv.add_argument('paths', nargs='+', help='K线文件或目录')
+    ohlcv.add_argument('--frequency', default='', help='K线周期说明，如 1d、1min')
+
+    options = commands.add_parser('build-options', help='由CSV/Parquet期权链文件构建数据集')
+    options.add_argument('name', help='数据集名称，如 options_chain')
+    options.add_argument('paths', nargs='+', help='期权链文件或目录')
+
+    commands.add_parser('list', help='列出已构建的数据集')
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str] = None):
+    """主函数"""
+    args = parse_args(argv)
+    store = MarketDataStore(args.root)
+
+    if args.command == 'build-ohlcv':
+        dataset = store.build_ohlcv(args.name, args.paths, frequency=args.frequency)
+        print(f"已构建K线数据集 {dataset.name}: {len(dataset)} 个时间点 × {len(dataset.symbols)} 个标的")
+    elif args.command == 'build-options':
+        dataset = store.build_option_chain(args.name, args.paths)
+        print(f"已构建期权链数据集 {dataset.name}: {len(dataset)} 个合约报价，{len(dataset.dates)} 个交易日")
+    else:
+        for name in store.datasets():
+            meta = store.open(name).meta
+            print(f"{name}: {meta['kind']} {meta.get('shape') or meta.get('rows')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+"""
+期权定价 - 向量化的Black-Scholes/Black-76定价、希腊字母和隐含波动率求解
+所有函数直接作用于整条期权链（乃至整段历史）的numpy数组，
+为期权分类中的备兑认购、跨式组合等策略计算隐含波动率、Delta、Vega等指标
+"""
+
+import argparse
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from market_data import MarketDataStore, OhlcvDataset, OptionChainDataset
+
+ArrayLike = Union[float, np.ndarray]
+
+_SQRT_2PI = np.sqrt(2.0 * np.pi)
+
+
+def norm_pdf(x: ArrayLike) -> np.ndarray:
+    """标准正态密度"""
+    x = np.asarray(x, dtype=np.float64)
+    return np.exp(-0.5 * x * x) / _SQRT_2PI
+
+
+def norm_cdf(x: ArrayLike) -> np.ndarray:
+    """标准正态分布函数（West 2005的Hart算法，双精度误差约1e-14，不依赖scipy）"""
+    x = np.asarray(x, dtype=np.float64)
+    z = np.abs(x)
+    exponential = np.exp(-0.5 * z * z)
+
+    numerator = 3.52624965998911e-02 * z + 0.700383064443688
+    for c in (6.37396220353165, 33.912866078383, 112.079291497871, 221.213596169931, 220.206867912376):
+        numerator = numerator * z + c
+    denominator = 8.83883476483184e-02 * z + 1.75566716318264
+    for c in (16.064177579207, 86.7807322029461, 296.564248779674, 637.333633378831,
+              793.826512519948, 440.413735824752):
+        denominator = denominator * z + c
+    near = exponential * numerator / denominator
+
+    # 尾部使用连分式
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fraction = z + 0.65
+        for c in (4.0, 3.0, 2.0, 1.0):
+            fraction = z + c / fraction
+        tail = exponential / fraction / 2.506628274631
+
+    lower = np.where(z < 7.07106781186547, near, np.where(z <= 37.0, tail, 0.0))
+    return np.where(x > 0, 1.0 - lower, lower)
+
+
+def is_call(option_type: Union[bool, str, np.ndarray]) -> np.ndarray:
+    """期权类型转为布尔数组：True/'C'/'call' 为认购，False/'P'/'put' 为认沽"""
+    values = np.asarray(option_type)
+    if values.dtype == bool:
+        return values
+    if values.dtype.kind in 'iuf':
+        return values > 0
+    return np.char.upper(values.astype(str)).astype('<U1') == 'C'
+
+
+class PricingModel(ABC):
+    """广义Black-Scholes-Merton模型（持有成本b）
+
+    underlying为标的价格（Black-76中为期货价格），expiry为剩余期限（年），
+    rate为连续复利无风险利率，sigma为年化波动率，call为认购标志（见is_call）。
+    vega对应波动率变化1.0（即100个百分点），theta为每年的时间价值变化。
+    """
+
+    name = ''
+
+    @abstractmethod
+    def carry(self, rate: np.ndarray) -> np.ndarray:
+        """持有成本b"""
+
+    def _inputs(self, underlying, strike, expiry, rate, sigma, call):
+        s, k, t, r, v = np.broadcast_arrays(*(np.asarray(a, dtype=np.float64)
+                                              for a in (underlying, strike, expiry, rate, sigma)))
+        call = np.broadcast_to(is_call(call), s.shape)
+        return s, k, t, r, v, call
+
+    def _evaluate(self, s, k, t, r, sigma, call, greeks: bool) -> Dict[str, np.ndarray]:
+        b = self.carry(r)
+        sqrt_t = np.sqrt(np.maximum(t, 0.0))
+        vol_t = sigma * sqrt_t
+        valid = (vol_t > 0) & (s > 0) & (k > 0)
+        safe_vol_t = np.where(valid, vol_t, 1.0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            d1 = np.where(valid, (np.log(s / k) + (b + 0.5 * sigma * sigma) * t) / safe_vol_t, 0.0)
+        d2 = d1 - vol_t
+        carry_df = np.exp((b - r) * t)
+        df = np.exp(-r * t)
+        sign = np.where(call, 1.0, -1.0)
+
+        nd1 = norm_cdf(sign * d1)
+        nd2 = norm_cdf(sign * d2)
+        forward_value = sign * (s * carry_df - k * df)
+        # 到期或零波动率时取（贴现后的）内在价值
+        price = np.where(valid, sign * (s * carry_df * nd1 - k * df * nd2), np.maximum(forward_value, 0.0))
+        result = {'price': price, 'd1': d1}
+        if not greeks:
+            result['vega'] = np.where(valid, s * carry_df * norm_pdf(d1) * sqrt_t, 0.0)
+            return result
+
+        pdf = norm_pdf(d1)
+        safe_sqrt_t = np.where(valid, sqrt_t, 1.0)
+        result['delta'] = np.where(valid, sign * carry_df * nd1,
+                                   np.where(forward_value > 0, sign * carry_df, 0.0))
+        result['gamma'] = np.where(valid, carry_df * pdf / (s * safe_vol_t), 0.0)
+        result['vega'] = np.where(valid, s * carry_df * pdf * sqrt_t, 0.0)
+        result['theta'] = np.where(
+            valid,
+            -s * carry_df * pdf * sigma / (2.0 * safe_sqrt_t)
+            - sign * (b - r) * s * carry_df * nd1 - sign * r * k * df * nd2,
+            0.0,
+        )
+        result['rho'] = self._rho(price, k, t, df, nd2, sign, valid)
+        return result
+
+    def _rho(self, price, k, t, df, nd2, sign, valid) -> np.ndarray:
+        return np.where(valid, sign * k * t * df * nd2, 0.0)
+
+    def price(self, underlying: ArrayLike, strike: ArrayLike, expiry: ArrayLike,
+              rate: ArrayLike, sigma: ArrayLike, call) -> np.ndarray:
+        """期权理论价格"""
+        return self._evaluate(*self._inputs(underlying, strike, expiry, rate, sigma, call), greeks=False)['price']
+
+    def greeks(self, underlying: ArrayLike, strike: ArrayLike, expiry: ArrayLike,
+               rate: ArrayLike, sigma: ArrayLike, call) -> Dict[str, np.ndarray]:
+        """理论价格和希腊字母：price、delta、gamma、vega、theta、rho"""
+        result = self._evaluate(*self._inputs(underlying, strike, expiry, rate, sigma, call), greeks=True)
+        result.pop('d1')
+        return result
+
+    def implied_volatility(self, price: ArrayLike, underlying: ArrayLike, strike: ArrayLike,
+                           expiry: ArrayLike, rate: ArrayLike, call,
+                           tol: float = 1e-10, max_iter: int = 100,
+                           lower: float = 1e-6, upper: float = 5.0) -> np.ndarray:
+        """向量化求解隐含波动率
+
+        所有合约同时迭代：Newton步落在当前区间 [lower, upper] 内且vega足够大时采用Newton步，
+        否则取区间中点（二分），因此深度实值/虚值、临近到期等vega很小的合约也能收敛。
+        价格不在无套利区间（贴现内在价值, 上界）内或期限为0的合约返回NaN。
+        """
+        s, k, t, r, _, call = self._inputs(underlying, strike, expiry, rate, 0.0, call)
+        target, s, k, t, r, call = np.broadcast_arrays(np.asarray(price, dtype=np.float64), s, k, t, r, call)
+        shape = target.shape
+        target, s, k, t, r, call = (a.ravel() for a in (target, s, k, t, r, call))
+
+        b = self.carry(r)
+        carry_df = np.exp((b - r) * t)
+        df = np.exp(-r * t)
+        intrinsic = np.maximum(np.where(call, s * carry_df - k * df, k * df - s * carry_df), 0.0)
+        ceiling = np.where(call, s * carry_df, k * df)
+        result = np.full(target.shape, np.nan)
+        solvable = np.isfinite(target) & (t > 0) & (s > 0) & (k > 0) & (target > intrinsic) & (target < ceiling)
+
+        active = np.flatnonzero(solvable)
+        # 初值：Brenner-Subrahmanyam近似（平值附近准确），夹在搜索区间内
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sigma = np.sqrt(2.0 * np.pi / t[active]) * target[active] / (s[active] * carry_df[active])
+        sigma = np.clip(np.nan_to_num(sigma, nan=0.2), lower * 2, upper / 2)
+        lo = np.full(active.shape, lower)
+        hi = np.full(active.shape, upper)
+
+        for _ in range(max_iter):
+            if not active.size:
+                break
+            values = self._evaluate(s[active], k[active], t[active], r[active], sigma, call[active], greeks=False)
+            diff = values['price'] - target[active]
+            converged = (np.abs(diff) <= tol * np.maximum(1.0, target[active])) | (hi - lo <= tol)
+            result[active[converged]] = sigma[converged]
+
+            keep = ~converged
+            active, sigma, diff = active[keep], sigma[keep], diff[keep]
+            vega = values['vega'][keep]
+            hi = np.where(diff > 0, sigma, hi[keep])
+            lo = np.where(diff < 0, sigma, lo[keep])
+            with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+                newton = sigma - diff / vega
+            use_newton = (vega > 1e-12) & (newton > lo) & (newton < hi)
+            sigma = np.where(use_newton, newton, 0.5 * (lo + hi))
+        return result.reshape(shape)
+
+
+class BlackScholes(PricingModel):
+    """Black-Scholes-Merton（股票/指数期权，可带连续股息率）"""
+
+    name = 'black-scholes'
+
+    def __init__(self, dividend_yield: float = 0.0):
+        self.dividend_yield = dividend_yield
+
+    def carry(self, rate: np.ndarray) -> np.ndarray:
+        return rate - self.dividend_yield
+
+
+class Black76(PricingModel):
+    """Black-76（期货/商品期权，标的为期货价格）"""
+
+    name = 'black76'
+
+    def carry(self, rate: np.ndarray) -> np.ndarray:
+        return np.zeros_like(rate)
+
+    def _rho(self, price, k, t, df, nd2, sign, valid) -> np.ndarray:
+        # 期货价格不随利率变化，利率只影响贴现
+        return -t * price
+
+
+PRICING_MODELS = {
+    'black-scholes': BlackScholes,
+    'black76': Black76,
+}
+
+
+def get_pricing_model(name: str, **kwargs) -> PricingModel:
+    """按名称创建定价模型"""
+    if name not in PRICING_MODELS:
+        raise ValueError(f"未知的定价模型: {name}（可选: {', '.join(PRICING_MODELS)}）")
+    return PRICING_MODELS[name](**kwargs)
+
+
+class OptionChainAnalyzer:
+    """在期权链数据集上批量计算隐含波动率和希腊字母
+
+    标的价格取自期权链中的spot_column列，或从K线数据集按日期向前取最近的收盘价；
+    期权价格优先使用买卖价中间价，其次是last/close/price列，都没有时使用数据集中的iv列定价。
+    """
+
+    PRICE_COLUMNS = ('mid', 'last', 'close', 'price')
+
+    def __init__(self, dataset: OptionChainDataset, model: Optional[PricingModel] = None,
+                 rate: float = 0.0, spot_column: str = 'underlying_price',
+                 spot_dataset: Optional[OhlcvDataset] = None, day_count: float = 365.0):
+        self.dataset = dataset
+        self.model = model or BlackScholes()
+        self.rate = rate
+        self.spot_column = spot_column
+        self.spot_dataset = spot_dataset
+        self.day_count = day_count
+
+    def columns(self, date=None, underlying: Optional[str] = None) -> Dict[str, np.ndarray]:
+        """某日（date为None时为全部历史）的期权链列"""
+        if date is not None:
+            return self.dataset.chain(date, underlying)
+        columns = {name: self.dataset.column(name) for name in self.dataset.columns}
+        if underlying is not None:
+            values = self.dataset.dictionaries['underlying']
+            code = values.index(underlying) if underlying in values else -1
+            mask = columns['underlying'] == code
+            columns = {name: values[mask] for name, values in columns.items()}
+        return columns
+
+    def spot(self, columns: Dict[str, np.ndarray]) -> np.ndarray:
+        """每个合约对应的标的价格"""
+        if self.spot_column in columns:
+            return np.asarray(columns[self.spot_column], dtype=np.float64)
+        if self.spot_dataset is None:
+            raise ValueError(f"期权链中没有 {self.spot_column} 列，需要提供标的K线数据集")
+        ohlcv = self.spot_dataset
+        lookup = np.array([ohlcv.symbol_index.get(symbol, -1)
+                           for symbol in self.dataset.dictionaries['underlying']] + [-1])
+        symbol_columns = lookup[columns['underlying']]
+        rows = np.searchsorted(ohlcv.timestamps, columns['date'], 'right') - 1
+        valid = (symbol_columns >= 0) & (rows >= 0)
+        spot = np.full(len(rows), np.nan)
+        spot[valid] = ohlcv.field('close')[rows[valid], symbol_columns[valid]]
+        return spot
+
+    def market_price(self, columns: Dict[str, np.ndarray]) -> Optional[np.ndarray]:
+        """合约市场价格：买卖价均为正时取中间价，否则依次取last/close/price"""
+        price = None
+        if 'bid' in columns and 'ask' in columns:
+            bid, ask = np.asarray(columns['bid']), np.asarray(columns['ask'])
+            price = np.where((bid > 0) & (ask > 0), 0.5 * (bid + ask), np.nan)
+        for name in self.PRICE_COLUMNS:
+            if name in columns:
+                fallback = np.asarray(columns[name], dtype=np.float64)
+                price = fallback if price is None else np.where(np.isnan(price), fallback, price)
+        return price
+
+    def evaluate(self, date=None, underlying: Optional[str] = None) -> pd.DataFrame:
+        """计算期权链（或整段历史）每个合约的隐含波动率和希腊字母"""
+        columns = self.columns(date, underlying)
+        call = self.dataset.decode('option_type', columns['option_type']) == 'C'
+        spot = self.spot(columns)
+        days = (columns['expiry'] - columns['date']) / np.timedelta64(1, 'D')
+        expiry = np.maximum(days, 0.0) / self.day_count
+        strike = np.asarray(columns['strike'], dtype=np.float64)
+
+        price = self.market_price(columns)
+        if price is not None:
+            iv = self.model.implied_volatility(price, spot, strike, expiry, self.rate, call)
+        elif 'iv' in columns:
+            iv = np.asarray(columns['iv'], dtype=np.float64)
+            price = self.model.price(spot, strike, expiry, self.rate, iv, call)
+        else:
+            raise ValueError(f"期权链 {self.dataset.name} 既没有价格列也没有iv列")
+        greeks = self.model.greeks(spot, strike, expiry, self.rate, iv, call)
+
+        frame = pd.DataFrame({
+            'date': columns['date'],
+            'underlying': self.dataset.decode('underlying', columns['underlying']),
+            'expiry': columns['expiry'],
+            'strike': strike,
+            'option_type': np.where(call, 'C', 'P'),
+            'spot': spot,
+            'days': days,
+            'price': price,
+            'iv': iv,
+        })
+        for name in ('delta', 'gamma', 'vega', 'theta', 'rho'):
+            frame[name] = np.where(np.isnan(iv), np.nan, greeks[name])
+        return frame
+
+    @staticmethod
+    def straddles(frame: pd.DataFrame) -> pd.DataFrame:
+        """跨式组合：同一标的、到期日、行权价的认购 + 认沽"""
+        keys = ['date', 'underlying', 'expiry', 'strike']
+        calls = frame[frame['option_type'] == 'C']
+        puts = frame[frame['option_type'] == 'P']
+        merged = calls.merge(puts.drop(columns=['option_type', 'spot', 'days']), on=keys,
+                             suffixes=('_call', '_put'))
+        result = merged[keys + ['spot', 'days']].copy()
+        result['price'] = merged['price_call'] + merged['price_put']
+        result['iv'] = 0.5 * (merged['iv_call'] + merged['iv_put'])
+        for name in ('delta', 'gamma', 'vega', 'theta', 'rho'):
+            result[name] = merged[f'{name}_call'] + merged[f'{name}_put']
+        result['breakeven_low'] = result['strike'] - result['price']
+        result['breakeven_high'] = result['strike'] + result['price']
+        return result.reset_index(drop=True)
+
+    @staticmethod
+    def covered_calls(frame: pd.DataFrame) -> pd.DataFrame:
+        """备兑认购：持有一单位标的 + 卖出一张认购期权"""
+        calls = frame[frame['option_type'] == 'C']
+        result = calls[['date', 'underlying', 'expiry', 'strike', 'spot', 'days', 'price', 'iv']].copy()
+        result['delta'] = 1.0 - calls['delta']
+        for name in ('gamma', 'vega', 'theta', 'rho'):
+            result[name] = -calls[name]
+        result['premium_yield'] = calls['price'] / calls['spot']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result['annualized_yield'] = result['premium_yield'] * 365.0 / calls['days']
+        result['max_return'] = (calls['strike'] - calls['spot'] + calls['price']) / calls['spot']
+        result['breakeven'] = calls['spot'] - calls['price']
+        return result.reset_index(drop=True)
+
+    @staticmethod
+    def atm(frame: pd.DataFrame, min_days: float = 0.0) -> pd.DataFrame:
+        """每个交易日、每个标的取剩余天数不少于min_days的最近到期日中行权价最接近标的价格的一行"""
+        frame = frame[(frame['days'] >= min_days) & frame['spot'].notna()]
+        if frame.empty:
+            return frame
+        groups = [frame['date'], frame['underlying']]
+        frame = frame[frame['expiry'] == frame.groupby(groups)['expiry'].transform('min')]
+        distance = (frame['strike'] - frame['spot']).abs()
+        nearest = distance.groupby([frame['date'], frame['underlying']]).idxmin()
+        return frame.loc[nearest.to_numpy()].reset_index(drop=True)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='期权链批量定价、希腊字母和隐含波动率')
+    parser.add_argument('dataset', help='期权链数据集名称')
+    parser.add_argument('--root', default='market_data', help='行情库根目录（见market_data.py）')
+    parser.add_argument('--date', default=None, help='只计算某个交易日（默认全部历史）')
+    parser.add_argument('--underlying', default=None, help='只计算某个标的')
+    parser.add_argument('--model', choices=list(PRICING_MODELS), default='black-scholes',
+                        help='定价模型：股票/指数期权用black-scholes，期货/商品期权用black76')
+    parser.add_argument('--rate', type=float, default=0.0, help='无风险利率（连续复利，年化）')
+    parser.add_argument('--dividend-yield', type=float, default=0.0, help='连续股息率（仅black-scholes）')
+    parser.add_argument('--spot-column', default='underlying_price', help='期权链中的标的价格列')
+    parser.add_argument('--spot-dataset', default=None, help='标的K线数据集名称（期权链没有标的价格列时使用）')
+    parser.add_argument('--strategy', choices=['greeks', 'straddle', 'covered-call'], default='greeks',
+                        help='输出单个合约的希腊字母，或跨式组合/备兑认购的组合指标')
+    parser.add_argument('--atm', action='store_true', help='每日每个标的只保留最近到期的平值合约')
+    parser.add_argument('--min-days', type=float, default=0.0, help='--atm时要求的最少剩余天数')
+    parser.add_argument('--output', default=None, help='结果输出CSV文件')
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    store = MarketDataStore(args.root)
+    model_kwargs = {'dividend_yield': args.dividend_yield} if args.model == 'black-scholes' else {}
+    analyzer = OptionChainAnalyzer(
+        store.open(args.dataset), get_pricing_model(args.model, **model_kwargs), rate=args.rate,
+        spot_column=args.spot_column,
+        spot_dataset=store.open(args.spot_dataset) if args.spot_dataset else None,
+    )
+
+    start = time.perf_counter()
+    frame = analyzer.evaluate(args.date, args.underlying)
+    if args.strategy == 'straddle':
+        frame = analyzer.straddles(frame)
+    elif args.strategy == 'covered-call':
+        frame = analyzer.covered_calls(frame)
+    if args.atm:
+        frame = analyzer.atm(frame, args.min_days)
+    elapsed = time.perf_counter() - start
+
+    print(frame.head(20).to_string(index=False))
+    print(f"\n共 {len(frame)} 行，耗时 {elapsed:.3f} 秒，隐含波动率无解 {int(frame['iv'].isna().sum())} 行")
+    if args.output:
+        frame.to_csv(args.output, index=False, encoding='utf-8-sig')
+        print(f"结果已保存到 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,617 @@
+#!/usr/bin/env python3
+"""
+多交易所订单簿回放 - 把多个交易所的本地L2订单簿增量和逐笔成交文件按时间归并为一条事件流，
+模拟各交易所的行情/下单延迟和手续费，在每个事件上运行跨交易所套利等逐事件策略
+文件逐行流式读取，堆归并时每个文件只在内存中保留一个事件，内存占用与回放时长无关
+"""
+
+import argparse
+import csv
+import gzip
+import heapq
+import json
+import math
+import os
+import time
+from datetime import datetime, timezone
+from operator import attrgetter
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+NAN = float('nan')
+
+BID = 'bid'
+ASK = 'ask'
+
+# 各类文件中可识别的列名（按优先级），兼容Tardis等常见导出格式
+TIME_COLUMNS = ('timestamp', 'exchange_timestamp', 'time', 'datetime', 'ts')
+SIZE_COLUMNS = ('amount', 'size', 'quantity', 'qty', 'volume')
+
+_SIDES = {
+    'bid': BID, 'bids': BID, 'buy': BID, 'b': BID,
+    'ask': ASK, 'asks': ASK, 'sell': ASK, 'a': ASK, 's': ASK, 'offer': ASK,
+}
+
+
+class BookUpdate:
+    """订单簿某一档的数量变化（size为该价位的最新挂单量，0表示撤档）"""
+
+    __slots__ = ('received', 'timestamp', 'venue', 'side', 'price', 'size', 'snapshot')
+
+    def __init__(self, received: int, timestamp: int, venue: str, side: str, price: float,
+                 size: float, snapshot: bool = False):
+        self.received = received
+        self.timestamp = timestamp
+        self.venue = venue
+        self.side = side
+        self.price = price
+        self.size = size
+        self.snapshot = snapshot
+
+
+class Trade:
+    """逐笔成交（side为主动方向 bid=买 / ask=卖）"""
+
+    __slots__ = ('received', 'timestamp', 'venue', 'side', 'price', 'size')
+
+    def __init__(self, received: int, timestamp: int, venue: str, side: str, price: float, size: float):
+        self.received = received
+        self.timestamp = timestamp
+        self.venue = venue
+        self.side = side
+        self.price = price
+        self.size = size
+
+
+class Order:
+    """IOC限价单：到达交易所时按当时的订单簿立即成交，未成交部分撤销"""
+
+    __slots__ = ('id', 'venue', 'side', 'size', 'limit', 'sent', 'execute_at', 'tag')
+
+    def __init__(self, id: int, venue: str, side: str, size: float, limit: float, sent: int,
+                 execute_at: int, tag: str = ''):
+        self.id = id
+        self.venue = venue
+        self.side = side
+        self.size = size
+        self.limit = limit
+        self.sent = sent
+        self.execute_at = execute_at
+        self.tag = tag
+
+
+class Fill:
+    """订单成交回报（filled为0表示完全未成交）"""
+
+    __slots__ = ('order', 'time', 'filled', 'notional', 'fee')
+
+    def __init__(self, order: Order, time: int, filled: float, notional: float, fee: float):
+        self.order = order
+        self.time = time
+        self.filled = filled
+        self.notional = notional
+        self.fee = fee
+
+    @property
+    def average_price(self) -> float:
+        return self.notional / self.filled if self.filled else NAN
+
+
+class OrderBook:
+    """单个交易所的L2订单簿
+
+    价位存于字典，最优价由惰性删除的堆维护：撤档只删字典，取最优价时弹出已失效的堆顶，
+    更新为O(1)，取最优价为均摊O(log n)。
+    """
+
+    __slots__ = ('bids', 'asks', '_bid_heap', '_ask_heap', 'in_snapshot')
+
+    def __init__(self):
+        self.bids: Dict[float, float] = {}
+        self.asks: Dict[float, float] = {}
+        self._bid_heap: List[float] = []
+        self._ask_heap: List[float] = []
+        self.in_snapshot = False
+
+    def clear(self):
+        self.bids.clear()
+        self.asks.clear()
+        self._bid_heap.clear()
+        self._ask_heap.clear()
+
+    def apply(self, update: BookUpdate):
+        """应用一条增量；快照开始时（前一条不是快照）先清空订单簿"""
+        if update.snapshot and not self.in_snapshot:
+            self.clear()
+        self.in_snapshot = update.snapshot
+        if update.side == BID:
+            levels, heap, key = self.bids, self._bid_heap, -update.price
+        else:
+            levels, heap, key = self.asks, self._ask_heap, update.price
+        if update.size > 0:
+            is_new = update.price not in levels
+            levels[update.price] = update.size
+            if is_new:
+                heapq.heappush(heap, key)
+                # 压缩按字典重建堆，新价位必须先写入字典
+                if len(heap) > 2 * len(levels) + 64:
+                    self._compact()
+        else:
+            levels.pop(update.price, None)
+
+    def _compact(self):
+        self._bid_heap[:] = [-price for price in self.bids]
+        heapq.heapify(self._bid_heap)
+        self._ask_heap[:] = list(self.asks)
+        heapq.heapify(self._ask_heap)
+
+    def best_bid(self) -> Tuple[float, float]:
+        """最优买价和数量，空簿返回 (nan, 0)"""
+        heap, levels = self._bid_heap, self.bids
+        while heap and -heap[0] not in levels:
+            heapq.heappop(heap)
+        if not heap:
+            return NAN, 0.0
+        return -heap[0], levels[-heap[0]]
+
+    def best_ask(self) -> Tuple[float, float]:
+        """最优卖价和数量，空簿返回 (nan, 0)"""
+        heap, levels = self._ask_heap, self.asks
+        while heap and heap[0] not in levels:
+            heapq.heappop(heap)
+        if not heap:
+            return NAN, 0.0
+        return heap[0], levels[heap[0]]
+
+    def mid(self) -> float:
+        return (self.best_bid()[0] + self.best_ask()[0]) / 2
+
+    def take(self, side: str, size: float, limit: float) -> Tuple[float, float]:
+        """主动吃单：买单吃卖盘（价格不高于limit）、卖单吃买盘（价格不低于limit），
+        从订单簿中扣除成交量，返回 (成交量, 成交额)"""
+        if side == BID:
+            levels = self.asks
+            prices = sorted(price for price in levels if price <= limit)
+        else:
+            levels = self.bids
+            prices = sorted((price for price in levels if price >= limit), reverse=True)
+        filled = notional = 0.0
+        for price in prices:
+            if filled >= size:
+                break
+            quantity = min(levels[price], size - filled)
+            filled += quantity
+            notional += quantity * price
+            remaining = levels[price] - quantity
+            if remaining > 1e-12:
+                levels[price] = remaining
+            else:
+                del levels[price]
+        return filled, notional
+
+
+class Venue:
+    """交易所参数：行情延迟、下单延迟（纳秒）、吃单手续费率和初始资金"""
+
+    __slots__ = ('name', 'feed_latency', 'order_latency', 'taker_fee', 'base', 'quote', 'book')
+
+    def __init__(self, name: str, feed_latency: int = 0, order_latency: int = 0,
+                 taker_fee: float = 0.001, base: float = 0.0, quote: float = 0.0):
+        self.name = name
+        self.feed_latency = feed_latency
+        self.order_latency = order_latency
+        self.taker_fee = taker_fee
+        self.base = base
+        self.quote = quote
+        self.book = OrderBook()
+
+    @classmethod
+    def from_config(cls, name: str, config: Dict) -> 'Venue':
+        """由配置创建，延迟以毫秒给出"""
+        return cls(
+            name,
+            feed_latency=int(config.get('feed_latency_ms', 0) * 1_000_000),
+            order_latency=int(config.get('order_latency_ms', 0) * 1_000_000),
+            taker_fee=config.get('taker_fee', 0.001),
+            base=config.get('base', 0.0),
+            quote=config.get('quote', 0.0),
+        )
+
+
+def timestamp_parser(sample: str) -> Callable[[str], int]:
+    """按样本选择时间戳解析函数（结果为纳秒）
+
+    整数按位数判断秒/毫秒/微秒/纳秒，小数按秒，其余按ISO 8601（无时区视为UTC）。
+    """
+    sample = sample.strip()
+    if sample.isdigit():
+        scale = 10 ** max(0, 19 - len(sample))
+        return lambda text: int(text) * scale
+    try:
+        float(sample)
+        return lambda text: int(round(float(text) * 1e9))
+    except ValueError:
+        pass
+
+    def parse_iso(text: str) -> int:
+        moment = datetime.fromisoformat(text.strip().replace('Z', '+00:00'))
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        return int(moment.timestamp()) * 1_000_000_000 + moment.microsecond * 1000
+
+    return parse_iso
+
+
+def _open_text(path: str):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8-sig', newline='')
+    return open(path, 'r', encoding='utf-8-sig', newline='')
+
+
+def _column(index: Dict[str, int], names: Iterable[str], path: str) -> int:
+    for name in names:
+        if name in index:
+            return index[name]
+    raise ValueError(f"{path} 缺少列 {'/'.join(names)}")
+
+
+def _iter_rows(path: str, event_type: str, venue: str, feed_latency: int) -> Iterator:
+    """逐行读取CSV（可为.gz），产生带接收时间（交易所时间 + 行情延迟）的事件"""
+    with _open_text(path) as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        index = {column.strip().lower(): i for i, column in enumerate(header)}
+        t = _column(index, TIME_COLUMNS, path)
+        s = _column(index, ('side',), path)
+        p = _column(index, ('price',), path)
+        q = _column(index, SIZE_COLUMNS, path)
+        snapshot = index.get('is_snapshot')
+        sides = _SIDES
+        parse = None
+        for row in reader:
+            if parse is None:
+                parse = timestamp_parser(row[t])
+            timestamp = parse(row[t])
+            side = sides.get(row[s]) or sides[row[s].strip().lower()]
+            if event_type == 'book':
+                yield BookUpdate(timestamp + feed_latency, timestamp, venue, side, float(row[p]), float(row[q]),
+                                 snapshot is not None and row[snapshot].strip().lower() in ('true', '1'))
+            else:
+                yield Trade(timestamp + feed_latency, timestamp, venue, side, float(row[p]), float(row[q]))
+
+
+def iter_book_updates(paths: Iterable[str], venue: str, feed_latency: int = 0) -> Iterator[BookUpdate]:
+    """依次读取一个交易所的订单簿增量文件（多个文件按给出的时间顺序衔接）
+
+    列：timestamp、side（bid/ask）、price、amount（该价位最新挂单量，0为撤档），可选is_snapshot。
+    """
+    for path in paths:
+        yield from _iter_rows(path, 'book', venue, feed_latency)
+
+
+def iter_trades(paths: Iterable[str], venue: str, feed_latency: int = 0) -> Iterator[Trade]:
+    """依次读取一个交易所的逐笔成交文件，列：timestamp、side（buy/sell）、price、amount"""
+    for path in paths:
+        yield from _iter_rows(path, 'trade', venue, feed_latency)
+
+
+class ReplayStrategy:
+    """逐事件策略基类
+
+    同一交易所同一时间戳的一批订单簿增量全部应用后，若该交易所的最优档（价格或数量）有变化
+    则调用一次on_book，各交易所的最优档见 sim.tops；策略通过 sim.send_order 下单，
+    成交回报经 on_fill 返回。
+    """
+
+    name = ''
+
+    def on_book(self, sim: 'ReplaySimulator', venue: str):
+        pass
+
+    def on_trade(self, sim: 'ReplaySimulator', trade: Trade):
+        pass
+
+    def on_fill(self, sim: 'ReplaySimulator', fill: Fill):
+        pass
+
+    def stats(self) -> Dict[str, float]:
+        return {}
+
+
+class CrossExchangeArbitrage(ReplayStrategy):
+    """跨交易所套利：扣除两边吃单手续费后，某交易所买一价仍高于另一交易所卖一价超过
+    min_edge_bps时，同时在低价交易所买入、高价交易所卖出（IOC）
+
+    采用预存资金模式，下单量受两边最优档数量、max_size、卖出所的币和买入所的计价资金限制；
+    有订单在途时不发新单。
+    """
+
+    name = '跨交易所套利'
+
+    def __init__(self, min_edge_bps: float = 5.0, max_size: float = 1.0, min_size: float = 1e-4):
+        self.min_edge_bps = min_edge_bps
+        self.max_size = max_size
+        self.min_size = min_size
+        self.opportunities = 0
+        self.attempts = 0
+        self.skipped = 0
+        self.bought = 0.0
+        self.sold = 0.0
+        self.edge_bps_total = 0.0
+
+    def on_book(self, sim, venue):
+        if sim.in_flight:
+            return
+        buy = sell = None
+        buy_cost, sell_value = math.inf, -math.inf
+        for candidate in sim.venues.values():
+            bid, bid_size, ask, ask_size = sim.tops[candidate.name]
+            cost = ask * (1 + candidate.taker_fee)
+            value = bid * (1 - candidate.taker_fee)
+            if cost < buy_cost:
+                buy, buy_cost, buy_price, buy_size = candidate, cost, ask, ask_size
+            if value > sell_value:
+                sell, sell_value, sell_price, sell_size = candidate, value, bid, bid_size
+        if buy is None or sell is None or buy is sell:
+            return
+        edge_bps = (sell_value / buy_cost - 1) * 1e4
+        if edge_bps < self.min_edge_bps:
+            return
+
+        self.opportunities += 1
+        size = min(buy_size, sell_size, self.max_size, sell.base, buy.quote / buy_cost)
+        if size < self.min_size:
+            self.skipped += 1
+            return
+        self.attempts += 1
+        self.edge_bps_total += edge_bps
+        sim.send_order(buy.name, BID, size, buy_price, tag='arb')
+        sim.send_order(sell.name, ASK, size, sell_price, tag='arb')
+
+    def on_fill(self, sim, fill):
+        if fill.order.side == BID:
+            self.bought += fill.filled
+        else:
+            self.sold += fill.filled
+
+    def stats(self):
+        return {
+            'opportunities': self.opportunities,
+            'attempts': self.attempts,
+            'skipped_no_inventory': self.skipped,
+            'average_edge_bps': round(self.edge_bps_total / self.attempts, 3) if self.attempts else 0.0,
+            'bought': round(self.bought, 8),
+            'sold': round(self.sold, 8),
+            # 两腿成交量不一致（延迟期间价格变化导致单腿未成交）留下的敞口
+            'unhedged': round(self.bought - self.sold, 8),
+        }
+
+
+REPLAY_STRATEGIES = {cls.name: cls for cls in (CrossExchangeArbitrage,)}
+
+
+def get_replay_strategy(name: str, **params) -> ReplayStrategy:
+    """按策略目录名称创建逐事件策略"""
+    if name not in REPLAY_STRATEGIES:
+        raise ValueError(f"未知的回放策略: {name}（可选: {', '.join(REPLAY_STRATEGIES)}）")
+    return REPLAY_STRATEGIES[name](**params)
+
+
+class ReplaySimulator:
+    """事件驱动回放
+
+    各文件的事件流按接收时间（交易所时间 + 该交易所行情延迟）用堆做k路归并。
+    订单在 发出时间 + 下单延迟 到达交易所，按交易所当时的订单簿成交；由于本地看到的是
+    延迟feed_latency后的订单簿，成交在本地时钟到达 到达时间 + 行情延迟 时模拟并回报。
+    """
+
+    def __init__(self, venues: Dict[str, Venue], strategy: ReplayStrategy):
+        self.venues = venues
+        self.strategy = strategy
+        self.now = 0
+        self.fills: List[Fill] = []
+        # 各交易所的最优档 (买一价, 买一量, 卖一价, 卖一量)
+        self.tops: Dict[str, Tuple[float, float, float, float]] = {
+            name: (NAN, 0.0, NAN, 0.0) for name in venues
+        }
+        self.book_updates = 0
+        self.trades = 0
+        self._pending: List[Tuple[int, int, Order]] = []
+        self._next_id = 0
+        self._initial = {name: (venue.base, venue.quote) for name, venue in venues.items()}
+
+    @property
+    def in_flight(self) -> int:
+        """在途订单数"""
+        return len(self._pending)
+
+    def send_order(self, venue: str, side: str, size: float, limit: float, tag: str = '') -> Order:
+        """发出IOC限价单"""
+        config = self.venues[venue]
+        self._next_id += 1
+        order = Order(self._next_id, venue, side, size, limit, self.now,
+                      self.now + config.order_latency + config.feed_latency, tag)
+        heapq.heappush(self._pending, (order.execute_at, order.id, order))
+        return order
+
+    def _refresh_top(self, name: str) -> bool:
+        """重新读取交易所的最优档，返回是否变化"""
+        book = self.venues[name].book
+        top = book.best_bid() + book.best_ask()
+        if top == self.tops[name]:
+            return False
+        self.tops[name] = top
+        return True
+
+    def _execute(self, order: Order):
+        venue = self.venues[order.venue]
+        filled, notional = venue.book.take(order.side, order.size, order.limit)
+        fee = notional * venue.taker_fee
+        if order.side == BID:
+            venue.base += filled
+            venue.quote -= notional + fee
+        else:
+            venue.base -= filled
+            venue.quote += notional - fee
+        self._refresh_top(order.venue)
+        fill = Fill(order, self.now, filled, notional, fee)
+        self.fills.append(fill)
+        self.strategy.on_fill(self, fill)
+
+    def _execute_until(self, until: int):
+        pending = self._pending
+        while pending and pending[0][0] <= until:
+            execute_at, _, order = heapq.heappop(pending)
+            self.now = execute_at
+            self._execute(order)
+
+    def run(self, streams: Iterable[Iterator]) -> Dict:
+        """回放全部事件流，返回统计"""
+        strategy = self.strategy
+        venues = self.venues
+        started = time.perf_counter()
+        batch_venue, batch_time = None, None
+        book_updates = trades = 0
+
+        for event in heapq.merge(*streams, key=attrgetter('received')):
+            is_book = type(event) is BookUpdate
+            if batch_venue is not None and (not is_book or event.venue != batch_venue
+                                            or event.timestamp != batch_time):
+                if self._refresh_top(batch_venue):
+                    strategy.on_book(self, batch_venue)
+                batch_venue = None
+            if self._pending:
+                self._execute_until(event.received)
+            self.now = event.received
+            if is_book:
+                venues[event.venue].book.apply(event)
+                batch_venue, batch_time = event.venue, event.timestamp
+                book_updates += 1
+            else:
+                trades += 1
+                strategy.on_trade(self, event)
+
+        if batch_venue is not None and self._refresh_top(batch_venue):
+            strategy.on_book(self, batch_venue)
+        self._execute_until(math.inf)
+        self.book_updates += book_updates
+        self.trades += trades
+        return self.report(time.perf_counter() - started)
+
+    def report(self, seconds: float = 0.0) -> Dict:
+        """回放统计；盈亏按各交易所最终中间价对持仓估值，与初始资金比较"""
+        events = self.book_updates + self.trades
+        venues = {}
+        pnl = fees = 0.0
+        for name, venue in self.venues.items():
+            mid = venue.book.mid()
+            initial_base, initial_quote = self._initial[name]
+            venue_fees = sum(fill.fee for fill in self.fills if fill.order.venue == name)
+            if not math.isnan(mid):
+                pnl += venue.quote - initial_quote + (venue.base - initial_base) * mid
+            fees += venue_fees
+            venues[name] = {'base': round(venue.base, 8), 'quote': round(venue.quote, 8),
+                            'mid': mid, 'fees': round(venue_fees, 8)}
+        return {
+            'events': events,
+            'book_updates': self.book_updates,
+            'trades': self.trades,
+            'seconds': round(seconds, 3),
+            'events_per_second': round(events / seconds) if seconds > 0 else None,
+            'orders': self._next_id,
+            'filled_orders': sum(1 for fill in self.fills if fill.filled > 0),
+            'fees': round(fees, 8),
+            'pnl': round(pnl, 8),
+            'venues': venues,
+            'strategy': self.strategy.stats(),
+        }
+
+    def write_fills(self, path: str):
+        """写出成交回报（CSV）"""
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['order_id', 'venue', 'side', 'tag', 'sent', 'executed', 'size', 'limit',
+                             'filled', 'average_price', 'fee'])
+            for fill in self.fills:
+                order = fill.order
+                writer.writerow([order.id, order.venue, order.side, order.tag, order.sent, fill.time,
+                                 order.size, order.limit, fill.filled, fill.average_price, fill.fee])
+
+
+def _as_list(value, base_dir: str) -> List[str]:
+    if not value:
+        return []
+    paths = [value] if isinstance(value, str) else list(value)
+    return [os.path.join(base_dir, path) for path in paths]
+
+
+def load_config(path: str) -> Tuple[Dict[str, Venue], List[Iterator]]:
+    """读取回放配置，返回交易所参数和各文件的事件流（相对路径相对于配置文件所在目录）
+
+    配置示例：
+        {"venues": {
+            "binance": {"book": ["binance_book_0101.csv.gz"], "trades": "binance_trades_0101.csv.gz",
+                        "feed_latency_ms": 5, "order_latency_ms": 20, "taker_fee": 0.001,
+                        "base": 1.0, "quote": 50000},
+            "okx": {...}}}
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    base_dir = os.path.dirname(os.path.abspath(path))
+    venues = {}
+    streams = []
+    for name, venue_config in config['venues'].items():
+        venue = Venue.from_config(name, venue_config)
+        venues[name] = venue
+        books = _as_list(venue_config.get('book'), base_dir)
+        trades = _as_list(venue_config.get('trades'), base_dir)
+        if books:
+            streams.append(iter_book_updates(books, name, venue.feed_latency))
+        if trades:
+            streams.append(iter_trades(trades, name, venue.feed_latency))
+    if len(venues) < 2:
+        print("注意: 配置中少于两个交易所，跨交易所套利不会触发")
+    return venues, streams
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='多交易所订单簿事件回放')
+    parser.add_argument('config', help='回放配置（JSON，含各交易所的数据文件、延迟、手续费和初始资金）')
+    parser.add_argument('--strategy', choices=list(REPLAY_STRATEGIES), default=CrossExchangeArbitrage.name,
+                        help='回放的策略')
+    parser.add_argument('--min-edge-bps', type=float, default=5.0, help='扣除手续费后的最小价差（基点）')
+    parser.add_argument('--max-size', type=float, default=1.0, help='单次套利的最大数量')
+    parser.add_argument('--fills', default=None, help='成交回报输出文件（CSV）')
+    parser.add_argument('--output', default=None, help='统计结果输出文件（JSON）')
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    venues, streams = load_config(args.config)
+    strategy = get_replay_strategy(args.strategy, min_edge_bps=args.min_edge_bps, max_size=args.max_size)
+    simulator = ReplaySimulator(venues, strategy)
+
+    print(f"=== 回放 {len(venues)} 个交易所、{len(streams)} 个数据文件 ===")
+    report = simulator.run(streams)
+    print(f"事件 {report['events']} 个（订单簿 {report['book_updates']}，成交 {report['trades']}），"
+          f"耗时 {report['seconds']}s，{report['events_per_second']} 事件/秒")
+    print(f"订单 {report['orders']} 个，成交 {report['filled_orders']} 个，"
+          f"手续费 {report['fees']}，盈亏 {report['pnl']}")
+    for name, venue in report['venues'].items():
+        print(f"  {name}: 币 {venue['base']}，计价 {venue['quote']}，中间价 {venue['mid']}")
+    for key, value in report['strategy'].items():
+        print(f"  {key}: {value}")
+
+    if args.fills:
+        simulator.write_fills(args.fills)
+        print(f"成交回报已保存到 {args.fills}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"统计结果已保存到 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+配对筛选 - 为配对交易策略在全市场股票中筛选协整股票对
+先用向量化相关系数矩阵（可先聚类）预筛候选对，再批量并行做Engle-Granger/ADF检验；
+相关系数的二阶矩随新交易日增量更新，检验结果按窗口缓存
+"""
+
+import argparse
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from market_data import MarketDataStore
+from parameter_sweep import SharedPanel
+from result_cache import DEFAULT_MAX_BYTES, ResultCache
+
+# 协整检验结果缓存的版本号，检验方法变化时递增
+SCREEN_VERSION = 'pairs-1'
+
+# MacKinnon (2010) 两变量、含常数项的Engle-Granger检验临界值响应面：b0 + b1/T + b2/T²
+EG_CRITICAL_VALUES = {
+    0.01: (-3.89644, -10.9519, -33.527),
+    0.05: (-3.33613, -6.1101, -6.823),
+    0.10: (-3.04445, -4.2412, -2.720),
+}
+
+RESULT_FIELDS = ['symbol_a', 'symbol_b', 'correlation', 'beta', 'alpha', 'adf_stat',
+                 'half_life', 'zscore']
+
+
+def eg_critical_value(nobs: int, significance: float = 0.05) -> float:
+    """Engle-Granger检验在给定样本量和显著性水平下的临界值"""
+    if significance not in EG_CRITICAL_VALUES:
+        raise ValueError(f"不支持的显著性水平: {significance}（可选: {', '.join(map(str, EG_CRITICAL_VALUES))}）")
+    b0, b1, b2 = EG_CRITICAL_VALUES[significance]
+    return b0 + b1 / nobs + b2 / nobs ** 2
+
+
+def log_returns(close: np.ndarray, start: int, stop: int) -> np.ndarray:
+    """第start到stop-1行的对数收益率（缺失记为0，与增量二阶矩的约定一致）"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = np.diff(np.log(np.asarray(close[max(start - 1, 0):stop], dtype=np.float64)), axis=0)
+    if start == 0:
+        returns = np.vstack([np.zeros((1, returns.shape[1])), returns])
+    return np.nan_to_num(returns, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+def correlation_from_moments(gram: np.ndarray, sums: np.ndarray, count: int) -> np.ndarray:
+    """由 Σrrᵀ 和 Σr 计算相关系数矩阵"""
+    mean = sums / count
+    cov = gram / count - np.outer(mean, mean)
+    std = np.sqrt(np.clip(np.diag(cov), 0.0, None))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        corr = cov / np.outer(std, std)
+    return np.nan_to_num(corr, nan=0.0)
+
+
+def spherical_kmeans(returns: np.ndarray, k: int, seed: int = 0, iterations: int = 20) -> np.ndarray:
+    """按收益率序列的相关性把标的聚为k类（标准化后的球面k-means），返回每个标的的类别"""
+    z = returns - returns.mean(axis=0)
+    norms = np.linalg.norm(z, axis=0)
+    z = z / np.where(norms > 0, norms, 1.0)
+    n = z.shape[1]
+    k = max(1, min(k, n))
+    rng = np.random.default_rng(seed)
+    centers = z[:, rng.choice(n, size=k, replace=False)]
+    labels = np.zeros(n, dtype=np.int64)
+    for _ in range(iterations):
+        new_labels = np.argmax(centers.T @ z, axis=0)
+        if np.array_equal(new_labels, labels) and _ > 0:
+            break
+        labels = new_labels
+        for cluster in range(k):
+            members = z[:, labels == cluster]
+            if members.shape[1]:
+                center = members.sum(axis=1)
+                centers[:, cluster] = center / (np.linalg.norm(center) or 1.0)
+    return labels
+
+
+def candidate_pairs(corr: np.ndarray, valid: np.ndarray, min_corr: float = 0.8,
+                    max_per_symbol: int = 0, labels: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """相关系数预筛：返回 i < j 的候选对下标
+
+    只保留两个标的都有完整窗口、相关系数不低于min_corr的对；提供labels时只配对同类标的；
+    max_per_symbol > 0 时每个标的只保留相关性最高的max_per_symbol个对手。
+    """
+    mask = (corr >= min_corr) & valid[:, None] & valid[None, :]
+    if labels is not None:
+        mask &= labels[:, None] == labels[None, :]
+    np.fill_diagonal(mask, False)
+    if max_per_symbol > 0:
+        scores = np.where(mask, corr, -np.inf)
+        keep = np.zeros_like(mask)
+        limit = min(max_per_symbol, scores.shape[1])
+        top = np.argpartition(-scores, limit - 1, axis=1)[:, :limit]
+        rows = np.repeat(np.arange(scores.shape[0]), limit)
+        keep[rows, top.ravel()] = True
+        # 任意一方的前max_per_symbol名即保留
+        mask &= keep | keep.T
+    i, j = np.nonzero(np.triu(mask, k=1))
+    return i, j
+
+
+def engle_granger(log_prices: np.ndarray, i: np.ndarray, j: np.ndarray, lags: int = 1) -> Dict[str, np.ndarray]:
+    """批量Engle-Granger两步检验：对每一对 (i, j) 回归 logP_i = alpha + beta·logP_j，
+    再对残差做不含常数项的ADF(lags)检验
+
+    所有候选对在同一组矩阵运算中完成，返回与i、j等长的数组：
+    beta、alpha、adf_stat（残差滞后项系数的t统计量）、half_life（均值回复半衰期，单位为bar）、
+    zscore（最新残差相对残差标准差的偏离）。
+    """
+    y = log_prices[:, i]
+    x = log_prices[:, j]
+    x_mean, y_mean = x.mean(axis=0), y.mean(axis=0)
+    xc, yc = x - x_mean, y - y_mean
+    with np.errstate(divide='ignore', invalid='ignore'):
+        beta = (xc * yc).sum(axis=0) / (xc * xc).sum(axis=0)
+    alpha = y_mean - beta * x_mean
+    resid = yc - beta * xc
+    diff = np.diff(resid, axis=0)
+
+    # ADF回归：Δe_t = γ·e_{t-1} + Σ φ_k·Δe_{t-k} + ε
+    target = diff[lags:]
+    regressors = [resid[lags:-1]] + [diff[lags - k:-k] for k in range(1, lags + 1)]
+    design = np.stack(regressors, axis=2)
+    xtx = np.einsum('tci,tcj->cij', design, design)
+    xty = np.einsum('tci,tc->ci', design, target)
+    nobs = target.shape[0]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        inverse = np.linalg.pinv(xtx)
+        coef = np.einsum('cij,cj->ci', inverse, xty)
+        fitted = np.einsum('tci,ci->tc', design, coef)
+        s2 = ((target - fitted) ** 2).sum(axis=0) / (nobs - design.shape[2])
+        adf_stat = coef[:, 0] / np.sqrt(s2 * inverse[:, 0, 0])
+
+        # 半衰期：AR(1)近似 Δe_t = g·e_{t-1}
+        lagged = resid[:-1]
+        g = (lagged * diff).sum(axis=0) / (lagged * lagged).sum(axis=0)
+        half_life = np.where((g < 0) & (g > -1), -np.log(2.0) / np.log1p(g), np.inf)
+        zscore = resid[-1] / resid.std(axis=0)
+    return {'beta': beta, 'alpha': alpha, 'adf_stat': adf_stat, 'half_life': half_life, 'zscore': zscore}
+
+
+# 子进程中挂载的对数价格窗口
+_worker_blocks: List[shared_memory.SharedMemory] = []
+_worker_prices: Dict[str, np.ndarray] = {}
+
+
+def _attach_prices(spec: Dict[str, Tuple[str, Tuple[int, ...], str]]):
+    """进程池初始化：按名称挂载共享内存中的对数价格窗口"""
+    for field, (name, shape, dtype) in spec.items():
+        block = shared_memory.SharedMemory(name=name)
+        _worker_blocks.append(block)
+        _worker_prices[field] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+
+
+def _test_chunk(i: np.ndarray, j: np.ndarray, lags: int) -> Dict[str, np.ndarray]:
+    """子进程任务：检验一批候选对"""
+    return engle_granger(_worker_prices['log_prices'], i, j, lags)
+
+
+class PairScreener:
+    """全市场协整配对筛选
+
+    1. 窗口内对数收益率的二阶矩 Σrrᵀ、Σr 在新交易日到来时做秩k更新（加入新行、移除滑出窗口的行），
+       每refresh次增量更新后完整重算一次以限制浮点误差累积；
+    2. 由二阶矩得到相关系数矩阵，按min_corr/max_per_symbol（可选先聚类）预筛候选对；
+    3. 候选对分块做批量Engle-Granger检验，workers > 1 时各进程共享同一块对数价格内存；
+       symmetric为True时两个回归方向都检验，取ADF统计量更小的方向；
+    4. 指定cache_dir时，检验结果按（参数, 窗口数据指纹）缓存，同一窗口重复筛选直接复用；
+       滚动窗口每天产生新条目，缓存超过cache_bytes时淘汰最久未用的结果。
+    """
+
+    def __init__(self, lookback: int = 252, min_corr: float = 0.8, max_per_symbol: int = 20,
+                 clusters: int = 0, lags: int = 1, significance: float = 0.05,
+                 symmetric: bool = True, workers: int = 1, chunk_size: int = 5000,
+                 cache_dir: Optional[str] = None, refresh: int = 20, seed: int = 0,
+                 cache_bytes: int = DEFAULT_MAX_BYTES):
+        if lookback < lags + 10:
+            raise ValueError("回看窗口过短，无法进行ADF检验")
+        eg_critical_value(lookback, significance)
+        self.lookback = lookback
+        self.min_corr = min_corr
+        self.max_per_symbol = max_per_symbol
+        self.clusters = clusters
+        self.lags = lags
+        self.significance = significance
+        self.symmetric = symmetric
+        self.workers = workers
+        self.chunk_size = max(1, chunk_size)
+        self.cache_dir = cache_dir
+        self.refresh = refresh
+        self.seed = seed
+        self.cache = ResultCache(cache_dir, SCREEN_VERSION, cache_bytes) if cache_dir else None
+        self.stats: Dict = {}
+
+    def _config(self) -> Dict:
+        return {
+            'lookback': self.lookback, 'min_corr': self.min_corr, 'max_per_symbol': self.max_per_symbol,
+            'clusters': self.clusters, 'lags': self.lags, 'symmetric': self.symmetric, 'seed': self.seed,
+        }
+
+    def _state_path(self, symbols: Sequence[str]) -> Optional[str]:
+        if not self.cache_dir:
+            return None
+        digest = hashlib.blake2b('\0'.join(symbols).encode('utf-8'), digest_size=8)
+        digest.update(str(self.lookback).encode('ascii'))
+        return os.path.join(self.cache_dir, f'pair_moments_{digest.hexdigest()}.npz')
+
+    def moments(self, close: np.ndarray, timestamps: np.ndarray, end: int,
+                symbols: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, int]:
+        """窗口 [end-lookback+2, end] 内对数收益率的 Σrrᵀ、Σr 和行数（可增量更新）"""
+        count = self.lookback - 1
+        start = end - count + 1
+        path = self._state_path(symbols)
+
+        if path and os.path.exists(path):
+            state = np.load(path)
+            previous = int(np.searchsorted(timestamps, state['end']))
+            step = end - previous
+            consistent = (
+                previous < len(timestamps) and timestamps[previous] == state['end']
+                and 0 <= step < count and int(state['age']) < self.refresh
+                # 上次窗口的最后一行收益率未变，说明历史数据没有被修改
+                and np.array_equal(log_returns(close, previous, previous + 1)[0], state['last_row'])
+            )
+            if consistent:
+                gram, sums = state['gram'], state['sums']
+                if step:
+                    added = log_returns(close, previous + 1, end + 1)
+                    removed = log_returns(close, previous - count + 1, start)
+                    gram = gram + added.T @ added - removed.T @ removed
+                    sums = sums + added.sum(axis=0) - removed.sum(axis=0)
+                self.stats['moments'] = f'增量更新 {step} 行'
+                self._save_state(path, timestamps[end], gram, sums, close, end, int(state['age']) + (step > 0))
+                return gram, sums, count
+
+        returns = log_returns(close, start, end + 1)
+        gram, sums = returns.T @ returns, returns.sum(axis=0)
+        self.stats['moments'] = '完整计算'
+        if path:
+            self._save_state(path, timestamps[end], gram, sums, close, end, 0)
+        return gram, sums, count
+
+    @staticmethod
+    def _save_state(path: str, end_time, gram, sums, close, end: int, age: int):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f'{path}.tmp.npz'
+        np.savez(tmp_path, end=end_time, gram=gram, sums=sums, age=age,
+                 last_row=log_returns(close, end, end + 1)[0])
+        os.replace(tmp_path, path)
+
+    def _test(self, log_prices: np.ndarray, i: np.ndarray, j: np.ndarray) -> Dict[str, np.ndarray]:
+        """分块检验候选对，workers > 1 时并行"""
+        chunks = [(i[k:k + self.chunk_size], j[k:k + self.chunk_size])
+                  for k in range(0, len(i), self.chunk_size)]
+        if self.workers <= 1 or len(chunks) <= 1:
+            parts = [engle_granger(log_prices, a, b, self.lags) for a, b in chunks]
+        else:
+            with SharedPanel({'log_prices': log_prices}) as shared, \
+                    ProcessPoolExecutor(max_workers=self.workers, initializer=_attach_prices,
+                                        initargs=(shared.spec,)) as executor:
+                parts = list(executor.map(_test_chunk, [a for a, _ in chunks], [b for _, b in chunks],
+                                          [self.lags] * len(chunks)))
+        if not parts:
+            return {name: np.empty(0) for name in ('beta', 'alpha', 'adf_stat', 'half_life', 'zscore')}
+        return {name: np.concatenate([p[name] for p in parts]) for name in parts[0]}
+
+    def screen(self, close: np.ndarray, symbols: Sequence[str], timestamps: np.ndarray,
+               end: Optional[int] = None) -> pd.DataFrame:
+        """以第end行（默认最后一行）为窗口终点筛选协整对，按ADF统计量升序返回"""
+        close = np.asarray(close)
+        symbols = list(symbols)
+        end = len(close) - 1 if end is None else end
+        self.stats = {'candidates': 0, 'tested': 0, 'cointegrated': 0, 'moments': '', 'cached': False}
+        if end + 1 < self.lookback:
+            raise ValueError(f"行情只有 {end + 1} 行，少于回看窗口 {self.lookback}")
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            log_prices = np.log(np.asarray(close[end - self.lookback + 1:end + 1], dtype=np.float64))
+        valid = np.isfinite(log_prices).all(axis=0)
+
+        key = None
+        if self.cache is not None:
+            digest = hashlib.blake2b(log_prices.tobytes(), digest_size=16)
+            digest.update('\0'.join(symbols).encode('utf-8'))
+            key = self.cache.key(self._config(), {'window': digest.hexdigest()})
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.stats.update(cached=True, tested=len(cached), cointegrated=int(cached['cointegrated'].sum()))
+                return cached
+
+        gram, sums, count = self.moments(close, timestamps, end, symbols)
+        corr = correlation_from_moments(gram, sums, count)
+        labels = None
+        if self.clusters > 1:
+            returns = np.diff(np.where(valid, log_prices, 0.0), axis=0)
+            labels = spherical_kmeans(returns, self.clusters, self.seed)
+        i, j = candidate_pairs(corr, valid, self.min_corr, self.max_per_symbol, labels)
+        self.stats['candidates'] = len(i)
+
+        result = self._test(log_prices, i, j)
+        if self.symmetric and len(i):
+            reverse = self._test(log_prices, j, i)
+            flip = reverse['adf_stat'] < result['adf_stat']
+            for name in result:
+                result[name] = np.where(flip, reverse[name], result[name])
+            i, j = np.where(flip, j, i), np.where(flip, i, j)
+
+        names = np.asarray(symbols, dtype=object)
+        frame = pd.DataFrame({
+            'symbol_a': names[i],
+            'symbol_b': names[j],
+            'correlation': corr[i, j],
+            **result,
+        })
+        frame['cointegrated'] = frame['adf_stat'] < eg_critical_value(self.lookback, self.significance)
+        frame = frame.sort_values('adf_stat', kind='stable').reset_index(drop=True)
+        self.stats.update(tested=len(frame), cointegrated=int(frame['cointegrated'].sum()))
+
+        if key is not None:
+            self.cache.put(key, frame)
+        return frame
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='全市场协整配对筛选（配对交易策略）')
+    parser.add_argument('dataset', help='K线数据集名称（使用close字段）')
+    parser.add_argument('--root', default='market_data', help='行情库根目录（见market_data.py）')
+    parser.add_argument('--end', default=None, help='窗口终点日期（默认最新交易日）')
+    parser.add_argument('--lookback', type=int, default=252, help='检验窗口长度（bar数）')
+    parser.add_argument('--min-corr', type=float, default=0.8, help='收益率相关系数预筛阈值')
+    parser.add_argument('--max-per-symbol', type=int, default=20, help='每个标的最多保留的候选对手数（0为不限）')
+    parser.add_argument('--clusters', type=int, default=0, help='先按收益率聚类，只在同类内配对（0为不聚类）')
+    parser.add_argument('--lags', type=int, default=1, help='ADF检验的滞后阶数')
+    parser.add_argument('--significance', type=float, choices=sorted(EG_CRITICAL_VALUES), default=0.05,
+                        help='协整检验的显著性水平')
+    parser.add_argument('--one-way', action='store_true', help='只检验 A~B 一个回归方向')
+    parser.add_argument('--workers', type=int, default=1, help='并行检验的进程数')
+    parser.add_argument('--cache-dir', default=None, help='检验结果和增量二阶矩的缓存目录')
+    parser.add_argument('--cache-mb', type=float, default=DEFAULT_MAX_BYTES / 1024 / 1024,
+                        help='检验结果缓存的磁盘上限（MB），超出时淘汰最久未用的条目')
+    parser.add_argument('--all', action='store_true', help='输出全部候选对（默认只输出通过检验的）')
+    parser.add_argument('--output', default=None, help='结果输出CSV文件')
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    dataset = MarketDataStore(args.root).open(args.dataset)
+    rows = dataset.rows(end=args.end)
+    screener = PairScreener(lookback=args.lookback, min_corr=args.min_corr,
+                            max_per_symbol=args.max_per_symbol, clusters=args.clusters,
+                            lags=args.lags, significance=args.significance,
+                            symmetric=not args.one_way, workers=args.workers, cache_dir=args.cache_dir,
+                            cache_bytes=int(args.cache_mb * 1024 * 1024))
+    frame = screener.screen(dataset.field('close'), dataset.symbols, dataset.timestamps, end=rows.stop - 1)
+    if not args.all:
+        frame = frame[frame['cointegrated']]
+
+    stats = screener.stats
+    print(frame.head(20).to_string(index=False))
+    source = '缓存' if stats['cached'] else f"二阶矩{stats['moments']}，候选 {stats['candidates']} 对"
+    print(f"\n{len(dataset.symbols)} 个标的，{source}，检验 {stats['tested']} 对，"
+          f"协整 {stats['cointegrated']} 对（显著性 {args.significance}）")
+    if args.output:
+        frame.to_csv(args.output, index=False, encoding='utf-8-sig')
+        print(f"结果已保存到 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
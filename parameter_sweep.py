@@ -0,0 +1,543 @@
+#!/usr/bin/env python3
+"""
+参数扫描 - 将扩展变体映射为具体的参数网格并并行回测
+行情数组放在共享内存中（或直接使用本地行情库的内存映射文件）供各进程读取，支持早停和结果缓存；
+行情只在末尾追加新bar时，缓存的组合只回测预热区间和新增部分并续算绩效
+"""
+
+import argparse
+import hashlib
+import json
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import product
+from multiprocessing import shared_memory
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
+
+import numpy as np
+
+from backtest import (BACKTEST_STRATEGIES, PERIODS_PER_YEAR, BacktestEngine, BacktestStrategy,
+                      IncrementalMetrics, IndicatorMemo, as_panel, get_backtest_strategy, memoize_indicators)
+from market_data import MarketDataStore, PanelSlice
+from result_cache import DEFAULT_MAX_BYTES, ResultCache
+from strategy_snapshots import iter_snapshot
+
+# 默认参数网格配置（与本模块位于同一目录）
+DEFAULT_GRID_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sweep_grids.json')
+
+# 扫描结果缓存版本：修改回测或扫描逻辑后需要递增
+SWEEP_VERSION = '3'
+
+# 续算时与上次结果逐bar核对仓位的bar数（核对不一致则完整重算）
+CHECK_BARS = 64
+
+# 续算时至少重算的预热bar数（按原始K线计，合并K线的变体按bar_size折算）：入场/离场之间
+# 沿用上一状态的策略需要在预热区间内出现过信号，核对区间的仓位才能与完整回测一致
+MIN_WARMUP_BARS = 250
+
+# 变体未指定时使用的回测设置
+DEFAULT_SETTINGS = {'bar_size': 1, 'leverage': 1.0}
+
+# 一个回测任务：(基础策略名称, ((参数名, 取值), ...), bar_size, leverage)
+SweepTask = Tuple[str, Tuple[Tuple[str, Any], ...], int, float]
+
+
+class ParameterGrid:
+    """变体到参数网格的映射
+
+    base_grids 为每个基础策略给出参数取值（取笛卡尔积），
+    variant_settings 按变体字段取值（如 timeframe=周线、aggressiveness=激进）
+    给出回测设置：bar_size 为K线合并倍数，leverage 为仓位倍数；
+    设置为null表示该变体无法用现有行情回测（如日线数据无法回测日内变体）。
+    """
+
+    def __init__(self, base_grids: Dict[str, Dict[str, List]],
+                 variant_settings: Optional[Dict[str, Dict[str, Optional[Dict]]]] = None):
+        unknown = [name for name in base_grids if name not in BACKTEST_STRATEGIES]
+        if unknown:
+            raise ValueError(f"参数网格中的策略暂无回测实现: {', '.join(unknown)}")
+        self.base_grids = base_grids
+        self.variant_settings = variant_settings or {}
+        self._points: Dict[str, List[Tuple[Tuple[str, Any], ...]]] = {}
+
+    @classmethod
+    def from_file(cls, path: str = DEFAULT_GRID_FILE) -> 'ParameterGrid':
+        """从JSON配置文件创建参数网格"""
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        return cls(config.get('base_grids', {}), config.get('variant_settings'))
+
+    @staticmethod
+    def base_name(strategy: Dict) -> Optional[str]:
+        """变体对应的可回测基础策略（基础策略自身或variant_of）"""
+        for name in (strategy.get('name'), strategy.get('variant_of')):
+            if name in BACKTEST_STRATEGIES:
+                return name
+        return None
+
+    def points(self, base: str) -> List[Tuple[Tuple[str, Any], ...]]:
+        """基础策略的全部合法参数组合（非法组合如快线周期>=慢线周期会被跳过）"""
+        if base not in self._points:
+            grid = self.base_grids.get(base, {})
+            names = list(grid)
+            points = []
+            for values in product(*(grid[name] for name in names)):
+                params = tuple(zip(names, values))
+                try:
+                    get_backtest_strategy(base, **dict(params))
+                except ValueError:
+                    continue
+                points.append(params)
+            self._points[base] = points
+        return self._points[base]
+
+    def settings(self, strategy: Dict) -> Optional[Dict]:
+        """变体的回测设置，无法回测时返回None"""
+        settings = dict(DEFAULT_SETTINGS)
+        for field, mapping in self.variant_settings.items():
+            value = strategy.get(field)
+            if value is None or value not in mapping:
+                continue
+            if mapping[value] is None:
+                return None
+            settings.update(mapping[value])
+        return settings
+
+    def tasks(self, strategy: Dict) -> List[SweepTask]:
+        """变体的参数扫描任务列表，无法回测时返回空列表"""
+        base = self.base_name(strategy)
+        settings = self.settings(strategy) if base else None
+        if settings is None:
+            return []
+        return [
+            (base, params, int(settings['bar_size']), float(settings['leverage']))
+            for params in self.points(base)
+        ]
+
+
+class LeveragedStrategy(BacktestStrategy):
+    """按固定倍数放大仓位的策略包装"""
+
+    def __init__(self, strategy: BacktestStrategy, leverage: float):
+        self.strategy = strategy
+        self.leverage = leverage
+        self.name = strategy.name
+        self.required = strategy.required
+        self.required_bars = strategy.required_bars
+
+    def positions(self, data):
+        return self.strategy.positions(data) * self.leverage
+
+    def asset_returns(self, data):
+        return self.strategy.asset_returns(data)
+
+
+def resample(panel: Mapping[str, np.ndarray], bar_size: int) -> Dict[str, np.ndarray]:
+    """将K线从第一根起按bar_size根合并，末尾不足一组的K线暂不合并
+
+    分组以第一根K线为起点，末尾追加新bar时已有分组的边界不变（不足一组的新bar
+    等补齐后才成为新的合并K线），续算时合并后的行情前缀保持一致。
+    """
+    if bar_size <= 1:
+        return dict(panel)
+    resampled = {}
+    for field, values in panel.items():
+        count = len(values) // bar_size
+        blocks = values[:count * bar_size].reshape(count, bar_size, -1)
+        if field == 'open':
+            resampled[field] = blocks[:, 0]
+        elif field == 'high':
+            resampled[field] = blocks.max(axis=1)
+        elif field == 'low':
+            resampled[field] = blocks.min(axis=1)
+        elif field == 'volume':
+            resampled[field] = blocks.sum(axis=1)
+        else:
+            resampled[field] = blocks[:, -1]
+    return resampled
+
+
+def _resampled_panel(panel: Mapping[str, np.ndarray], bar_size: int,
+                     resampled: Optional[Dict[int, Dict[str, np.ndarray]]],
+                     memo: Optional[IndicatorMemo]) -> Dict[str, np.ndarray]:
+    if resampled is None:
+        resampled = {}
+    if bar_size not in resampled:
+        resampled[bar_size] = resample(panel, bar_size)
+        if memo is not None:
+            memo.register(resampled[bar_size])
+    return resampled[bar_size]
+
+
+def evaluate_task(panel: Mapping[str, np.ndarray], task: SweepTask, cost: float,
+                  resampled: Optional[Dict[int, Dict[str, np.ndarray]]] = None,
+                  memo: Optional[IndicatorMemo] = None) -> Dict[str, float]:
+    """回测一个参数组合，返回各标的平均绩效（提供memo时复用相同的指标计算）"""
+    base, params, bar_size, leverage = task
+    bars = _resampled_panel(panel, bar_size, resampled, memo)
+    strategy = LeveragedStrategy(get_backtest_strategy(base, **dict(params)), leverage)
+    engine = BacktestEngine(cost=cost, periods_per_year=PERIODS_PER_YEAR / bar_size)
+    with memoize_indicators(memo):
+        return engine.run(strategy, bars).summary()
+
+
+def evaluate_task_incremental(panel: Mapping[str, np.ndarray], task: SweepTask, cost: float,
+                              state: Optional[Dict] = None,
+                              resampled: Optional[Dict[int, Dict[str, np.ndarray]]] = None,
+                              memo: Optional[IndicatorMemo] = None,
+                              scratch: Optional[Dict] = None) -> Tuple[Dict[str, float], Dict, bool]:
+    """回测一个参数组合并返回可续算的状态
+
+    state为上次运行保存的状态（行数、当时行情的指纹、最后CHECK_BARS个仓位和绩效累计量）。
+    当前行情的前state['rows']行与当时一致（只在末尾追加了新bar）时，只回测
+    "策略所需的预热bar + 核对区间 + 新增bar"这一段：核对区间的仓位与上次一致后，
+    把新增bar的仓位和收益追加到绩效累计量；新增的原始bar不足一根合并K线时直接沿用上次结果。
+    预热bar数从策略的required_bars与折算后的MIN_WARMUP_BARS中的较大者开始，核对不一致时
+    放大4倍重试（长时间没有信号的策略需要更长的预热），预热覆盖到行情开头时改为完整回测。
+    返回 (各标的平均绩效, 新状态, 是否为续算)。
+    """
+    base, params, bar_size, leverage = task
+    scratch = {} if scratch is None else scratch
+    bars = _resampled_panel(panel, bar_size, resampled, memo)
+    strategy = LeveragedStrategy(get_backtest_strategy(base, **dict(params)), leverage)
+    periods_per_year = PERIODS_PER_YEAR / bar_size
+    engine = BacktestEngine(cost=cost, periods_per_year=periods_per_year)
+    total = len(next(iter(bars.values())))
+
+    def prefix(rows: int) -> str:
+        key = ('prefix', bar_size, rows)
+        if key not in scratch:
+            scratch[key] = panel_fingerprint({field: values[:rows] for field, values in bars.items()})
+        return scratch[key]
+
+    resumable = state is not None and state['rows'] <= total and prefix(state['rows']) == state['prefix']
+    if resumable and state['rows'] == total:
+        # 新增的原始bar还不足一根合并K线，合并后的行情与上次相同
+        return state['metrics'].summary(), state, True
+    warmup = max(strategy.required_bars, -(-MIN_WARMUP_BARS // bar_size))
+
+    with memoize_indicators(memo):
+        while resumable:
+            check = state['positions']
+            start = state['rows'] - len(check) - warmup
+            if start <= 0:
+                break
+            window_key = ('window', bar_size, start)
+            if window_key not in scratch:
+                scratch[window_key] = {field: values[start:] for field, values in bars.items()}
+                if memo is not None:
+                    memo.register(scratch[window_key])
+            result = engine.run(strategy, scratch[window_key])
+            offset = state['rows'] - start
+            if np.array_equal(result.positions[offset - len(check):offset], check):
+                metrics = state['metrics']
+                metrics.update(result.positions[offset:], result.returns[offset:])
+                new_state = {'rows': total, 'prefix': prefix(total),
+                             'positions': result.positions[-CHECK_BARS:].copy(), 'metrics': metrics}
+                return metrics.summary(), new_state, True
+            warmup *= 4
+
+        result = engine.run(strategy, bars)
+    new_state = {'rows': total, 'prefix': prefix(total), 'positions': result.positions[-CHECK_BARS:].copy(),
+                 'metrics': IncrementalMetrics.from_result(result, periods_per_year)}
+    return result.summary(), new_state, False
+
+
+def panel_fingerprint(panel: Mapping[str, np.ndarray]) -> str:
+    """行情内容指纹（用于结果缓存键）"""
+    digest = hashlib.blake2b(digest_size=16)
+    for field in sorted(panel):
+        values = np.ascontiguousarray(panel[field])
+        digest.update(f'{field}:{values.shape}:{values.dtype}'.encode('utf-8'))
+        digest.update(values.data)
+    return digest.hexdigest()
+
+
+class SharedPanel:
+    """放在共享内存中的行情数组
+
+    子进程通过spec按名称挂载同一块内存，任务参数中不再携带行情数据。
+    """
+
+    def __init__(self, panel: Mapping[str, np.ndarray]):
+        self.blocks: Dict[str, shared_memory.SharedMemory] = {}
+        self.spec: Dict[str, Tuple[str, Tuple[int, ...], str]] = {}
+        for field, values in panel.items():
+            block = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+            np.ndarray(values.shape, dtype=values.dtype, buffer=block.buf)[...] = values
+            self.blocks[field] = block
+            self.spec[field] = (block.name, values.shape, values.dtype.str)
+
+    def close(self):
+        """释放共享内存"""
+        for block in self.blocks.values():
+            block.close()
+            block.unlink()
+        self.blocks = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+# 子进程中挂载的行情和已合并的K线
+_worker_blocks: List[shared_memory.SharedMemory] = []
+_worker_panel: Dict[str, np.ndarray] = {}
+_worker_resampled: Dict[int, Dict[str, np.ndarray]] = {}
+_worker_memo = IndicatorMemo()
+_worker_scratch: Dict = {}
+
+
+def _attach_panel(spec: Dict[str, Tuple[str, Tuple[int, ...], str]]):
+    """进程池初始化：按名称挂载共享内存中的行情"""
+    for field, (name, shape, dtype) in spec.items():
+        block = shared_memory.SharedMemory(name=name)
+        _worker_blocks.append(block)
+        _worker_panel[field] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+
+
+def _open_source(source: PanelSlice):
+    """进程池初始化：打开行情库中的内存映射切片"""
+    _worker_panel.update(BacktestEngine.prepare(source.load()))
+
+
+def _evaluate_shared(task: SweepTask, cost: float, incremental: bool = False, state: Optional[Dict] = None):
+    """子进程任务：使用共享内存中的行情回测一个参数组合（incremental时返回可续算的状态）"""
+    if incremental:
+        return evaluate_task_incremental(_worker_panel, task, cost, state, _worker_resampled,
+                                         _worker_memo, _worker_scratch)
+    return evaluate_task(_worker_panel, task, cost, _worker_resampled, _worker_memo)
+
+
+class SweepRunner:
+    """并行参数扫描
+
+    逐个变体按网格顺序评估参数组合，同时最多预先提交lookahead个任务以保持进程池繁忙。
+    patience > 0 时启用早停：连续patience个组合未能刷新最优指标即停止该变体的扫描。
+    相同的(策略, 参数, 设置)在一次运行中只回测一次，各组合共用的滚动指标只计算一次；
+    指定cache_dir时结果持久化（磁盘占用超过cache_bytes时淘汰最久未用的条目）：
+    行情或参数不变的组合在之后的运行中直接复用，行情只在末尾追加了新bar的组合只计算新增部分。
+    data为行情库切片（PanelSlice）时，子进程各自打开同一份内存映射文件，不再复制到共享内存。
+    """
+
+    def __init__(self, data: Union[Mapping[str, Any], PanelSlice], grid: Optional[ParameterGrid] = None,
+                 workers: int = 1, cost: float = 0.0005, metric: str = 'sharpe',
+                 patience: int = 0, cache_dir: Optional[str] = None,
+                 lookahead: Optional[int] = None, cache_bytes: int = DEFAULT_MAX_BYTES):
+        self.source = data if isinstance(data, PanelSlice) else None
+        self.panel = BacktestEngine.prepare(data.load() if self.source else data)
+        self.grid = grid or ParameterGrid.from_file()
+        self.workers = max(1, workers)
+        self.cost = cost
+        self.metric = metric
+        self.patience = patience
+        self.lookahead = lookahead or self.workers * 2
+        self.cache = ResultCache(cache_dir, f'sweep-{SWEEP_VERSION}', cache_bytes) if cache_dir else None
+        self.fingerprint = ''
+        self.series: Dict[str, Any] = {}
+        if cache_dir:
+            self.fingerprint = self.source.fingerprint() if self.source else panel_fingerprint(self.panel)
+            # 续算状态按"同一组行情序列"保存，与数据长度无关
+            self.series = {'fields': sorted(self.panel), 'symbols': next(iter(self.panel.values())).shape[1]}
+            if self.source:
+                columns = self.source.columns
+                if isinstance(columns, slice):
+                    columns = (columns.start, columns.stop)
+                self.series.update(directory=os.path.abspath(self.source.directory), columns=columns,
+                                   start=self.source.rows.start)
+        self.results: Dict[SweepTask, Dict[str, float]] = {}
+        self.stats = {'variants': 0, 'skipped': 0, 'evaluated': 0, 'cached': 0, 'resumed': 0,
+                      'stopped_early': 0}
+        self._resampled: Dict[int, Dict[str, np.ndarray]] = {}
+        self._memo = IndicatorMemo()
+        self._scratch: Dict = {}
+
+    def _task_fields(self, task: SweepTask) -> Dict[str, Any]:
+        base, params, bar_size, leverage = task
+        return {'cost': self.cost, 'strategy': base, 'params': dict(params),
+                'bar_size': bar_size, 'leverage': leverage}
+
+    def _cache_key(self, task: SweepTask) -> str:
+        return self.cache.key({'data': self.fingerprint, **self._task_fields(task)})
+
+    def _state_key(self, task: SweepTask) -> str:
+        return self.cache.key({'state': self.series, **self._task_fields(task)})
+
+    def _submit(self, task: SweepTask, executor: Optional[ProcessPoolExecutor],
+                pending: Dict[SweepTask, Future]):
+        """提交尚未有结果的任务（先查缓存）"""
+        if task in self.results or task in pending:
+            return
+        if self.cache is not None:
+            cached = self.cache.get(self._cache_key(task))
+            if cached is not None:
+                self.results[task] = cached
+                self.stats['cached'] += 1
+                return
+        if executor is not None:
+            if self.cache is not None:
+                pending[task] = executor.submit(_evaluate_shared, task, self.cost, True,
+                                                self.cache.get(self._state_key(task)))
+            else:
+                pending[task] = executor.submit(_evaluate_shared, task, self.cost)
+
+    def _result(self, task: SweepTask, pending: Dict[SweepTask, Future]) -> Dict[str, float]:
+        """取得任务结果（进程池中的任务等待完成，单进程模式下直接计算）"""
+        if task not in self.results:
+            future = pending.pop(task, None)
+            if self.cache is None:
+                result = future.result() if future is not None else \
+                    evaluate_task(self.panel, task, self.cost, self._resampled, self._memo)
+            else:
+                if future is not None:
+                    result, state, resumed = future.result()
+                else:
+                    result, state, resumed = evaluate_task_incremental(
+                        self.panel, task, self.cost, self.cache.get(self._state_key(task)),
+                        self._resampled, self._memo, self._scratch)
+                self.stats['resumed'] += resumed
+                self.cache.put(self._cache_key(task), result)
+                self.cache.put(self._state_key(task), state)
+            self.results[task] = result
+            self.stats['evaluated'] += 1
+        return self.results[task]
+
+    def _sweep_variant(self, strategy: Dict, tasks: List[SweepTask],
+                       executor: Optional[ProcessPoolExecutor],
+                       pending: Dict[SweepTask, Future]) -> Dict:
+        """按网格顺序扫描一个变体，返回最优参数和绩效"""
+        best, best_task, stale, evaluated = None, None, 0, 0
+        window = deque()
+        queued = iter(tasks)
+
+        def fill():
+            while len(window) < self.lookahead:
+                task = next(queued, None)
+                if task is None:
+                    return
+                self._submit(task, executor, pending)
+                window.append(task)
+
+        fill()
+        stopped = False
+        while window:
+            task = window.popleft()
+            result = self._result(task, pending)
+            evaluated += 1
+            if best is None or result[self.metric] > best[self.metric]:
+                best, best_task, stale = result, task, 0
+            else:
+                stale += 1
+                if self.patience and stale >= self.patience:
+                    stopped = evaluated < len(tasks)
+                    break
+            fill()
+
+        if stopped:
+            self.stats['stopped_early'] += 1
+        base, params, bar_size, leverage = best_task
+        return {
+            'name': strategy.get('name'),
+            'category': strategy.get('category'),
+            'base_strategy': base,
+            'bar_size': bar_size,
+            'leverage': leverage,
+            'best_params': dict(params),
+            'metric': self.metric,
+            'best': best,
+            'evaluated': evaluated,
+            'grid_size': len(tasks),
+            'stopped_early': stopped,
+        }
+
+    def run(self, strategies: Iterable[Dict]) -> Iterator[Dict]:
+        """惰性扫描一组变体，逐个返回扫描结果（无法回测的变体跳过）"""
+        if self.workers <= 1:
+            yield from self._run(strategies, None)
+            return
+        if self.source is not None:
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=_open_source,
+                                     initargs=(self.source,)) as executor:
+                yield from self._run(strategies, executor)
+            return
+        with SharedPanel(self.panel) as shared, \
+                ProcessPoolExecutor(max_workers=self.workers, initializer=_attach_panel,
+                                    initargs=(shared.spec,)) as executor:
+            yield from self._run(strategies, executor)
+
+    def _run(self, strategies: Iterable[Dict],
+             executor: Optional[ProcessPoolExecutor]) -> Iterator[Dict]:
+        pending: Dict[SweepTask, Future] = {}
+        for strategy in strategies:
+            tasks = self.grid.tasks(strategy)
+            # 行情中缺少所需字段（如配对交易的pair_close）的策略同样跳过
+            required = BACKTEST_STRATEGIES[tasks[0][0]].required if tasks else ()
+            if not tasks or any(field not in self.panel for field in required):
+                self.stats['skipped'] += 1
+                continue
+            self.stats['variants'] += 1
+            yield self._sweep_variant(strategy, tasks, executor, pending)
+        # 早停后仍在运行的预提交任务不再需要
+        for future in pending.values():
+            future.cancel()
+
+
+def load_panel_npz(path: str) -> Dict[str, np.ndarray]:
+    """读取 .npz 行情文件（open/high/low/close/volume 等数组，形状为 (bar数, 标的数)）"""
+    with np.load(path) as data:
+        return {field: as_panel(data[field]) for field in data.files}
+
+
+def parse_args(argv: List[str] = None) -> argparse.Namespace:
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='扩展变体参数扫描')
+    parser.add_argument('data', help='行情文件（.npz，数组形状为 (bar数, 标的数)），指定--store时为数据集名称')
+    parser.add_argument('strategies', nargs='+',
+                        help='策略快照文件（.json/.jsonl/.parquet），如 expanded_strategies_YYYYMMDD.json')
+    parser.add_argument('--grid', default=DEFAULT_GRID_FILE, help='参数网格配置文件（JSON）')
+    parser.add_argument('--output', default='sweep_results.jsonl', help='扫描结果输出文件（JSON Lines）')
+    parser.add_argument('--workers', type=int, default=1, help='并行回测使用的进程数')
+    parser.add_argument('--metric', default='sharpe', help='选择最优参数的指标')
+    parser.add_argument('--patience', type=int, default=0,
+                        help='早停：连续多少个参数组合未刷新最优即停止（0表示不早停）')
+    parser.add_argument('--cache-dir', default=None, help='扫描结果缓存目录')
+    parser.add_argument('--cache-mb', type=float, default=DEFAULT_MAX_BYTES / 1024 / 1024,
+                        help='结果缓存的磁盘上限（MB），超出时淘汰最久未用的条目')
+    parser.add_argument('--cost', type=float, default=0.0005, help='单边交易费率')
+    parser.add_argument('--store', default=None, help='本地行情库根目录（见market_data.py）')
+    parser.add_argument('--start', default=None, help='使用行情库时的起始日期')
+    parser.add_argument('--end', default=None, help='使用行情库时的结束日期')
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str] = None):
+    """主函数"""
+    args = parse_args(argv)
+    print("=== 参数扫描启动 ===")
+
+    if args.store:
+        data = MarketDataStore(args.store).open(args.data).slice(args.start, args.end)
+    else:
+        data = load_panel_npz(args.data)
+    runner = SweepRunner(
+        data, ParameterGrid.from_file(args.grid), workers=args.workers,
+        cost=args.cost, metric=args.metric, patience=args.patience, cache_dir=args.cache_dir,
+        cache_bytes=int(args.cache_mb * 1024 * 1024),
+    )
+    strategies = (strategy for path in args.strategies for strategy in iter_snapshot(path))
+    with open(args.output, 'w', encoding='utf-8') as f:
+        for result in runner.run(strategies):
+            f.write(json.dumps(result, ensure_ascii=False) + '\n')
+
+    stats = runner.stats
+    print(f"已扫描 {stats['variants']} 个变体，跳过 {stats['skipped']} 个无法回测的策略")
+    print(f"回测 {stats['evaluated']} 个参数组合（其中 {stats['resumed']} 个只计算新增数据），"
+          f"缓存复用 {stats['cached']} 个，早停 {stats['stopped_early']} 个变体")
+    print(f"结果已保存到 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
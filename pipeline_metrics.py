@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+流水线度量 - 阶段计时器、计数器和可选的cProfile/tracemalloc
+阶段可以嵌套（包括被逐条拉取的生成器），同时记录含子阶段的总耗时和扣除子阶段的自身耗时；
+结果可输出为JSON或Prometheus文本文件（node_exporter textfile collector），用于夜间任务告警
+"""
+
+import argparse
+import cProfile
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Prometheus指标名前缀
+METRIC_PREFIX = 'strategy_pipeline'
+
+
+class _Frame:
+    """正在执行的阶段"""
+
+    __slots__ = ('name', 'start', 'child_seconds', 'peak')
+
+    def __init__(self, name: str, start: float):
+        self.name = name
+        self.start = start
+        self.child_seconds = 0.0
+        self.peak = 0
+
+
+class PipelineMetrics:
+    """阶段计时与计数
+
+    stage(name)           上下文管理器，记录一次阶段执行
+    timed_iter(name, it)  包装迭代器，只统计在迭代器内部花费的时间（不含消费方处理时间）
+    count(name, n)        累加计数器；gauge(name, v) 设置瞬时值
+    开启trace_memory时用tracemalloc记录每个stage的峰值内存（嵌套阶段互不干扰，
+    逐条迭代不记录内存，开销过大）。
+    """
+
+    def __init__(self, job: str = 'pipeline', trace_memory: bool = False):
+        self.job = job
+        self.trace_memory = trace_memory
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self.counters: Dict[str, float] = {}
+        self.gauges: Dict[str, float] = {}
+        self._stack: List[_Frame] = []
+        self._started = time.perf_counter()
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def _stats(self, name: str) -> Dict[str, Any]:
+        stats = self.stages.get(name)
+        if stats is None:
+            stats = self.stages[name] = {
+                'calls': 0, 'items': 0, 'seconds': 0.0, 'self_seconds': 0.0,
+                'max_seconds': 0.0, 'peak_bytes': None,
+            }
+        return stats
+
+    def _enter(self, name: str, trace_memory: bool) -> _Frame:
+        if trace_memory:
+            # tracemalloc只有一个全局峰值：进入子阶段前把父阶段至今的峰值保存到父帧
+            peak = tracemalloc.get_traced_memory()[1]
+            if self._stack:
+                self._stack[-1].peak = max(self._stack[-1].peak, peak)
+            tracemalloc.reset_peak()
+        frame = _Frame(name, time.perf_counter())
+        self._stack.append(frame)
+        return frame
+
+    def _exit(self, frame: _Frame, trace_memory: bool, calls: int = 1, items: int = 0):
+        elapsed = time.perf_counter() - frame.start
+        self._stack.pop()
+        stats = self._stats(frame.name)
+        stats['calls'] += calls
+        stats['items'] += items
+        stats['seconds'] += elapsed
+        stats['self_seconds'] += elapsed - frame.child_seconds
+        stats['max_seconds'] = max(stats['max_seconds'], elapsed)
+        if self._stack:
+            self._stack[-1].child_seconds += elapsed
+        if trace_memory:
+            peak = max(frame.peak, tracemalloc.get_traced_memory()[1])
+            stats['peak_bytes'] = max(stats['peak_bytes'] or 0, peak)
+            if self._stack:
+                self._stack[-1].peak = max(self._stack[-1].peak, peak)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """计时一个阶段"""
+        trace_memory = self.trace_memory and tracemalloc.is_tracing()
+        frame = self._enter(name, trace_memory)
+        try:
+            yield
+        finally:
+            self._exit(frame, trace_memory)
+
+    def timed_iter(self, name: str, iterable: Iterable) -> Iterator:
+        """逐条计时迭代器：每次取下一个元素计为该阶段的一段耗时，元素数计入items"""
+        iterator = iter(iterable)
+        self._stats(name)['calls'] += 1
+        while True:
+            frame = self._enter(name, False)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self._exit(frame, False, calls=0)
+                return
+            except BaseException:
+                self._exit(frame, False, calls=0)
+                raise
+            self._exit(frame, False, calls=0, items=1)
+            yield item
+
+    def count(self, name: str, value: float = 1):
+        """累加计数器"""
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def gauge(self, name: str, value: float):
+        """设置瞬时值"""
+        self.gauges[name] = value
+
+    def snapshot(self) -> Dict[str, Any]:
+        """当前全部度量（可直接序列化为JSON）"""
+        gauges = dict(self.gauges)
+        gauges['run_seconds'] = round(time.perf_counter() - self._started, 6)
+        if resource is not None:
+            # Linux上ru_maxrss单位为KB，macOS为字节
+            maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            gauges['max_rss_bytes'] = maxrss if os.uname().sysname == 'Darwin' else maxrss * 1024
+        stages = {
+            name: {key: round(value, 6) if isinstance(value, float) else value
+                   for key, value in stats.items()}
+            for name, stats in self.stages.items()
+        }
+        return {
+            'job': self.job,
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'stages': stages,
+            'counters': dict(self.counters),
+            'gauges': gauges,
+        }
+
+    def summary(self) -> str:
+        """按自身耗时降序的文本汇总"""
+        lines = [f"{'阶段':<24} {'次数':>8} {'条目':>10} {'总耗时(s)':>11} {'自身耗时(s)':>12} {'峰值内存(MB)':>12}"]
+        for name, stats in sorted(self.stages.items(), key=lambda kv: -kv[1]['self_seconds']):
+            peak = f"{stats['peak_bytes'] / 1e6:.1f}" if stats['peak_bytes'] is not None else '-'
+            lines.append(f"{name:<24} {stats['calls']:>8} {stats['items']:>10} "
+                         f"{stats['seconds']:>11.3f} {stats['self_seconds']:>12.3f} {peak:>12}")
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"{name}: {value}")
+        return '\n'.join(lines)
+
+    def write_json(self, path: str):
+        """写入JSON（原子替换）"""
+        _atomic_write(path, json.dumps(self.snapshot(), ensure_ascii=False, indent=2))
+
+    def write_prometheus(self, path: str):
+        """写入Prometheus文本格式（node_exporter textfile collector会读取 *.prom 文件）"""
+        snapshot = self.snapshot()
+        job = _escape_label(self.job)
+        lines = []
+
+        def metric(name: str, help_text: str, samples: List[tuple]):
+            full_name = f'{METRIC_PREFIX}_{name}'
+            lines.append(f'# HELP {full_name} {help_text}')
+            lines.append(f'# TYPE {full_name} gauge')
+            for labels, value in samples:
+                label_text = ','.join([f'job="{job}"'] + [f'{k}="{_escape_label(v)}"' for k, v in labels])
+                lines.append(f'{full_name}{{{label_text}}} {value}')
+
+        stages = snapshot['stages']
+        metric('stage_seconds', 'Wall time spent in a stage including nested stages.',
+               [((('stage', n),), s['seconds']) for n, s in stages.items()])
+        metric('stage_self_seconds', 'Wall time spent in a stage excluding nested stages.',
+               [((('stage', n),), s['self_seconds']) for n, s in stages.items()])
+        metric('stage_calls', 'Number of times a stage ran.',
+               [((('stage', n),), s['calls']) for n, s in stages.items()])
+        metric('stage_items', 'Items produced by an iterator stage.',
+               [((('stage', n),), s['items']) for n, s in stages.items()])
+        metric('stage_peak_bytes', 'Peak traced Python memory during a stage.',
+               [((('stage', n),), s['peak_bytes']) for n, s in stages.items() if s['peak_bytes'] is not None])
+        metric('count', 'Pipeline counters.',
+               [((('name', n),), v) for n, v in snapshot['counters'].items()])
+        for name, value in snapshot['gauges'].items():
+            metric(name, f'Pipeline gauge {name}.', [((), value)])
+        metric('last_run_timestamp_seconds', 'Unix time the metrics were written.', [((), round(time.time(), 3))])
+        _atomic_write(path, '\n'.join(lines) + '\n')
+
+    @contextmanager
+    def profile(self, path: Optional[str]) -> Iterator[None]:
+        """path非空时用cProfile分析代码块并写出统计文件（可用 python -m pstats 或 snakeviz 查看）"""
+        if not path:
+            yield
+            return
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(path)
+
+    @classmethod
+    def from_args(cls, job: str, args: argparse.Namespace) -> 'PipelineMetrics':
+        """按 add_metrics_arguments 添加的命令行参数创建"""
+        return cls(job, trace_memory=args.trace_memory)
+
+    def report(self, args: argparse.Namespace):
+        """按命令行参数打印汇总并写出JSON/Prometheus文件"""
+        if args.metrics_summary:
+            print(self.summary())
+        if args.metrics_json:
+            self.write_json(args.metrics_json)
+            print(f"度量已写入 {args.metrics_json}")
+        if args.metrics_prom:
+            self.write_prometheus(args.metrics_prom)
+            print(f"Prometheus度量已写入 {args.metrics_prom}")
+
+
+def _escape_label(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _atomic_write(path: str, text: str):
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def add_metrics_arguments(parser: argparse.ArgumentParser):
+    """为命令行添加度量相关参数"""
+    group = parser.add_argument_group('度量与性能分析')
+    group.add_argument('--metrics-json', default=None, help='将各阶段耗时和计数写入JSON文件')
+    group.add_argument('--metrics-prom', default=None,
+                       help='写入Prometheus文本文件（供node_exporter textfile collector采集）')
+    group.add_argument('--metrics-summary', action='store_true', help='运行结束时打印各阶段耗时汇总')
+    group.add_argument('--trace-memory', action='store_true',
+                       help='用tracemalloc记录各阶段峰值内存（会明显变慢）')
+    group.add_argument('--profile', default=None, help='用cProfile分析整个运行并写出统计文件')
@@ -0,0 +1,518 @@
+#!/usr/bin/env python3
+"""
+组合分析 - 汇总各变体的收益序列，分块流式计算协方差/相关矩阵，聚类冗余变体，
+构建风险平价和最小方差组合，结果写入策略总目录的"组合分析"章节
+收益序列逐变体追加到磁盘上的矩阵文件，计算协方差时按时间分块读取，不需要把全部序列放进内存
+"""
+
+import argparse
+import json
+import math
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from catalog_updater import CatalogUpdater
+
+# 收益序列库中的文件
+RETURNS_FILE = 'returns.f4'
+SERIES_FILE = 'series.json'
+
+# 组合分析报告（位于策略总目录所在目录，update_catalog据此生成目录章节）
+REPORT_FILE = 'portfolio_report.json'
+
+# 相关系数不低于该值的变体视为同一笔押注
+DEFAULT_THRESHOLD = 0.9
+
+# 流式计算协方差时每次读取的bar数
+DEFAULT_CHUNK_BARS = 256
+
+# 协方差向 平均方差 × 单位阵 收缩的比例（变体数接近或超过bar数时样本协方差奇异）
+DEFAULT_SHRINKAGE = 0.1
+
+# 年化使用的每年bar数（与backtest.PERIODS_PER_YEAR一致）
+PERIODS_PER_YEAR = 252
+
+# 目录章节中列出的簇数和权重数
+SECTION_TOP = 15
+
+
+class ReturnSeriesWriter:
+    """收益序列库的写入器
+
+    每个变体一行float32收益（长度为bars）顺序追加到 RETURNS_FILE，变体信息写入 SERIES_FILE；
+    写入先落临时文件，close时一起重命名，读取方不会看到写了一半的库。
+    """
+
+    def __init__(self, directory: str, bars: int):
+        self.directory = directory
+        self.bars = bars
+        self.variants: List[Dict[str, Any]] = []
+        os.makedirs(directory, exist_ok=True)
+        self._returns_path = os.path.join(directory, RETURNS_FILE)
+        self._file = open(f'{self._returns_path}.tmp', 'wb')
+
+    def append(self, variant: Dict[str, Any], returns: np.ndarray):
+        """追加一个变体的收益序列"""
+        returns = np.asarray(returns, dtype=np.float32)
+        if returns.shape != (self.bars,):
+            raise ValueError(f"收益序列长度应为 {self.bars}，实际为 {returns.shape}")
+        self._file.write(np.nan_to_num(returns).tobytes())
+        self.variants.append(variant)
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._file.close()
+        os.replace(f'{self._returns_path}.tmp', self._returns_path)
+        series_path = os.path.join(self.directory, SERIES_FILE)
+        with open(f'{series_path}.tmp', 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'bars': self.bars, 'variants': self.variants},
+                               ensure_ascii=False))
+        os.replace(f'{series_path}.tmp', series_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._file.close()
+            os.remove(f'{self._returns_path}.tmp')
+
+
+class ReturnSeriesStore:
+    """收益序列库：变体 × bar 的float32矩阵（内存映射）及变体信息"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, SERIES_FILE), 'r', encoding='utf-8') as f:
+            series = json.load(f)
+        self.bars: int = series['bars']
+        self.variants: List[Dict[str, Any]] = series['variants']
+        path = os.path.join(directory, RETURNS_FILE)
+        if self.variants and self.bars:
+            self.returns = np.memmap(path, dtype=np.float32, mode='r', shape=(len(self.variants), self.bars))
+        else:
+            self.returns = np.zeros((len(self.variants), self.bars), dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.variants)
+
+    def names(self) -> List[str]:
+        return [variant['name'] for variant in self.variants]
+
+    def iter_chunks(self, chunk_bars: int = DEFAULT_CHUNK_BARS) -> Iterator[np.ndarray]:
+        """按时间分块读取，每块形状为 (变体数, ≤chunk_bars)，转为float64"""
+        for start in range(0, self.bars, chunk_bars):
+            yield np.asarray(self.returns[:, start:start + chunk_bars], dtype=np.float64)
+
+
+def streaming_covariance(chunks: Iterable[np.ndarray]) -> Tuple[np.ndarray, np.ndarray, int]:
+    """按时间分块累加的样本协方差
+
+    每块为 (序列数, bar数)。先减去第一块的均值作为平移量再累加叉积，避免均值远大于波动时
+    E[xy] - E[x]E[y] 的相消误差；内存只占一块数据和 序列数² 的累加矩阵。
+    返回 (协方差矩阵, 均值, bar数)。
+    """
+    shift = cross = sums = None
+    count = 0
+    for chunk in chunks:
+        if shift is None:
+            shift = chunk.mean(axis=1)
+            cross = np.zeros((len(chunk), len(chunk)))
+            sums = np.zeros(len(chunk))
+        centered = chunk - shift[:, None]
+        cross += centered @ centered.T
+        sums += centered.sum(axis=1)
+        count += chunk.shape[1]
+    if count < 2:
+        size = 0 if shift is None else len(shift)
+        return np.zeros((size, size)), np.zeros(size) if shift is None else shift, count
+    mean = sums / count
+    cov = (cross - count * np.outer(mean, mean)) / (count - 1)
+    return cov, shift + mean, count
+
+
+def correlation_from_covariance(cov: np.ndarray) -> np.ndarray:
+    """协方差转相关系数（零方差序列的相关系数为0，对角线为1）"""
+    std = np.sqrt(np.clip(np.diag(cov), 0.0, None))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        corr = cov / np.outer(std, std)
+    corr[~np.isfinite(corr)] = 0.0
+    np.clip(corr, -1.0, 1.0, out=corr)
+    np.fill_diagonal(corr, 1.0)
+    return corr
+
+
+def cluster_redundant(corr: np.ndarray, order: Iterable[int],
+                      threshold: float = DEFAULT_THRESHOLD) -> Tuple[np.ndarray, List[int]]:
+    """按顺序的领头者聚类
+
+    按order（通常为夏普降序）依次处理：与已有领头者的最大相关系数不低于threshold时
+    并入相关性最高的那一簇，否则自成一簇并成为领头者。只看正相关（负相关是对冲，不是同一笔押注）。
+    返回 (每个序列的簇编号（未参与的为-1）, 各簇领头者的下标)。
+    """
+    labels = np.full(len(corr), -1, dtype=np.int64)
+    leaders: List[int] = []
+    for index in order:
+        if leaders:
+            similarity = corr[index, leaders]
+            best = int(np.argmax(similarity))
+            if similarity[best] >= threshold:
+                labels[index] = best
+                continue
+        labels[index] = len(leaders)
+        leaders.append(index)
+    return labels, leaders
+
+
+def shrink_covariance(cov: np.ndarray, shrinkage: float = DEFAULT_SHRINKAGE) -> np.ndarray:
+    """向 平均方差 × 单位阵 收缩"""
+    target = np.trace(cov) / max(len(cov), 1)
+    return (1 - shrinkage) * cov + shrinkage * target * np.eye(len(cov))
+
+
+def min_variance_weights(cov: np.ndarray, long_only: bool = True) -> np.ndarray:
+    """最小方差权重（权重和为1）
+
+    w ∝ Σ⁻¹1；只做多时反复剔除负权重的序列并在剩余序列上重解（有效集法的简化版），
+    cov应先收缩保证可逆。
+    """
+    weights = np.zeros(len(cov))
+    active = np.arange(len(cov))
+    while len(active):
+        solved = np.linalg.solve(cov[np.ix_(active, active)], np.ones(len(active)))
+        solved /= solved.sum()
+        if not long_only or (solved >= 0).all():
+            weights[active] = solved
+            break
+        active = active[solved > 0]
+    return weights
+
+
+def risk_parity_weights(cov: np.ndarray, budget: Optional[np.ndarray] = None,
+                        tol: float = 1e-8, max_iter: int = 500) -> np.ndarray:
+    """风险平价（等风险贡献）权重，循环坐标下降求解
+
+    逐个求解 σᵢᵢwᵢ² + (Σ_{j≠i} σᵢⱼwⱼ)wᵢ - bᵢ = 0 的正根，收敛后归一化使权重和为1；
+    budget为各序列的风险预算（默认相等）。
+    """
+    size = len(cov)
+    if size == 0:
+        return np.zeros(0)
+    budget = np.full(size, 1.0 / size) if budget is None else np.asarray(budget, dtype=np.float64)
+    diag = np.diag(cov)
+    weights = 1.0 / np.sqrt(np.where(diag > 0, diag, 1.0))
+    weights /= weights.sum()
+    marginal = cov @ weights
+    for _ in range(max_iter):
+        change = 0.0
+        for i in range(size):
+            rest = marginal[i] - diag[i] * weights[i]
+            updated = (-rest + math.sqrt(rest * rest + 4 * diag[i] * budget[i])) / (2 * diag[i])
+            delta = updated - weights[i]
+            if delta:
+                marginal += cov[:, i] * delta
+                weights[i] = updated
+                change = max(change, abs(delta) / updated)
+        if change < tol:
+            break
+    return weights / weights.sum()
+
+
+def portfolio_stats(weights: np.ndarray, cov: np.ndarray, mean: np.ndarray,
+                    periods_per_year: float = PERIODS_PER_YEAR) -> Dict[str, float]:
+    """组合的年化收益/波动、夏普、分散化比率和有效押注数（按风险贡献的熵）"""
+    variance = float(weights @ cov @ weights)
+    volatility = math.sqrt(max(variance, 0.0))
+    annual_return = float(weights @ mean) * periods_per_year
+    annual_volatility = volatility * math.sqrt(periods_per_year)
+    std = np.sqrt(np.clip(np.diag(cov), 0.0, None))
+    contributions = weights * (cov @ weights) / variance if variance > 0 else np.zeros_like(weights)
+    share = contributions[contributions > 0]
+    share = share / share.sum() if len(share) else share
+    return {
+        'annual_return': round(annual_return, 4),
+        'annual_volatility': round(annual_volatility, 4),
+        'sharpe': round(annual_return / annual_volatility, 4) if annual_volatility > 0 else 0.0,
+        'diversification_ratio': round(float(weights @ std) / volatility, 4) if volatility > 0 else 0.0,
+        'effective_bets': round(float(np.exp(-(share * np.log(share)).sum())), 2) if len(share) else 0.0,
+        'holdings': int(np.count_nonzero(weights > 1e-6)),
+    }
+
+
+class PortfolioAnalyzer:
+    """在收益序列库上做相关性聚类和组合构建
+
+    threshold   相关系数不低于该值的变体并为一簇，每簇保留夏普最高的领头者作为精简核心
+    shrinkage   构建组合前协方差的收缩比例
+    组合只在核心变体上构建：冗余变体几乎不增加分散度，却会让最小方差解更病态。
+    """
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD, shrinkage: float = DEFAULT_SHRINKAGE,
+                 chunk_bars: int = DEFAULT_CHUNK_BARS, periods_per_year: float = PERIODS_PER_YEAR):
+        self.threshold = threshold
+        self.shrinkage = shrinkage
+        self.chunk_bars = chunk_bars
+        self.periods_per_year = periods_per_year
+
+    def analyze(self, store: ReturnSeriesStore) -> Dict[str, Any]:
+        """返回分析报告（可直接序列化为JSON）"""
+        variants = store.variants
+        cov, mean, bars = streaming_covariance(store.iter_chunks(self.chunk_bars))
+        variance = np.diag(cov) if len(cov) else np.zeros(0)
+        flat = [i for i in range(len(variants)) if not variance[i] > 0]
+        traded = [i for i in range(len(variants)) if variance[i] > 0]
+        sharpe = np.zeros(len(variants))
+        sharpe[traded] = mean[traded] / np.sqrt(variance[traded]) * math.sqrt(self.periods_per_year)
+
+        corr = correlation_from_covariance(cov)
+        order = sorted(traded, key=lambda i: (-sharpe[i], variants[i]['name']))
+        labels, leaders = cluster_redundant(corr, order, self.threshold)
+
+        clusters = []
+        for label, leader in enumerate(leaders):
+            members = [i for i in order if labels[i] == label]
+            others = [i for i in members if i != leader]
+            clusters.append({
+                'leader': variants[leader]['name'],
+                'size': len(members),
+                'mean_corr': round(float(corr[leader, others].mean()), 4) if others else 1.0,
+                'sharpe': round(float(sharpe[leader]), 4),
+                'members': [variants[i]['name'] for i in members],
+                'hybrid': sum(1 for i in members if variants[i].get('is_hybrid')),
+            })
+        clusters.sort(key=lambda cluster: (-cluster['size'], cluster['leader']))
+
+        core = np.array(leaders, dtype=np.int64)
+        core_cov = cov[np.ix_(core, core)]
+        shrunk = shrink_covariance(core_cov, self.shrinkage)
+        core_mean = mean[core]
+        names = [variants[i]['name'] for i in core]
+        portfolios = {}
+        if len(core):
+            candidates = {
+                'equal_weight': np.full(len(core), 1.0 / len(core)),
+                'risk_parity': risk_parity_weights(shrunk),
+                'min_variance': min_variance_weights(shrunk),
+            }
+            for kind, weights in candidates.items():
+                stats = portfolio_stats(weights, core_cov, core_mean, self.periods_per_year)
+                stats['weights'] = {name: round(float(w), 6) for name, w in zip(names, weights) if w > 1e-6}
+                portfolios[kind] = stats
+
+        return {
+            'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'variants': len(variants),
+            'bars': bars,
+            'threshold': self.threshold,
+            'shrinkage': self.shrinkage,
+            'flat': [variants[i]['name'] for i in flat],
+            'core': names,
+            'clusters': clusters,
+            'portfolios': portfolios,
+        }
+
+
+def save_report(report: Dict[str, Any], base_dir: str = '.') -> str:
+    """写入组合分析报告（原子替换），返回路径"""
+    path = os.path.join(base_dir, REPORT_FILE)
+    with open(f'{path}.tmp', 'w', encoding='utf-8') as f:
+        f.write(json.dumps(report, ensure_ascii=False, indent=2))
+    os.replace(f'{path}.tmp', path)
+    return path
+
+
+def load_report(base_dir: str = '.') -> Optional[Dict[str, Any]]:
+    """读取组合分析报告，不存在时返回None"""
+    path = os.path.join(base_dir, REPORT_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def render_section(report: Mapping[str, Any], top: int = SECTION_TOP) -> str:
+    """组合分析报告渲染为策略总目录的章节"""
+    total = report['variants']
+    core = len(report['core'])
+    redundant = total - core - len(report['flat'])
+    lines = [
+        '## 组合分析',
+        '',
+        f"- 分析时间: {report['generated_at']}（{report['bars']} 根bar）",
+        f"- 参与分析的变体: {total} 个，其中无交易（收益恒为0）{len(report['flat'])} 个",
+        f"- 相关系数 ≥ {report['threshold']} 的变体视为同一笔押注: {len(report['clusters'])} 簇，"
+        f"冗余变体 {redundant} 个",
+        f"- 精简核心: {core} 个变体（评估量可减少约 {redundant / total:.0%}）" if total else '- 精简核心: 0 个变体',
+        '',
+    ]
+    clusters = [cluster for cluster in report['clusters'] if cluster['size'] > 1][:top]
+    if clusters:
+        lines += [
+            '### 冗余变体簇',
+            '',
+            '| 保留变体 | 簇大小 | 平均相关系数 | 夏普 | 混合策略数 |',
+            '|---------|--------|--------------|------|------------|',
+        ]
+        lines += [f"| {c['leader']} | {c['size']} | {c['mean_corr']:.2f} | {c['sharpe']:.2f} | {c['hybrid']} |"
+                  for c in clusters]
+        lines.append('')
+
+    titles = {'equal_weight': '等权', 'risk_parity': '风险平价', 'min_variance': '最小方差'}
+    portfolios = report['portfolios']
+    if portfolios:
+        lines += [
+            '### 核心组合',
+            '',
+            '| 组合 | 年化收益 | 年化波动 | 夏普 | 分散化比率 | 有效押注数 | 持仓数 |',
+            '|------|----------|----------|------|------------|------------|--------|',
+        ]
+        for kind, title in titles.items():
+            if kind in portfolios:
+                p = portfolios[kind]
+                lines.append(f"| {title} | {p['annual_return']:.2%} | {p['annual_volatility']:.2%} | "
+                             f"{p['sharpe']:.2f} | {p['diversification_ratio']:.2f} | "
+                             f"{p['effective_bets']:.1f} | {p['holdings']} |")
+        lines.append('')
+        for kind in ('risk_parity', 'min_variance'):
+            if kind not in portfolios:
+                continue
+            weights = sorted(portfolios[kind]['weights'].items(), key=lambda item: -item[1])[:top]
+            lines.append(f"**{titles[kind]}权重前{len(weights)}**: " +
+                         '，'.join(f'{name} {weight:.1%}' for name, weight in weights))
+            lines.append('')
+    return '\n'.join(lines).rstrip() + '\n'
+
+
+def build_return_series(panel: Mapping[str, np.ndarray], results: Iterable[Dict], directory: str,
+                        cost: float = 0.0005, strategies: Optional[Mapping[str, Dict]] = None) -> Dict[str, int]:
+    """按参数扫描结果回测各变体的最优参数，把收益序列写入收益序列库
+
+    每个变体的收益为各标的收益的等权平均；bar_size > 1 的变体把合并K线的收益记在
+    该组最后一根原始bar上，与其他变体对齐到同一时间轴。最优参数相同的变体只回测一次。
+    strategies为 {变体名称: 策略记录}，用于补充variant_of/variant_type/is_hybrid等信息。
+    """
+    from backtest import PERIODS_PER_YEAR as BARS_PER_YEAR, BacktestEngine, IndicatorMemo, \
+        get_backtest_strategy, memoize_indicators
+    from parameter_sweep import LeveragedStrategy, _resampled_panel
+
+    panel = BacktestEngine.prepare(panel)
+    bars = len(next(iter(panel.values())))
+    memo = IndicatorMemo()
+    memo.register(panel)
+    resampled: Dict[int, Dict[str, np.ndarray]] = {}
+    computed: Dict[Tuple, np.ndarray] = {}
+    stats = {'variants': 0, 'backtests': 0, 'skipped': 0}
+    with ReturnSeriesWriter(directory, bars) as writer:
+        for result in results:
+            base, bar_size, leverage = result['base_strategy'], int(result['bar_size']), float(result['leverage'])
+            params = tuple(sorted(result['best_params'].items()))
+            task = (base, params, bar_size, leverage)
+            required = get_backtest_strategy(base, **dict(params)).required
+            if any(field not in panel for field in required):
+                stats['skipped'] += 1
+                continue
+            if task not in computed:
+                data = _resampled_panel(panel, bar_size, resampled, memo)
+                strategy = LeveragedStrategy(get_backtest_strategy(base, **dict(params)), leverage)
+                engine = BacktestEngine(cost=cost, periods_per_year=BARS_PER_YEAR / bar_size)
+                with memoize_indicators(memo):
+                    returns = engine.run(strategy, data).returns.mean(axis=1)
+                series = np.zeros(bars)
+                # 与resample一致：分组从第一根K线开始，第k组的最后一根为 (k+1)·bar_size - 1
+                series[bar_size - 1:len(returns) * bar_size:bar_size] = returns
+                computed[task] = series
+                stats['backtests'] += 1
+            variant = {
+                'name': result['name'],
+                'category': result.get('category'),
+                'base_strategy': base,
+                'bar_size': bar_size,
+                'leverage': leverage,
+                'best_params': result['best_params'],
+            }
+            record = (strategies or {}).get(result['name'], {})
+            for field in ('variant_of', 'variant_type', 'is_hybrid', 'parent_strategies'):
+                if field in record:
+                    variant[field] = record[field]
+            writer.append(variant, computed[task])
+            stats['variants'] += 1
+    return stats
+
+
+def update_catalog(report: Mapping[str, Any], base_dir: str = '.') -> bool:
+    """把组合分析章节写入策略总目录，返回目录是否有变化"""
+    state = CatalogUpdater(base_dir).update(sections={'portfolio': render_section(report)})
+    return state['changed']
+
+
+def _iter_jsonl(path: str) -> Iterator[Dict]:
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='策略库组合分析（相关性聚类与风险平价/最小方差组合）')
+    parser.add_argument('series_dir', help='收益序列库目录')
+    parser.add_argument('--build', default=None, metavar='SWEEP_RESULTS',
+                        help='先由参数扫描结果（JSON Lines）回测最优参数并重建收益序列库')
+    parser.add_argument('--data', default=None, help='重建时使用的行情文件（.npz），指定--store时为数据集名称')
+    parser.add_argument('--store', default=None, help='本地行情库根目录（见market_data.py）')
+    parser.add_argument('--start', default=None, help='使用行情库时的起始日期')
+    parser.add_argument('--end', default=None, help='使用行情库时的结束日期')
+    parser.add_argument('--strategies', nargs='*', default=[],
+                        help='策略快照文件，用于补充变体来源信息（variant_of/is_hybrid等）')
+    parser.add_argument('--cost', type=float, default=0.0005, help='单边交易费率')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='相关系数不低于该值的变体视为冗余')
+    parser.add_argument('--shrinkage', type=float, default=DEFAULT_SHRINKAGE, help='协方差收缩比例')
+    parser.add_argument('--chunk-bars', type=int, default=DEFAULT_CHUNK_BARS, help='流式计算时每次读取的bar数')
+    parser.add_argument('--base-dir', default='.', help='策略总目录所在目录（报告也写到这里）')
+    parser.add_argument('--no-catalog', action='store_true', help='只写报告，不更新策略总目录')
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    print("=== 组合分析启动 ===")
+
+    if args.build:
+        if not args.data:
+            raise SystemExit("重建收益序列库需要指定 --data")
+        from parameter_sweep import load_panel_npz
+        from strategy_snapshots import iter_snapshot
+        if args.store:
+            from market_data import MarketDataStore
+            panel = MarketDataStore(args.store).open(args.data).slice(args.start, args.end).load()
+        else:
+            panel = load_panel_npz(args.data)
+        strategies = {strategy.get('name'): strategy
+                      for path in args.strategies for strategy in iter_snapshot(path)}
+        stats = build_return_series(panel, _iter_jsonl(args.build), args.series_dir, cost=args.cost,
+                                    strategies=strategies)
+        print(f"已写入 {stats['variants']} 个变体的收益序列（回测 {stats['backtests']} 次，"
+              f"跳过 {stats['skipped']} 个行情字段不足的变体）")
+
+    store = ReturnSeriesStore(args.series_dir)
+    analyzer = PortfolioAnalyzer(threshold=args.threshold, shrinkage=args.shrinkage, chunk_bars=args.chunk_bars)
+    report = analyzer.analyze(store)
+    path = save_report(report, args.base_dir)
+    print(f"{report['variants']} 个变体聚为 {len(report['clusters'])} 簇，精简核心 {len(report['core'])} 个变体")
+    for kind, portfolio in report['portfolios'].items():
+        print(f"  {kind}: 年化波动 {portfolio['annual_volatility']:.2%}，夏普 {portfolio['sharpe']:.2f}，"
+              f"有效押注数 {portfolio['effective_bets']:.1f}")
+    print(f"报告已保存到 {path}")
+    if not args.no_catalog:
+        changed = update_catalog(report, args.base_dir)
+        print("已更新策略总目录的组合分析章节" if changed else "策略总目录无变化")
+
+
+if __name__ == "__main__":
+    main()
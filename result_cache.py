@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+结果缓存 - 回测/评估结果的持久化内容寻址缓存
+以（策略记录, 解析后的参数, 输入数据指纹）的哈希为键，值用pickle保存（可包含numpy数组），
+磁盘占用超过上限时按最近使用时间淘汰
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import pickle
+from typing import Any, Dict, List, Optional, Tuple
+
+# 默认磁盘上限
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+# 淘汰时删到上限的这个比例以下，避免每次写入都触发淘汰
+LOW_WATERMARK = 0.9
+
+ENTRY_SUFFIX = '.pkl'
+
+
+class ResultCache:
+    """内容寻址的结果缓存（LRU磁盘淘汰）
+
+    条目保存为 cache_dir/<前两位>/<哈希>.pkl，读取命中时更新文件的修改时间作为最近使用时间，
+    写入后总大小超过max_bytes时从最久未使用的条目开始删除。写入先落临时文件再重命名，
+    多个进程共用同一目录时不会读到写了一半的条目。缓存只应存放本机生成的结果（pickle不可信任外部来源）。
+    """
+
+    def __init__(self, cache_dir: str, version: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.version = version
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evicted = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        self.nbytes = sum(size for _, size, _ in self._entries())
+
+    def key(self, *parts: Dict) -> str:
+        """由若干个可JSON序列化的字典计算缓存键"""
+        digest = hashlib.sha256(self.version.encode('utf-8'))
+        for part in parts:
+            digest.update(b'\0')
+            digest.update(json.dumps(part, ensure_ascii=False, sort_keys=True, default=str).encode('utf-8'))
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f'{key}{ENTRY_SUFFIX}')
+
+    def _entries(self) -> List[Tuple[str, int, float]]:
+        """全部条目 (路径, 字节数, 最近使用时间)"""
+        entries = []
+        for shard in os.scandir(self.cache_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(ENTRY_SUFFIX):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((entry.path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """读取条目，未命中时返回default"""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            self.misses += 1
+            return default
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: Any):
+        """写入条目（覆盖同键的旧值），必要时淘汰旧条目"""
+        path = self._path(key)
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            previous = os.path.getsize(path)
+        except OSError:
+            previous = 0
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self.nbytes += len(data) - previous
+        self.writes += 1
+        if self.nbytes > self.max_bytes:
+            self.evict()
+
+    def evict(self, max_bytes: Optional[int] = None) -> int:
+        """按最近使用时间从旧到新删除条目，直到总大小不超过上限的LOW_WATERMARK，返回删除数量"""
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        target = limit * LOW_WATERMARK
+        removed = 0
+        for path, size, _ in sorted(entries, key=lambda entry: entry[2]):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        self.nbytes = total
+        self.evicted += removed
+        return removed
+
+    def clear(self) -> int:
+        """删除全部条目"""
+        return self.evict(0)
+
+    def stats(self) -> Dict[str, int]:
+        """命中和容量统计"""
+        return {'hits': self.hits, 'misses': self.misses, 'writes': self.writes,
+                'evicted': self.evicted, 'bytes': self.nbytes}
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='结果缓存维护')
+    parser.add_argument('cache_dir', help='缓存目录')
+    parser.add_argument('--max-mb', type=float, default=DEFAULT_MAX_BYTES / 1024 / 1024,
+                        help='磁盘上限（MB），超出时淘汰最久未使用的条目')
+    parser.add_argument('--clear', action='store_true', help='清空缓存')
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    cache = ResultCache(args.cache_dir, '', max_bytes=int(args.max_mb * 1024 * 1024))
+    entries = len(cache._entries())
+    print(f"缓存 {args.cache_dir}: {entries} 个条目，{cache.nbytes / 1024 / 1024:.1f} MB")
+    if args.clear:
+        removed = cache.clear()
+    else:
+        removed = cache.evict() if cache.nbytes > cache.max_bytes else 0
+    if removed:
+        print(f"已删除 {removed} 个条目，剩余 {cache.nbytes / 1024 / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
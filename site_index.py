@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+静态站点索引构建 - 为 docs/index.html 生成分片的gzip JSON策略数据和倒排搜索索引
+页面只需加载很小的 index.json，再按需加载查询词所在的索引桶和结果所在的数据分片，
+无需下载整个策略库即可在浏览器中检索十万级策略
+"""
+
+import argparse
+import gzip
+import json
+import os
+import re
+import zlib
+from array import array
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from catalog_updater import CATEGORY_TITLES
+from strategy_snapshots import discover_snapshots, iter_snapshot
+
+# 索引格式版本（页面脚本据此判断能否解析）
+INDEX_VERSION = 1
+
+# 数据分片中保留的字段（按顺序存为数组，避免每条记录重复字段名）
+SHARD_FIELDS = ['id', 'name', 'category', 'type', 'complexity', 'indicators',
+                'logic', 'references', 'variant_of']
+
+# 参与倒排索引的字段
+SEARCH_FIELDS = ['name', 'type', 'indicators']
+
+DEFAULT_SHARD_SIZE = 2000
+
+# 英文/数字按单词切分，中文连续片段切为单字和相邻双字
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+|[\u4e00-\u9fff]+')
+
+
+def tokenize(text: str) -> List[str]:
+    """切分检索词（页面脚本中的 tokenize 必须与此保持一致）"""
+    tokens = []
+    for run in TOKEN_PATTERN.findall(str(text or '').lower()):
+        if run[0].isascii():
+            tokens.append(run)
+            continue
+        tokens.extend(run)
+        tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def token_bucket(token: str, buckets: int) -> int:
+    """词项所在的索引桶（CRC32取模，页面脚本使用相同算法）"""
+    return zlib.crc32(token.encode('utf-8')) % buckets
+
+
+def auto_buckets(total: int, target: int = 1000) -> int:
+    """按策略数量选择索引桶数：约每target条策略一个桶，取2的幂，最多256个"""
+    buckets = 1
+    while buckets * target < total and buckets < 256:
+        buckets *= 2
+    return buckets
+
+
+def iter_category(base_dir: str, category: str) -> Iterator[Dict]:
+    """依次返回分类最新的基础策略和扩展策略"""
+    for prefix in ('strategies', 'expanded_strategies'):
+        for path in discover_snapshots(base_dir, category, prefix=prefix):
+            yield from iter_snapshot(path)
+
+
+def _gzip_json(data) -> bytes:
+    """紧凑JSON + gzip（mtime固定为0，内容不变时输出字节不变）"""
+    text = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    return gzip.compress(text.encode('utf-8'), compresslevel=9, mtime=0)
+
+
+class SiteIndexBuilder:
+    """站点索引构建器
+
+    输出目录结构：
+        index.json             清单：总数、各分类的文档编号范围和分片列表、索引桶数
+        shards/{分类}-NNNN.json.gz   数据分片 {"start": 首个编号, "rows": [[字段值...]]}
+        search/NNN.json.gz     倒排索引桶 {词项: 差分编码的文档编号列表}
+    文档编号按分类连续分配，页面可直接由编号范围过滤分类、由编号定位分片。
+    """
+
+    def __init__(self, output_dir: str, shard_size: int = DEFAULT_SHARD_SIZE,
+                 buckets: Optional[int] = None):
+        if shard_size < 1:
+            raise ValueError("分片大小必须为正数")
+        self.output_dir = output_dir
+        self.shard_size = shard_size
+        self.buckets = buckets
+        self.written = 0
+        self.unchanged = 0
+
+    def _write(self, relative_path: str, data: bytes):
+        """内容变化时才原子写入，避免无关分片在版本库中产生改动"""
+        path = os.path.join(self.output_dir, relative_path)
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                if f.read() == data:
+                    self.unchanged += 1
+                    return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self.written += 1
+
+    def _remove_stale(self, subdir: str, keep: Iterable[str]):
+        """删除上次构建遗留、本次不再引用的文件"""
+        directory = os.path.join(self.output_dir, subdir)
+        if not os.path.isdir(directory):
+            return
+        keep = set(keep)
+        for filename in os.listdir(directory):
+            if filename.endswith('.json.gz') and f'{subdir}/{filename}' not in keep:
+                os.remove(os.path.join(directory, filename))
+
+    def _write_shard(self, category: str, number: int, start: int, rows: List[List]) -> str:
+        relative_path = f'shards/{category}-{number:04d}.json.gz'
+        self._write(relative_path, _gzip_json({'start': start, 'rows': rows}))
+        return relative_path
+
+    def build(self, sources: Dict[str, Iterable[Dict]]) -> Dict:
+        """从 {分类: 策略迭代器} 构建索引，返回清单
+
+        策略逐条流式处理，写满一个分片即落盘；内存中只保留倒排表（每个词项一个整型数组）。
+        """
+        postings = defaultdict(lambda: array('I'))
+        categories = []
+        shard_files = []
+        doc_id = 0
+
+        for category, strategies in sources.items():
+            start = doc_id
+            title = CATEGORY_TITLES.get(category, category)
+            shards = []
+            rows = []
+            for strategy in strategies:
+                rows.append([strategy.get(field) for field in SHARD_FIELDS])
+                text = ' '.join(str(strategy.get(field) or '') for field in SEARCH_FIELDS)
+                for token in set(tokenize(f'{text} {category} {title}')):
+                    postings[token].append(doc_id)
+                doc_id += 1
+                if len(rows) == self.shard_size:
+                    shards.append(self._write_shard(category, len(shards), doc_id - len(rows), rows))
+                    rows = []
+            if rows:
+                shards.append(self._write_shard(category, len(shards), doc_id - len(rows), rows))
+
+            categories.append({
+                'key': category,
+                'title': title,
+                'start': start,
+                'count': doc_id - start,
+                'shards': shards,
+            })
+            shard_files.extend(shards)
+
+        buckets = self.buckets or auto_buckets(doc_id)
+        bucket_terms = [dict() for _ in range(buckets)]
+        for token, ids in postings.items():
+            # 编号递增写入，差分后多为小整数，gzip压缩率高
+            deltas = [ids[0]] + [ids[i] - ids[i - 1] for i in range(1, len(ids))]
+            bucket_terms[token_bucket(token, buckets)][token] = deltas
+
+        search_files = []
+        for bucket, terms in enumerate(bucket_terms):
+            relative_path = f'search/{bucket:03d}.json.gz'
+            self._write(relative_path, _gzip_json(dict(sorted(terms.items()))))
+            search_files.append(relative_path)
+
+        self._remove_stale('shards', shard_files)
+        self._remove_stale('search', search_files)
+
+        manifest = {
+            'version': INDEX_VERSION,
+            'generated': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'total': doc_id,
+            'terms': len(postings),
+            'shard_size': self.shard_size,
+            'buckets': buckets,
+            'fields': SHARD_FIELDS,
+            'categories': categories,
+        }
+        os.makedirs(self.output_dir, exist_ok=True)
+        manifest_file = os.path.join(self.output_dir, 'index.json')
+        tmp_file = f'{manifest_file}.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, manifest_file)
+        return manifest
+
+    def build_from_library(self, base_dir: str, categories: Optional[List[str]] = None) -> Dict:
+        """从策略库目录（最新的基础策略快照 + 扩展策略）构建索引"""
+        categories = categories or list(CATEGORY_TITLES)
+        return self.build({c: iter_category(base_dir, c) for c in categories})
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='构建策略库静态站点的分片数据和搜索索引')
+    parser.add_argument('--base-dir', default='.', help='策略库根目录')
+    parser.add_argument('--output', default=os.path.join('docs', 'data'),
+                        help='索引输出目录（docs/index.html 从 data/ 加载）')
+    parser.add_argument('--shard-size', type=int, default=DEFAULT_SHARD_SIZE,
+                        help='每个数据分片的策略数')
+    parser.add_argument('--buckets', type=int, default=None,
+                        help='倒排索引桶数（默认按策略数量自动选择）')
+    parser.add_argument('--categories', nargs='+', default=None,
+                        help=f"只索引指定分类（默认: {' '.join(CATEGORY_TITLES)}）")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    builder = SiteIndexBuilder(args.output, shard_size=args.shard_size, buckets=args.buckets)
+    manifest = builder.build_from_library(args.base_dir, args.categories)
+
+    for category in manifest['categories']:
+        print(f"{category['title']}: {category['count']} 个策略，{len(category['shards'])} 个分片")
+    print(f"索引完成：{manifest['total']} 个策略，{manifest['terms']} 个词项，"
+          f"{manifest['buckets']} 个索引桶")
+    print(f"写入 {builder.written} 个文件，{builder.unchanged} 个未变化，输出目录 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
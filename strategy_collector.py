@@ -5,18 +5,38 @@
 """
 
 import os
+import argparse
 import json
 import time
 from datetime import datetime
 from typing import Dict, List, Optional
 import pandas as pd
 
+from catalog_updater import CatalogUpdater
+from pipeline_metrics import PipelineMetrics, add_metrics_arguments
+from strategy_db import StrategyDatabase
+from strategy_dedup import Deduplicator
+from strategy_snapshots import register_snapshot
+from strategy_storage import STORAGE_BACKENDS, get_storage_backend
+from strategy_table import StrategyTable
+
 class StrategyCollector:
     """策略搜集器基类"""
     
-    def __init__(self, output_dir: str = "."):
+    def __init__(self, output_dir: str = ".", storage: Optional[str] = None,
+                 db_path: Optional[str] = None, metrics: Optional[PipelineMetrics] = None):
         self.output_dir = output_dir
-        self.strategies = []
+        # 各阶段耗时和计数
+        self.metrics = metrics or PipelineMetrics('collector')
+        self.strategies = StrategyTable()
+        # 存储后端（jsonl/parquet），JSON/CSV仅作为导出格式
+        self.storage = get_storage_backend(storage, output_dir) if storage else None
+        # 各分类已写入存储后端的策略数，之后只追加新增部分
+        self.stored_counts: Dict[str, int] = {}
+        # 可选的SQLite策略目录
+        self.db = StrategyDatabase(db_path) if db_path else None
+        # 去重器：精确重复和近似重复的策略都不会再次加入
+        self.deduplicator = Deduplicator()
         self.categories = {
             'stocks': '股票策略',
             'futures': '期货策略', 
@@ -28,18 +48,19 @@ class StrategyCollector:
         for category in self.categories.keys():
             os.makedirs(os.path.join(output_dir, category), exist_ok=True)
     
-    def add_strategy(self, strategy: Dict):
-        """添加策略到列表"""
+    def add_strategy(self, strategy: Dict) -> bool:
+        """添加策略到列表，重复策略会被跳过，返回是否添加成功"""
+        if not self.deduplicator.add(strategy):
+            self.metrics.count('duplicate_strategies')
+            return False
         strategy['added_date'] = datetime.now().strftime('%Y-%m-%d')
         strategy['last_updated'] = datetime.now().strftime('%Y-%m-%d')
         self.strategies.append(strategy)
+        return True
     
     def save_to_json(self, category: str):
         """保存策略到JSON文件"""
-        category_strategies = [
-            s for s in self.strategies 
-            if s.get('category') == category
-        ]
+        category_strategies = self.strategies.filter(category=category)
         
         if not category_strategies:
             return
@@ -50,100 +71,76 @@ class StrategyCollector:
             f'strategies_{datetime.now().strftime("%Y%m%d")}.json'
         )
         
-        with open(output_file, 'w', encoding='utf-8') as f:
+        with self.metrics.stage('write_json'), open(output_file, 'w', encoding='utf-8') as f:
             json.dump(category_strategies, f, ensure_ascii=False, indent=2)
+        register_snapshot(self.output_dir, category, output_file, len(category_strategies))
         
         print(f"已保存 {len(category_strategies)} 个{self.categories[category]}到 {output_file}")
     
+    def save_to_storage(self, category: str):
+        """追加保存到存储后端，只写入上次保存之后新增的策略"""
+        if self.storage is None:
+            return
+        
+        if category not in self.stored_counts:
+            # 本次运行首次写入该分类，重新生成当天快照
+            self.storage.reset(category)
+            self.stored_counts[category] = 0
+        
+        rows = self.strategies.lookup(category=category)
+        new_rows = rows[self.stored_counts[category]:]
+        if not len(new_rows):
+            return
+        
+        with self.metrics.stage('write_storage'):
+            self.storage.append(category, self.strategies.rows(new_rows))
+        self.stored_counts[category] = len(rows)
+        
+        output_file = self.storage.path(category)
+        register_snapshot(self.output_dir, category, output_file, len(rows))
+        print(f"已追加 {len(new_rows)} 个{self.categories[category]}到 {output_file}")
+    
+    def save_to_database(self):
+        """将全部策略upsert到SQLite策略目录"""
+        if self.db is None:
+            return
+        
+        with self.metrics.stage('write_db'):
+            count = self.db.upsert_strategies(self.strategies)
+        print(f"已写入 {count} 个策略到数据库 {self.db.db_path}")
+    
     def save_to_csv(self, category: str):
         """保存策略到CSV文件"""
-        category_strategies = [
-            s for s in self.strategies 
-            if s.get('category') == category
-        ]
+        category_strategies = self.strategies.filter(category=category)
         
         if not category_strategies:
             return
         
-        df = pd.DataFrame(category_strategies)
         output_file = os.path.join(
             self.output_dir, 
             category, 
             f'strategies_{datetime.now().strftime("%Y%m%d")}.csv'
         )
         
-        df.to_csv(output_file, index=False, encoding='utf-8-sig')
+        with self.metrics.stage('write_csv'):
+            pd.DataFrame(category_strategies).to_csv(output_file, index=False, encoding='utf-8-sig')
         print(f"已保存 {len(category_strategies)} 个{self.categories[category]}到 {output_file}")
     
     def update_catalog(self):
-        """更新策略总目录"""
-        catalog_file = os.path.join(self.output_dir, 'strategies_catalog.md')
-        
-        # 读取现有目录
-        if os.path.exists(catalog_file):
-            with open(catalog_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-        else:
-            content = "# 量化交易策略总目录\n\n## 统计信息\n"
-        
-        # 更新统计信息
-        stats = {}
-        for category in self.categories.keys():
-            count = len([s for s in self.strategies if s.get('category') == category])
-            stats[category] = count
-        
-        total = sum(stats.values())
-        
-        # 生成更新内容
-        update_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        stats_section = f"""
-## 统计信息
-- **总策略数:** {total} (持续更新中)
-- **最后更新:** {update_time}
-- **覆盖市场:** 股票、期货、加密货币、期权
-
-### 各市场策略数量
-- **股票策略:** {stats.get('stocks', 0)} 个
-- **期货策略:** {stats.get('futures', 0)} 个  
-- **加密货币策略:** {stats.get('crypto', 0)} 个
-- **期权策略:** {stats.get('options', 0)} 个
-"""
+        """更新策略总目录（只重写统计信息和发生变化的分类清单）"""
+        listings = {
+            category: self.strategies.filter(category=category)
+            for category in self.categories.keys()
+        }
+        base = {category: len(rows) for category, rows in listings.items()}
+        with self.metrics.stage('update_catalog'):
+            state = CatalogUpdater(self.output_dir).update(stats={'base': base}, listings=listings)
         
-        # 替换或添加统计信息
-        if "## 统计信息" in content:
-            # 找到统计信息部分并替换
-            lines = content.split('\n')
-            new_lines = []
-            in_stats = False
-            for line in lines:
-                if line.strip().startswith("## 统计信息"):
-                    new_lines.append("## 统计信息")
-                    in_stats = True
-                elif in_stats and line.strip().startswith("## "):
-                    # 遇到下一个章节，结束替换
-                    in_stats = False
-                    new_lines.extend(stats_section.strip().split('\n'))
-                    new_lines.append(line)
-                elif not in_stats:
-                    new_lines.append(line)
-            
-            if in_stats:
-                # 如果直到文件结束都在统计信息部分
-                new_lines.extend(stats_section.strip().split('\n'))
-            
-            content = '\n'.join(new_lines)
+        if state['changed']:
+            print(f"已更新策略总目录，总计 {sum(base.values())} 个基础策略，"
+                  f"更新章节: {', '.join(state['changed'])}")
         else:
-            # 在文件开头添加统计信息
-            content = content.replace(
-                "# 量化交易策略总目录\n\n", 
-                f"# 量化交易策略总目录\n\n{stats_section}\n"
-            )
-        
-        # 保存更新后的目录
-        with open(catalog_file, 'w', encoding='utf-8') as f:
-            f.write(content)
-        
-        print(f"已更新策略总目录，总计 {total} 个策略")
+            print("策略总目录无变化")
 
 
 class KnownStrategiesCollector(StrategyCollector):
@@ -284,31 +281,69 @@ class KnownStrategiesCollector(StrategyCollector):
             options_strategies
         )
         
-        for strategy in all_strategies:
-            self.add_strategy(strategy)
+        added = sum(1 for strategy in all_strategies if self.add_strategy(strategy))
         
-        print(f"已添加 {len(all_strategies)} 个已知策略")
+        print(f"已添加 {added} 个已知策略")
+        if added < len(all_strategies):
+            print(f"跳过 {len(all_strategies) - added} 个重复策略")
 
 
-def main():
+def parse_args(argv: List[str] = None) -> argparse.Namespace:
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='量化交易策略搜集器')
+    parser.add_argument('--output-dir', default='.', help='策略库根目录')
+    parser.add_argument('--storage', choices=sorted(STORAGE_BACKENDS), default=None,
+                        help='追加写入的存储后端（JSON/CSV导出始终保留）')
+    parser.add_argument('--db', default=None, help='SQLite策略目录文件路径')
+    parser.add_argument('--sources', default=None,
+                        help='异步搜集来源配置文件（JSON，如 collector_sources.json）')
+    parser.add_argument('--concurrency', type=int, default=32, help='异步搜集的最大并发请求数')
+    parser.add_argument('--http-cache', default='.http_cache',
+                        help='条件请求缓存目录（保存ETag/Last-Modified和响应正文）')
+    add_metrics_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str] = None):
     """主函数"""
+    args = parse_args(argv)
     print("开始搜集量化交易策略...")
     
     # 创建搜集器
-    collector = KnownStrategiesCollector(output_dir='.')
-    
-    # 搜集已知策略
-    collector.collect_known_strategies()
-    
-    # 保存各分类策略
-    for category in ['stocks', 'futures', 'crypto', 'options']:
-        collector.save_to_json(category)
-        collector.save_to_csv(category)
+    metrics = PipelineMetrics.from_args('collector', args)
+    collector = KnownStrategiesCollector(output_dir=args.output_dir, storage=args.storage,
+                                         db_path=args.db, metrics=metrics)
     
-    # 更新总目录
-    collector.update_catalog()
+    with metrics.profile(args.profile):
+        # 搜集已知策略
+        with metrics.stage('collect_known'):
+            collector.collect_known_strategies()
+        
+        # 异步搜集外部来源
+        if args.sources:
+            from async_collector import AsyncStrategyCollector, load_sources
+            with metrics.stage('collect_sources'):
+                stats = AsyncStrategyCollector(collector, load_sources(args.sources),
+                                               concurrency=args.concurrency,
+                                               cache_dir=args.http_cache).collect()
+            for key in ('requests', 'not_modified', 'failed', 'added'):
+                metrics.count(f'source_{key}', stats[key])
+            print(f"外部来源：请求 {stats['requests']} 次（未修改 {stats['not_modified']}，"
+                  f"失败 {stats['failed']}），新增 {stats['added']} 个策略，跳过 {stats['duplicates']} 个重复策略")
+        
+        # 保存各分类策略
+        for category in ['stocks', 'futures', 'crypto', 'options']:
+            collector.save_to_storage(category)
+            collector.save_to_json(category)
+            collector.save_to_csv(category)
+        collector.save_to_database()
+        
+        # 更新总目录
+        collector.update_catalog()
     
+    metrics.count('strategies', len(collector.strategies))
     print("策略搜集完成！")
+    metrics.report(args)
 
 
 if __name__ == "__main__":
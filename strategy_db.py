@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+策略数据库 - 基于SQLite的本地策略目录
+支持批量upsert和按分类/类型/父策略的索引查询，无需加载全部快照文件
+"""
+
+import json
+import sqlite3
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Optional
+
+# 单独建列（并可建索引）的字段，其余字段保存在data列的JSON中
+STRATEGY_COLUMNS = ('name', 'category', 'type', 'complexity', 'source', 'added_date', 'last_updated')
+VARIANT_COLUMNS = ('id', 'name', 'category', 'type', 'complexity', 'variant_of', 'variant_type',
+                   'is_hybrid', 'added_date', 'last_updated')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS strategies (
+    name TEXT NOT NULL,
+    category TEXT NOT NULL,
+    type TEXT,
+    complexity TEXT,
+    source TEXT,
+    added_date TEXT,
+    last_updated TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (name, category)
+);
+CREATE INDEX IF NOT EXISTS idx_strategies_category ON strategies (category);
+CREATE INDEX IF NOT EXISTS idx_strategies_type ON strategies (type);
+
+CREATE TABLE IF NOT EXISTS variants (
+    id TEXT,
+    name TEXT NOT NULL,
+    category TEXT NOT NULL,
+    type TEXT,
+    complexity TEXT,
+    variant_of TEXT,
+    variant_type TEXT,
+    is_hybrid INTEGER NOT NULL DEFAULT 0,
+    added_date TEXT,
+    last_updated TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (name, category)
+);
+CREATE INDEX IF NOT EXISTS idx_variants_category ON variants (category);
+CREATE INDEX IF NOT EXISTS idx_variants_type ON variants (type);
+CREATE INDEX IF NOT EXISTS idx_variants_variant_of ON variants (variant_of);
+CREATE INDEX IF NOT EXISTS idx_variants_variant_type ON variants (variant_type);
+"""
+
+TABLE_COLUMNS = {
+    'strategies': STRATEGY_COLUMNS,
+    'variants': VARIANT_COLUMNS,
+}
+
+
+class StrategyDatabase:
+    """SQLite策略目录
+
+    strategies表保存基础策略，variants表保存扩展变体和混合策略，
+    两张表都以(name, category)为主键，重复写入时更新已有记录。
+    """
+
+    def __init__(self, db_path: str, batch_size: int = 10000):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.conn = sqlite3.connect(db_path)
+        self.conn.row_factory = sqlite3.Row
+        # WAL模式下读写互不阻塞，批量写入时无需每次fsync
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+
+    def _upsert(self, table: str, records: Iterable[Dict]) -> int:
+        """在单个事务内分批executemany写入，返回写入数量"""
+        columns = TABLE_COLUMNS[table]
+        updates = ', '.join(f'{c} = excluded.{c}' for c in columns + ('data',)
+                            if c not in ('name', 'category'))
+        sql = (
+            f"INSERT INTO {table} ({', '.join(columns)}, data) "
+            f"VALUES ({', '.join('?' for _ in columns)}, ?) "
+            f"ON CONFLICT (name, category) DO UPDATE SET {updates}"
+        )
+
+        rows = (
+            tuple(_column_value(record, c) for c in columns)
+            + (json.dumps(record, ensure_ascii=False),)
+            for record in records
+        )
+        total = 0
+        with self.conn:
+            while True:
+                batch = list(islice(rows, self.batch_size))
+                if not batch:
+                    break
+                self.conn.executemany(sql, batch)
+                total += len(batch)
+        return total
+
+    def upsert_strategies(self, strategies: Iterable[Dict]) -> int:
+        """批量写入基础策略"""
+        return self._upsert('strategies', strategies)
+
+    def upsert_variants(self, variants: Iterable[Dict]) -> int:
+        """批量写入扩展变体和混合策略"""
+        return self._upsert('variants', variants)
+
+    def _where(self, table: str, filters: Dict[str, Any]) -> tuple:
+        """根据过滤条件生成WHERE子句（只允许按建列字段过滤）"""
+        columns = TABLE_COLUMNS[table]
+        clauses, params = [], []
+        for field, value in filters.items():
+            if field not in columns:
+                raise ValueError(f"{table}表不支持按 {field} 查询")
+            clauses.append(f'{field} = ?')
+            params.append(_column_value({field: value}, field))
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ''
+        return where, params
+
+    def query(self, table: str = 'strategies', limit: Optional[int] = None,
+              **filters: Any) -> List[Dict]:
+        """按字段查询策略，例如 query('variants', category='crypto', variant_type='ml_enhancement')"""
+        where, params = self._where(table, filters)
+        sql = f'SELECT data FROM {table}{where} ORDER BY rowid'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        return [json.loads(row['data']) for row in self.conn.execute(sql, params)]
+
+    def count(self, table: str = 'strategies', **filters: Any) -> int:
+        """统计满足条件的策略数量"""
+        where, params = self._where(table, filters)
+        return self.conn.execute(f'SELECT COUNT(*) FROM {table}{where}', params).fetchone()[0]
+
+    def get(self, name: str, category: Optional[str] = None,
+            table: str = 'strategies') -> Optional[Dict]:
+        """按名称查找单个策略"""
+        filters = {'name': name}
+        if category is not None:
+            filters['category'] = category
+        results = self.query(table, limit=1, **filters)
+        return results[0] if results else None
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def _column_value(record: Dict, column: str) -> Any:
+    """取出建列字段的值（is_hybrid存为0/1）"""
+    value = record.get(column)
+    if column == 'is_hybrid':
+        return int(bool(value))
+    return value
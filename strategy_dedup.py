@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+策略去重 - 精确键哈希 + MinHash/LSH近似重复检测
+逐条增量判断，整体复杂度与记录数近似线性
+"""
+
+import hashlib
+import re
+import unicodedata
+import zlib
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+import numpy as np
+
+# MinHash使用的梅森素数 2^61-1
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+
+# 规范化时去除的空白和标点
+_PUNCTUATION = re.compile(r'[\s\W_]+', re.UNICODE)
+
+
+def normalize_text(text: str) -> str:
+    """规范化文本：全角转半角、转小写、去除空白和标点"""
+    text = unicodedata.normalize('NFKC', str(text or '')).lower()
+    return _PUNCTUATION.sub('', text)
+
+
+def exact_key(strategy: Dict) -> bytes:
+    """精确去重键：规范化后的 名称 + 分类 + 核心逻辑"""
+    content = '\0'.join(
+        normalize_text(strategy.get(field, ''))
+        for field in ('name', 'category', 'logic')
+    )
+    return hashlib.blake2b(content.encode('utf-8'), digest_size=16).digest()
+
+
+def shingles(text: str, size: int = 3) -> Set[str]:
+    """字符n-gram集合（中文文本按字符切分比按词更稳定）"""
+    text = normalize_text(text)
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+class MinHasher:
+    """向量化MinHash：一次计算所有置换下的最小哈希"""
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        rng = np.random.RandomState(seed)
+        # 与datasketch相同：a、b取[0, 2^61-1)内的随机数，a*h + b 按uint64溢出回绕后再取模
+        self.a = rng.randint(1, 1 << 61, size=num_perm, dtype=np.int64).astype(np.uint64)
+        self.b = rng.randint(0, 1 << 61, size=num_perm, dtype=np.int64).astype(np.uint64)
+
+    def signature(self, tokens: Set[str]) -> np.ndarray:
+        """计算集合的MinHash签名（uint32数组）"""
+        hashes = np.fromiter(
+            (zlib.crc32(token.encode('utf-8')) for token in tokens),
+            dtype=np.uint64, count=len(tokens),
+        )
+        permuted = (np.outer(hashes, self.a) + self.b) % _MERSENNE_PRIME
+        return (permuted.min(axis=0) & np.uint64(0xFFFFFFFF)).astype(np.uint32)
+
+
+class Deduplicator:
+    """增量策略去重器
+
+    1. 精确重复：exact_key相同即视为重复，适用于所有记录，
+       可防止重复运行搜集/扩展导致策略库翻倍。
+    2. 近似重复：对核心逻辑和技术指标做MinHash，按LSH分桶只比较
+       同桶候选，估计Jaccard相似度达到threshold即视为重复。
+       只作用于搜集得到的原始策略；扩展变体按规则从基础策略派生，
+       同一基础策略的变体本就共享逻辑文本，只做精确去重。
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 64, bands: int = 16,
+                 near_duplicates: bool = True):
+        if num_perm % bands:
+            raise ValueError("num_perm必须是bands的整数倍")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows_per_band = num_perm // bands
+        self.near_duplicates = near_duplicates
+        self.hasher = MinHasher(num_perm)
+
+        self.exact_keys: Set[bytes] = set()
+        # 已登记签名按行存放，容量不足时成倍扩容，便于批量比较候选
+        self.signatures = np.zeros((1024, num_perm), dtype=np.uint32)
+        self.names: List[str] = []
+        self.buckets: Dict[tuple, List[int]] = {}
+        self.exact_duplicates = 0
+        self.near_duplicate_count = 0
+
+    @staticmethod
+    def _is_generated(strategy: Dict) -> bool:
+        return bool(strategy.get('variant_of') or strategy.get('is_hybrid'))
+
+    def _band_keys(self, strategy: Dict, signature: np.ndarray) -> List[tuple]:
+        """LSH分桶键（按分类隔离，不同市场的同名策略不互相比较）"""
+        category = strategy.get('category')
+        r = self.rows_per_band
+        return [
+            (category, band, signature[band * r:(band + 1) * r].tobytes())
+            for band in range(self.bands)
+        ]
+
+    def _signature(self, strategy: Dict) -> Optional[np.ndarray]:
+        """需要做近似去重时返回MinHash签名，否则返回None"""
+        if not self.near_duplicates or self._is_generated(strategy):
+            return None
+        tokens = shingles(f"{strategy.get('logic', '')} {strategy.get('indicators', '')}")
+        return self.hasher.signature(tokens) if tokens else None
+
+    def _near_match(self, strategy: Dict, signature: np.ndarray) -> Optional[str]:
+        """在LSH同桶候选中查找相似度达到阈值的已登记策略"""
+        candidates = set()
+        for key in self._band_keys(strategy, signature):
+            candidates.update(self.buckets.get(key, ()))
+        if not candidates:
+            return None
+
+        candidates = np.fromiter(sorted(candidates), dtype=np.int64, count=len(candidates))
+        similarity = (self.signatures[candidates] == signature).mean(axis=1)
+        matches = np.flatnonzero(similarity >= self.threshold)
+        return self.names[candidates[matches[0]]] if len(matches) else None
+
+    def find_duplicate(self, strategy: Dict) -> Optional[str]:
+        """返回与之重复的已登记策略名称，不重复时返回None（不登记）"""
+        if exact_key(strategy) in self.exact_keys:
+            return strategy.get('name', '')
+        signature = self._signature(strategy)
+        if signature is None:
+            return None
+        return self._near_match(strategy, signature)
+
+    def add(self, strategy: Dict) -> bool:
+        """登记策略，返回True表示是新策略，False表示重复"""
+        key = exact_key(strategy)
+        if key in self.exact_keys:
+            self.exact_duplicates += 1
+            return False
+
+        signature = self._signature(strategy)
+        if signature is not None:
+            if self._near_match(strategy, signature) is not None:
+                self.near_duplicate_count += 1
+                return False
+            record = len(self.names)
+            if record == len(self.signatures):
+                self.signatures = np.concatenate([self.signatures, np.zeros_like(self.signatures)])
+            self.signatures[record] = signature
+            self.names.append(strategy.get('name', ''))
+            for band_key in self._band_keys(strategy, signature):
+                self.buckets.setdefault(band_key, []).append(record)
+
+        self.exact_keys.add(key)
+        return True
+
+    def filter(self, strategies: Iterable[Dict]) -> Iterator[Dict]:
+        """惰性过滤掉重复策略"""
+        for strategy in strategies:
+            if self.add(strategy):
+                yield strategy
+
+    @property
+    def duplicates(self) -> int:
+        """累计发现的重复数"""
+        return self.exact_duplicates + self.near_duplicate_count
@@ -4,82 +4,187 @@
 目标：从9个基础策略扩展到100+个策略
 """
 
+import argparse
 import json
 import os
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Any
+from itertools import chain, islice
+from typing import Dict, List, Any, Iterable, Iterator, Optional
 import random
 
+from catalog_updater import CatalogUpdater
+from expansion_cache import ExpansionCache
+from hybrid_pairing import PAIRING_POLICIES, NeighborPairing, PairingPolicy, get_pairing_policy
+from pipeline_metrics import PipelineMetrics, add_metrics_arguments
+from portfolio_analytics import load_report, render_section
+from strategy_db import StrategyDatabase
+from strategy_dedup import Deduplicator
+from strategy_snapshots import load_categories
+from strategy_storage import STORAGE_BACKENDS, JsonlBackend, StorageBackend, get_storage_backend
+from strategy_table import MISSING, StrategyTable
+from variant_rules import DEFAULT_RULES_FILE, VariantRuleEngine
+
+# 生成器版本号：修改生成代码后需要递增，使扩展缓存失效（规则文件的变化由其指纹体现）
+GENERATOR_VERSION = '1'
+
+
+def format_csv_row(strategy: Dict, headers: List[str]) -> str:
+    """将策略格式化为一行简化CSV（字段加引号，逗号替换为分号）"""
+    row = []
+    for header in headers:
+        value = str(strategy.get(header, '')).replace(',', ';')
+        row.append(f'"{value}"')
+    return ','.join(row)
+
+
+class IncrementalStrategyWriter:
+    """按分类增量写入策略（存储后端 + CSV导出）
+    
+    策略先进入缓冲区，累计batch_size条后统一落盘，
+    因此内存中最多只保留batch_size条策略。
+    存储后端默认为JSON Lines，也可使用Parquet；指定db时同时upsert到SQLite。
+    """
+    
+    def __init__(self, base_dir: str = ".", batch_size: int = 1000,
+                 prefix: str = 'expanded_strategies',
+                 storage: Optional[StorageBackend] = None,
+                 db: Optional[StrategyDatabase] = None,
+                 metrics: Optional[PipelineMetrics] = None):
+        self.base_dir = base_dir
+        self.batch_size = max(1, batch_size)
+        self.prefix = prefix
+        self.storage = storage or JsonlBackend(base_dir, prefix=prefix)
+        self.db = db
+        self.metrics = metrics or PipelineMetrics('writer')
+        self.date_str = self.storage.date_str
+        self.buffers: Dict[str, List[Dict]] = {}
+        self.pending = 0
+        self.headers: Dict[str, List[str]] = {}
+        self.counts: Dict[str, int] = {}
+        self.csv_files: Dict[str, Any] = {}
+    
+    def _csv_path(self, category: str) -> str:
+        """返回分类对应的CSV导出路径"""
+        return os.path.join(self.base_dir, category, f'{self.prefix}_{self.date_str}.csv')
+    
+    def _open(self, category: str):
+        """首次写入某分类时清空当天快照并打开CSV文件"""
+        os.makedirs(os.path.join(self.base_dir, category), exist_ok=True)
+        self.storage.reset(category)
+        csv_f = open(self._csv_path(category), 'w', encoding='utf-8-sig')
+        self.csv_files[category] = csv_f
+        return csv_f
+    
+    def write(self, strategy: Dict):
+        """写入单个策略，缓冲区满时自动落盘"""
+        self.buffers.setdefault(strategy['category'], []).append(strategy)
+        self.pending += 1
+        if self.pending >= self.batch_size:
+            self.flush()
+    
+    def flush(self):
+        """将缓冲区中的策略写入文件"""
+        for category, strategies in self.buffers.items():
+            csv_f = self.csv_files.get(category) or self._open(category)
+            
+            if category not in self.headers:
+                # 与save_expanded_strategies一致，以首条策略的字段作为CSV表头
+                self.headers[category] = list(strategies[0].keys())
+                csv_f.write(','.join(self.headers[category]) + '\n')
+            headers = self.headers[category]
+            
+            with self.metrics.stage('write_storage'):
+                self.storage.append(category, strategies)
+            if self.db is not None:
+                with self.metrics.stage('write_db'):
+                    self.db.upsert_variants(strategies)
+            with self.metrics.stage('write_csv'):
+                csv_f.write(''.join(
+                    format_csv_row(s, headers) + '\n' for s in strategies
+                ))
+            self.counts[category] = self.counts.get(category, 0) + len(strategies)
+        
+        self.buffers = {}
+        self.pending = 0
+    
+    def close(self):
+        """落盘剩余策略并关闭所有文件"""
+        self.flush()
+        for f in self.csv_files.values():
+            f.close()
+        self.csv_files = {}
+        
+        for category, count in self.counts.items():
+            print(f"已保存 {count} 个{category}策略到 {self.storage.path(category)} 和 {self._csv_path(category)}")
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
 class StrategyExpander:
     """策略扩展器"""
     
-    def __init__(self, base_dir: str = "."):
+    def __init__(self, base_dir: str = ".", cache_dir: Optional[str] = None,
+                 snapshot_mode: str = 'latest', storage: Optional[str] = None,
+                 db_path: Optional[str] = None,
+                 hybrid_policy: Optional[PairingPolicy] = None,
+                 variant_rules: Optional[VariantRuleEngine] = None,
+                 metrics: Optional[PipelineMetrics] = None):
         self.base_dir = base_dir
-        self.strategies = []
-        self.expanded_strategies = []
+        # 各阶段耗时和计数（并行模式下子进程内的生成耗时计入父进程的等待时间）
+        self.metrics = metrics or PipelineMetrics('expander')
+        # 变体规则（默认读取 variant_rules.json）
+        self.variant_rules = variant_rules or VariantRuleEngine.from_file()
+        # 混合策略的配对方式，默认与后面2个相邻同类策略配对
+        self.hybrid_policy = hybrid_policy or NeighborPairing()
+        # 扩展策略的存储后端（jsonl/parquet），JSON/CSV仅作为导出格式
+        self.storage = get_storage_backend(storage, base_dir, prefix='expanded_strategies') if storage else None
+        # 可选的SQLite策略目录
+        self.db = StrategyDatabase(db_path) if db_path else None
+        # 基础策略和扩展策略共用的去重器，重复运行不会使策略库翻倍
+        self.deduplicator = Deduplicator()
+        # 'latest' 只加载各分类最新快照，'all' 加载全部历史快照
+        self.snapshot_mode = snapshot_mode
+        # 启用增量扩展时，按基础策略内容哈希缓存已生成的变体
+        self.cache = ExpansionCache(
+            cache_dir, f'{GENERATOR_VERSION}-{self.variant_rules.fingerprint}'
+        ) if cache_dir else None
+        self.strategies = StrategyTable()
+        # 扩展策略以基础策略为父行，只存储被变体覆盖的字段
+        self.expanded_strategies = StrategyTable(base=self.strategies)
+        self._reset_stats()
         
     def load_existing_strategies(self):
-        """加载现有策略"""
+        """加载现有策略
+        
+        通过快照清单（或扫描目录）查找各分类的快照文件，不依赖当天日期；
+        各分类并发增量解析，按固定分类顺序合并。
+        """
         categories = ['stocks', 'futures', 'crypto', 'options']
         
-        for category in categories:
-            json_file = os.path.join(self.base_dir, category, f'strategies_{datetime.now().strftime("%Y%m%d")}.json')
-            if os.path.exists(json_file):
-                with open(json_file, 'r', encoding='utf-8') as f:
-                    category_strategies = json.load(f)
-                    self.strategies.extend(category_strategies)
+        with self.metrics.stage('load'):
+            loaded = load_categories(self.base_dir, categories, mode=self.snapshot_mode)
+            duplicates = self.deduplicator.duplicates
+            for category in categories:
+                self.strategies.extend(self.deduplicator.filter(loaded.pop(category)))
+        self.metrics.count('base_strategies', len(self.strategies))
+        self.metrics.count('duplicate_base_strategies', self.deduplicator.duplicates - duplicates)
         
         print(f"已加载 {len(self.strategies)} 个基础策略")
+        if self.deduplicator.duplicates > duplicates:
+            print(f"跳过 {self.deduplicator.duplicates - duplicates} 个重复的基础策略")
     
-    def generate_variants(self, strategy: Dict) -> List[Dict]:
-        """为单个策略生成变体"""
-        variants = []
-        base_name = strategy['name']
-        
-        # 1. 时间周期变体
-        timeframes = ['日内', '日线', '周线', '月线']
-        for tf in timeframes:
-            variant = strategy.copy()
-            variant['name'] = f"{base_name} ({tf})"
-            variant['timeframe'] = tf
-            variant['variant_of'] = base_name
-            variant['variant_type'] = 'timeframe'
-            variants.append(variant)
-        
-        # 2. 参数优化变体
-        param_variants = [
-            {'name': f"{base_name} (激进版)", 'risk_level': '高', 'aggressiveness': '激进'},
-            {'name': f"{base_name} (保守版)", 'risk_level': '低', 'aggressiveness': '保守'},
-            {'name': f"{base_name} (平衡版)", 'risk_level': '中', 'aggressiveness': '平衡'},
-        ]
-        
-        for param in param_variants:
-            variant = strategy.copy()
-            variant.update(param)
-            variant['variant_of'] = base_name
-            variant['variant_type'] = 'parameters'
-            variants.append(variant)
-        
-        # 3. 技术指标组合变体
-        indicator_combinations = [
-            {'indicators': f"{strategy.get('indicators', '')} + MACD", 'name': f"{base_name} (MACD增强)"},
-            {'indicators': f"{strategy.get('indicators', '')} + 布林带", 'name': f"{base_name} (布林带增强)"},
-            {'indicators': f"{strategy.get('indicators', '')} + KDJ", 'name': f"{base_name} (KDJ增强)"},
-        ]
-        
-        for combo in indicator_combinations:
-            variant = strategy.copy()
-            variant.update(combo)
-            variant['variant_of'] = base_name
-            variant['variant_type'] = 'indicators'
-            variants.append(variant)
-        
-        return variants
+    def generate_variants(self, strategy: Dict) -> Iterator[Dict]:
+        """按变体规则为单个策略生成全部变体（惰性生成）"""
+        return self.variant_rules.generate(strategy)
     
-    def generate_hybrid_strategies(self, strategy1: Dict, strategy2: Dict) -> List[Dict]:
-        """生成混合策略"""
-        hybrids = []
-        
+    def generate_hybrid_strategies(self, strategy1: Dict, strategy2: Dict) -> Iterator[Dict]:
+        """生成混合策略（惰性生成）"""
         # 基础混合
         hybrid = {
             'name': f"{strategy1['name']} + {strategy2['name']} 混合策略",
@@ -95,240 +200,393 @@ class StrategyExpander:
             'is_hybrid': True,
             'parent_strategies': [strategy1['name'], strategy2['name']]
         }
-        hybrids.append(hybrid)
-        
-        return hybrids
+        yield hybrid
     
-    def generate_market_specific_variants(self, strategy: Dict) -> List[Dict]:
-        """生成市场特定变体"""
-        variants = []
-        base_name = strategy['name']
-        original_category = strategy['category']
+    def generate_hybrid_combination(self, strategies: List[Dict]) -> Iterator[Dict]:
+        """为任意数量（>=2）的同类策略生成混合策略（惰性生成）"""
+        if len(strategies) == 2:
+            yield from self.generate_hybrid_strategies(*strategies)
+            return
         
-        # 映射不同市场的对应策略
-        market_mapping = {
-            'stocks': ['A股', '美股', '港股'],
-            'futures': ['商品期货', '金融期货', '股指期货'],
-            'crypto': ['比特币', '以太坊', '山寨币'],
-            'options': ['股票期权', '指数期权', '商品期权']
+        names = [s['name'] for s in strategies]
+        hybrid = {
+            'name': f"{' + '.join(names)} 混合策略",
+            'category': strategies[0]['category'],
+            'type': '混合策略',
+            'complexity': '中级' if all(s['complexity'] == '基础' for s in strategies) else '高级',
+            'logic': f"结合{'、'.join(s['name'] + '的' + s['logic'] for s in strategies)}，通过加权信号进行交易决策",
+            'indicators': ', '.join(str(s.get('indicators', '')) for s in strategies),
+            'language': 'Python',
+            'data_requirements': ' + '.join(str(s.get('data_requirements', '')) for s in strategies),
+            'source': '策略混合生成',
+            'references': f"基于{'、'.join(names)}",
+            'is_hybrid': True,
+            'parent_strategies': names
         }
+        yield hybrid
+    
+    def iter_base_variants(self, strategies: Iterable[Dict]) -> Iterator[Dict]:
+        """惰性生成一组基础策略的全部变体（不含ID）"""
+        for strategy in strategies:
+            yield from self.generate_variants(strategy)
+    
+    def iter_hybrid_groups(self) -> Iterator[List[Dict]]:
+        """按配对策略惰性枚举参与混合的基础策略组合"""
+        groups = self.hybrid_policy.combinations(self.strategies)
+        for rows in self.metrics.timed_iter('hybrid_pairing', groups):
+            yield [self.strategies[row] for row in rows]
+    
+    def _announce_hybrids(self):
+        """开始生成混合策略前打印配对方式和预计数量"""
+        policy = self.hybrid_policy
+        print(f"生成混合策略...（{type(policy).__name__}，预计 {policy.estimate(self.strategies)} 组）")
+    
+    def iter_hybrid_strategies(self) -> Iterator[Dict]:
+        """惰性生成混合策略（策略组合）"""
+        self._announce_hybrids()
+        for group in self.iter_hybrid_groups():
+            yield from self.generate_hybrid_combination(group)
+    
+    def iter_parallel_strategies(self, workers: int, chunk_size: int = 0) -> Iterator[Dict]:
+        """使用进程池分片生成变体和混合策略，按原顺序返回结果（不含ID）"""
+        total = len(self.strategies)
+        if not chunk_size:
+            # 每个进程分到约4个分片，兼顾负载均衡和进程间通信开销
+            chunk_size = max(1, -(-total // (workers * 4)))
+        starts = range(0, total, chunk_size)
+        expander_cls = type(self)
         
-        target_markets = market_mapping.get(original_category, [])
-        for market in target_markets:
-            variant = strategy.copy()
-            variant['name'] = f"{base_name} ({market})"
-            variant['market_specific'] = market
-            variant['variant_of'] = base_name
-            variant['variant_type'] = 'market'
-            variants.append(variant)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            base_tasks = (
+                (_expand_base_shard, expander_cls, self.base_dir, self.variant_rules,
+                 self.strategies[start:start + chunk_size])
+                for start in starts
+            )
+            for shard in self.metrics.timed_iter('variants', _ordered_map(executor, base_tasks, workers * 2)):
+                yield from shard
+            
+            self._announce_hybrids()
+            # 组合在父进程中惰性枚举，按chunk_size组一个分片提交，不会一次性展开全部组合
+            groups = self.iter_hybrid_groups()
+            hybrid_tasks = (
+                (_expand_hybrid_groups, expander_cls, self.base_dir, self.variant_rules, shard)
+                for shard in iter(lambda: list(islice(groups, chunk_size)), [])
+            )
+            for shard in self.metrics.timed_iter('hybrids', _ordered_map(executor, hybrid_tasks, workers * 2)):
+                yield from shard
+    
+    def iter_base_groups(self, strategies: List[Dict], workers: int = 1) -> Iterator[List[Dict]]:
+        """按顺序为每个基础策略生成一组变体，workers > 1 时使用进程池"""
+        if workers <= 1 or len(strategies) <= 1:
+            for strategy in strategies:
+                yield list(self.iter_base_variants([strategy]))
+            return
         
-        return variants
+        chunk_size = max(1, -(-len(strategies) // (workers * 4)))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            tasks = (
+                (_expand_base_groups, type(self), self.base_dir, self.variant_rules,
+                 strategies[start:start + chunk_size])
+                for start in range(0, len(strategies), chunk_size)
+            )
+            for shard in _ordered_map(executor, tasks, workers * 2):
+                yield from shard
     
-    def generate_ml_enhanced_variants(self, strategy: Dict) -> List[Dict]:
-        """生成机器学习增强变体"""
-        variants = []
-        base_name = strategy['name']
+    def iter_cached_strategies(self, workers: int = 1) -> Iterator[Dict]:
+        """增量扩展：复用缓存中未变化基础策略的变体，只为新增或修改的策略重新生成（不含ID）"""
+        cache = self.cache
+        keys = [cache.key(strategy) for strategy in self.strategies]
+        
+        # 先为缓存中缺失的基础策略生成变体，写入缓存并保留在内存中
+        missing = [row for row, key in enumerate(keys) if not cache.contains(key)]
+        missing_strategies = [self.strategies[row] for row in missing]
+        generated = self.metrics.timed_iter('variants', self.iter_base_groups(missing_strategies, workers))
+        fresh = {}
+        for row, variants in zip(missing, generated):
+            cache.put(keys[row], variants)
+            fresh[row] = variants
+        
+        # 再按原顺序输出，保证ID分配与完整扩展一致；只有原本已缓存的条目才从缓存读取
+        for row, key in enumerate(keys):
+            variants = fresh.pop(row, None)
+            if variants is None:
+                variants = cache.get(key)
+            if variants is None:
+                variants = list(self.iter_base_variants([self.strategies[row]]))
+                cache.put(key, variants)
+            yield from variants
+        
+        self._announce_hybrids()
+        for group in self.iter_hybrid_groups():
+            key = cache.key(*group)
+            hybrids = cache.get(key)
+            if hybrids is None:
+                hybrids = list(self.metrics.timed_iter('hybrids', self.generate_hybrid_combination(group)))
+                cache.put(key, hybrids)
+            yield from hybrids
         
-        ml_enhancements = [
-            {
-                'name': f"{base_name} (LSTM信号过滤)",
-                'type': f"{strategy['type']} + 机器学习",
-                'complexity': '高级',
-                'logic': f"使用LSTM神经网络对{strategy['name']}的原始信号进行过滤和优化",
-                'indicators': f"{strategy.get('indicators', '')}, LSTM神经网络",
-                'ml_technique': 'LSTM'
-            },
-            {
-                'name': f"{base_name} (XGBoost优化)",
-                'type': f"{strategy['type']} + 机器学习", 
-                'complexity': '高级',
-                'logic': f"使用XGBoost模型优化{strategy['name']}的交易参数和时机选择",
-                'indicators': f"{strategy.get('indicators', '')}, XGBoost模型",
-                'ml_technique': 'XGBoost'
-            },
-            {
-                'name': f"{base_name} (强化学习)",
-                'type': f"{strategy['type']} + 强化学习",
-                'complexity': '高级',
-                'logic': f"使用强化学习算法动态调整{strategy['name']}的交易策略",
-                'indicators': f"{strategy.get('indicators', '')}, 强化学习模型",
-                'ml_technique': 'Reinforcement Learning'
-            }
-        ]
+        evicted = cache.evict_unused()
+        stats = cache.stats()
+        self.metrics.count('cache_hits', stats['hits'])
+        self.metrics.count('cache_misses', stats['misses'])
+        print(f"扩展缓存：复用 {stats['hits']} 组，重新生成 {stats['misses']} 组，清理 {evicted} 个过期条目")
+    
+    def iter_expanded_strategies(self, workers: int = 1) -> Iterator[Dict]:
+        """按固定顺序惰性生成全部扩展策略，并添加唯一ID和时间戳
         
-        for enhancement in ml_enhancements:
-            variant = strategy.copy()
-            variant.update(enhancement)
-            variant['variant_of'] = base_name
-            variant['variant_type'] = 'ml_enhancement'
-            variants.append(variant)
+        workers > 1 时使用进程池并行生成，结果按原顺序合并，
+        因此ID分配与单进程模式完全一致；启用缓存时只重新生成有变化的部分。
+        """
+        metrics = self.metrics
+        if self.cache is not None:
+            # 自身耗时即缓存读写耗时，缓存未命中时的生成计入variants/hybrids
+            raw_strategies = metrics.timed_iter('cache', self.iter_cached_strategies(workers))
+        elif workers > 1:
+            raw_strategies = self.iter_parallel_strategies(workers)
+        else:
+            raw_strategies = chain(
+                metrics.timed_iter('variants', self.iter_base_variants(self.strategies)),
+                metrics.timed_iter('hybrids', self.iter_hybrid_strategies()),
+            )
         
-        return variants
+        # 先去重再分配ID，ID保持连续
+        duplicates = self.deduplicator.duplicates
+        unique_strategies = metrics.timed_iter('dedup', self.deduplicator.filter(raw_strategies))
+        yield from metrics.timed_iter('assign_ids', self._assign_ids(unique_strategies))
+        metrics.count('duplicate_variants', self.deduplicator.duplicates - duplicates)
+    
+    def _assign_ids(self, strategies: Iterable[Dict]) -> Iterator[Dict]:
+        """按顺序为去重后的扩展策略分配ID和时间戳"""
+        today = datetime.now().strftime('%Y-%m-%d')
+        for idx, strategy in enumerate(strategies):
+            strategy['id'] = f"strategy_{idx+1000:04d}"
+            strategy['added_date'] = today
+            strategy['last_updated'] = today
+            strategy['generated_by'] = 'StrategyExpander'
+            yield strategy
+    
+    def _accumulate_stats(self, strategy: Dict):
+        """累加单个扩展策略的统计信息（流式模式下策略不入表，无法使用索引）"""
+        stats = self.expansion_stats
+        category = strategy['category']
+        stats['total'] += 1
+        stats['categories'][category] = stats['categories'].get(category, 0) + 1
+        if strategy.get('variant_type') == 'ml_enhancement':
+            stats['ml_enhanced'] += 1
+        if strategy.get('is_hybrid', False):
+            stats['hybrid'] += 1
     
-    def expand_strategies(self):
+    def _table_stats(self) -> Dict:
+        """从扩展策略表的二级索引直接读取统计信息"""
+        table = self.expanded_strategies
+        return {
+            'total': len(table),
+            'categories': table.value_counts('category'),
+            'ml_enhanced': table.count(variant_type='ml_enhancement'),
+            'hybrid': table.count(is_hybrid=True),
+        }
+    
+    def _reset_stats(self):
+        """重置扩展统计信息"""
+        self.expansion_stats = {'total': 0, 'categories': {}, 'ml_enhanced': 0, 'hybrid': 0}
+    
+    def expand_strategies(self, workers: int = 1):
         """扩展策略库"""
         print("开始扩展策略库...")
         
         # 加载现有策略
         self.load_existing_strategies()
         
-        # 为每个基础策略生成变体
-        for strategy in self.strategies:
-            # 1. 基础变体
-            variants = self.generate_variants(strategy)
-            self.expanded_strategies.extend(variants)
-            
-            # 2. 市场特定变体
-            market_variants = self.generate_market_specific_variants(strategy)
-            self.expanded_strategies.extend(market_variants)
-            
-            # 3. 机器学习增强变体
-            ml_variants = self.generate_ml_enhanced_variants(strategy)
-            self.expanded_strategies.extend(ml_variants)
-        
-        # 生成混合策略（策略组合）
-        print("生成混合策略...")
-        for i in range(len(self.strategies)):
-            for j in range(i+1, min(i+3, len(self.strategies))):  # 每个策略与后面2个策略混合
-                if self.strategies[i]['category'] == self.strategies[j]['category']:
-                    hybrids = self.generate_hybrid_strategies(self.strategies[i], self.strategies[j])
-                    self.expanded_strategies.extend(hybrids)
-        
-        # 添加唯一ID和时间戳
-        for idx, strategy in enumerate(self.expanded_strategies):
-            strategy['id'] = f"strategy_{idx+1000:04d}"
-            strategy['added_date'] = datetime.now().strftime('%Y-%m-%d')
-            strategy['last_updated'] = datetime.now().strftime('%Y-%m-%d')
-            strategy['generated_by'] = 'StrategyExpander'
+        # 生成所有变体和混合策略（expand的自身耗时即写入策略表的耗时）
+        with self.metrics.stage('expand'):
+            parents = {name: row for row, name in enumerate(self.strategies.column('name'))}
+            for strategy in self.iter_expanded_strategies(workers=workers):
+                parent = parents.get(strategy.get('variant_of'), MISSING)
+                self.expanded_strategies.append(strategy, parent=parent)
+            self.expansion_stats = self._table_stats()
+        self.metrics.count('expanded_strategies', self.expansion_stats['total'])
         
         print(f"策略扩展完成！生成 {len(self.expanded_strategies)} 个新策略")
         print(f"总计策略数: {len(self.strategies) + len(self.expanded_strategies)}")
     
+    def stream_expanded_strategies(self, batch_size: int = 1000, workers: int = 1):
+        """流式扩展并增量写入策略库
+        
+        变体逐条生成后直接写入各分类的存储后端和CSV文件，不保存在
+        expanded_strategies中，峰值内存由batch_size而非总输出量决定。
+        """
+        print("开始流式扩展策略库...")
+        
+        self.load_existing_strategies()
+        
+        self._reset_stats()
+        with self.metrics.stage('expand'), \
+                IncrementalStrategyWriter(self.base_dir, batch_size=batch_size, storage=self.storage,
+                                          db=self.db, metrics=self.metrics) as writer:
+            for strategy in self.iter_expanded_strategies(workers=workers):
+                writer.write(strategy)
+                self._accumulate_stats(strategy)
+        self.metrics.count('expanded_strategies', self.expansion_stats['total'])
+        
+        print(f"策略扩展完成！生成 {self.expansion_stats['total']} 个新策略")
+        print(f"总计策略数: {len(self.strategies) + self.expansion_stats['total']}")
+    
     def save_expanded_strategies(self):
         """保存扩展后的策略"""
         # 按分类保存
-        categories = {}
-        for strategy in self.expanded_strategies:
-            category = strategy['category']
-            if category not in categories:
-                categories[category] = []
-            categories[category].append(strategy)
-        
-        # 保存各分类策略
-        for category, strategies in categories.items():
+        metrics = self.metrics
+        for category in self.expanded_strategies.unique('category'):
+            with metrics.stage('materialize'):
+                strategies = self.expanded_strategies.filter(category=category)
             output_dir = os.path.join(self.base_dir, category)
             os.makedirs(output_dir, exist_ok=True)
             
             # JSON格式
             json_file = os.path.join(output_dir, f'expanded_strategies_{datetime.now().strftime("%Y%m%d")}.json')
-            with open(json_file, 'w', encoding='utf-8') as f:
+            with metrics.stage('write_json'), open(json_file, 'w', encoding='utf-8') as f:
                 json.dump(strategies, f, ensure_ascii=False, indent=2)
             
             # CSV格式
             csv_file = os.path.join(output_dir, f'expanded_strategies_{datetime.now().strftime("%Y%m%d")}.csv')
             # 简化的CSV生成（实际项目中可使用pandas）
-            with open(csv_file, 'w', encoding='utf-8-sig') as f:
+            with metrics.stage('write_csv'), open(csv_file, 'w', encoding='utf-8-sig') as f:
                 if strategies:
-                    headers = strategies[0].keys()
+                    headers = list(strategies[0].keys())
                     f.write(','.join(headers) + '\n')
                     for strategy in strategies:
-                        row = []
-                        for header in headers:
-                            value = str(strategy.get(header, '')).replace(',', ';')
-                            row.append(f'"{value}"')
-                        f.write(','.join(row) + '\n')
+                        f.write(format_csv_row(strategy, headers) + '\n')
             
             print(f"已保存 {len(strategies)} 个{category}策略到 {json_file} 和 {csv_file}")
+            
+            if self.storage is not None:
+                with metrics.stage('write_storage'):
+                    self.storage.reset(category)
+                    self.storage.append(category, strategies)
+                print(f"已写入 {len(strategies)} 个{category}策略到 {self.storage.path(category)}")
+        
+        if self.db is not None:
+            with metrics.stage('write_db'):
+                count = self.db.upsert_variants(self.expanded_strategies)
+            print(f"已写入 {count} 个扩展策略到数据库 {self.db.db_path}")
     
     def update_catalog(self):
-        """更新策略总目录"""
-        catalog_file = os.path.join(self.base_dir, 'strategies_catalog.md')
+        """更新策略总目录（统计数据写入旁路状态文件，只重写统计信息章节；
+        存在组合分析报告时同时更新组合分析章节，见portfolio_analytics.py）"""
+        stats = self.expansion_stats
+        with self.metrics.stage('update_catalog'):
+            report = load_report(self.base_dir)
+            sections = {'portfolio': render_section(report)} if report else None
+            state = CatalogUpdater(self.base_dir).update(stats={
+                'base': self.strategies.value_counts('category'),
+                'expanded': dict(stats['categories']),
+                'ml_enhanced': stats['ml_enhanced'],
+                'hybrid': stats['hybrid'],
+            }, sections=sections)
         
-        if not os.path.exists(catalog_file):
-            print("策略目录文件不存在")
-            return
-        
-        with open(catalog_file, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # 计算总策略数
-        total_strategies = len(self.strategies) + len(self.expanded_strategies)
-        
-        # 按分类统计
-        category_counts = {}
-        all_strategies = self.strategies + self.expanded_strategies
-        for strategy in all_strategies:
-            category = strategy['category']
-            category_counts[category] = category_counts.get(category, 0) + 1
-        
-        # 更新统计信息
-        update_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        stats_section = f"""
-## 统计信息
-- **总策略数:** {total_strategies} (持续更新中)
-- **最后更新:** {update_time}
-- **覆盖市场:** 股票、期货、加密货币、期权
+        total_strategies = len(self.strategies) + stats['total']
+        if state['changed']:
+            print(f"已更新策略总目录，总计 {total_strategies} 个策略")
+        else:
+            print(f"策略总目录无变化，总计 {total_strategies} 个策略")
 
-### 各市场策略数量
-- **股票策略:** {category_counts.get('stocks', 0)} 个
-- **期货策略:** {category_counts.get('futures', 0)} 个  
-- **加密货币策略:** {category_counts.get('crypto', 0)} 个
-- **期权策略:** {category_counts.get('options', 0)} 个
 
-### 策略来源
-- **基础策略:** {len(self.strategies)} 个
-- **扩展变体:** {len(self.expanded_strategies)} 个
-- **机器学习增强:** {sum(1 for s in self.expanded_strategies if s.get('variant_type') == 'ml_enhancement')} 个
-- **混合策略:** {sum(1 for s in self.expanded_strategies if s.get('is_hybrid', False))} 个
-"""
-        
-        # 替换或添加统计信息
-        if "## 统计信息" in content:
-            lines = content.split('\n')
-            new_lines = []
-            in_stats = False
-            for line in lines:
-                if line.strip().startswith("## 统计信息"):
-                    new_lines.append("## 统计信息")
-                    in_stats = True
-                elif in_stats and line.strip().startswith("## "):
-                    in_stats = False
-                    new_lines.extend(stats_section.strip().split('\n'))
-                    new_lines.append(line)
-                elif not in_stats:
-                    new_lines.append(line)
-            
-            if in_stats:
-                new_lines.extend(stats_section.strip().split('\n'))
-            
-            content = '\n'.join(new_lines)
-        else:
-            content = content.replace(
-                "# 量化交易策略总目录\n\n", 
-                f"# 量化交易策略总目录\n\n{stats_section}\n"
-            )
-        
-        # 保存更新后的目录
-        with open(catalog_file, 'w', encoding='utf-8') as f:
-            f.write(content)
-        
-        print(f"已更新策略总目录，总计 {total_strategies} 个策略")
+def _expand_base_shard(expander_cls: type, base_dir: str, variant_rules: VariantRuleEngine,
+                       strategies: List[Dict]) -> List[Dict]:
+    """子进程任务：为一个分片的基础策略生成变体"""
+    expander = expander_cls(base_dir=base_dir, variant_rules=variant_rules)
+    return list(expander.iter_base_variants(strategies))
+
+
+def _expand_base_groups(expander_cls: type, base_dir: str, variant_rules: VariantRuleEngine,
+                        strategies: List[Dict]) -> List[List[Dict]]:
+    """子进程任务：为一个分片的每个基础策略分别生成一组变体"""
+    expander = expander_cls(base_dir=base_dir, variant_rules=variant_rules)
+    return [list(expander.iter_base_variants([strategy])) for strategy in strategies]
+
+
+def _expand_hybrid_groups(expander_cls: type, base_dir: str, variant_rules: VariantRuleEngine,
+                          groups: List[List[Dict]]) -> List[Dict]:
+    """子进程任务：为一个分片的策略组合生成混合策略"""
+    expander = expander_cls(base_dir=base_dir, variant_rules=variant_rules)
+    return [hybrid for group in groups for hybrid in expander.generate_hybrid_combination(group)]
+
 
+def _ordered_map(executor: Executor, tasks: Iterable[tuple], max_pending: int) -> Iterator[Any]:
+    """按提交顺序返回任务结果，最多同时保留max_pending个未完成任务"""
+    pending = deque()
+    for task in tasks:
+        pending.append(executor.submit(*task))
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
 
-def main():
+
+def parse_args(argv: List[str] = None) -> argparse.Namespace:
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='策略扩展器')
+    parser.add_argument('--base-dir', default='.', help='策略库根目录')
+    parser.add_argument('--stream', action='store_true',
+                        help='流式扩展：边生成边写入JSON Lines/CSV，内存占用有界')
+    parser.add_argument('--batch-size', type=int, default=1000,
+                        help='流式模式下每批落盘的策略数')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='并行扩展使用的进程数（1表示单进程）')
+    parser.add_argument('--snapshots', choices=['latest', 'all'], default='latest',
+                        help='加载各分类最新快照或全部历史快照')
+    parser.add_argument('--storage', choices=sorted(STORAGE_BACKENDS), default=None,
+                        help='扩展策略的存储后端（流式模式默认jsonl）')
+    parser.add_argument('--db', default=None, help='SQLite策略目录文件路径')
+    parser.add_argument('--cache-dir', default=None,
+                        help='增量扩展缓存目录，未变化的基础策略直接复用缓存的变体')
+    parser.add_argument('--hybrid-policy', choices=list(PAIRING_POLICIES), default='neighbors',
+                        help='混合策略配对方式：相邻/同类全配对/指标重叠top-k/随机抽样/k路组合')
+    parser.add_argument('--hybrid-k', type=int, default=3,
+                        help='top-k的每个策略配对数，或k-way的组合大小')
+    parser.add_argument('--hybrid-sample', type=int, default=100,
+                        help='random模式下每个分类抽取的策略对数量')
+    parser.add_argument('--seed', type=int, default=0, help='random模式的随机种子')
+    parser.add_argument('--rules', default=DEFAULT_RULES_FILE, help='变体规则配置文件（JSON）')
+    add_metrics_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def build_pairing_policy(args: argparse.Namespace) -> PairingPolicy:
+    """根据命令行参数创建混合策略配对方式"""
+    kwargs = {}
+    if args.hybrid_policy in ('top-k', 'k-way'):
+        kwargs['k'] = args.hybrid_k
+    elif args.hybrid_policy == 'random':
+        kwargs.update(sample_size=args.hybrid_sample, seed=args.seed)
+    return get_pairing_policy(args.hybrid_policy, **kwargs)
+
+
+def main(argv: List[str] = None):
     """主函数"""
+    args = parse_args(argv)
     print("=== 策略扩展器启动 ===")
     
-    expander = StrategyExpander(base_dir='.')
-    expander.expand_strategies()
-    expander.save_expanded_strategies()
-    expander.update_catalog()
+    metrics = PipelineMetrics.from_args('expander', args)
+    expander = StrategyExpander(base_dir=args.base_dir, cache_dir=args.cache_dir,
+                                snapshot_mode=args.snapshots, storage=args.storage,
+                                db_path=args.db, hybrid_policy=build_pairing_policy(args),
+                                variant_rules=VariantRuleEngine.from_file(args.rules),
+                                metrics=metrics)
+    with metrics.profile(args.profile):
+        if args.stream:
+            expander.stream_expanded_strategies(batch_size=args.batch_size, workers=args.workers)
+        else:
+            expander.expand_strategies(workers=args.workers)
+            expander.save_expanded_strategies()
+        expander.update_catalog()
     
+    expanded_total = expander.expansion_stats['total']
     print("=== 策略扩展完成 ===")
     print(f"基础策略: {len(expander.strategies)} 个")
-    print(f"扩展策略: {len(expander.expanded_strategies)} 个")
-    print(f"总计: {len(expander.strategies) + len(expander.expanded_strategies)} 个策略")
+    print(f"扩展策略: {expanded_total} 个")
+    print(f"总计: {len(expander.strategies) + expanded_total} 个策略")
+    metrics.report(args)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
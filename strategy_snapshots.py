@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+策略快照管理 - 记录和发现各分类的策略快照文件
+支持增量解析JSON数组/JSON Lines/Parquet快照，并发加载多个分类
+"""
+
+import glob
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional
+
+from strategy_storage import JsonlBackend, ParquetBackend
+
+# 快照清单文件名（位于策略库根目录）
+MANIFEST_FILE = 'snapshots.json'
+
+# 基础策略快照文件名：strategies_YYYYMMDD.json / .jsonl / .parquet（目录）
+SNAPSHOT_PATTERN = re.compile(r'^strategies_(\d{8})\.(json|jsonl|parquet)$')
+
+# 同一天存在多种格式时的优先级（越大越优先）
+FORMAT_PRIORITY = {'json': 0, 'jsonl': 1, 'parquet': 2}
+
+# 增量解析时每次读取的字符数
+READ_CHUNK_SIZE = 1 << 16
+
+# 数组元素之间的逗号和空白
+_SEPARATOR = re.compile(r'\s*,?\s*')
+
+
+def load_manifest(base_dir: str) -> Dict[str, List[Dict]]:
+    """读取快照清单，不存在或损坏时返回空清单"""
+    manifest_file = os.path.join(base_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_file):
+        return {}
+    try:
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except ValueError:
+        print(f"快照清单 {manifest_file} 格式错误，改为扫描目录")
+        return {}
+
+
+def register_snapshot(base_dir: str, category: str, snapshot_file: str, count: int):
+    """在快照清单中登记（或更新）一个快照文件"""
+    filename = os.path.basename(snapshot_file)
+    match = SNAPSHOT_PATTERN.match(filename)
+    if not match:
+        return
+
+    manifest = load_manifest(base_dir)
+    # 分类首次登记时先收录目录中已有的历史快照
+    existing = manifest.get(category) or _scan_snapshots(base_dir, category)
+    entries = [e for e in existing if e['file'] != filename]
+    entries.append({
+        'file': filename,
+        'date': match.group(1),
+        'format': match.group(2),
+        'count': count,
+    })
+    manifest[category] = sorted(entries, key=lambda e: e['date'])
+
+    manifest_file = os.path.join(base_dir, MANIFEST_FILE)
+    tmp_file = f'{manifest_file}.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_file, manifest_file)
+
+
+def _scan_snapshots(base_dir: str, category: str, prefix: str = 'strategies') -> List[Dict]:
+    """扫描分类目录中的快照文件"""
+    pattern = SNAPSHOT_PATTERN if prefix == 'strategies' else re.compile(
+        rf'^{re.escape(prefix)}_(\d{{8}})\.(json|jsonl|parquet)$')
+    entries = []
+    for path in glob.glob(os.path.join(base_dir, category, f'{prefix}_*')):
+        match = pattern.match(os.path.basename(path))
+        if match:
+            entries.append({
+                'file': os.path.basename(path),
+                'date': match.group(1),
+                'format': match.group(2),
+            })
+    return entries
+
+
+def discover_snapshots(base_dir: str, category: str, mode: str = 'latest',
+                       manifest: Optional[Dict[str, List[Dict]]] = None,
+                       prefix: str = 'strategies') -> List[str]:
+    """返回分类的快照文件路径（按日期升序）
+
+    优先使用快照清单，清单中没有该分类或文件已不存在时扫描目录。
+    清单只登记基础策略快照，其他前缀（如 expanded_strategies）总是扫描目录。
+    mode='latest' 只返回最新日期的快照（同一天Parquet > JSONL > JSON），
+    mode='all' 返回全部快照。
+    """
+    if prefix != 'strategies':
+        manifest = {}
+    elif manifest is None:
+        manifest = load_manifest(base_dir)
+
+    category_dir = os.path.join(base_dir, category)
+    entries = [
+        e for e in manifest.get(category, [])
+        if os.path.exists(os.path.join(category_dir, e['file']))
+    ]
+    if not entries:
+        entries = _scan_snapshots(base_dir, category, prefix)
+    if not entries:
+        return []
+
+    # 同一日期存在多种格式时只取优先级最高的一种
+    by_date = {}
+    for entry in sorted(entries, key=lambda e: (e['date'], FORMAT_PRIORITY[e['format']])):
+        by_date[entry['date']] = entry
+
+    dates = sorted(by_date)
+    if mode == 'latest':
+        dates = dates[-1:]
+    elif mode != 'all':
+        raise ValueError(f"未知的快照加载模式: {mode}")
+    return [os.path.join(category_dir, by_date[date]['file']) for date in dates]
+
+
+def iter_json_array(path: str) -> Iterator[Dict]:
+    """增量解析JSON数组文件，逐个返回元素而不一次性读入整个文件
+
+    解析位置用下标记录在缓冲区内，只有需要读入下一块时才丢弃已解析的部分，
+    避免每个元素都复制一次剩余缓冲区。
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = f.read(READ_CHUNK_SIZE).lstrip()
+        if not buffer.startswith('['):
+            raise ValueError(f"{path} 不是JSON数组")
+        position = 1
+        eof = False
+
+        while True:
+            position = _SEPARATOR.match(buffer, position).end()
+            if buffer.startswith(']', position):
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+                # 元素恰好止于缓冲区末尾时可能被截断（如数字），需读到更多内容再确认
+                complete = eof or end < len(buffer)
+            except ValueError:
+                if eof:
+                    raise
+                complete = False
+            if not complete:
+                # 当前缓冲区不足以解析一个完整元素，丢弃已解析部分后继续读取
+                chunk = f.read(READ_CHUNK_SIZE)
+                eof = not chunk
+                buffer = buffer[position:] + chunk
+                position = 0
+                continue
+            yield item
+            position = end
+
+
+def iter_snapshot(path: str) -> Iterator[Dict]:
+    """按扩展名选择解析方式，逐条返回快照中的策略"""
+    if path.endswith('.jsonl'):
+        return JsonlBackend.read_path(path)
+    if path.endswith('.parquet'):
+        return ParquetBackend.read_path(path)
+    return iter_json_array(path)
+
+
+def load_categories(base_dir: str, categories: List[str], mode: str = 'latest',
+                    max_workers: int = 4) -> Dict[str, List[Dict]]:
+    """并发加载多个分类的快照，返回 {分类: 策略列表}（按categories顺序）"""
+    manifest = load_manifest(base_dir)
+
+    def load(category: str) -> List[Dict]:
+        strategies = []
+        for path in discover_snapshots(base_dir, category, mode, manifest):
+            strategies.extend(iter_snapshot(path))
+        return strategies
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        results = list(executor.map(load, categories))
+    return dict(zip(categories, results))
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+策略存储后端 - 追加写入的JSON Lines和压缩Parquet存储
+JSON/CSV仍作为导出格式保留，存储后端负责日常增量写入
+"""
+
+import glob
+import json
+import os
+import shutil
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+
+class StorageBackend(ABC):
+    """存储后端基类
+
+    每个分类每天一个快照：{base_dir}/{category}/{prefix}_{YYYYMMDD}{extension}，
+    append()只写入新增记录，代价与新增记录数成正比。
+    """
+
+    extension = ''
+
+    def __init__(self, base_dir: str = ".", prefix: str = 'strategies',
+                 date_str: Optional[str] = None):
+        self.base_dir = base_dir
+        self.prefix = prefix
+        self.date_str = date_str or datetime.now().strftime("%Y%m%d")
+
+    def path(self, category: str) -> str:
+        """分类当天快照的路径"""
+        return os.path.join(self.base_dir, category, f'{self.prefix}_{self.date_str}{self.extension}')
+
+    @abstractmethod
+    def append(self, category: str, strategies: List[Dict]) -> int:
+        """追加写入策略，返回写入数量"""
+
+    @abstractmethod
+    def reset(self, category: str):
+        """删除分类当天的快照，之后的append从空快照开始"""
+
+    def read(self, category: str, columns: Optional[List[str]] = None) -> Iterator[Dict]:
+        """读取分类当天的快照，columns不为None时只返回指定字段"""
+        return self.read_path(self.path(category), columns)
+
+    @classmethod
+    @abstractmethod
+    def read_path(cls, path: str, columns: Optional[List[str]] = None) -> Iterator[Dict]:
+        """读取指定快照文件"""
+
+
+class JsonlBackend(StorageBackend):
+    """追加写入的JSON Lines存储（每行一个策略）"""
+
+    extension = '.jsonl'
+
+    def append(self, category: str, strategies: List[Dict]) -> int:
+        path = self.path(category)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(''.join(
+                json.dumps(s, ensure_ascii=False) + '\n' for s in strategies
+            ))
+        return len(strategies)
+
+    def reset(self, category: str):
+        path = self.path(category)
+        if os.path.exists(path):
+            os.remove(path)
+
+    @classmethod
+    def read_path(cls, path: str, columns: Optional[List[str]] = None) -> Iterator[Dict]:
+        if not os.path.exists(path):
+            return
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                strategy = json.loads(line)
+                if columns is not None:
+                    strategy = {k: strategy[k] for k in columns if k in strategy}
+                yield strategy
+
+
+class ParquetBackend(StorageBackend):
+    """压缩Parquet存储（需要安装pyarrow）
+
+    快照是一个目录，每次append写入一个新的part文件，
+    已有文件不会被重写；读取时可只加载需要的列。
+    各part按所有记录字段的并集建表，另用FIELDS_COLUMN列保存每条记录自身的字段名，
+    读取时据此还原字段集合和顺序（值为None的字段也原样保留）。
+    """
+
+    extension = '.parquet'
+    compression = 'zstd'
+    FIELDS_COLUMN = '__fields__'
+
+    def __init__(self, base_dir: str = ".", prefix: str = 'strategies',
+                 date_str: Optional[str] = None):
+        super().__init__(base_dir, prefix, date_str)
+        # 检查可选依赖，尽早给出提示
+        _import_pyarrow()
+
+    def append(self, category: str, strategies: List[Dict]) -> int:
+        if not strategies:
+            return 0
+        pa, pq = _import_pyarrow()
+
+        snapshot_dir = self.path(category)
+        os.makedirs(snapshot_dir, exist_ok=True)
+        part = len(glob.glob(os.path.join(snapshot_dir, 'part-*.parquet')))
+        # 以所有策略字段的并集建表（from_pylist只按首行推断字段）
+        fields = list(dict.fromkeys(k for s in strategies for k in s))
+        columns = {k: [s.get(k) for s in strategies] for k in fields}
+        columns[self.FIELDS_COLUMN] = [list(s) for s in strategies]
+        table = pa.Table.from_pydict(columns)
+        pq.write_table(
+            table,
+            os.path.join(snapshot_dir, f'part-{part:05d}.parquet'),
+            compression=self.compression,
+        )
+        return len(strategies)
+
+    def reset(self, category: str):
+        snapshot_dir = self.path(category)
+        if os.path.isdir(snapshot_dir):
+            shutil.rmtree(snapshot_dir)
+
+    @classmethod
+    def read_path(cls, path: str, columns: Optional[List[str]] = None) -> Iterator[Dict]:
+        _, pq = _import_pyarrow()
+        for part in sorted(glob.glob(os.path.join(path, 'part-*.parquet'))):
+            # 各part的字段可能不同，只读取该part中存在的列
+            available = pq.read_schema(part).names
+            selected = available if columns is None else [c for c in columns if c in available]
+            if cls.FIELDS_COLUMN not in available:
+                # 旧版本写入的part没有字段名列：缺失字段在Parquet中为null，按null还原为稀疏字典
+                for strategy in pq.read_table(part, columns=selected).to_pylist():
+                    yield {k: v for k, v in strategy.items() if v is not None}
+                continue
+            if cls.FIELDS_COLUMN not in selected:
+                selected = selected + [cls.FIELDS_COLUMN]
+            for row in pq.read_table(part, columns=selected).to_pylist():
+                fields = row[cls.FIELDS_COLUMN]
+                if columns is not None:
+                    # 与JsonlBackend一致，按columns的顺序返回记录中存在的字段
+                    present = set(fields)
+                    fields = [k for k in columns if k in present]
+                yield {k: row[k] for k in fields}
+
+
+STORAGE_BACKENDS = {
+    'jsonl': JsonlBackend,
+    'parquet': ParquetBackend,
+}
+
+
+def get_storage_backend(name: str, base_dir: str = ".", prefix: str = 'strategies') -> StorageBackend:
+    """按名称创建存储后端"""
+    if name not in STORAGE_BACKENDS:
+        raise ValueError(f"未知的存储后端: {name}（可选: {', '.join(STORAGE_BACKENDS)}）")
+    return STORAGE_BACKENDS[name](base_dir=base_dir, prefix=prefix)
+
+
+def _import_pyarrow():
+    """导入可选依赖pyarrow"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Parquet存储需要安装pyarrow: pip install pyarrow") from e
+    return pa, pq
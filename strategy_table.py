@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+列式策略存储 - 以字典编码的NumPy列代替策略字典列表
+变体行只保存与父策略不同的字段，其余字段从父策略继承
+"""
+
+import copy
+import json
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+import numpy as np
+
+# 列编码中表示"未设置/继承父策略"的值
+MISSING = -1
+
+# 默认维护二级索引的字段
+INDEXED_FIELDS = ('category', 'type', 'complexity', 'variant_type', 'variant_of', 'is_hybrid')
+
+
+class ValuePool:
+    """值字典：将重复出现的字段值编码为整数"""
+
+    def __init__(self):
+        self.values: List[Any] = []
+        self.codes: Dict[Any, int] = {}
+
+    @staticmethod
+    def _key(value: Any) -> Any:
+        """生成可哈希的字典键（字符串直接使用，其他类型按类型+JSON区分）"""
+        if isinstance(value, str):
+            return value
+        return (type(value).__name__, json.dumps(value, ensure_ascii=False, sort_keys=True, default=str))
+
+    def encode(self, value: Any) -> int:
+        """编码字段值，新值自动加入字典"""
+        key = self._key(value)
+        code = self.codes.get(key)
+        if code is None:
+            code = len(self.values)
+            self.values.append(value)
+            self.codes[key] = code
+        return code
+
+    def lookup(self, value: Any) -> int:
+        """查找字段值的编码，不存在时返回MISSING"""
+        return self.codes.get(self._key(value), MISSING)
+
+    def decode(self, code: int) -> Any:
+        """解码字段值（列表等可变值返回副本）"""
+        value = self.values[code]
+        if isinstance(value, (list, dict)):
+            return copy.deepcopy(value)
+        return value
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+class StrategyTable:
+    """列式策略表
+
+    每个字段是一列int32编码，字段值经ValuePool字典编码后共享存储；
+    parent列记录父策略行号，变体行中与父策略相同的字段记为MISSING，
+    读取时从父策略继承。schema列记录每行的字段顺序，保证还原出的
+    字典与写入时一致。
+
+    列在写入时使用array.array逐行追加，查询时通过np.frombuffer零拷贝
+    转为NumPy数组做向量化运算。较少使用的字段列只延伸到最后一次写入
+    的行，其后的行视为MISSING。
+
+    表对外表现为字典序列（支持len、迭代、下标和切片），读取时按需
+    还原为新的字典，修改返回的字典不会影响表中数据。
+
+    base不为None时，parent指向base表中的行（例如扩展策略表指向基础
+    策略表），两张表共享值字典，因此编码可以直接比较。
+
+    indexed_fields中的字段在追加时同步维护二级索引（取值编码 -> 行号），
+    对这些字段的计数为O(1)，按取值切片为O(k)，无需扫描全表。
+    """
+
+    def __init__(self, base: Optional['StrategyTable'] = None,
+                 indexed_fields: Iterable[str] = INDEXED_FIELDS):
+        self.base = base
+        self.pools: Dict[str, ValuePool] = base.pools if base is not None else {}
+        self.schemas: ValuePool = base.schemas if base is not None else ValuePool()
+        self.columns: Dict[str, array] = {}
+        self.parent = array('i')
+        self.schema = array('i')
+        self.indexes: Dict[str, Dict[int, array]] = {field: {} for field in indexed_fields}
+
+    # ---- 写入 ----
+
+    def append(self, record: Dict, parent: int = MISSING) -> int:
+        """追加一行策略，返回行号
+
+        指定parent时只保存与父策略不同的字段。
+        """
+        row = len(self.parent)
+        parent_table = self._parent_table()
+        pools = self.pools
+        columns = self.columns
+        indexes = self.indexes
+
+        self.parent.append(parent)
+        self.schema.append(self.schemas.encode(tuple(record.keys())))
+        for field, value in record.items():
+            pool = pools.get(field)
+            if pool is None:
+                pool = pools[field] = ValuePool()
+            code = pool.encode(value)
+            index = indexes.get(field)
+            if index is not None:
+                rows = index.get(code)
+                if rows is None:
+                    rows = index[code] = array('i')
+                rows.append(row)
+            if parent != MISSING and parent_table._code(parent, field) == code:
+                continue
+
+            column = columns.get(field)
+            if column is None:
+                column = columns[field] = array('i')
+            if len(column) < row:
+                column.extend(_missing(row - len(column)))
+            column.append(code)
+
+        return row
+
+    def extend(self, records: Iterable[Dict]):
+        """批量追加策略"""
+        for record in records:
+            self.append(record)
+
+    def clear(self):
+        """清空表（保留共享的值字典）"""
+        self.columns = {}
+        self.parent = array('i')
+        self.schema = array('i')
+        self.indexes = {field: {} for field in self.indexes}
+
+    # ---- 读取 ----
+
+    def _parent_table(self) -> 'StrategyTable':
+        return self.base if self.base is not None else self
+
+    def _code(self, row: int, field: str) -> int:
+        """单行某字段的编码（已解析继承）"""
+        column = self.columns.get(field)
+        code = column[row] if column is not None and row < len(column) else MISSING
+        if code == MISSING:
+            parent = self.parent[row]
+            if parent != MISSING:
+                return self._parent_table()._code(parent, field)
+        return code
+
+    def get(self, row: int) -> Dict:
+        """还原单行策略为字典"""
+        size = len(self.parent)
+        if row < 0:
+            row += size
+        if not 0 <= row < size:
+            raise IndexError(f"策略行号越界: {row}")
+
+        record = {}
+        for field in self.schemas.values[self.schema[row]]:
+            code = self._code(row, field)
+            record[field] = self.pools[field].decode(code) if code != MISSING else None
+        return record
+
+    def __len__(self) -> int:
+        return len(self.parent)
+
+    def __iter__(self) -> Iterator[Dict]:
+        for row in range(len(self.parent)):
+            yield self.get(row)
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[Dict, List[Dict]]:
+        if isinstance(key, slice):
+            return [self.get(row) for row in range(*key.indices(len(self.parent)))]
+        return self.get(key)
+
+    def rows(self, indices: Iterable[int]) -> List[Dict]:
+        """按行号批量还原策略"""
+        return [self.get(int(row)) for row in indices]
+
+    # ---- 向量化查询 ----
+
+    def _raw_codes(self, field: str) -> np.ndarray:
+        """字段的原始编码列（未解析继承），补齐到行数"""
+        size = len(self.parent)
+        resolved = np.full(size, MISSING, dtype=np.int32)
+        column = self.columns.get(field)
+        if column:
+            resolved[:len(column)] = np.frombuffer(column, dtype=np.int32)
+        return resolved
+
+    def codes(self, field: str) -> np.ndarray:
+        """返回字段的完整编码列（已解析继承），长度等于行数"""
+        raw = self._raw_codes(field)
+        resolved = raw.copy()
+        if not len(resolved):
+            return resolved
+
+        parents = np.frombuffer(self.parent, dtype=np.int32).copy()
+        inherit = (resolved == MISSING) & (parents != MISSING)
+        if not inherit.any():
+            return resolved
+
+        if self.base is not None:
+            resolved[inherit] = self.base.codes(field)[parents[inherit]]
+            return resolved
+
+        # 同表内继承，沿父策略链逐层向上解析
+        all_parents = np.frombuffer(self.parent, dtype=np.int32)
+        while inherit.any():
+            ancestors = parents[inherit]
+            resolved[inherit] = raw[ancestors]
+            parents[inherit] = all_parents[ancestors]
+            inherit = (resolved == MISSING) & (parents != MISSING)
+        return resolved
+
+    def column(self, field: str) -> List[Any]:
+        """返回字段的完整取值列表"""
+        pool = self.pools.get(field)
+        return [
+            pool.values[code] if code != MISSING else None
+            for code in self.codes(field).tolist()
+        ]
+
+    def unique(self, field: str) -> List[Any]:
+        """返回字段出现过的取值（按首次出现顺序）"""
+        pool = self.pools.get(field)
+        if pool is None:
+            return []
+        index = self.indexes.get(field)
+        if index is not None:
+            return [pool.values[code] for code in index]
+        codes = self.codes(field)
+        present, first = np.unique(codes[codes != MISSING], return_index=True)
+        return [pool.values[code] for code in present[np.argsort(first)].tolist()]
+
+    def value_counts(self, field: str) -> Dict[Any, int]:
+        """统计字段各取值的行数（索引字段直接读取索引）"""
+        pool = self.pools.get(field)
+        if pool is None:
+            return {}
+        index = self.indexes.get(field)
+        if index is not None:
+            return {pool.values[code]: len(rows) for code, rows in index.items()}
+        codes = self.codes(field)
+        present, first, counts = np.unique(
+            codes[codes != MISSING], return_index=True, return_counts=True
+        )
+        order = np.argsort(first)
+        return {
+            pool.values[code]: count
+            for code, count in zip(present[order].tolist(), counts[order].tolist())
+        }
+
+    def mask(self, **conditions: Any) -> np.ndarray:
+        """按字段取值生成布尔掩码，例如 mask(category='crypto', variant_type='ml_enhancement')"""
+        result = np.ones(len(self.parent), dtype=bool)
+        for field, value in conditions.items():
+            pool = self.pools.get(field)
+            code = pool.lookup(value) if pool is not None else MISSING
+            if code == MISSING:
+                return np.zeros(len(self.parent), dtype=bool)
+            result &= self.codes(field) == code
+        return result
+
+    def _index_rows(self, field: str, value: Any) -> array:
+        """从索引中取出字段等于value的行号"""
+        pool = self.pools.get(field)
+        code = pool.lookup(value) if pool is not None else MISSING
+        return self.indexes[field].get(code, array('i'))
+
+    def lookup(self, **conditions: Any) -> np.ndarray:
+        """返回满足条件的行号（升序）
+
+        条件字段全部建有索引时只访问索引，否则退化为全表掩码。
+        """
+        if not conditions or any(field not in self.indexes for field in conditions):
+            return np.flatnonzero(self.mask(**conditions))
+
+        postings = sorted(
+            (self._index_rows(field, value) for field, value in conditions.items()),
+            key=len,
+        )
+        # 复制一份：返回索引缓冲区的视图会阻止之后append扩容array（BufferError）
+        rows = np.frombuffer(postings[0], dtype=np.int32).copy()
+        for other in postings[1:]:
+            if not len(rows):
+                break
+            rows = np.intersect1d(rows, np.frombuffer(other, dtype=np.int32), assume_unique=True)
+        return rows
+
+    def filter(self, **conditions: Any) -> List[Dict]:
+        """返回满足条件的策略列表"""
+        return self.rows(self.lookup(**conditions))
+
+    def count(self, **conditions: Any) -> int:
+        """统计满足条件的策略数量（单个索引字段为O(1)）"""
+        if len(conditions) == 1:
+            (field, value), = conditions.items()
+            if field in self.indexes:
+                return len(self._index_rows(field, value))
+        return len(self.lookup(**conditions))
+
+    @property
+    def nbytes(self) -> int:
+        """编码列占用的字节数（不含值字典）"""
+        arrays = [self.parent, self.schema] + list(self.columns.values())
+        arrays += [rows for index in self.indexes.values() for rows in index.values()]
+        return sum(len(column) * column.itemsize for column in arrays)
+
+
+def _missing(count: int) -> array:
+    """生成count个MISSING编码"""
+    return array('i', [MISSING]) * count
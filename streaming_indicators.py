@@ -0,0 +1,582 @@
+#!/usr/bin/env python3
+"""
+增量指标 - 逐bar/逐tick更新的技术指标和策略信号
+每次更新的代价是O(1)（滚动最值为均摊O(1)），与回看周期长度无关；
+计算口径与backtest.py中的向量化实现一致，并提供本地行情文件的回放工具
+"""
+
+import argparse
+import csv
+import math
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from backtest import BACKTEST_STRATEGIES
+
+NAN = float('nan')
+
+
+class Bar:
+    """一根K线（tick数据以 open=high=low=close=价格 表示）"""
+
+    __slots__ = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+
+    def __init__(self, timestamp: str, open: float, high: float, low: float, close: float,
+                 volume: float = 0.0):
+        self.timestamp = timestamp
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+
+
+class SMA:
+    """简单移动平均：环形缓冲区 + 滚动求和"""
+
+    __slots__ = ('period', 'window', 'total', 'value')
+
+    def __init__(self, period: int):
+        self.period = period
+        self.window = deque()
+        self.total = 0.0
+        self.value = NAN
+
+    def update(self, x: float) -> float:
+        window = self.window
+        window.append(x)
+        self.total += x
+        if len(window) > self.period:
+            self.total -= window.popleft()
+        if len(window) == self.period:
+            self.value = self.total / self.period
+        return self.value
+
+
+class EMA:
+    """指数移动平均（与pandas ewm(span, adjust=False, min_periods=span)一致）"""
+
+    __slots__ = ('alpha', 'period', 'count', 'state', 'value')
+
+    def __init__(self, span: int = 0, alpha: float = 0.0):
+        self.alpha = alpha or 2 / (span + 1)
+        self.period = span or round(1 / self.alpha)
+        self.count = 0
+        self.state = NAN
+        self.value = NAN
+
+    def update(self, x: float) -> float:
+        if x != x:
+            # NaN不参与平滑
+            return self.value
+        self.count += 1
+        if self.count == 1:
+            self.state = x
+        else:
+            self.state += self.alpha * (x - self.state)
+        if self.count >= self.period:
+            self.value = self.state
+        return self.value
+
+
+class Wilder(EMA):
+    """Wilder平滑（alpha = 1/period）"""
+
+    __slots__ = ()
+
+    def __init__(self, period: int):
+        super().__init__(alpha=1 / period)
+        self.period = period
+
+
+class RollingMax:
+    """滚动最大值：单调队列，均摊O(1)"""
+
+    __slots__ = ('period', 'items', 'count', 'value')
+
+    def __init__(self, period: int):
+        self.period = period
+        self.items = deque()
+        self.count = 0
+        self.value = NAN
+
+    def _better(self, new: float, old: float) -> bool:
+        return new >= old
+
+    def update(self, x: float) -> float:
+        items = self.items
+        while items and self._better(x, items[-1][1]):
+            items.pop()
+        items.append((self.count, x))
+        self.count += 1
+        if items[0][0] <= self.count - 1 - self.period:
+            items.popleft()
+        if self.count >= self.period:
+            self.value = items[0][1]
+        return self.value
+
+
+class RollingMin(RollingMax):
+    """滚动最小值"""
+
+    __slots__ = ()
+
+    def _better(self, new: float, old: float) -> bool:
+        return new <= old
+
+
+class RSI:
+    """相对强弱指标（Wilder平滑）"""
+
+    __slots__ = ('gain', 'loss', 'previous', 'value')
+
+    def __init__(self, period: int = 14):
+        self.gain = Wilder(period)
+        self.loss = Wilder(period)
+        self.previous = NAN
+        self.value = NAN
+
+    def update(self, close: float) -> float:
+        delta = close - self.previous
+        self.previous = close
+        if delta != delta:
+            return self.value
+        gain = self.gain.update(max(delta, 0.0))
+        loss = self.loss.update(max(-delta, 0.0))
+        if gain == gain and loss == loss:
+            if loss == 0:
+                self.value = 100.0 if gain > 0 else 50.0
+            else:
+                self.value = 100 - 100 / (1 + gain / loss)
+        return self.value
+
+
+class ATR:
+    """平均真实波幅"""
+
+    __slots__ = ('average', 'previous', 'value')
+
+    def __init__(self, period: int = 20):
+        self.average = Wilder(period)
+        self.previous = NAN
+        self.value = NAN
+
+    def update(self, high: float, low: float, close: float) -> float:
+        previous = self.previous
+        true_range = high - low
+        if previous == previous:
+            true_range = max(true_range, abs(high - previous), abs(low - previous))
+        self.previous = close
+        self.value = self.average.update(true_range)
+        return self.value
+
+
+class Bollinger:
+    """布林带：滑动窗口Welford算法维护均值和方差（总体标准差）"""
+
+    __slots__ = ('period', 'width', 'window', 'mean', 'm2', 'middle', 'upper', 'lower')
+
+    def __init__(self, period: int = 20, width: float = 2.0):
+        self.period = period
+        self.width = width
+        self.window = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.middle = self.upper = self.lower = NAN
+
+    def update(self, x: float) -> Tuple[float, float, float]:
+        window = self.window
+        window.append(x)
+        if len(window) > self.period:
+            old = window.popleft()
+            mean = self.mean + (x - old) / self.period
+            self.m2 += (x - old) * (x - mean + old - self.mean)
+            self.mean = mean
+        else:
+            delta = x - self.mean
+            self.mean += delta / len(window)
+            self.m2 += delta * (x - self.mean)
+        if len(window) == self.period:
+            std = math.sqrt(max(self.m2, 0.0) / self.period)
+            self.middle = self.mean
+            self.upper = self.mean + self.width * std
+            self.lower = self.mean - self.width * std
+        return self.middle, self.upper, self.lower
+
+
+class KDJ:
+    """随机指标KDJ（RSV平滑系数1/m1、1/m2，K、D初值50）"""
+
+    __slots__ = ('highest', 'lowest', 'm1', 'm2', 'k', 'd', 'j')
+
+    def __init__(self, period: int = 9, m1: int = 3, m2: int = 3):
+        self.highest = RollingMax(period)
+        self.lowest = RollingMin(period)
+        self.m1 = m1
+        self.m2 = m2
+        self.k = self.d = 50.0
+        self.j = NAN
+
+    def update(self, high: float, low: float, close: float) -> Tuple[float, float, float]:
+        highest = self.highest.update(high)
+        lowest = self.lowest.update(low)
+        if highest != highest:
+            return NAN, NAN, NAN
+        rsv = 50.0 if highest == lowest else (close - lowest) / (highest - lowest) * 100
+        self.k += (rsv - self.k) / self.m1
+        self.d += (self.k - self.d) / self.m2
+        self.j = 3 * self.k - 2 * self.d
+        return self.k, self.d, self.j
+
+
+class MACD:
+    """MACD：DIF = EMA(fast) - EMA(slow)，DEA = EMA(DIF, signal)，柱 = DIF - DEA"""
+
+    __slots__ = ('fast', 'slow', 'signal', 'macd', 'histogram')
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self.fast = EMA(fast)
+        self.slow = EMA(slow)
+        self.signal = EMA(signal)
+        self.macd = self.histogram = NAN
+
+    def update(self, close: float) -> Tuple[float, float, float]:
+        self.macd = self.fast.update(close) - self.slow.update(close)
+        dea = self.signal.update(self.macd)
+        self.histogram = self.macd - dea
+        return self.macd, dea, self.histogram
+
+
+class StreamingStrategy(ABC):
+    """增量策略基类：每根K线更新一次，返回收盘后的目标仓位
+
+    与backtest.py中同名策略的逐bar仓位一致。
+    """
+
+    __slots__ = ('position',)
+
+    name = ''
+
+    def __init__(self):
+        self.position = 0.0
+
+    @abstractmethod
+    def update(self, bar: Bar) -> float:
+        """处理一根K线，返回收盘后的目标仓位"""
+
+
+class StreamingMovingAverageCross(StreamingStrategy):
+    """双均线策略"""
+
+    __slots__ = ('fast', 'slow')
+
+    name = '双均线策略'
+
+    def __init__(self, fast: int = 10, slow: int = 30, kind: str = 'sma'):
+        super().__init__()
+        average = SMA if kind == 'sma' else EMA
+        self.fast = average(fast)
+        self.slow = average(slow)
+
+    def update(self, bar):
+        self.position = 1.0 if self.fast.update(bar.close) > self.slow.update(bar.close) else 0.0
+        return self.position
+
+
+class StreamingRSIReversal(StreamingStrategy):
+    """RSI超买超卖策略"""
+
+    __slots__ = ('rsi', 'lower', 'upper')
+
+    name = 'RSI超买超卖策略'
+
+    def __init__(self, period: int = 14, lower: float = 30, upper: float = 70):
+        super().__init__()
+        self.rsi = RSI(period)
+        self.lower = lower
+        self.upper = upper
+
+    def update(self, bar):
+        value = self.rsi.update(bar.close)
+        if value < self.lower:
+            self.position = 1.0
+        elif value > self.upper:
+            self.position = 0.0
+        return self.position
+
+
+class StreamingTurtleBreakout(StreamingStrategy):
+    """海龟交易法则（突破入场，反向突破或吊灯ATR止损离场）"""
+
+    __slots__ = ('entry_high', 'entry_low', 'exit_high', 'exit_low', 'close_high', 'close_low',
+                 'atr', 'stop_atr', 'long_leg', 'short_leg')
+
+    name = '海龟交易法则'
+
+    def __init__(self, entry: int = 20, exit: int = 10, atr_period: int = 20, stop_atr: float = 2.0):
+        super().__init__()
+        self.entry_high, self.entry_low = RollingMax(entry), RollingMin(entry)
+        self.exit_high, self.exit_low = RollingMax(exit), RollingMin(exit)
+        self.close_high, self.close_low = RollingMax(entry), RollingMin(entry)
+        self.atr = ATR(atr_period)
+        self.stop_atr = stop_atr
+        self.long_leg = self.short_leg = 0.0
+
+    def update(self, bar):
+        close = bar.close
+        # 突破通道使用上一根K线为止的高低点
+        upper, lower = self.entry_high.value, self.entry_low.value
+        exit_high, exit_low = self.exit_high.value, self.exit_low.value
+        for indicator, value in ((self.entry_high, bar.high), (self.entry_low, bar.low),
+                                 (self.exit_high, bar.high), (self.exit_low, bar.low)):
+            indicator.update(value)
+        stop = self.stop_atr * self.atr.update(bar.high, bar.low, close)
+        close_high = self.close_high.update(close)
+        close_low = self.close_low.update(close)
+
+        if close > upper:
+            self.long_leg = 1.0
+        elif close < exit_low or close < close_high - stop:
+            self.long_leg = 0.0
+        if close < lower:
+            self.short_leg = 1.0
+        elif close > exit_high or close > close_low + stop:
+            self.short_leg = 0.0
+        self.position = self.long_leg - self.short_leg
+        return self.position
+
+
+class StreamingDualThrust(StreamingStrategy):
+    """Dual Thrust策略"""
+
+    __slots__ = ('highest_high', 'lowest_low', 'highest_close', 'lowest_close', 'k1', 'k2')
+
+    name = 'Dual Thrust策略'
+
+    def __init__(self, lookback: int = 4, k1: float = 0.5, k2: float = 0.5):
+        super().__init__()
+        self.highest_high, self.lowest_low = RollingMax(lookback), RollingMin(lookback)
+        self.highest_close, self.lowest_close = RollingMax(lookback), RollingMin(lookback)
+        self.k1 = k1
+        self.k2 = k2
+
+    def update(self, bar):
+        # 区间由前lookback根K线计算，当前K线只参与之后的区间
+        band = max(self.highest_high.value - self.lowest_close.value,
+                   self.highest_close.value - self.lowest_low.value)
+        if bar.close > bar.open + self.k1 * band:
+            self.position = 1.0
+        elif bar.close < bar.open - self.k2 * band:
+            self.position = -1.0
+        self.highest_high.update(bar.high)
+        self.lowest_low.update(bar.low)
+        self.highest_close.update(bar.close)
+        self.lowest_close.update(bar.close)
+        return self.position
+
+
+class StreamingMomentum(StreamingStrategy):
+    """动量策略（比特币动量策略）"""
+
+    __slots__ = ('closes', 'trend')
+
+    name = '比特币动量策略'
+
+    def __init__(self, lookback: int = 20, trend: int = 50):
+        super().__init__()
+        self.closes = deque(maxlen=lookback + 1)
+        self.trend = SMA(trend)
+
+    def update(self, bar):
+        close = bar.close
+        self.closes.append(close)
+        trend = self.trend.update(close)
+        rising = len(self.closes) == self.closes.maxlen and close > self.closes[0]
+        self.position = 1.0 if rising and close > trend else 0.0
+        return self.position
+
+
+STREAMING_STRATEGIES = {
+    cls.name: cls
+    for cls in (StreamingMovingAverageCross, StreamingRSIReversal, StreamingTurtleBreakout,
+                StreamingDualThrust, StreamingMomentum)
+}
+
+
+def get_streaming_strategy(name: str, **params) -> StreamingStrategy:
+    """按策略目录名称创建增量策略"""
+    if name not in STREAMING_STRATEGIES:
+        hint = '（该策略需要多条行情，仅支持向量化回测）' if name in BACKTEST_STRATEGIES else ''
+        raise ValueError(f"策略 {name} 暂无增量实现{hint}（可选: {', '.join(STREAMING_STRATEGIES)}）")
+    return STREAMING_STRATEGIES[name](**params)
+
+
+def iter_bars(path: str) -> Iterator[Bar]:
+    """逐行读取本地K线或tick文件（CSV，列名不区分大小写）
+
+    K线文件需要open/high/low/close列；tick文件只需price列。
+    """
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.reader(f)
+        header = [column.strip().lower() for column in next(reader)]
+        index = {column: i for i, column in enumerate(header)}
+        time_index = next((index[c] for c in ('datetime', 'timestamp', 'date', 'time') if c in index), None)
+        volume_index = index.get('volume')
+
+        if 'close' in index:
+            o, h, l, c = (index[field] for field in ('open', 'high', 'low', 'close'))
+            for row in reader:
+                yield Bar(
+                    row[time_index] if time_index is not None else '',
+                    float(row[o]), float(row[h]), float(row[l]), float(row[c]),
+                    float(row[volume_index]) if volume_index is not None else 0.0,
+                )
+        elif 'price' in index:
+            p = index['price']
+            for row in reader:
+                price = float(row[p])
+                yield Bar(
+                    row[time_index] if time_index is not None else '', price, price, price, price,
+                    float(row[volume_index]) if volume_index is not None else 0.0,
+                )
+        else:
+            raise ValueError(f"{path} 缺少close或price列")
+
+
+class LatencyHistogram:
+    """延迟直方图（纳秒）：按2的幂分段、每段再等分为SUB_BUCKETS个桶
+
+    桶数固定，内存占用与更新次数无关；分位数取所在桶的中点，相对误差不超过
+    1/(2·SUB_BUCKETS)。次数、总和与最大值精确记录。
+    """
+
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    SUB_BITS = 3
+    SUB_BUCKETS = 1 << SUB_BITS
+    # 小于该值的延迟每个整数单独一个桶
+    EXACT = 2 * SUB_BUCKETS
+
+    def __init__(self):
+        self.counts = [0] * (self.EXACT + (64 - self.SUB_BITS - 1) * self.SUB_BUCKETS)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    @classmethod
+    def bucket(cls, value: int) -> int:
+        """延迟所在的桶"""
+        if value < cls.EXACT:
+            return value
+        exponent = value.bit_length() - 1
+        sub = (value >> (exponent - cls.SUB_BITS)) - cls.SUB_BUCKETS
+        return cls.EXACT + (exponent - cls.SUB_BITS - 1) * cls.SUB_BUCKETS + sub
+
+    @classmethod
+    def midpoint(cls, bucket: int) -> float:
+        """桶的代表值（区间中点）"""
+        if bucket < cls.EXACT:
+            return float(bucket)
+        group, sub = divmod(bucket - cls.EXACT, cls.SUB_BUCKETS)
+        width = 1 << (group + 1)
+        return (cls.SUB_BUCKETS + sub) * width + (width - 1) / 2
+
+    def record(self, value: int):
+        self.counts[self.bucket(value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """第 int(count·q) 小的延迟的近似值"""
+        rank = min(self.count - 1, int(self.count * q))
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen > rank:
+                return min(self.midpoint(bucket), float(self.max))
+        return float(self.max)
+
+
+class ReplayReport:
+    """回放统计：更新次数、逐次更新延迟的直方图（纳秒）和最终仓位"""
+
+    def __init__(self, names: List[str]):
+        self.names = names
+        self.latencies: Dict[str, LatencyHistogram] = {name: LatencyHistogram() for name in names}
+        self.positions: Dict[str, float] = {name: 0.0 for name in names}
+        self.changes: Dict[str, int] = {name: 0 for name in names}
+
+    def latency_summary(self, name: str) -> Dict[str, float]:
+        """单个策略的延迟统计（微秒，分位数为直方图近似值）"""
+        latencies = self.latencies[name]
+        count = latencies.count
+        if not count:
+            return {'updates': 0, 'mean_us': 0.0, 'p50_us': 0.0, 'p99_us': 0.0, 'max_us': 0.0}
+        return {
+            'updates': count,
+            'mean_us': round(latencies.total / count / 1000, 3),
+            'p50_us': round(latencies.quantile(0.5) / 1000, 3),
+            'p99_us': round(latencies.quantile(0.99) / 1000, 3),
+            'max_us': round(latencies.max / 1000, 3),
+        }
+
+
+def replay(bars: Iterator[Bar], strategies: Dict[str, StreamingStrategy],
+           signals_file: Optional[str] = None) -> ReplayReport:
+    """按时间顺序把K线逐根推送给各策略，记录每次更新的延迟和仓位变化"""
+    report = ReplayReport(list(strategies))
+    perf_counter_ns = time.perf_counter_ns
+    writer = None
+    output = open(signals_file, 'w', encoding='utf-8', newline='') if signals_file else None
+    try:
+        if output is not None:
+            writer = csv.writer(output)
+            writer.writerow(['timestamp', 'close'] + report.names)
+        for bar in bars:
+            row = []
+            for name, strategy in strategies.items():
+                started = perf_counter_ns()
+                position = strategy.update(bar)
+                report.latencies[name].record(perf_counter_ns() - started)
+                if position != report.positions[name]:
+                    report.changes[name] += 1
+                    report.positions[name] = position
+                row.append(position)
+            if writer is not None:
+                writer.writerow([bar.timestamp, bar.close] + row)
+    finally:
+        if output is not None:
+            output.close()
+    return report
+
+
+def parse_args(argv: List[str] = None) -> argparse.Namespace:
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='增量指标策略回放')
+    parser.add_argument('path', help='本地K线或tick文件（CSV）')
+    parser.add_argument('--strategy', action='append', choices=list(STREAMING_STRATEGIES),
+                        help='回放的策略（可重复指定，默认全部）')
+    parser.add_argument('--signals', default=None, help='逐bar仓位输出文件（CSV）')
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str] = None):
+    """主函数"""
+    args = parse_args(argv)
+    names = args.strategy or list(STREAMING_STRATEGIES)
+    strategies = {name: get_streaming_strategy(name) for name in names}
+
+    print(f"=== 回放 {args.path} ===")
+    report = replay(iter_bars(args.path), strategies, args.signals)
+    for name in names:
+        stats = report.latency_summary(name)
+        print(f"{name}: {stats['updates']} 次更新，平均 {stats['mean_us']}μs，"
+              f"p99 {stats['p99_us']}μs，换仓 {report.changes[name]} 次，当前仓位 {report.positions[name]}")
+
+
+if __name__ == "__main__":
+    main()
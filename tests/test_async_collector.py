@@ -0,0 +1,151 @@
+"""异步搜集器：针对本地aiohttp桩服务器的测试"""
+
+import asyncio
+import json
+import time
+
+import pytest
+
+web = pytest.importorskip('aiohttp.web')
+
+from async_collector import (ArxivSource, AsyncSource, AsyncStrategyCollector, GitHubSearchSource,
+                             JsonFeedSource)
+from strategy_collector import StrategyCollector
+
+ARXIV_FEED = """<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <entry><id>http://arxiv.org/abs/1</id><title>Volatility  timing with options</title>
+  <summary>Implied vol based overlay.</summary></entry>
+</feed>"""
+
+
+def run_with_server(routes, collect):
+    """启动本地桩服务器，collect(base_url) 为协程函数"""
+
+    async def main():
+        app = web.Application()
+        for path, handler in routes.items():
+            app.router.add_get(path, handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        try:
+            return await collect(port)
+        finally:
+            await runner.cleanup()
+
+    return asyncio.run(main())
+
+
+def json_handler(payload, status=200, headers=None):
+    async def handler(request):
+        return web.Response(text=json.dumps(payload), status=status, headers=headers,
+                            content_type='application/json')
+    return handler
+
+
+def text_handler(body):
+    async def handler(request):
+        return web.Response(text=body)
+    return handler
+
+
+def test_malformed_feeds_do_not_abort_crawl(tmp_path):
+    routes = {
+        '/good': json_handler({'items': [{'title': 'Bitcoin 动量突破', 'category': 'forex'},
+                                         {'title': '均值回归', 'category': 'stocks'}]}),
+        '/bad-item': json_handler([{'name': '正常记录'}, 'not a dict']),
+        '/search/repositories': json_handler([{'full_name': 'a/b'}]),
+        '/arxiv': text_handler(ARXIV_FEED),
+        '/broken': text_handler('{not json'),
+    }
+
+    async def collect(port):
+        base = f'http://127.0.0.1:{port}'
+        sources = [
+            JsonFeedSource(f'{base}/good', field_map={'title': 'name'}),
+            JsonFeedSource(f'{base}/bad-item'),
+            GitHubSearchSource('quant', api_url=base),
+            ArxivSource('q-fin', api_url=f'{base}/arxiv'),
+            JsonFeedSource(f'{base}/broken'),
+        ]
+        collector = StrategyCollector(output_dir=str(tmp_path))
+        stats = await AsyncStrategyCollector(collector, sources, per_host_rate=0, retries=0).run()
+        return collector, stats
+
+    collector, stats = run_with_server(routes, collect)
+    assert stats['failed'] == 3
+    assert stats['added'] == 3
+    names = {s['name']: s['category'] for s in collector.strategies}
+    # 未知分类按内容重新推断，保证会被某个分类的保存流程写出
+    assert names == {'Bitcoin 动量突破': 'crypto', '均值回归': 'stocks',
+                     'Volatility timing with options': 'options'}
+
+
+def test_unknown_source_category_rejected():
+    with pytest.raises(ValueError):
+        JsonFeedSource('http://example.com/feed', category='forex')
+
+
+def test_retry_after_and_conditional_requests(tmp_path):
+    calls = {'flaky': 0, 'etag': 0}
+
+    async def flaky(request):
+        calls['flaky'] += 1
+        if calls['flaky'] == 1:
+            return web.Response(status=503, headers={'Retry-After': '0'})
+        return web.json_response([{'name': '重试后成功'}])
+
+    async def etag(request):
+        calls['etag'] += 1
+        if request.headers.get('If-None-Match') == '"v1"':
+            return web.Response(status=304)
+        return web.json_response([{'name': '条件请求'}], headers={'ETag': '"v1"'})
+
+    async def collect(port):
+        base = f'http://127.0.0.1:{port}'
+        sources = [JsonFeedSource(f'{base}/flaky'), JsonFeedSource(f'{base}/etag')]
+        results = []
+        for _ in range(2):
+            collector = StrategyCollector(output_dir=str(tmp_path))
+            crawler = AsyncStrategyCollector(collector, sources, per_host_rate=0, backoff=0.01,
+                                             cache_dir=str(tmp_path / 'http_cache'))
+            results.append(await crawler.run())
+        return results
+
+    first, second = run_with_server({'/flaky': flaky, '/etag': etag}, collect)
+    assert first['retries'] == 1 and first['added'] == 2 and first['failed'] == 0
+    assert second['not_modified'] == 1 and second['added'] == 2
+    assert calls['etag'] == 2
+
+
+def test_rate_limited_host_does_not_hold_concurrency_slots(tmp_path):
+    finished = {}
+
+    async def handler(request):
+        finished[request.path] = time.monotonic()
+        return web.json_response([{'name': request.path}])
+
+    routes = {f'/slow/{i}': handler for i in range(4)}
+    routes['/fast'] = handler
+
+    async def collect(port):
+        # 两个主机名指向同一个桩服务器，限速按主机名分别计算
+        slow = [JsonFeedSource(f'http://127.0.0.1:{port}/slow/{i}') for i in range(4)]
+        fast = JsonFeedSource(f'http://localhost:{port}/fast')
+        collector = StrategyCollector(output_dir=str(tmp_path))
+        start = time.monotonic()
+        await AsyncStrategyCollector(collector, slow + [fast], concurrency=1, per_host_rate=4).run()
+        return start
+
+    start = run_with_server(routes, collect)
+    # 慢主机的4个请求至少需要0.75秒；另一主机的请求不应排在它们之后
+    assert finished['/slow/3'] - start >= 0.7
+    assert finished['/fast'] - start < 0.5
+
+
+def test_source_base_is_abstract():
+    with pytest.raises(TypeError):
+        AsyncSource()
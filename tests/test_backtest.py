@@ -0,0 +1,120 @@
+"""向量化回测引擎与逐bar循环参考实现一致"""
+
+import numpy as np
+import pytest
+
+import backtest
+from backtest import (BACKTEST_STRATEGIES, BacktestEngine, IndicatorMemo, get_backtest_strategy,
+                      memoize_indicators, positions_from_signals)
+
+
+@pytest.fixture(scope='module')
+def panel():
+    rng = np.random.default_rng(11)
+    bars, symbols = 800, 3
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (bars, symbols)), axis=0))
+    open_ = close * np.exp(rng.normal(0, 0.005, (bars, symbols)))
+    spread = np.abs(rng.normal(0, 0.01, (bars, symbols))) * close
+    return BacktestEngine.prepare({
+        'open': open_,
+        'high': np.maximum(open_, close) + spread,
+        'low': np.minimum(open_, close) - spread,
+        'close': close,
+        'pair_close': close * np.exp(rng.normal(0, 0.01, (bars, symbols))),
+    })
+
+
+def loop_positions(entries_long, entries_short, exits):
+    state = np.zeros(entries_long.shape[1])
+    result = np.zeros(entries_long.shape)
+    for t in range(len(result)):
+        state = np.where(exits[t], 0.0, state)
+        if entries_short is not None:
+            state = np.where(entries_short[t], -1.0, state)
+        state = np.where(entries_long[t], 1.0, state)
+        result[t] = state
+    return result
+
+
+def loop_returns(positions, asset_returns, cost):
+    """逐bar参考实现：持有上一bar收盘时的目标仓位，换仓费用在下一bar扣除"""
+    returns = np.zeros(positions.shape)
+    for t in range(1, len(positions)):
+        turnover = np.abs(positions[t - 1] - (positions[t - 2] if t >= 2 else 0.0))
+        returns[t] = positions[t - 1] * asset_returns[t] - cost * turnover
+    return returns
+
+
+def test_positions_from_signals_matches_loop():
+    rng = np.random.default_rng(3)
+    signals = [rng.random((500, 4)) < p for p in (0.05, 0.05, 0.1)]
+    np.testing.assert_array_equal(positions_from_signals(*signals), loop_positions(*signals))
+    np.testing.assert_array_equal(positions_from_signals(signals[0], None, signals[2]),
+                                  loop_positions(signals[0], None, signals[2]))
+
+
+@pytest.mark.parametrize('name', sorted(BACKTEST_STRATEGIES))
+def test_run_matches_loop(panel, name):
+    strategy = get_backtest_strategy(name)
+    engine = BacktestEngine(cost=0.001)
+    result = engine.run(strategy, panel)
+    positions = np.nan_to_num(strategy.positions(panel), nan=0.0)
+    np.testing.assert_array_equal(result.positions, positions)
+    expected = loop_returns(positions, strategy.asset_returns(panel), 0.001)
+    np.testing.assert_allclose(result.returns, expected, rtol=1e-12, atol=1e-15)
+
+    equity = np.cumprod(1 + expected, axis=0)
+    metrics = result.metrics
+    np.testing.assert_allclose(metrics['total_return'], equity[-1] - 1, rtol=1e-10)
+    drawdown = [min(e / max(equity[:t + 1, s]) - 1 for t, e in enumerate(equity[:, s])) for s in range(3)]
+    np.testing.assert_allclose(metrics['max_drawdown'], drawdown, rtol=1e-10, atol=1e-15)
+    trades = [sum(positions[t, s] != (positions[t - 1, s] if t else 0) for t in range(len(positions)))
+              for s in range(3)]
+    np.testing.assert_array_equal(metrics['trades'], trades)
+
+
+@pytest.mark.parametrize('name', sorted(BACKTEST_STRATEGIES))
+def test_symbols_are_independent(panel, name):
+    engine = BacktestEngine()
+    strategy = get_backtest_strategy(name)
+    combined = engine.run(strategy, panel).returns
+    for column in range(3):
+        single = engine.run(strategy, {field: values[:, column] for field, values in panel.items()})
+        np.testing.assert_allclose(single.returns[:, 0], combined[:, column], rtol=1e-12, atol=1e-15)
+
+
+def test_evaluate_maps_variants_and_skips_missing_fields(panel):
+    catalog = [
+        {'name': '双均线策略 (日线)', 'variant_of': '双均线策略'},
+        {'name': '海龟交易法则'},
+        {'name': '未实现的策略'},
+    ]
+    close_only = {'close': panel['close']}
+    results = list(BacktestEngine().evaluate(catalog, close_only))
+    # 海龟交易法则需要high/low，只有close时跳过
+    assert [r['name'] for r in results] == ['双均线策略 (日线)']
+    expected = BacktestEngine().run(get_backtest_strategy('双均线策略'), close_only).summary()
+    assert results[0]['backtest'] == expected
+    with pytest.raises(ValueError):
+        get_backtest_strategy('未实现的策略')
+
+
+def test_memoized_indicators_accept_keywords(panel):
+    close = panel['close']
+    expected = backtest.rsi(close, 14)
+    np.testing.assert_array_equal(backtest.rsi(close, period=14), expected)
+    memo = IndicatorMemo()
+    memo.register(panel)
+    with memoize_indicators(memo):
+        # 位置参数、关键字参数和默认值补齐后是同一个调用，只计算一次
+        results = [backtest.rsi(close), backtest.rsi(close, 14), backtest.rsi(close, period=14),
+                   backtest.sma(values=close, window=20)]
+    assert (memo.misses, memo.hits) == (2, 2)
+    for result in results[:3]:
+        np.testing.assert_array_equal(result, expected)
+    np.testing.assert_array_equal(results[3], backtest.sma(close, 20))
+
+
+def test_strategy_base_is_abstract():
+    with pytest.raises(TypeError):
+        backtest.BacktestStrategy()
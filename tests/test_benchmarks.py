@@ -0,0 +1,62 @@
+"""基准测试：合成数据可复现、基线比较与命令行退出码"""
+
+import json
+from functools import partial
+
+import benchmarks
+from benchmarks import (DEFAULT_BASELINE_FILE, DEFAULT_SIZES, STAGES, compare_with_baseline, main,
+                        synthetic_strategies)
+
+
+def result(stage, seconds, peak_bytes=None, size=100):
+    return {'size': size, 'stage': stage, 'seconds': seconds, 'peak_bytes': peak_bytes}
+
+
+def test_synthetic_strategies_are_reproducible():
+    first = list(synthetic_strategies(50, seed=3))
+    assert first == list(synthetic_strategies(50, seed=3))
+    assert first != list(synthetic_strategies(50, seed=4))
+    assert len({s['name'] for s in first}) == len({s['logic'] for s in first}) == 50
+
+
+def test_compare_with_baseline():
+    baseline = {'results': [result('collect', 1.0, 1000), result('expand_strategies', 0.01, 1000),
+                            result('save_to_csv', 1.0)]}
+    report = {'results': [
+        result('collect', 1.2, 1300),             # 耗时在容差内，内存超出
+        result('expand_strategies', 0.04, 900),   # 倍数超出但绝对耗时低于min_seconds
+        result('save_to_csv', 2.0),               # 耗时回退
+        result('collect', 5.0, size=1000),        # 基线中没有的规模不比较
+    ]}
+    regressions = compare_with_baseline(report, baseline, tolerance=0.25, min_seconds=0.05)
+    assert [(r['stage'], r['metric']) for r in regressions] == [('collect', 'peak_bytes'),
+                                                                ('save_to_csv', 'seconds')]
+    assert report['results'][0]['time_ratio'] == 1.2 and report['results'][0]['memory_ratio'] == 1.3
+    assert 'baseline_seconds' not in report['results'][3]
+
+
+def test_committed_baseline_covers_default_run():
+    with open(DEFAULT_BASELINE_FILE, encoding='utf-8') as f:
+        baseline = json.load(f)
+    assert {(r['size'], r['stage']) for r in baseline['results']} == \
+        {(size, stage) for size in DEFAULT_SIZES for stage in STAGES}
+
+
+def test_main_exit_codes(tmp_path, capsys, monkeypatch):
+    baseline = str(tmp_path / 'baseline.json')
+    args = ['--sizes', '20', '--no-memory', '--baseline', baseline]
+    assert main(args) == 2
+    assert main(args + ['--no-baseline']) == 0
+    assert main(args + ['--save-baseline']) == 0
+
+    with open(baseline, encoding='utf-8') as f:
+        saved = json.load(f)
+    assert {r['stage'] for r in saved['results']} == set(STAGES)
+    # 把基线耗时改得极小，并取消最短耗时限制，所有阶段都应判为回退
+    for r in saved['results']:
+        r['seconds'] = 1e-9
+    with open(baseline, 'w', encoding='utf-8') as f:
+        json.dump(saved, f)
+    monkeypatch.setattr(benchmarks, 'compare_with_baseline', partial(compare_with_baseline, min_seconds=0))
+    assert main(args) == 1
+    assert f'发现 {len(STAGES)} 项性能回退' in capsys.readouterr().out
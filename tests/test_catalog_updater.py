@@ -0,0 +1,104 @@
+"""策略总目录：旧版章节迁移、按章节增量重写"""
+
+import json
+import os
+
+from catalog_updater import CATALOG_FILE, STATE_FILE, CatalogUpdater
+
+LEGACY_CATALOG = """# 量化交易策略总目录
+
+## 统计信息
+## 统计信息
+- **总策略数:** 159 (持续更新中)
+- **最后更新:** 2026-01-29 19:27:56
+
+### 各市场策略数量
+- **股票策略:** 54 个
+
+### 策略来源
+- **基础策略:** 9 个
+## 策略分类索引
+
+### 股票策略
+| 策略名称 | 类型 | 复杂度 | 核心逻辑 | 技术指标 | 代码链接 | 状态 |
+|---------|------|--------|----------|----------|----------|------|
+| 旧策略 | 趋势跟踪 | 基础 | 旧逻辑 | SMA | - | ✅ 已收录 |
+
+### 期货策略
+| 策略名称 | 类型 | 复杂度 | 核心逻辑 | 技术指标 | 代码链接 | 状态 |
+|---------|------|--------|----------|----------|----------|------|
+
+## 复杂度定义
+- **基础:** 使用简单技术指标 (MA, RSI, MACD等)
+
+## 更新日志
+### 2025-04-06
+- 创建策略目录框架
+"""
+
+STOCKS = [{'name': '双均线策略', 'type': '趋势跟踪', 'complexity': '基础', 'logic': '金叉买入 | 死叉卖出',
+           'indicators': 'SMA', 'references': 'https://example.com/ma'}]
+
+
+def read(directory):
+    with open(os.path.join(directory, CATALOG_FILE), encoding='utf-8') as f:
+        return f.read()
+
+
+def test_migrates_legacy_sections(tmp_path):
+    (tmp_path / CATALOG_FILE).write_text(LEGACY_CATALOG, encoding='utf-8')
+    state = CatalogUpdater(str(tmp_path)).update(stats={'base': {'stocks': 1}}, listings={'stocks': STOCKS})
+    content = read(tmp_path)
+    assert sorted(state['changed']) == ['listing:stocks', 'stats']
+    assert content.count('## 统计信息') == 1
+    assert content.count('### 股票策略') == 1 and '旧策略' not in content
+    assert '金叉买入 \\| 死叉卖出' in content and '[参考链接](https://example.com/ma)' in content
+    assert content.index('<!-- catalog:stats -->') < content.index('## 策略分类索引') \
+        < content.index('<!-- catalog:listing:stocks -->') < content.index('### 期货策略')
+    # 不由程序维护的章节原样保留
+    for untouched in ('### 期货策略\n| 策略名称', '## 复杂度定义\n- **基础:**', '## 更新日志\n### 2025-04-06\n'):
+        assert untouched in content
+    assert '- **总策略数:** 1 (持续更新中)' in content
+
+
+def test_unchanged_update_does_not_rewrite(tmp_path):
+    (tmp_path / CATALOG_FILE).write_text(LEGACY_CATALOG, encoding='utf-8')
+    updater = CatalogUpdater(str(tmp_path))
+    updater.update(stats={'base': {'stocks': 1}}, listings={'stocks': STOCKS})
+    before = read(tmp_path)
+    mtime = os.stat(tmp_path / CATALOG_FILE).st_mtime_ns
+    state = updater.update(stats={'base': {'stocks': 1}}, listings={'stocks': STOCKS})
+    assert state['changed'] == []
+    assert read(tmp_path) == before and os.stat(tmp_path / CATALOG_FILE).st_mtime_ns == mtime
+
+
+def test_only_changed_sections_are_rewritten(tmp_path):
+    (tmp_path / CATALOG_FILE).write_text(LEGACY_CATALOG, encoding='utf-8')
+    updater = CatalogUpdater(str(tmp_path))
+    updater.update(stats={'base': {'stocks': 1}}, listings={'stocks': STOCKS})
+    state = updater.update(stats={'expanded': {'stocks': 3}, 'hybrid': 2})
+    assert state['changed'] == ['stats']
+    # 按键覆盖：之前写入的base保留
+    assert state['stats'] == {'base': {'stocks': 1}, 'expanded': {'stocks': 3}, 'hybrid': 2}
+    content = read(tmp_path)
+    assert '- **总策略数:** 4 (持续更新中)' in content and '- **混合策略:** 2 个' in content
+    with open(tmp_path / STATE_FILE, encoding='utf-8') as f:
+        assert json.load(f)['stats']['hybrid'] == 2
+
+
+def test_custom_section_inserted_after_index_and_replaced(tmp_path):
+    (tmp_path / CATALOG_FILE).write_text(LEGACY_CATALOG, encoding='utf-8')
+    updater = CatalogUpdater(str(tmp_path))
+    updater.update(sections={'portfolio': '## 组合分析\n\n- 精简核心: 3 个变体\n'})
+    content = read(tmp_path)
+    assert content.index('### 期货策略') < content.index('## 组合分析') < content.index('## 复杂度定义')
+    updater.update(sections={'portfolio': '## 组合分析\n\n- 精简核心: 2 个变体\n'})
+    content = read(tmp_path)
+    assert content.count('## 组合分析') == 1 and '2 个变体' in content and '3 个变体' not in content
+
+
+def test_creates_catalog_when_missing(tmp_path):
+    state = CatalogUpdater(str(tmp_path)).update(stats={'base': {'crypto': 2}})
+    content = read(tmp_path)
+    assert state['changed'] == ['stats']
+    assert content.startswith('# 量化交易策略总目录\n') and '- **加密货币策略:** 2 个' in content
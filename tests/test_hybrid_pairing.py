@@ -0,0 +1,47 @@
+"""混合配对策略：组合枚举与数量估算一致"""
+
+import pytest
+
+from hybrid_pairing import AllPairsPairing, KWayPairing, NeighborPairing, PairingPolicy, RandomPairing
+from strategy_table import StrategyTable
+
+CATEGORIES = ['stocks'] * 7 + ['futures'] * 3 + ['stocks'] * 2 + ['crypto']
+
+
+@pytest.fixture
+def table():
+    table = StrategyTable()
+    table.extend({'name': f's{i}', 'category': c} for i, c in enumerate(CATEGORIES))
+    return table
+
+
+@pytest.mark.parametrize('policy', [
+    NeighborPairing(), NeighborPairing(window=4), AllPairsPairing(), KWayPairing(3),
+    RandomPairing(sample_size=5, seed=3), RandomPairing(sample_size=1000),
+])
+def test_estimate_matches_combinations(policy, table):
+    groups = list(policy.combinations(table))
+    assert policy.estimate(table) == len(groups)
+    assert len(set(groups)) == len(groups)
+    for rows in groups:
+        assert list(rows) == sorted(rows)
+        assert len({CATEGORIES[row] for row in rows}) == 1
+
+
+def test_random_pairing_is_seeded_subset(table):
+    everything = set(AllPairsPairing().combinations(table))
+    sample = list(RandomPairing(sample_size=5, seed=3).combinations(table))
+    assert set(sample) <= everything
+    assert sample == list(RandomPairing(sample_size=5, seed=3).combinations(table))
+    # 抽样数不小于组合总数时退化为同类全配对
+    assert set(RandomPairing(sample_size=1000).combinations(table)) == everything
+
+
+def test_kway_requires_two():
+    with pytest.raises(ValueError):
+        KWayPairing(1)
+
+
+def test_policy_base_is_abstract():
+    with pytest.raises(TypeError):
+        PairingPolicy()
@@ -0,0 +1,54 @@
+"""本地行情库：由CSV/Parquet构建K线数据集"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import market_data
+from market_data import MarketDataStore
+
+
+@pytest.fixture
+def sources(tmp_path):
+    dates = pd.date_range('2024-01-01', periods=6, freq='D')
+    long = pd.DataFrame({
+        'Date': list(dates[:4]) * 2,
+        'Symbol': ['AAA'] * 4 + ['BBB'] * 4,
+        'Close': np.arange(8, dtype=float),
+        'Volume': np.arange(8, dtype=float) * 10,
+        'Comment': ['x'] * 8,
+    })
+    long.to_csv(tmp_path / 'long.csv', index=False)
+    single = pd.DataFrame({'timestamp': dates[2:], 'open': [1.0, 2.0, 3.0, 4.0], 'close': [5.0, 6.0, 7.0, 8.0]})
+    single.to_parquet(tmp_path / 'CCC.parquet')
+    return tmp_path, dates
+
+
+def test_build_ohlcv_aligns_files(sources):
+    directory, dates = sources
+    store = MarketDataStore(str(directory / 'store'))
+    dataset = store.build_ohlcv('daily', [str(directory / 'long.csv'), str(directory / 'CCC.parquet')])
+    assert dataset.symbols == ['AAA', 'BBB', 'CCC']
+    assert dataset.fields == ['open', 'close', 'volume']
+    assert np.array_equal(dataset.timestamps, dates.to_numpy(dtype='datetime64[ns]'))
+    close = dataset.field('close')
+    np.testing.assert_array_equal(close[:4, 0], [0, 1, 2, 3])
+    np.testing.assert_array_equal(close[:4, 1], [4, 5, 6, 7])
+    np.testing.assert_array_equal(close[2:, 2], [5, 6, 7, 8])
+    assert np.isnan(close[4:, :2]).all() and np.isnan(close[:2, 2]).all()
+    assert np.isnan(dataset.field('open')[:, :2]).all()
+
+
+def test_first_pass_reads_only_time_and_symbol(sources, monkeypatch):
+    directory, _ = sources
+    requested = []
+    read_table = market_data._read_table
+
+    def spy(path, columns=None):
+        requested.append(None if columns is None else set(columns))
+        return read_table(path, columns)
+
+    monkeypatch.setattr(market_data, '_read_table', spy)
+    MarketDataStore(str(directory / 'store')).build_ohlcv('daily', [str(directory / 'long.csv')])
+    assert requested[0] == {'date', 'symbol'}
+    assert None not in requested and all('comment' not in columns for columns in requested)
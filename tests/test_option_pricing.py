@@ -0,0 +1,82 @@
+"""期权定价：已知数值、平价关系、希腊字母与隐含波动率往返"""
+
+import numpy as np
+import pytest
+
+from option_pricing import Black76, BlackScholes, PricingModel, get_pricing_model
+
+
+def grid():
+    s, k, t, sigma, call = np.meshgrid([100.0], [50, 80, 95, 100, 105, 120, 200], [0.02, 0.25, 1.0, 3.0],
+                                       [0.05, 0.2, 0.6, 1.5], [True, False], indexing='ij')
+    return s.ravel(), k.ravel(), t.ravel(), sigma.ravel(), call.ravel()
+
+
+def test_reference_values():
+    model = BlackScholes()
+    assert model.price(100, 100, 1.0, 0.05, 0.2, 'call') == pytest.approx(10.450583572185565, abs=1e-9)
+    assert model.price(100, 100, 1.0, 0.05, 0.2, 'put') == pytest.approx(5.573526022256971, abs=1e-9)
+    # 到期时为内在价值
+    assert model.price(110, 100, 0.0, 0.05, 0.2, 'call') == pytest.approx(10.0)
+
+
+@pytest.mark.parametrize('model', [BlackScholes(), BlackScholes(dividend_yield=0.03), Black76()])
+def test_put_call_parity(model):
+    s, k, t, sigma, _ = grid()
+    r = 0.04
+    call = model.price(s, k, t, r, sigma, True)
+    put = model.price(s, k, t, r, sigma, False)
+    forward = s * np.exp((model.carry(np.full_like(s, r)) - r) * t) - k * np.exp(-r * t)
+    np.testing.assert_allclose(call - put, forward, atol=1e-9)
+
+
+@pytest.mark.parametrize('model', [BlackScholes(dividend_yield=0.02), Black76()])
+def test_greeks_match_finite_differences(model):
+    s, k, t, sigma, call = 100.0, np.array([90.0, 100.0, 115.0]), 0.5, 0.3, np.array([True, False, True])
+    r, h = 0.03, 1e-4
+    greeks = model.greeks(s, k, t, r, sigma, call)
+
+    def price(**bump):
+        args = {'underlying': s, 'strike': k, 'expiry': t, 'rate': r, 'sigma': sigma, 'call': call}
+        args.update({name: args[name] + value for name, value in bump.items()})
+        return model.price(**args)
+
+    np.testing.assert_allclose(greeks['delta'], (price(underlying=h) - price(underlying=-h)) / (2 * h), atol=1e-6)
+    np.testing.assert_allclose(greeks['gamma'],
+                               (price(underlying=h) - 2 * price() + price(underlying=-h)) / h ** 2, atol=1e-4)
+    np.testing.assert_allclose(greeks['vega'], (price(sigma=h) - price(sigma=-h)) / (2 * h), atol=1e-5)
+    np.testing.assert_allclose(greeks['rho'], (price(rate=h) - price(rate=-h)) / (2 * h), atol=1e-5)
+    np.testing.assert_allclose(greeks['theta'], -(price(expiry=h) - price(expiry=-h)) / (2 * h), atol=1e-4)
+
+
+@pytest.mark.parametrize('name', ['black-scholes', 'black76'])
+def test_implied_volatility_round_trip(name):
+    model = get_pricing_model(name)
+    s, k, t, sigma, call = grid()
+    r = 0.02
+    prices = model.price(s, k, t, r, sigma, call)
+    implied = model.implied_volatility(prices, s, k, t, r, call)
+    # 求解器按价格收敛（容差1e-10 × max(1, 价格)），vega很小的合约（深度实值/虚值、临近到期）
+    # 价格对波动率几乎不敏感，只要求重新定价一致；其余必须还原出原波动率
+    vega = model.greeks(s, k, t, r, sigma, call)['vega']
+    resolvable = vega > 1e-2
+    assert resolvable.mean() > 0.6
+    np.testing.assert_allclose(implied[resolvable], sigma[resolvable], rtol=1e-6)
+    solved = np.isfinite(implied)
+    assert solved[resolvable].all()
+    repriced = model.price(s, k, t, r, implied, call)
+    assert (np.abs(repriced - prices)[solved] <= 1e-9 * np.maximum(prices[solved], 1.0)).all()
+
+
+def test_implied_volatility_outside_arbitrage_bounds_is_nan():
+    model = BlackScholes()
+    prices = np.array([0.5, 150.0, 5.0, np.nan])
+    implied = model.implied_volatility(prices, 100.0, np.array([50.0, 100.0, 100.0, 100.0]),
+                                       np.array([1.0, 1.0, 0.0, 1.0]), 0.0, 'call')
+    # 低于内在价值、高于标的价格、已到期、价格缺失
+    assert np.isnan(implied).all()
+
+
+def test_pricing_model_base_is_abstract():
+    with pytest.raises(TypeError):
+        PricingModel()
@@ -0,0 +1,123 @@
+"""订单簿回放：订单簿最优档维护、时间戳解析、多文件归并与跨交易所套利成交记账"""
+
+import gzip
+import random
+
+import pytest
+
+from orderbook_replay import (ASK, BID, BookUpdate, CrossExchangeArbitrage, OrderBook,
+                              ReplaySimulator, Venue, iter_book_updates, iter_trades, timestamp_parser)
+
+T0 = 1_700_000_000_000  # 毫秒时间戳
+MS = 1_000_000
+
+
+def test_best_levels_match_full_scan():
+    rng = random.Random(0)
+    book = OrderBook()
+    for i in range(5000):
+        side = rng.choice([BID, ASK])
+        price = round(100 + (rng.randint(-50, -1) if side == BID else rng.randint(1, 50)) * 0.01, 2)
+        size = rng.choice([0.0, 0.0, 1.0, 2.5])
+        book.apply(BookUpdate(i, i, 'x', side, price, size))
+        expected_bid = max(book.bids) if book.bids else None
+        expected_ask = min(book.asks) if book.asks else None
+        if expected_bid is not None:
+            assert book.best_bid() == (expected_bid, book.bids[expected_bid])
+        if expected_ask is not None:
+            assert book.best_ask() == (expected_ask, book.asks[expected_ask])
+    assert len(book._bid_heap) <= 2 * len(book.bids) + 65
+
+    # 新快照开始时清空旧订单簿
+    book.apply(BookUpdate(0, 0, 'x', BID, 90.0, 1.0, snapshot=True))
+    book.apply(BookUpdate(0, 0, 'x', ASK, 91.0, 1.0, snapshot=True))
+    assert book.bids == {90.0: 1.0} and book.asks == {91.0: 1.0}
+
+
+def test_take_walks_levels_within_limit():
+    book = OrderBook()
+    for price, size in ((100.0, 1.0), (100.5, 2.0), (101.0, 5.0)):
+        book.apply(BookUpdate(0, 0, 'x', ASK, price, size))
+    assert book.take(BID, 2.5, 100.5) == (2.5, 100.0 + 1.5 * 100.5)
+    assert book.asks == {100.5: 0.5, 101.0: 5.0}
+    assert book.best_ask() == (100.5, 0.5)
+    assert book.take(BID, 1.0, 99.0) == (0.0, 0.0)
+
+
+@pytest.mark.parametrize('sample, expected', [
+    ('1700000000', 1_700_000_000 * 10 ** 9),
+    ('1700000000123', 1_700_000_000_123 * MS),
+    ('1700000000123456', 1_700_000_000_123_456 * 1000),
+    ('1700000000.5', 1_700_000_000_500_000_000),
+    ('2023-11-14T22:13:20.25Z', 1_700_000_000_250_000_000),
+    ('2023-11-14 22:13:20', 1_700_000_000 * 10 ** 9),
+])
+def test_timestamp_parser(sample, expected):
+    assert timestamp_parser(sample)(sample) == expected
+
+
+def write_csv(path, header, rows):
+    text = '\n'.join([header] + [','.join(map(str, row)) for row in rows]) + '\n'
+    if str(path).endswith('.gz'):
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        path.write_text(text, encoding='utf-8')
+    return str(path)
+
+
+def make_streams(tmp_path, venues, extra_a=()):
+    book_a = write_csv(tmp_path / 'a_book.csv.gz', 'timestamp,side,price,amount',
+                       [(T0 + 1000, 'bid', 99, 1), (T0 + 1000, 'ask', 100, 1), *extra_a])
+    book_b = write_csv(tmp_path / 'b_book.csv', 'Time,Side,Price,Size',
+                       [(T0 + 2000, 'b', 101, 1), (T0 + 2000, 'a', 102, 1)])
+    trades_b = write_csv(tmp_path / 'b_trades.csv', 'timestamp,side,price,qty',
+                         [(T0 + 1500, 'buy', 101.5, 0.1)])
+    return [iter_book_updates([book_a], 'a', venues['a'].feed_latency),
+            iter_book_updates([book_b], 'b', venues['b'].feed_latency),
+            iter_trades([trades_b], 'b', venues['b'].feed_latency)]
+
+
+def test_arbitrage_fills_and_accounting(tmp_path):
+    venues = {'a': Venue('a', quote=1000.0), 'b': Venue('b', base=1.0)}
+    strategy = CrossExchangeArbitrage(min_edge_bps=5, max_size=0.5)
+    simulator = ReplaySimulator(venues, strategy)
+    report = simulator.run(make_streams(tmp_path, venues))
+
+    assert (report['book_updates'], report['trades'], report['orders'], report['filled_orders']) == (4, 1, 2, 2)
+    assert [(f.order.venue, f.order.side, f.filled, f.average_price) for f in simulator.fills] == [
+        ('a', BID, 0.5, 100.0), ('b', ASK, 0.5, 101.0)]
+    assert report['strategy']['unhedged'] == 0 and report['strategy']['attempts'] == 1
+    assert venues['a'].base == 0.5 and venues['a'].quote == pytest.approx(1000 - 50 * 1.001)
+    assert venues['b'].base == 0.5 and venues['b'].quote == pytest.approx(50.5 * 0.999)
+    expected_pnl = (-50 * 1.001 + 0.5 * 99.5) + (50.5 * 0.999 - 0.5 * 101.5)
+    assert report['pnl'] == pytest.approx(expected_pnl)
+    assert report['fees'] == pytest.approx(0.05 + 0.0505)
+
+
+def test_order_latency_can_leave_a_leg_unfilled(tmp_path):
+    venues = {'a': Venue('a', order_latency=50 * MS, quote=1000.0), 'b': Venue('b', base=1.0)}
+    strategy = CrossExchangeArbitrage(min_edge_bps=5, max_size=0.5)
+    simulator = ReplaySimulator(venues, strategy)
+    # 买单在路上时a的卖一被撤掉
+    report = simulator.run(make_streams(tmp_path, venues, extra_a=[(T0 + 2010, 'ask', 100, 0)]))
+    fills = {f.order.venue: f for f in simulator.fills}
+    assert fills['a'].filled == 0 and fills['a'].time == (T0 + 2050) * MS
+    assert fills['b'].filled == 0.5 and fills['b'].time == (T0 + 2000) * MS
+    assert report['strategy']['unhedged'] == -0.5
+
+
+def test_events_merge_by_receive_time(tmp_path):
+    venues = {'a': Venue('a', feed_latency=1500 * MS), 'b': Venue('b')}
+    order = []
+
+    class Recorder(CrossExchangeArbitrage):
+        def on_book(self, sim, venue):
+            order.append((sim.now, venue))
+
+        def on_trade(self, sim, trade):
+            order.append((sim.now, 'trade'))
+
+    ReplaySimulator(venues, Recorder()).run(make_streams(tmp_path, venues))
+    # a的行情延迟1.5秒，在b的行情之后才到达
+    assert order == [((T0 + 1500) * MS, 'trade'), ((T0 + 2000) * MS, 'b'), ((T0 + 2500) * MS, 'a')]
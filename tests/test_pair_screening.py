@@ -0,0 +1,58 @@
+"""协整配对筛选：增量二阶矩与完整重算一致、结果缓存有上限"""
+
+import numpy as np
+
+from pair_screening import PairScreener, log_returns
+
+
+def make_prices(bars=400, symbols=12, seed=0):
+    rng = np.random.default_rng(seed)
+    log_prices = np.cumsum(rng.normal(0, 0.01, (bars, symbols)), axis=0) + 4
+    # 第1列与第0列协整：共同随机游走 + 平稳噪声
+    log_prices[:, 1] = 0.8 * log_prices[:, 0] + 1 + rng.normal(0, 0.005, bars)
+    timestamps = np.arange('2020-01-01', bars, dtype='datetime64[D]').astype('datetime64[ns]')
+    return np.exp(log_prices), [f'S{i:02d}' for i in range(symbols)], timestamps
+
+
+def test_incremental_moments_match_full_recompute(tmp_path):
+    close, symbols, timestamps = make_prices()
+    screener = PairScreener(lookback=120, cache_dir=str(tmp_path), refresh=100)
+    screener.stats = {}
+    screener.moments(close, timestamps, 200, symbols)
+    for end in (201, 205, 240, 250):
+        gram, sums, count = screener.moments(close, timestamps, end, symbols)
+        assert screener.stats['moments'].startswith('增量')
+        returns = log_returns(close, end - count + 1, end + 1)
+        np.testing.assert_allclose(gram, returns.T @ returns, rtol=1e-10, atol=1e-14)
+        np.testing.assert_allclose(sums, returns.sum(axis=0), rtol=1e-10, atol=1e-14)
+
+
+def test_modified_history_forces_full_recompute(tmp_path):
+    close, symbols, timestamps = make_prices()
+    screener = PairScreener(lookback=120, cache_dir=str(tmp_path))
+    screener.stats = {}
+    screener.moments(close, timestamps, 200, symbols)
+    close = close.copy()
+    close[200, 3] *= 1.01
+    screener.moments(close, timestamps, 201, symbols)
+    assert screener.stats['moments'] == '完整计算'
+
+
+def test_screen_finds_planted_pair_and_caches(tmp_path):
+    close, symbols, timestamps = make_prices()
+    screener = PairScreener(lookback=250, min_corr=0.5, cache_dir=str(tmp_path))
+    frame = screener.screen(close, symbols, timestamps)
+    top = frame.iloc[0]
+    assert {top['symbol_a'], top['symbol_b']} == {'S00', 'S01'} and top['cointegrated']
+    again = screener.screen(close, symbols, timestamps)
+    assert screener.stats['cached']
+    assert again.equals(frame)
+
+
+def test_result_cache_is_bounded(tmp_path):
+    close, symbols, timestamps = make_prices()
+    screener = PairScreener(lookback=120, min_corr=0.0, cache_dir=str(tmp_path), cache_bytes=20000)
+    for end in range(150, 400, 10):
+        screener.screen(close, symbols, timestamps, end=end)
+    assert screener.cache.nbytes <= 20000
+    assert screener.cache.evicted > 0
@@ -0,0 +1,106 @@
+"""参数扫描：网格映射、K线合并、并行与单进程结果一致、早停"""
+
+import numpy as np
+import pytest
+
+from backtest import PERIODS_PER_YEAR, BacktestEngine, get_backtest_strategy
+from parameter_sweep import LeveragedStrategy, ParameterGrid, SweepRunner, resample
+
+GRIDS = {
+    '双均线策略': {'fast': [5, 20, 40], 'slow': [30, 60], 'kind': ['sma', 'ema']},
+    'RSI超买超卖策略': {'period': [7, 14], 'lower': [20, 30], 'upper': [70]},
+    '海龟交易法则': {'entry': [20, 55], 'exit': [10], 'stop_atr': [2.0, 3.0]},
+}
+SETTINGS = {
+    'timeframe': {'日内': None, '日线': {'bar_size': 1}, '周线': {'bar_size': 5}},
+    'aggressiveness': {'激进': {'leverage': 1.5}, '保守': {'leverage': 0.5}},
+}
+STRATEGIES = [
+    {'name': '双均线策略'},
+    {'name': '双均线策略 (周线, 激进版)', 'variant_of': '双均线策略', 'timeframe': '周线', 'aggressiveness': '激进'},
+    {'name': 'RSI超买超卖策略 (保守版)', 'variant_of': 'RSI超买超卖策略', 'aggressiveness': '保守'},
+    {'name': '海龟交易法则'},
+    {'name': '双均线策略 (日内)', 'variant_of': '双均线策略', 'timeframe': '日内'},
+    {'name': '没有回测实现的策略'},
+]
+
+
+@pytest.fixture(scope='module')
+def panel():
+    rng = np.random.default_rng(5)
+    bars, symbols = 900, 2
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0001, 0.015, (bars, symbols)), axis=0))
+    open_ = close * np.exp(rng.normal(0, 0.004, (bars, symbols)))
+    spread = np.abs(rng.normal(0, 0.008, (bars, symbols))) * close
+    return {'open': open_, 'high': np.maximum(open_, close) + spread,
+            'low': np.minimum(open_, close) - spread, 'close': close,
+            'volume': rng.integers(1000, 5000, (bars, symbols)).astype(float)}
+
+
+@pytest.fixture(scope='module')
+def grid():
+    return ParameterGrid(GRIDS, SETTINGS)
+
+
+def test_grid_tasks(grid):
+    tasks = grid.tasks(STRATEGIES[1])
+    # fast >= slow 的组合被跳过
+    assert len(tasks) == 10 and all(dict(params)['fast'] < dict(params)['slow'] for _, params, _, _ in tasks)
+    assert {(base, bar_size, leverage) for base, _, bar_size, leverage in tasks} == {('双均线策略', 5, 1.5)}
+    assert grid.tasks(STRATEGIES[4]) == [] and grid.tasks(STRATEGIES[5]) == []
+    with pytest.raises(ValueError):
+        ParameterGrid({'没有回测实现的策略': {}})
+
+
+def test_resample_anchors_at_first_bar(panel):
+    bars = resample(panel, 5)
+    assert len(bars['close']) == 900 // 5
+    np.testing.assert_array_equal(bars['close'], panel['close'][4::5])
+    np.testing.assert_array_equal(bars['open'], panel['open'][0::5])
+    np.testing.assert_array_equal(bars['high'][3], panel['high'][15:20].max(axis=0))
+    np.testing.assert_array_equal(bars['volume'][-1], panel['volume'][-5:].sum(axis=0))
+    odd = resample({'close': panel['close'][:7]}, 5)
+    np.testing.assert_array_equal(odd['close'], panel['close'][4:5])
+    # 末尾追加不足一组的新bar时已有分组不变
+    appended = resample({field: values[:897] for field, values in panel.items()}, 5)
+    for field, values in resample({field: values[:895] for field, values in panel.items()}, 5).items():
+        np.testing.assert_array_equal(appended[field], values)
+
+
+def brute_force(panel, grid, strategy):
+    """逐个参数组合直接回测，取夏普最高者"""
+    best = None
+    for base, params, bar_size, leverage in grid.tasks(strategy):
+        engine = BacktestEngine(periods_per_year=PERIODS_PER_YEAR / bar_size)
+        implementation = LeveragedStrategy(get_backtest_strategy(base, **dict(params)), leverage)
+        summary = engine.run(implementation, resample(BacktestEngine.prepare(panel), bar_size)).summary()
+        if best is None or summary['sharpe'] > best[1]['sharpe']:
+            best = (dict(params), summary)
+    return best
+
+
+def test_sweep_finds_grid_optimum(panel, grid):
+    runner = SweepRunner(panel, grid)
+    results = list(runner.run(STRATEGIES))
+    assert [r['name'] for r in results] == [s['name'] for s in STRATEGIES[:4]]
+    assert runner.stats['skipped'] == 2
+    for strategy, result in zip(STRATEGIES, results):
+        params, summary = brute_force(panel, grid, strategy)
+        assert result['best_params'] == params and result['best'] == summary
+        assert result['evaluated'] == result['grid_size'] and not result['stopped_early']
+
+
+def test_parallel_matches_serial(panel, grid):
+    serial = list(SweepRunner(panel, grid).run(STRATEGIES))
+    parallel = list(SweepRunner(panel, grid, workers=2).run(STRATEGIES))
+    assert parallel == serial
+
+
+def test_early_stopping(panel, grid):
+    results = list(SweepRunner(panel, grid, patience=1).run(STRATEGIES))
+    full = list(SweepRunner(panel, grid).run(STRATEGIES))
+    for stopped, complete in zip(results, full):
+        assert stopped['evaluated'] <= complete['grid_size']
+        assert stopped['stopped_early'] == (stopped['evaluated'] < complete['grid_size'])
+        assert stopped['best']['sharpe'] <= complete['best']['sharpe']
+    assert any(r['stopped_early'] for r in results)
@@ -0,0 +1,113 @@
+"""流水线度量：嵌套阶段的总耗时/自身耗时、迭代器计时与输出格式"""
+
+import json
+import tracemalloc
+
+import pytest
+
+import pipeline_metrics
+from pipeline_metrics import PipelineMetrics
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(pipeline_metrics.time, 'perf_counter', clock)
+    return clock
+
+
+def test_nested_stages_split_self_time(clock):
+    metrics = PipelineMetrics('test')
+    with metrics.stage('outer'):
+        clock.advance(1)
+        for _ in range(2):
+            with metrics.stage('inner'):
+                clock.advance(2)
+        clock.advance(0.5)
+    outer, inner = metrics.stages['outer'], metrics.stages['inner']
+    assert (outer['calls'], outer['seconds'], outer['self_seconds']) == (1, 5.5, 1.5)
+    assert (inner['calls'], inner['seconds'], inner['self_seconds'], inner['max_seconds']) == (2, 4, 4, 2)
+
+
+def test_timed_iter_excludes_consumer_time(clock):
+    metrics = PipelineMetrics('test')
+
+    def produce():
+        for i in range(3):
+            clock.advance(1)
+            with metrics.stage('nested'):
+                clock.advance(0.25)
+            yield i
+
+    with metrics.stage('consume'):
+        for _ in metrics.timed_iter('produce', produce()):
+            clock.advance(10)
+    produce_stats, consume = metrics.stages['produce'], metrics.stages['consume']
+    assert (produce_stats['calls'], produce_stats['items']) == (1, 3)
+    assert produce_stats['seconds'] == 3.75 and produce_stats['self_seconds'] == 3
+    assert consume['seconds'] == 33.75 and consume['self_seconds'] == 30
+
+
+def test_timed_iter_propagates_errors(clock):
+    metrics = PipelineMetrics('test')
+
+    def broken():
+        yield 1
+        raise RuntimeError('boom')
+
+    with pytest.raises(RuntimeError):
+        list(metrics.timed_iter('broken', broken()))
+    assert metrics.stages['broken']['items'] == 1 and metrics._stack == []
+
+
+def test_trace_memory_attributes_peaks():
+    was_tracing = tracemalloc.is_tracing()
+    metrics = PipelineMetrics('test', trace_memory=True)
+    try:
+        with metrics.stage('outer'):
+            with metrics.stage('inner'):
+                block = bytearray(8_000_000)
+                del block
+            with metrics.stage('small'):
+                block = bytearray(1000)
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+    stages = metrics.stages
+    assert stages['inner']['peak_bytes'] >= 8_000_000 > stages['small']['peak_bytes']
+    assert stages['outer']['peak_bytes'] >= stages['inner']['peak_bytes']
+
+
+def test_json_and_prometheus_output(tmp_path, clock):
+    metrics = PipelineMetrics('nightly "job"')
+    with metrics.stage('load'):
+        clock.advance(1.5)
+    metrics.count('strategies', 3)
+    metrics.count('strategies', 2)
+    metrics.gauge('cache_entries', 7)
+
+    json_path, prom_path = tmp_path / 'metrics.json', tmp_path / 'metrics.prom'
+    metrics.write_json(str(json_path))
+    metrics.write_prometheus(str(prom_path))
+    snapshot = json.loads(json_path.read_text(encoding='utf-8'))
+    assert snapshot['stages']['load']['seconds'] == 1.5
+    assert snapshot['counters'] == {'strategies': 5} and snapshot['gauges']['cache_entries'] == 7
+
+    lines = prom_path.read_text(encoding='utf-8').splitlines()
+    assert 'strategy_pipeline_stage_seconds{job="nightly \\"job\\"",stage="load"} 1.5' in lines
+    assert 'strategy_pipeline_count{job="nightly \\"job\\"",name="strategies"} 5' in lines
+    assert 'strategy_pipeline_cache_entries{job="nightly \\"job\\""} 7' in lines
+    # 每个指标都先声明HELP和TYPE
+    names = {line.split('{')[0] for line in lines if not line.startswith('#')}
+    assert all(f'# TYPE {name} gauge' in lines for name in names)
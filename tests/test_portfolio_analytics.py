@@ -0,0 +1,96 @@
+"""组合分析：流式协方差、冗余聚类与组合权重"""
+
+import numpy as np
+import pytest
+
+from portfolio_analytics import (PortfolioAnalyzer, ReturnSeriesStore, ReturnSeriesWriter,
+                                 cluster_redundant, correlation_from_covariance, min_variance_weights,
+                                 render_section, risk_parity_weights, shrink_covariance,
+                                 streaming_covariance)
+
+
+def make_returns(variants=12, bars=700, seed=0):
+    rng = np.random.default_rng(seed)
+    factors = rng.normal(0.0004, 0.01, (3, bars))
+    returns = np.empty((variants, bars))
+    for i in range(variants):
+        # 每个因子下有若干个只差一点噪声的"同一笔押注"
+        returns[i] = factors[i % 3] * (1 + 0.5 * (i % 2)) + rng.normal(0, 0.001, bars)
+    return returns
+
+
+@pytest.mark.parametrize('chunk', [1, 64, 700, 5000])
+def test_streaming_covariance_matches_numpy(chunk):
+    returns = make_returns() + 3.0  # 均值远大于波动时检验数值稳定性
+    chunks = (returns[:, start:start + chunk] for start in range(0, returns.shape[1], chunk))
+    cov, mean, count = streaming_covariance(chunks)
+    assert count == returns.shape[1]
+    np.testing.assert_allclose(cov, np.cov(returns), rtol=1e-9, atol=1e-15)
+    np.testing.assert_allclose(mean, returns.mean(axis=1), rtol=1e-12)
+    np.testing.assert_allclose(correlation_from_covariance(cov), np.corrcoef(returns), atol=1e-9)
+
+
+def test_store_round_trip_and_chunks(tmp_path):
+    returns = make_returns()
+    with ReturnSeriesWriter(str(tmp_path), returns.shape[1]) as writer:
+        for i, row in enumerate(returns):
+            writer.append({'name': f'v{i}'}, row)
+    store = ReturnSeriesStore(str(tmp_path))
+    assert store.names() == [f'v{i}' for i in range(len(returns))]
+    np.testing.assert_array_equal(np.concatenate(list(store.iter_chunks(100)), axis=1),
+                                  returns.astype(np.float32))
+    cov, _, _ = streaming_covariance(store.iter_chunks(100))
+    np.testing.assert_allclose(cov, np.cov(returns.astype(np.float32).astype(np.float64)), rtol=1e-9)
+
+
+def test_failed_writer_leaves_no_store(tmp_path):
+    with pytest.raises(ValueError):
+        with ReturnSeriesWriter(str(tmp_path), 10) as writer:
+            writer.append({'name': 'v0'}, np.zeros(9))
+    assert not list(tmp_path.iterdir())
+
+
+def test_cluster_redundant_groups_same_bets():
+    corr = np.corrcoef(make_returns())
+    labels, leaders = cluster_redundant(corr, range(len(corr)), threshold=0.9)
+    assert leaders == [0, 1, 2]
+    assert labels.tolist() == [i % 3 for i in range(len(corr))]
+    # 负相关是对冲，不并入同一簇
+    labels, leaders = cluster_redundant(np.array([[1.0, -0.99], [-0.99, 1.0]]), [0, 1])
+    assert leaders == [0, 1]
+
+
+def test_portfolio_weights():
+    rng = np.random.default_rng(1)
+    cov = shrink_covariance(np.cov(rng.normal(0, 0.01, (8, 200)) * np.arange(1, 9)[:, None]))
+    weights = risk_parity_weights(cov)
+    contributions = weights * (cov @ weights)
+    assert weights.sum() == pytest.approx(1.0)
+    np.testing.assert_allclose(contributions, contributions.mean(), rtol=1e-6)
+
+    weights = min_variance_weights(cov)
+    assert weights.sum() == pytest.approx(1.0) and (weights >= 0).all()
+    best = weights @ cov @ weights
+    for _ in range(500):
+        trial = np.abs(weights + rng.normal(0, 0.02, len(weights)))
+        trial /= trial.sum()
+        assert trial @ cov @ trial >= best - 1e-15
+    unconstrained = min_variance_weights(cov, long_only=False)
+    np.testing.assert_allclose(unconstrained, np.linalg.solve(cov, np.ones(8)) / np.linalg.solve(cov, np.ones(8)).sum())
+
+
+def test_analyzer_report(tmp_path):
+    returns = make_returns()
+    returns = np.vstack([returns, np.zeros(returns.shape[1])])
+    with ReturnSeriesWriter(str(tmp_path), returns.shape[1]) as writer:
+        for i, row in enumerate(returns):
+            writer.append({'name': f'v{i}', 'is_hybrid': i == 4}, row)
+    report = PortfolioAnalyzer(chunk_bars=128).analyze(ReturnSeriesStore(str(tmp_path)))
+    assert report['variants'] == 13 and report['flat'] == ['v12']
+    assert len(report['core']) == 3 and sum(c['size'] for c in report['clusters']) == 12
+    assert set(report['portfolios']) == {'equal_weight', 'risk_parity', 'min_variance'}
+    for portfolio in report['portfolios'].values():
+        assert sum(portfolio['weights'].values()) == pytest.approx(1.0, abs=1e-5)
+        assert set(portfolio['weights']) <= set(report['core'])
+    section = render_section(report)
+    assert section.startswith('## 组合分析\n') and '精简核心: 3 个变体' in section
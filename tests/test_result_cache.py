@@ -0,0 +1,112 @@
+"""结果缓存：LRU淘汰，以及行情追加新bar后只续算尾部的扫描结果与完整重算一致"""
+
+import json
+import os
+
+import numpy as np
+import pytest
+
+import parameter_sweep
+from parameter_sweep import DEFAULT_GRID_FILE, ParameterGrid, SweepRunner
+from result_cache import ResultCache
+
+
+def test_get_put_and_lru_eviction(tmp_path):
+    cache = ResultCache(str(tmp_path), 'v1', max_bytes=10_000)
+    keys = [cache.key({'task': i}) for i in range(6)]
+    assert len(set(keys)) == 6 and keys[0] == ResultCache(str(tmp_path), 'v1').key({'task': 0})
+    assert cache.key({'task': 0}) != ResultCache(str(tmp_path), 'v2').key({'task': 0})
+    for i, key in enumerate(keys[:4]):
+        cache.put(key, {'i': i, 'payload': np.zeros(250)})
+        os.utime(cache._path(key), (i, i))
+    assert cache.get(keys[0])['i'] == 0  # 命中后成为最近使用
+    cache.put(keys[4], {'i': 4, 'payload': np.zeros(250)})
+    assert cache.nbytes <= 10_000 * 0.9
+    assert cache.get(keys[1]) is None and cache.get(keys[0]) is not None and cache.get(keys[4]) is not None
+    assert cache.clear() > 0 and cache.nbytes == 0
+
+
+@pytest.fixture(scope='module')
+def panel():
+    rng = np.random.default_rng(3)
+    bars, symbols = 2600, 3
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0002, 0.012, (bars, symbols)), axis=0))
+    open_ = close * np.exp(rng.normal(0, 0.004, (bars, symbols)))
+    spread = np.abs(rng.normal(0, 0.008, (bars, symbols))) * close
+    return {'open': open_, 'high': np.maximum(open_, close) + spread,
+            'low': np.minimum(open_, close) - spread, 'close': close,
+            'volume': rng.integers(1000, 5000, (bars, symbols)).astype(float)}
+
+
+@pytest.fixture(scope='module')
+def grid():
+    with open(DEFAULT_GRID_FILE, encoding='utf-8') as f:
+        config = json.load(f)
+    small = {
+        '双均线策略': {'fast': [5, 20], 'slow': [30, 120], 'kind': ['sma', 'ema']},
+        'RSI超买超卖策略': {'period': [7, 14], 'lower': [30], 'upper': [70]},
+        '海龟交易法则': {'entry': [20, 55], 'exit': [10], 'stop_atr': [2.0]},
+        'Dual Thrust策略': {'lookback': [3, 5], 'k1': [0.5], 'k2': [0.5]},
+        '比特币动量策略': {'lookback': [20], 'trend': [50, 200]},
+    }
+    return ParameterGrid(small, config['variant_settings'])
+
+
+STRATEGIES = [{'name': name} for name in ('双均线策略', 'RSI超买超卖策略', '海龟交易法则',
+                                         'Dual Thrust策略', '比特币动量策略')]
+STRATEGIES += [{'name': '双均线策略_周线', 'variant_of': '双均线策略', 'timeframe': '周线'},
+               {'name': '双均线策略_月线', 'variant_of': '双均线策略', 'timeframe': '月线'},
+               {'name': '海龟交易法则_激进', 'variant_of': '海龟交易法则', 'aggressiveness': '激进'}]
+
+
+def sweep(panel, rows, grid, cache_dir=None):
+    data = {field: values[:rows] for field, values in panel.items()}
+    runner = SweepRunner(data, grid, cache_dir=cache_dir)
+    return list(runner.run(STRATEGIES)), runner.stats
+
+
+@pytest.fixture
+def resumed_by_bar_size(monkeypatch):
+    """记录每个任务是否续算，按bar_size分组"""
+    calls = {}
+    evaluate = parameter_sweep.evaluate_task_incremental
+
+    def spy(panel, task, *args, **kwargs):
+        result = evaluate(panel, task, *args, **kwargs)
+        calls.setdefault(task[2], []).append(result[2])
+        return result
+
+    monkeypatch.setattr(parameter_sweep, 'evaluate_task_incremental', spy)
+    return calls
+
+
+@pytest.mark.parametrize('appended', [1, 5, 37])
+def test_tail_resume_matches_full_sweep(tmp_path, panel, grid, appended, resumed_by_bar_size):
+    cache_dir = str(tmp_path / 'cache')
+    sweep(panel, 2500, grid, cache_dir)
+    resumed_by_bar_size.clear()
+    resumed, stats = sweep(panel, 2500 + appended, grid, cache_dir)
+    full, _ = sweep(panel, 2500 + appended, grid)
+    assert stats['resumed'] > 0 and stats['cached'] == 0
+    # 日线、周线、月线变体都能续算（追加不足一组时合并K线不变，同样视为续算）
+    assert sorted(resumed_by_bar_size) == [1, 5, 21]
+    assert all(any(flags) for flags in resumed_by_bar_size.values())
+    assert resumed == full
+
+
+def test_unchanged_data_served_from_cache(tmp_path, panel, grid):
+    cache_dir = str(tmp_path / 'cache')
+    first, _ = sweep(panel, 2500, grid, cache_dir)
+    again, stats = sweep(panel, 2500, grid, cache_dir)
+    assert again == first and stats['evaluated'] == 0 and stats['cached'] > 0
+
+
+def test_modified_history_is_recomputed(tmp_path, panel, grid):
+    cache_dir = str(tmp_path / 'cache')
+    sweep(panel, 2500, grid, cache_dir)
+    edited = {field: values.copy() for field, values in panel.items()}
+    # 第104行同时是周线和月线分组的最后一根，合并后的收盘价也随之改变
+    edited['close'][104] *= 1.05
+    resumed, stats = sweep(edited, 2510, grid, cache_dir)
+    full, _ = sweep(edited, 2510, grid)
+    assert stats['resumed'] == 0 and resumed == full
@@ -0,0 +1,83 @@
+"""站点索引：分片与倒排索引可还原全部策略，检索结果与全表扫描一致"""
+
+import gzip
+import json
+import os
+import random
+
+from site_index import SiteIndexBuilder, token_bucket, tokenize
+
+WORDS = ['均线', '突破', '动量', '反转', '网格', '套利', 'RSI', 'MACD', 'ATR', '布林带']
+
+
+def make_sources(seed=0, per_category=120):
+    rng = random.Random(seed)
+    sources = {}
+    for category in ('stocks', 'crypto'):
+        sources[category] = [{
+            'id': f'{category}_{i}',
+            'name': f'{rng.choice(WORDS)}{rng.choice(WORDS)}策略{i}',
+            'category': category,
+            'type': rng.choice(['趋势跟踪', '均值回归']),
+            'indicators': ', '.join(rng.sample(WORDS, 2)),
+            'logic': '逻辑',
+        } for i in range(per_category)]
+    return sources
+
+
+def read_gz(output_dir, relative_path):
+    with gzip.open(os.path.join(output_dir, relative_path), 'rt', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def search(output_dir, manifest, query):
+    """与页面脚本相同的检索流程：按桶读取倒排表，求交集后定位分片"""
+    result = None
+    for token in set(tokenize(query)):
+        bucket = read_gz(output_dir, f"search/{token_bucket(token, manifest['buckets']):03d}.json.gz")
+        ids, total = set(), 0
+        for delta in bucket.get(token, []):
+            total += delta
+            ids.add(total)
+        result = ids if result is None else result & ids
+    return sorted(result or [])
+
+
+def test_shards_and_search_match_scan(tmp_path):
+    sources = make_sources()
+    output_dir = str(tmp_path)
+    manifest = SiteIndexBuilder(output_dir, shard_size=50, buckets=8).build(sources)
+    assert manifest['total'] == 240
+
+    documents = []
+    for category in manifest['categories']:
+        assert category['start'] == len(documents)
+        for shard in category['shards']:
+            data = read_gz(output_dir, shard)
+            assert data['start'] == len(documents)
+            documents.extend(dict(zip(manifest['fields'], row)) for row in data['rows'])
+    records = sources['stocks'] + sources['crypto']
+    assert [d['id'] for d in documents] == [r['id'] for r in records]
+
+    for query in ('均线', 'RSI 突破', 'macd', '均值回归 布林', '加密 网格'):
+        expected = [
+            doc for doc, r in enumerate(records)
+            if set(tokenize(query)) <= set(tokenize(
+                f"{r['name']} {r['type']} {r['indicators']} {r['category']} "
+                f"{manifest['categories'][doc >= 120]['title']}"))
+        ]
+        assert search(output_dir, manifest, query) == expected
+
+
+def test_rebuild_only_rewrites_changed_files(tmp_path):
+    output_dir = str(tmp_path)
+    SiteIndexBuilder(output_dir, shard_size=50, buckets=8).build(make_sources())
+    builder = SiteIndexBuilder(output_dir, shard_size=50, buckets=8)
+    builder.build(make_sources())
+    assert builder.written == 0 and builder.unchanged > 0
+
+    # 策略减少后多余的分片被删除
+    smaller = make_sources(per_category=30)
+    manifest = SiteIndexBuilder(output_dir, shard_size=50, buckets=8).build(smaller)
+    on_disk = sorted(f'shards/{name}' for name in os.listdir(os.path.join(output_dir, 'shards')))
+    assert on_disk == sorted(s for c in manifest['categories'] for s in c['shards'])
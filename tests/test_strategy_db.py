@@ -0,0 +1,46 @@
+"""SQLite策略目录：批量upsert、索引字段查询与重复写入"""
+
+import pytest
+
+from strategy_db import StrategyDatabase
+
+VARIANTS = [
+    {'id': f'strategy_{i:04d}', 'name': f'双均线策略 ({tf})', 'category': category, 'type': '趋势跟踪',
+     'variant_of': '双均线策略', 'variant_type': 'timeframe', 'timeframe': tf}
+    for i, (category, tf) in enumerate([(c, tf) for c in ('stocks', 'crypto') for tf in ('日线', '周线', '月线')])
+] + [{'id': 'strategy_0100', 'name': 'A + B 混合策略', 'category': 'stocks', 'is_hybrid': True,
+      'parent_strategies': ['A', 'B']}]
+
+
+@pytest.fixture
+def db(tmp_path):
+    # 批次小于记录数，覆盖跨批次写入
+    with StrategyDatabase(str(tmp_path / 'strategies.db'), batch_size=3) as db:
+        yield db
+
+
+def test_upsert_and_query(db):
+    assert db.upsert_variants(iter(VARIANTS)) == len(VARIANTS)
+    assert db.count('variants') == 7
+    assert db.count('variants', category='stocks', variant_type='timeframe') == 3
+    assert db.query('variants', is_hybrid=True) == VARIANTS[-1:]
+    assert db.query('variants', variant_of='双均线策略', limit=2) == VARIANTS[:2]
+    assert db.get('双均线策略 (周线)', category='crypto', table='variants') == VARIANTS[4]
+    assert db.get('不存在', table='variants') is None
+
+
+def test_repeated_upsert_updates_in_place(db):
+    db.upsert_variants(VARIANTS)
+    updated = dict(VARIANTS[0], type='均值回归', last_updated='2026-10-18')
+    db.upsert_variants([updated])
+    assert db.count('variants') == len(VARIANTS)
+    assert db.query('variants', type='均值回归') == [updated]
+    # 主键是 (name, category)，不同市场的同名策略是两条记录
+    assert db.count('variants', name=VARIANTS[0]['name']) == 2
+
+
+def test_rejects_unindexed_fields(db):
+    db.upsert_strategies([{'name': '双均线策略', 'category': 'stocks', 'logic': '金叉买入'}])
+    assert db.get('双均线策略') == {'name': '双均线策略', 'category': 'stocks', 'logic': '金叉买入'}
+    with pytest.raises(ValueError):
+        db.query('strategies', logic='金叉买入')
@@ -0,0 +1,58 @@
+"""策略去重：精确键规范化、MinHash相似度估计与LSH近似去重"""
+
+import random
+
+from strategy_dedup import Deduplicator, MinHasher, exact_key, shingles
+
+BASE = {'name': '双均线策略', 'category': 'stocks', 'logic': '短期均线上穿长期均线时买入，下穿时卖出，并按ATR设置止损',
+        'indicators': 'SMA, ATR'}
+
+
+def test_exact_key_normalizes_width_case_and_punctuation():
+    variant = dict(BASE, name=' 双均线策略！', logic=BASE['logic'].replace('，', ',') + '。')
+    assert exact_key(variant) == exact_key(BASE)
+    assert exact_key(dict(BASE, category='futures')) != exact_key(BASE)
+
+
+def test_minhash_estimates_jaccard():
+    rng = random.Random(0)
+    universe = [f't{i}' for i in range(400)]
+    hasher = MinHasher(num_perm=256)
+    for _ in range(5):
+        a = set(rng.sample(universe, 150))
+        b = set(rng.sample(universe, 150)) | set(sorted(a)[:100])
+        jaccard = len(a & b) / len(a | b)
+        estimate = (hasher.signature(a) == hasher.signature(b)).mean()
+        assert abs(estimate - jaccard) < 0.1
+    assert (hasher.signature(a) == hasher.signature(set(a))).all()
+
+
+def test_near_duplicates_are_filtered_per_category():
+    reworded = dict(BASE, name='均线交叉', logic=BASE['logic'] + '。')
+    other = dict(BASE, name='RSI反转', logic='RSI低于30买入，高于70卖出', indicators='RSI')
+    other_market = dict(reworded, category='crypto')
+    dedup = Deduplicator()
+    kept = list(dedup.filter([BASE, dict(BASE), reworded, other, other_market]))
+    assert [s['name'] for s in kept] == ['双均线策略', 'RSI反转', '均线交叉']
+    assert kept[2]['category'] == 'crypto'
+    assert dedup.exact_duplicates == 1 and dedup.near_duplicate_count == 1
+    assert dedup.find_duplicate(dict(reworded, name='再次改写')) == '双均线策略'
+
+
+def test_generated_variants_only_use_exact_keys():
+    dedup = Deduplicator()
+    variants = [dict(BASE, name=f'双均线策略 - 变体{i}', variant_of='双均线策略') for i in range(3)]
+    assert list(dedup.filter(variants)) == variants
+    assert list(dedup.filter(variants)) == []
+    assert dedup.duplicates == 3
+
+
+def test_signature_storage_grows_past_initial_capacity():
+    rng = random.Random(1)
+    alphabet = '买卖均线突破回撤波动率动量反转趋势成交量价差'
+    records = [{'name': f's{i}', 'category': 'stocks', 'indicators': '',
+                'logic': ''.join(rng.choice(alphabet) for _ in range(40))} for i in range(1500)]
+    dedup = Deduplicator()
+    assert len(list(dedup.filter(records))) == 1500
+    assert len(dedup.names) == 1500 and len(dedup.signatures) >= 1500
+    assert dedup.find_duplicate(dict(records[1400], name='改名')) == 's1400'
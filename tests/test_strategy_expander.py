@@ -0,0 +1,95 @@
+"""策略扩展：流式写入、多进程合并、增量缓存与内存模式输出一致"""
+
+import os
+import shutil
+
+import pytest
+
+from strategy_expander import StrategyExpander
+from strategy_storage import JsonlBackend
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CATEGORIES = ['stocks', 'futures', 'crypto', 'options']
+# 时间戳字段随运行日期变化，比较时忽略
+VOLATILE = ('added_date', 'last_updated')
+
+
+@pytest.fixture
+def base_dir(tmp_path):
+    for category in CATEGORIES:
+        shutil.copytree(os.path.join(REPO_ROOT, category), tmp_path / category)
+    return str(tmp_path)
+
+
+def strip(strategies):
+    return [{k: v for k, v in s.items() if k not in VOLATILE} for s in strategies]
+
+
+def expand(base_dir, **kwargs):
+    workers = kwargs.pop('workers', 1)
+    expander = StrategyExpander(base_dir, **kwargs)
+    expander.load_existing_strategies()
+    return expander, strip(expander.iter_expanded_strategies(workers=workers))
+
+
+def test_in_memory_expansion(base_dir):
+    expander = StrategyExpander(base_dir)
+    expander.expand_strategies()
+    _, streamed = expand(base_dir)
+    materialized = strip(expander.expanded_strategies)
+    assert materialized == streamed
+    assert [s['id'] for s in streamed] == [f'strategy_{i + 1000:04d}' for i in range(len(streamed))]
+    stats = expander.expansion_stats
+    assert stats['total'] == len(streamed)
+    assert stats['hybrid'] == sum(1 for s in streamed if s.get('is_hybrid'))
+    assert sum(stats['categories'].values()) == stats['total']
+
+
+def test_stream_writes_every_strategy(base_dir):
+    _, expected = expand(base_dir)
+    expander = StrategyExpander(base_dir, storage='jsonl')
+    # 批次远小于输出量，跨批次写入后结果不变
+    expander.stream_expanded_strategies(batch_size=7)
+    backend = JsonlBackend(base_dir, prefix='expanded_strategies')
+    written = [s for category in CATEGORIES for s in backend.read(category)]
+    assert sorted(s['id'] for s in strip(written)) == [s['id'] for s in expected]
+    by_id = {s['id']: s for s in strip(written)}
+    assert [by_id[s['id']] for s in expected] == expected
+    assert expander.expansion_stats['total'] == len(expected)
+
+
+def test_parallel_matches_serial(base_dir):
+    _, serial = expand(base_dir)
+    _, parallel = expand(base_dir, workers=2)
+    assert parallel == serial
+
+
+def test_cache_rerun_reuses_groups(base_dir, tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    _, expected = expand(base_dir)
+    first, cold = expand(base_dir, cache_dir=cache_dir)
+    assert cold == expected
+    assert first.cache.stats()['hits'] == 0
+    second, warm = expand(base_dir, cache_dir=cache_dir)
+    assert warm == expected
+    assert second.cache.stats()['misses'] == 0 and second.cache.stats()['hits'] > 0
+
+
+def test_cold_run_does_not_reread_fresh_entries(base_dir, tmp_path, monkeypatch):
+    from expansion_cache import ExpansionCache
+    reads = []
+    original_get = ExpansionCache.get
+
+    def recording_get(self, key):
+        variants = original_get(self, key)
+        if variants is not None:
+            reads.append(key)
+        return variants
+
+    monkeypatch.setattr(ExpansionCache, 'get', recording_get)
+    _, expected = expand(base_dir)
+    first, cold = expand(base_dir, cache_dir=str(tmp_path / 'cache'))
+    assert cold == expected
+    # 本次新生成的变体直接输出，不会写入后又立即读回
+    assert reads == []
+    assert first.cache.stats()['misses'] > 0
@@ -0,0 +1,32 @@
+"""快照读取：增量JSON数组解析"""
+
+import json
+
+import pytest
+
+import strategy_snapshots
+from strategy_snapshots import iter_json_array
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 64, 1 << 16])
+@pytest.mark.parametrize('indent', [None, 2])
+def test_iter_json_array_matches_json_load(tmp_path, monkeypatch, chunk_size, indent):
+    records = [{'name': f'策略{i}', 'logic': '买入' * (i % 50), 'score': i * 0.5, 'tags': [i, None, True]}
+               for i in range(300)]
+    records += [12345, 'text', [], {}]
+    path = tmp_path / 'strategies.json'
+    path.write_text(json.dumps(records, ensure_ascii=False, indent=indent), encoding='utf-8')
+    monkeypatch.setattr(strategy_snapshots, 'READ_CHUNK_SIZE', chunk_size)
+    assert list(iter_json_array(str(path))) == records
+
+
+def test_iter_json_array_edge_cases(tmp_path):
+    path = tmp_path / 'empty.json'
+    path.write_text('  [ ]\n', encoding='utf-8')
+    assert list(iter_json_array(str(path))) == []
+    path.write_text('{"name": 1}', encoding='utf-8')
+    with pytest.raises(ValueError):
+        list(iter_json_array(str(path)))
+    path.write_text('[{"name": 1}, {"name": ', encoding='utf-8')
+    with pytest.raises(ValueError):
+        list(iter_json_array(str(path)))
@@ -0,0 +1,55 @@
+"""存储后端：追加写入、按列读取与快照发现"""
+
+import os
+
+import pytest
+
+from strategy_snapshots import discover_snapshots, iter_snapshot
+from strategy_storage import STORAGE_BACKENDS, get_storage_backend
+
+STRATEGIES = [
+    {'name': '双均线策略', 'category': 'stocks', 'indicators': 'SMA', 'is_hybrid': False},
+    {'name': '双均线策略 (日线)', 'category': 'stocks', 'timeframe': '日线', 'variant_of': '双均线策略'},
+    {'name': 'A + B 混合策略', 'category': 'stocks', 'is_hybrid': True, 'parent_strategies': ['A', 'B']},
+    {'category': 'stocks', 'name': '无参考策略', 'references': None, 'variant_of': None},
+]
+
+
+@pytest.mark.parametrize('name', sorted(STORAGE_BACKENDS))
+def test_append_and_read_back(name, tmp_path):
+    backend = get_storage_backend(name, str(tmp_path), prefix='expanded_strategies')
+    assert backend.append('stocks', STRATEGIES[:2]) == 2
+    assert backend.append('stocks', STRATEGIES[2:]) == 2
+    # 稀疏字段按原样还原，不会补出其他记录的字段，值为None的字段也不会丢失
+    restored = list(backend.read('stocks'))
+    assert restored == STRATEGIES
+    assert [list(s) for s in restored] == [list(s) for s in STRATEGIES]
+    assert list(backend.read('stocks', columns=['name', 'variant_of'])) == [
+        {'name': s['name'], **({'variant_of': s['variant_of']} if 'variant_of' in s else {})}
+        for s in STRATEGIES
+    ]
+    assert list(backend.read('futures')) == []
+
+    backend.reset('stocks')
+    backend.append('stocks', STRATEGIES[:1])
+    assert list(backend.read('stocks')) == STRATEGIES[:1]
+
+
+@pytest.mark.parametrize('name', sorted(STORAGE_BACKENDS))
+def test_snapshot_discovery_reads_backend(name, tmp_path):
+    backend = get_storage_backend(name, str(tmp_path))
+    backend.append('stocks', STRATEGIES)
+    paths = discover_snapshots(str(tmp_path), 'stocks')
+    assert paths == [backend.path('stocks')]
+    assert list(iter_snapshot(paths[0])) == STRATEGIES
+
+
+def test_unknown_backend(tmp_path):
+    with pytest.raises(ValueError):
+        get_storage_backend('csv', str(tmp_path))
+
+
+def test_backend_base_is_abstract(tmp_path):
+    from strategy_storage import StorageBackend
+    with pytest.raises(TypeError):
+        StorageBackend(str(tmp_path))
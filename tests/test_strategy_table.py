@@ -0,0 +1,98 @@
+"""列式策略表：二级索引、查询与继承"""
+
+import random
+
+import numpy as np
+
+from strategy_table import StrategyTable
+
+
+def make_records(count, seed=0):
+    rng = random.Random(seed)
+    records = []
+    for i in range(count):
+        records.append({
+            'name': f'策略{i}',
+            'category': rng.choice(['stocks', 'futures', 'crypto', 'options']),
+            'complexity': rng.choice(['基础', '中级', '高级']),
+            'variant_type': rng.choice(['timeframe', 'ml_enhancement', None]),
+            'is_hybrid': rng.random() < 0.2,
+            'logic': f'逻辑{i % 7}',
+        })
+    return records
+
+
+def test_lookup_matches_full_scan():
+    records = make_records(500)
+    table = StrategyTable()
+    table.extend(records)
+    conditions = [
+        {'category': 'crypto'},
+        {'category': 'stocks', 'complexity': '高级'},
+        {'variant_type': 'ml_enhancement', 'is_hybrid': True},
+        {'category': 'forex'},
+        {'logic': '逻辑3'},  # 无索引字段退化为掩码
+        {'category': 'options', 'logic': '逻辑1'},
+    ]
+    for condition in conditions:
+        expected = [i for i, r in enumerate(records) if all(r[k] == v for k, v in condition.items())]
+        assert table.lookup(**condition).tolist() == expected
+        assert np.flatnonzero(table.mask(**condition)).tolist() == expected
+        assert table.count(**condition) == len(expected)
+        assert table.filter(**condition) == [records[i] for i in expected]
+
+
+def test_value_counts_from_index():
+    records = make_records(300, seed=1)
+    table = StrategyTable()
+    table.extend(records)
+    for field in ('category', 'complexity', 'logic'):
+        expected = {}
+        for record in records:
+            expected[record[field]] = expected.get(record[field], 0) + 1
+        assert table.value_counts(field) == expected
+
+
+def test_lookup_result_does_not_pin_index():
+    table = StrategyTable()
+    table.extend(make_records(50))
+    rows = table.lookup(category='crypto')
+    # 持有查询结果时仍可继续追加（结果不能是索引缓冲区的视图）
+    table.extend(make_records(2000, seed=2))
+    assert rows.tolist() == table.lookup(category='crypto').tolist()[:len(rows)]
+
+
+def test_variants_inherit_parent_fields():
+    base = StrategyTable()
+    base.extend(make_records(10))
+    variants = StrategyTable(base=base)
+    for row in range(10):
+        record = dict(base[row], name=f'{base[row]["name"]}_变体', variant_type='timeframe')
+        variants.append(record, parent=row)
+    assert variants[:] == [dict(base[row], name=f'{base[row]["name"]}_变体', variant_type='timeframe')
+                           for row in range(10)]
+    assert variants.codes('category').tolist() == base.codes('category').tolist()
+    assert variants.count(variant_type='timeframe') == 10
+
+
+def test_round_trip_preserves_values_and_field_order():
+    records = [
+        {'name': 'A', 'category': 'stocks', 'parent_strategies': ['x', 'y'], 'score': 1},
+        {'category': 'stocks', 'name': 'B', 'score': '1', 'is_hybrid': True},
+        {'name': 'C', 'score': 1.0, 'is_hybrid': 1, 'params': {'fast': 5}},
+        {'name': 'D', 'score': None},
+    ]
+    table = StrategyTable()
+    table.extend(records)
+    restored = list(table)
+    assert restored == records
+    assert [list(r) for r in restored] == [list(r) for r in records]
+    # 1、'1'、1.0、True 是不同的取值，不会被字典编码合并
+    assert [type(r['score']) for r in restored] == [int, str, float, type(None)]
+    assert type(restored[2]['is_hybrid']) is int and restored[1]['is_hybrid'] is True
+    assert table[-1] == records[-1] and table[1:3] == records[1:3]
+
+    # 修改还原出的字典（含列表值）不影响表中数据
+    restored[0]['parent_strategies'].append('z')
+    restored[2]['params']['fast'] = 10
+    assert table[0] == records[0] and table[2] == records[2]
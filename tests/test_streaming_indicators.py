@@ -0,0 +1,99 @@
+"""增量指标和策略与backtest.py向量化实现逐bar一致"""
+
+import numpy as np
+import pytest
+
+import backtest
+from backtest import BacktestEngine, get_backtest_strategy
+from streaming_indicators import (ATR, EMA, RSI, SMA, Bar, LatencyHistogram, RollingMax, RollingMin,
+                                  STREAMING_STRATEGIES, StreamingStrategy, get_streaming_strategy, replay)
+
+
+@pytest.fixture(scope='module')
+def panel():
+    rng = np.random.default_rng(7)
+    bars = 1500
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, bars)))
+    open_ = close * np.exp(rng.normal(0, 0.005, bars))
+    spread = np.abs(rng.normal(0, 0.01, bars)) * close
+    return BacktestEngine.prepare({
+        'open': open_,
+        'high': np.maximum(open_, close) + spread,
+        'low': np.minimum(open_, close) - spread,
+        'close': close,
+        'volume': rng.integers(1000, 5000, bars).astype(float),
+    })
+
+
+def bars_of(panel):
+    return [Bar(str(t), *(panel[f][t, 0] for f in ('open', 'high', 'low', 'close', 'volume')))
+            for t in range(len(panel['close']))]
+
+
+def stream(indicator, *inputs):
+    return np.array([indicator.update(*values) for values in zip(*inputs)])
+
+
+def test_indicators_match_vectorized(panel):
+    close, high, low = panel['close'][:, 0], panel['high'][:, 0], panel['low'][:, 0]
+    column = panel['close']
+    cases = [
+        (stream(SMA(20), close), backtest.sma(column, 20)),
+        (stream(EMA(12), close), backtest.ema(column, 12)),
+        (stream(RollingMax(30), close), backtest.rolling_max(column, 30)),
+        (stream(RollingMin(30), close), backtest.rolling_min(column, 30)),
+        (stream(RSI(14), close), backtest.rsi(column, 14)),
+        (stream(ATR(20), high, low, close), backtest.atr(panel['high'], panel['low'], column, 20)),
+    ]
+    for streamed, vectorized in cases:
+        np.testing.assert_allclose(streamed, vectorized[:, 0], rtol=1e-9, atol=1e-9, equal_nan=True)
+
+
+PARAMS = {
+    '双均线策略': [{'fast': 5, 'slow': 30, 'kind': 'sma'}, {'fast': 10, 'slow': 60, 'kind': 'ema'}],
+    'RSI超买超卖策略': [{'period': 14, 'lower': 30, 'upper': 70}, {'period': 7, 'lower': 20, 'upper': 80}],
+    '海龟交易法则': [{'entry': 20, 'exit': 10, 'stop_atr': 2.0}, {'entry': 55, 'exit': 20, 'stop_atr': 3.0}],
+    'Dual Thrust策略': [{'lookback': 4, 'k1': 0.5, 'k2': 0.5}, {'lookback': 3, 'k1': 0.3, 'k2': 0.7}],
+    '比特币动量策略': [{'lookback': 20, 'trend': 50}, {'lookback': 60, 'trend': 200}],
+}
+
+
+@pytest.mark.parametrize('name,params', [(name, params) for name in STREAMING_STRATEGIES
+                                         for params in PARAMS[name]])
+def test_streaming_positions_match_backtest(panel, name, params):
+    vectorized = np.nan_to_num(get_backtest_strategy(name, **params).positions(panel)[:, 0])
+    strategy = get_streaming_strategy(name, **params)
+    streamed = np.array([strategy.update(bar) for bar in bars_of(panel)])
+    assert np.count_nonzero(vectorized) > 0
+    np.testing.assert_array_equal(streamed, vectorized)
+
+
+def test_latency_histogram_quantiles():
+    rng = np.random.default_rng(1)
+    values = np.concatenate([rng.integers(0, 20, 500), rng.lognormal(8, 1.5, 20000).astype(np.int64)])
+    histogram = LatencyHistogram()
+    for value in values.tolist():
+        histogram.record(value)
+    exact = np.sort(values)
+    assert histogram.count == len(values) and histogram.total == int(values.sum())
+    assert histogram.max == exact[-1]
+    for q in (0.0, 0.01, 0.5, 0.9, 0.99, 0.999, 1.0):
+        expected = exact[min(len(exact) - 1, int(len(exact) * q))]
+        assert abs(histogram.quantile(q) - expected) <= max(0.5, expected / 16)
+
+
+def test_replay_latency_memory_is_bounded(panel):
+    strategies = {name: get_streaming_strategy(name) for name in STREAMING_STRATEGIES}
+    report = replay(iter(bars_of(panel)), strategies)
+    for name in strategies:
+        histogram = report.latencies[name]
+        # 直方图大小固定，不随更新次数增长
+        assert len(histogram.counts) == len(LatencyHistogram().counts)
+        summary = report.latency_summary(name)
+        assert summary['updates'] == len(panel['close'])
+        assert 0 < summary['p50_us'] <= summary['p99_us'] <= summary['max_us']
+
+
+def test_streaming_strategy_base_is_abstract():
+    with pytest.raises(TypeError):
+        StreamingStrategy()
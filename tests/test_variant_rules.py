@@ -0,0 +1,62 @@
+"""变体规则引擎：维度笛卡尔积、分类过滤、字段模板与规则指纹"""
+
+import pytest
+
+from variant_rules import VariantRuleEngine
+
+BASE = {'name': '双均线{快慢}', 'category': 'stocks', 'indicators': 'SMA', 'logic': '金叉买入'}
+
+CONFIG = {'rules': [
+    {'variant_type': 'grid', 'axes': [
+        {'field': 'timeframe', 'values': ['日线', '周线']},
+        {'values': [{'label': '激进{版}', 'fields': {'risk_level': '高', 'indicators': '{indicators} + MACD'}},
+                    {'label': '', 'fields': {'risk_level': '低'}}]},
+    ]},
+    {'variant_type': 'market', 'categories': ['stocks', 'crypto'], 'name': '{label}·{name}',
+     'axes': [{'field': 'market_specific', 'values_by_category': {'stocks': ['A股'], 'futures': ['商品']}}]},
+]}
+
+
+def test_generates_cartesian_product_in_rule_order():
+    engine = VariantRuleEngine.from_config(CONFIG)
+    variants = list(engine.generate(BASE))
+    assert engine.count('stocks') == len(variants) == 5
+    assert [v['name'] for v in variants] == [
+        '双均线{快慢} (日线, 激进{版})', '双均线{快慢} (日线)',
+        '双均线{快慢} (周线, 激进{版})', '双均线{快慢} (周线)', 'A股·双均线{快慢}',
+    ]
+    assert variants[0]['indicators'] == 'SMA + MACD' and variants[1]['indicators'] == 'SMA'
+    assert [v['risk_level'] for v in variants[:4]] == ['高', '低', '高', '低']
+    assert all(v['variant_of'] == BASE['name'] and v['logic'] == BASE['logic'] for v in variants)
+    assert [v['variant_type'] for v in variants] == ['grid'] * 4 + ['market']
+    assert BASE == {'name': '双均线{快慢}', 'category': 'stocks', 'indicators': 'SMA', 'logic': '金叉买入'}
+
+
+def test_category_filters():
+    engine = VariantRuleEngine.from_config(CONFIG)
+    # futures不在规则的categories中；crypto在其中但没有对应取值
+    assert engine.count('futures') == 4
+    assert engine.count('crypto') == 4
+    assert engine.count('options') == 4
+
+
+def test_fingerprint_tracks_config():
+    changed = {'rules': CONFIG['rules'][:1]}
+    assert VariantRuleEngine.from_config(CONFIG).fingerprint == VariantRuleEngine.from_config(dict(CONFIG)).fingerprint
+    assert VariantRuleEngine.from_config(changed).fingerprint != VariantRuleEngine.from_config(CONFIG).fingerprint
+
+
+def test_invalid_rules():
+    with pytest.raises(ValueError):
+        VariantRuleEngine.from_config({'rules': [{'variant_type': 'empty', 'axes': []}]})
+    engine = VariantRuleEngine.from_config({'rules': [{'variant_type': 'bad', 'axes': [{'values': ['日线']}]}]})
+    with pytest.raises(ValueError):
+        engine.count('stocks')
+
+
+def test_default_rule_file_loads():
+    engine = VariantRuleEngine.from_file()
+    for category in ('stocks', 'futures', 'crypto', 'options'):
+        variants = list(engine.generate(dict(BASE, category=category)))
+        assert len(variants) == engine.count(category) > 0
+        assert len({v['name'] for v in variants}) == len(variants)
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+变体规则引擎 - 从配置文件读取变体维度，按分类预先展开笛卡尔积
+新增变体维度只需修改配置文件（默认 variant_rules.json），无需改代码
+"""
+
+import hashlib
+import json
+import os
+from itertools import product
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# 默认规则文件（与本模块位于同一目录）
+DEFAULT_RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'variant_rules.json')
+
+# 变体名称模板，{label} 为各维度取值标签（多个维度以逗号连接）
+DEFAULT_NAME_TEMPLATE = '{name} ({label})'
+
+# 编译后的变体：(variant_type, 名称模板, ((字段, 值, 是否为模板), ...))
+CompiledVariant = Tuple[str, str, Tuple[Tuple[str, Any, bool], ...]]
+
+
+class _TemplateFields:
+    """模板取值：按基础策略字段格式化，缺失字段视为空字符串"""
+
+    __slots__ = ('strategy',)
+
+    def __init__(self, strategy: Dict):
+        self.strategy = strategy
+
+    def __getitem__(self, key: str) -> Any:
+        return self.strategy.get(key, '')
+
+
+class VariantRule:
+    """一条变体规则：若干变体维度的笛卡尔积，每个组合生成一个变体
+
+    配置格式：
+        {
+            "variant_type": "timeframe",
+            "categories": ["stocks"],                # 可选，只作用于指定分类
+            "name": "{name} ({label})",              # 可选，变体名称模板
+            "axes": [
+                {"field": "timeframe", "values": ["日内", "日线"]},
+                {"values": [{"label": "激进版", "fields": {"risk_level": "高"}}]},
+                {"field": "market_specific", "values_by_category": {"stocks": ["A股"]}}
+            ]
+        }
+
+    fields中的字符串是格式化模板，可引用基础策略字段（如 "{indicators} + MACD"）。
+    """
+
+    def __init__(self, variant_type: str, axes: List[Dict],
+                 categories: Optional[List[str]] = None,
+                 name: str = DEFAULT_NAME_TEMPLATE):
+        if not axes:
+            raise ValueError(f"变体规则 {variant_type} 至少需要一个维度")
+        self.variant_type = variant_type
+        self.axes = axes
+        self.categories = set(categories) if categories is not None else None
+        self.name = name
+
+    @classmethod
+    def from_config(cls, config: Dict) -> 'VariantRule':
+        return cls(
+            variant_type=config['variant_type'],
+            axes=config['axes'],
+            categories=config.get('categories'),
+            name=config.get('name', DEFAULT_NAME_TEMPLATE),
+        )
+
+    def _axis_options(self, axis: Dict, category: str) -> List[Tuple[str, List[Tuple[str, Any, bool]]]]:
+        """维度在指定分类下的取值列表：[(标签, [(字段, 值, 是否为模板), ...]), ...]"""
+        if 'values_by_category' in axis:
+            values = axis['values_by_category'].get(category, [])
+        else:
+            values = axis.get('values', [])
+
+        options = []
+        for value in values:
+            if isinstance(value, dict):
+                fields = [
+                    (key, v, isinstance(v, str) and '{' in v)
+                    for key, v in value.get('fields', {}).items()
+                ]
+                options.append((str(value.get('label', '')), fields))
+            elif 'field' in axis:
+                # 简写形式：取值本身既是标签也是字段值
+                options.append((str(value), [(axis['field'], value, False)]))
+            else:
+                raise ValueError(f"变体规则 {self.variant_type} 的维度缺少field，无法使用简写取值")
+        return options
+
+    def compile(self, category: str) -> List[CompiledVariant]:
+        """展开指定分类下全部维度组合"""
+        if self.categories is not None and category not in self.categories:
+            return []
+
+        compiled = []
+        axes = [self._axis_options(axis, category) for axis in self.axes]
+        for combination in product(*axes):
+            label = ', '.join(option_label for option_label, _ in combination if option_label)
+            # 标签中的花括号需转义，避免被当作模板字段
+            name = self.name.replace('{label}', label.replace('{', '{{').replace('}', '}}'))
+            fields = tuple(field for _, option_fields in combination for field in option_fields)
+            compiled.append((self.variant_type, name, fields))
+        return compiled
+
+
+class VariantRuleEngine:
+    """变体规则引擎
+
+    各分类的维度组合只在首次遇到该分类时展开一次并缓存，
+    之后每个基础策略只需逐个套用已编译的字段模板。
+    """
+
+    def __init__(self, rules: List[VariantRule], fingerprint: str = ''):
+        self.rules = rules
+        self.fingerprint = fingerprint
+        self._plans: Dict[str, List[CompiledVariant]] = {}
+
+    @classmethod
+    def from_config(cls, config: Dict) -> 'VariantRuleEngine':
+        """从配置字典创建规则引擎"""
+        canonical = json.dumps(config, ensure_ascii=False, sort_keys=True)
+        fingerprint = hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:16]
+        rules = [VariantRule.from_config(rule) for rule in config.get('rules', [])]
+        return cls(rules, fingerprint)
+
+    @classmethod
+    def from_file(cls, path: str = DEFAULT_RULES_FILE) -> 'VariantRuleEngine':
+        """从JSON规则文件创建规则引擎"""
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_config(json.load(f))
+
+    def plan(self, category: str) -> List[CompiledVariant]:
+        """返回分类的变体展开计划（按规则顺序）"""
+        plan = self._plans.get(category)
+        if plan is None:
+            plan = [variant for rule in self.rules for variant in rule.compile(category)]
+            self._plans[category] = plan
+        return plan
+
+    def count(self, category: str) -> int:
+        """分类下每个基础策略生成的变体数"""
+        return len(self.plan(category))
+
+    def generate(self, strategy: Dict) -> Iterator[Dict]:
+        """为单个基础策略惰性生成全部变体"""
+        base_name = strategy['name']
+        fields = _TemplateFields(strategy)
+        for variant_type, name, overrides in self.plan(strategy.get('category')):
+            variant = strategy.copy()
+            variant['name'] = name.format_map(fields)
+            for key, value, is_template in overrides:
+                variant[key] = value.format_map(fields) if is_template else value
+            variant['variant_of'] = base_name
+            variant['variant_type'] = variant_type
+            yield variant
+
+    def generate_many(self, strategies: Iterable[Dict]) -> Iterator[Dict]:
+        """按顺序为一组基础策略惰性生成变体"""
+        for strategy in strategies:
+            yield from self.generate(strategy)